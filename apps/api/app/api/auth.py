@@ -1,12 +1,14 @@
 # apps/api/app/api/auth.py
 from fastapi import APIRouter, HTTPException, status, Depends
 from fastapi.responses import RedirectResponse
-from supabase import create_client, Client
+from supabase import AsyncClient
 import os
 import logging
 from typing import Optional
 from pydantic import BaseModel, EmailStr, Field
 from app.dependencies.auth_middleware import get_current_user_id # Import the new dependency
+from app.core.supabase import supabase_registry
+from app.services.user_service import invalidate_profile_cache
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -15,25 +17,31 @@ class UserCredentials(BaseModel):
     email: EmailStr
     password: str
 
-# Supabase client initialization (for authenticated user actions)
-def get_supabase_client() -> Client:
-    supabase_url = os.environ.get("SUPABASE_URL")
-    supabase_key = os.environ.get("SUPABASE_KEY") # This is typically the anon key
-    if not supabase_url or not supabase_key:
-        raise HTTPException(status_code=500, detail="Supabase URL and Key must be set as environment variables.")
-    return create_client(supabase_url, supabase_key)
-
-# Supabase client initialization (for admin actions requiring service role key)
-def get_admin_supabase_client() -> Client:
-    supabase_url = os.environ.get("SUPABASE_URL")
-    supabase_service_role_key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
-    if not supabase_url or not supabase_service_role_key:
-        raise HTTPException(status_code=500, detail="Supabase URL and SERVICE_ROLE_KEY must be set as environment variables.")
-    return create_client(supabase_url, supabase_service_role_key)
+# Supabase client for authenticated user actions (pooled anon client from the shared registry)
+def get_supabase_client() -> AsyncClient:
+    try:
+        return supabase_registry.anon()
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Supabase client for sign-up / sign-in. Never shared: a session established on it would leak
+# into every other request using the same client. Still reuses the registry's connection pool.
+def get_auth_supabase_client() -> AsyncClient:
+    try:
+        return supabase_registry.for_auth_flow()
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Supabase client for admin actions requiring the service role key (pooled, shared registry)
+def get_admin_supabase_client() -> AsyncClient:
+    try:
+        return supabase_registry.admin()
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/register", status_code=status.HTTP_201_CREATED)
-async def register_user(credentials: UserCredentials, supabase: Client = Depends(get_supabase_client)):
-    response = supabase.auth.sign_up({"email": credentials.email, "password": credentials.password})
+async def register_user(credentials: UserCredentials, supabase: AsyncClient = Depends(get_auth_supabase_client)):
+    response = await supabase.auth.sign_up({"email": credentials.email, "password": credentials.password})
     if response.user:
         return {"user": response.user.__dict__, "session": response.session}
     elif response.error:
@@ -42,8 +50,8 @@ async def register_user(credentials: UserCredentials, supabase: Client = Depends
 
 
 @router.post("/login")
-async def login_user(credentials: UserCredentials, supabase: Client = Depends(get_supabase_client)):
-    response = supabase.auth.sign_in_with_password({"email": credentials.email, "password": credentials.password})
+async def login_user(credentials: UserCredentials, supabase: AsyncClient = Depends(get_auth_supabase_client)):
+    response = await supabase.auth.sign_in_with_password({"email": credentials.email, "password": credentials.password})
     if response.session:
         return {"access_token": response.session.access_token, "token_type": "bearer"}
     elif response.error:
@@ -52,7 +60,7 @@ async def login_user(credentials: UserCredentials, supabase: Client = Depends(ge
 
 
 @router.get("/google")
-async def google_oauth_initiate(supabase: Client = Depends(get_supabase_client)):
+async def google_oauth_initiate(supabase: AsyncClient = Depends(get_supabase_client)):
     frontend_base_url = os.environ.get("FRONTEND_BASE_URL", "http://localhost:3000")
     logger.info("Backend /auth/google endpoint called. Redirecting to frontend's configured callback.")
     return RedirectResponse(url=f"{frontend_base_url}/auth/callback")
@@ -63,7 +71,7 @@ async def auth_callback(
     refresh_token: Optional[str] = None,
     error: Optional[str] = None,
     error_description: Optional[str] = None,
-    supabase: Client = Depends(get_supabase_client)
+    supabase: AsyncClient = Depends(get_supabase_client)
 ):
     logger.info(f"Backend /auth/callback received. Access Token: {access_token}, Refresh Token: {refresh_token}, Error: {error}")
 
@@ -83,7 +91,7 @@ async def auth_callback(
 @router.delete("/users/me", summary="Delete authenticated user's account")
 async def delete_account(
     user_id: str = Depends(get_current_user_id),
-    supabase_admin: Client = Depends(get_admin_supabase_client)
+    supabase_admin: AsyncClient = Depends(get_admin_supabase_client)
 ):
     """
     Deletes the authenticated user's account and all associated data.
@@ -95,26 +103,33 @@ async def delete_account(
         # that reference this user_id.
 
         # Delete from Goals table
-        goals_delete_response = supabase_admin.table("Goals").delete().eq("user_id", user_id).execute()
+        goals_delete_response = await supabase_admin.table("Goals").delete().eq("user_id", user_id).execute()
         if goals_delete_response.error:
             logger.error(f"Error deleting goals for user {user_id}: {goals_delete_response.error.message}")
             raise HTTPException(status_code=500, detail="Failed to delete associated goals.")
 
         # Delete from WorkoutLogs table
-        workout_logs_delete_response = supabase_admin.table("WorkoutLogs").delete().eq("user_id", user_id).execute()
+        workout_logs_delete_response = await supabase_admin.table("WorkoutLogs").delete().eq("user_id", user_id).execute()
         if workout_logs_delete_response.error:
             logger.error(f"Error deleting workout logs for user {user_id}: {workout_logs_delete_response.error.message}")
             raise HTTPException(status_code=500, detail="Failed to delete associated workout logs.")
 
         # Delete from Equipment table
-        equipment_delete_response = supabase_admin.table("Equipment").delete().eq("user_id", user_id).execute()
+        equipment_delete_response = await supabase_admin.table("Equipment").delete().eq("user_id", user_id).execute()
         if equipment_delete_response.error:
             logger.error(f"Error deleting equipment for user {user_id}: {equipment_delete_response.error.message}")
             raise HTTPException(status_code=500, detail="Failed to delete associated equipment.")
 
+        # Delete what is derived from the workout logs: dashboard rollups and weekly reviews
+        for table in ("WorkoutDailyRollups", "WorkoutWeeklyRollups", "WorkoutRollupVersions", "WeeklyReviewSnapshots"):
+            derived_delete_response = await supabase_admin.table(table).delete().eq("user_id", user_id).execute()
+            if derived_delete_response.error:
+                logger.error(f"Error deleting {table} for user {user_id}: {derived_delete_response.error.message}")
+                raise HTTPException(status_code=500, detail="Failed to delete associated workout summaries.")
+
         # Step 2: Delete the user from Supabase Auth
         # This requires the service role key.
-        user_delete_response = supabase_admin.auth.admin.delete_user(user_id)
+        user_delete_response = await supabase_admin.auth.admin.delete_user(user_id)
         if user_delete_response.error:
             logger.error(f"Error deleting user {user_id} from Supabase Auth: {user_delete_response.error.message}")
             raise HTTPException(status_code=500, detail="Failed to delete user from authentication system.")
@@ -129,4 +144,7 @@ async def delete_account(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An unexpected error occurred during account deletion.",
-        )
\ No newline at end of file
+        )
+    finally:
+        # Drop the cached profile whether or not every step succeeded; some data may already be gone.
+        await invalidate_profile_cache(user_id)
\ No newline at end of file
@@ -1,22 +1,85 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+import math
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from typing import Optional
 from uuid import UUID
 
-from apps.api.app.models.dashboard import DashboardMetrics
-from apps.api.app.services.dashboard_service import DashboardService
-from apps.api.app.core.auth import get_current_user_id
+from app.core.conditional import PRIVATE_IMMUTABLE, etag_matches, not_modified, set_validators
+from app.core.config import settings
+from app.models.dashboard import DashboardMetrics
+from app.services.charts import CHART_KINDS, canonical_values, chart_etag, sparklines
+from app.services.dashboard_service import DashboardService
+from app.dependencies.auth_middleware import get_current_user_id
 
 dashboard_router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
+
+def get_dashboard_service() -> DashboardService:
+    return DashboardService()
+
+
+def _absolute(request: Request, path: Optional[str]) -> Optional[str]:
+    # Charts load as <img> from the web app's origin, so they need the API's own origin.
+    return f"{str(request.base_url).rstrip('/')}{path}" if path and path.startswith("/") else path
+
 @dashboard_router.get(
     "/",
     response_model=DashboardMetrics,
     status_code=status.HTTP_200_OK,
     summary="Get user's dashboard metrics and weekly review",
-    dependencies=[Depends(get_current_user_id)],
 )
 async def get_dashboard(
+    request: Request,
+    response: Response,
     user_id: UUID = Depends(get_current_user_id),
+    dashboard_service: DashboardService = Depends(get_dashboard_service),
 ):
-    # This will be implemented in Subtask 4.3 and 4.4
-    raise NotImplementedError("Getting dashboard metrics is not yet implemented.")
+    # One primary-key read of the rollup version decides 304 before the rollups are read.
+    etag = await dashboard_service.etag(user_id, str(request.base_url))
+    unchanged = not_modified(request, "dashboard", etag)
+    if unchanged is not None:
+        return unchanged
+    metrics = await dashboard_service.get_dashboard_metrics(user_id)
+    review = metrics.weekly_review
+    metrics.weekly_volume.chart_data_url = _absolute(request, metrics.weekly_volume.chart_data_url)
+    review.volume.chart_url = _absolute(request, review.volume.chart_url)
+    review.intensity.chart_url = _absolute(request, review.intensity.chart_url)
+    # A write landing after the version read only makes this ETag older than the body: the next
+    # request misses and refetches, it can never pin a stale body.
+    set_validators(response, etag)
+    return metrics
+
+@dashboard_router.get(
+    "/charts/{kind}.svg",
+    response_class=Response,
+    summary="Render a weekly review sparkline",
+    description=(
+        "SVG sparkline of the comma-separated `values` (as linked from the dashboard). Responses carry an "
+        "ETag derived from the series; a matching If-None-Match gets 304 without re-rendering."
+    ),
+)
+async def get_dashboard_chart(
+    kind: str,
+    request: Request,
+    values: str = Query("", max_length=4096),
+):
+    if kind not in CHART_KINDS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown chart: {kind}")
+    try:
+        series = [float(value) for value in values.split(",")] if values else []
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="values must be comma-separated numbers.")
+    if len(series) > settings.CHART_MAX_POINTS or not all(math.isfinite(value) for value in series):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"values must be at most {settings.CHART_MAX_POINTS} finite numbers.",
+        )
+
+    # Chart URLs carry their series, so a URL's content never changes; the series is the user's own
+    # training data, so only their browser may keep it.
+    etag = chart_etag(kind, canonical_values(series))
+    headers = {"ETag": etag, "Cache-Control": PRIVATE_IMMUTABLE}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        sparklines.record_not_modified()
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    _, svg = sparklines.render(kind, series)
+    return Response(content=svg, media_type="image/svg+xml", headers=headers)
@@ -1,5 +1,6 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status
-from supabase import Client
+from supabase import AsyncClient
 import os
 import logging # Moved to top
 from dotenv import load_dotenv
@@ -17,7 +18,7 @@ router = APIRouter()
 @router.post("/users/me/export", summary="Request GDPR-compliant data export")
 async def request_data_export(
     user_id: str = Depends(get_current_user_id),
-    supabase: Client = Depends(get_supabase_client) # Use reusable Supabase client
+    supabase: AsyncClient = Depends(get_supabase_client) # Use reusable Supabase client
 ):
     """
     Initiates a GDPR-compliant data export for the authenticated user.
@@ -26,10 +27,18 @@ async def request_data_export(
     try:
         # TODO: Implement Data Export Service logic to fetch and format user data
         # This is a placeholder for fetching data from various tables
-        user_profile_response = supabase.table("Users").select("*").eq("id", user_id).single().execute()
-        user_goals_response = supabase.table("Goals").select("*").eq("user_id", user_id).execute()
-        user_equipment_response = supabase.table("Equipment").select("*").eq("user_id", user_id).execute()
-        user_workout_logs_response = supabase.table("WorkoutLogs").select("*").eq("user_id", user_id).execute()
+        # The reads are independent, so they run concurrently over the shared connection pool.
+        (
+            user_profile_response,
+            user_goals_response,
+            user_equipment_response,
+            user_workout_logs_response,
+        ) = await asyncio.gather(
+            supabase.table("Users").select("*").eq("id", user_id).single().execute(),
+            supabase.table("Goals").select("*").eq("user_id", user_id).execute(),
+            supabase.table("Equipment").select("*").eq("user_id", user_id).execute(),
+            supabase.table("WorkoutLogs").select("*").eq("user_id", user_id).execute(),
+        )
         # Add other relevant tables as needed
 
         exported_data = {
@@ -1,39 +1,89 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from typing import List, Optional
 from uuid import UUID
 
-from ..models.workout_log import WorkoutLogCreate, WorkoutLogResponse
-from ..services.log_service import LogService
-from app.core.supabase import get_current_user_id
+from ..core.config import settings
+from ..models.workout_log import WorkoutLogBulkResult, WorkoutLogCreate, WorkoutLogPage, WorkoutLogResponse
+from ..services.log_service import BULK_FAILED, LogService
+from ..services.log_writer import BufferedLogWriter
+from app.dependencies.auth_middleware import get_current_user_id
 
 logs_router = APIRouter(prefix="/logs", tags=["Workout Logs"])
 
 log_service = LogService()
 
+
+def get_log_writer(request: Request) -> Optional[BufferedLogWriter]:
+    return getattr(request.app.state, "log_writer", None)
+
+@logs_router.get(
+    "/",
+    response_model=WorkoutLogPage,
+    summary="List logged workout sets",
+    description=(
+        "Returns the user's sets newest first, one page at a time; pass `next_cursor` back as `cursor` "
+        "for the next page. Filter by exercise, plan and a `since`/`until` window on `completed_at`, "
+        "and limit the returned columns with a comma-separated `fields`."
+    ),
+)
+async def list_workout_sets(
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(settings.LOG_PAGE_SIZE, ge=1, le=settings.LOG_MAX_PAGE_SIZE),
+    exercise: Optional[str] = Query(None, description="Exact exercise name"),
+    plan_id: Optional[UUID] = Query(None),
+    since: Optional[datetime] = Query(None, description="Inclusive lower bound on completed_at"),
+    until: Optional[datetime] = Query(None, description="Exclusive upper bound on completed_at"),
+    fields: Optional[str] = Query(None, description="e.g. exercise_name,actual_weight,actual_reps"),
+    user_id: UUID = Depends(get_current_user_id),
+):
+    selected = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    try:
+        return await log_service.list_logs(
+            user_id, limit=limit, cursor=cursor, exercise_name=exercise, plan_id=plan_id,
+            since=since, until=until, fields=selected,
+        )
+    except ValueError as e: # unknown field or a cursor this server did not issue
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
 @logs_router.post(
     "/",
     response_model=WorkoutLogResponse,
     status_code=status.HTTP_201_CREATED,
     summary="Log a single workout set",
     description="Logs data for a single completed workout set (reps, weight, RPE).",
-    dependencies=[Depends(get_current_user_id)],
 )
 async def log_workout_set(
     log_entry: WorkoutLogCreate,
     user_id: UUID = Depends(get_current_user_id),
+    log_writer: Optional[BufferedLogWriter] = Depends(get_log_writer),
 ):
+    if log_writer is not None:
+        # Write-behind: durable in the local WAL now, in WorkoutLogs within LOG_FLUSH_INTERVAL_MS.
+        return log_writer.append(log_entry, user_id)
     return await log_service.create_log_entry(log_entry, user_id)
 
 @logs_router.post(
     "/bulk",
-    response_model=List[WorkoutLogResponse],
+    response_model=List[WorkoutLogBulkResult],
     status_code=status.HTTP_201_CREATED,
     summary="Log multiple workout sets in bulk",
-    description="Logs data for multiple completed workout sets.",
-    dependencies=[Depends(get_current_user_id)],
+    description=(
+        "Logs data for multiple completed workout sets. Idempotent on client-generated `id`s: replayed "
+        "sets are reported as `duplicate` rather than stored twice. Returns 207 if some sets failed."
+    ),
 )
 async def bulk_log_workout_sets(
     log_entries: List[WorkoutLogCreate],
+    response: Response,
     user_id: UUID = Depends(get_current_user_id),
 ):
-    return await log_service.create_bulk_log_entries(log_entries, user_id)
\ No newline at end of file
+    if len(log_entries) > settings.LOG_BULK_MAX_ENTRIES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.LOG_BULK_MAX_ENTRIES} workout sets per request."
+        )
+    results = await log_service.create_bulk_log_entries(log_entries, user_id)
+    if any(result.status == BULK_FAILED for result in results):
+        response.status_code = status.HTTP_207_MULTI_STATUS
+    return results
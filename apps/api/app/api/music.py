@@ -7,7 +7,7 @@ from datetime import datetime # Import datetime
 
 from app.services.music_service import MusicService
 from app.core.config import settings
-from app.core.supabase import get_current_user_id # Import the dependency
+from app.dependencies.auth_middleware import get_current_user_id
 from app.models.music import MusicFeedbackRequest # Import MusicFeedbackRequest
 
 # Initialize MusicService
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from typing import Dict, Any, Optional, List
 
-from app.core.supabase import get_current_user_id
+from app.dependencies.auth_middleware import get_current_user_id
 
 router = APIRouter(redirect_slashes=False)
 
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from app.models.workout_plan import PlanGenerationRequest, PlanGenerationResponse, WorkoutPlanModel, WorkoutDay, Exercise
-from app.services.ai_orchestrator import AIOrchestratorService
+from app.services.ai_orchestrator import AIOrchestratorService, AIServiceTimeout, get_ai_orchestrator
 from app.services.plan_service import PlanService
-from datetime import date
+from app.services.plan_jobs import JobQueueFull, PlanJobQueue, run_plan_generation, stream_plan_generation
+from app.core.conditional import not_modified, set_validators, strong_etag
+from app.core.config import settings
+from app.dependencies.auth_middleware import get_current_user_id
+import json
 import logging
 
 router = APIRouter()
@@ -10,11 +15,16 @@ logger = logging.getLogger(__name__)
 
 # Dependency functions for services
 async def get_ai_orchestrator_service() -> AIOrchestratorService:
-    return AIOrchestratorService()
+    # Shared instance: one OpenAI connection pool and one set of concurrency limits per process.
+    return get_ai_orchestrator()
 
 async def get_plan_service() -> PlanService:
     return PlanService()
 
+async def get_plan_job_queue_service(request: Request) -> PlanJobQueue:
+    # Started and stopped by the app lifespan (app.main), alongside its event loop.
+    return request.app.state.plan_job_queue
+
 @router.get("/")
 async def read_root():
     return {"message": "Plans API is working!"}
@@ -22,37 +32,40 @@ async def read_root():
 @router.post("/generate", response_model=PlanGenerationResponse)
 async def generate_plan(
     request: PlanGenerationRequest,
+    mode: str = Query("sync", pattern="^(sync|async)$"),
+    user_id: str = Depends(get_current_user_id),
     ai_orchestrator_service: AIOrchestratorService = Depends(get_ai_orchestrator_service),
-    plan_service: PlanService = Depends(get_plan_service)
+    plan_service: PlanService = Depends(get_plan_service),
+    plan_job_queue: PlanJobQueue = Depends(get_plan_job_queue_service)
 ):
-    # Dummy user data for now. In reality, this would come from the authenticated user.
-    user_id = "test_user_id"
-    user_profile = {"fitness_level": "intermediate"}
-    user_goals = {"primary_goal": "build_muscle"}
-    workout_history = [] # Placeholder
-
-    try:
-        workout_plan = await ai_orchestrator_service.generate_workout_plan(
-            user_id=user_id,
-            user_profile=user_profile,
-            user_goals=user_goals,
-            workout_history=workout_history,
-            context=request.context
-        )
-        
-        # Ensure user_id and plan_date are set in the generated plan
-        workout_plan.user_id = user_id
-        workout_plan.plan_date = date.today()
-
-        # Store the generated plan
-        stored_plan = await plan_service.store_workout_plan(workout_plan)
-        if not stored_plan:
+    """
+    Generates and stores today's plan. `mode=async` returns 202 with a job id immediately instead;
+    the plan is then fetched from GET /plans/jobs/{job_id}.
+    """
+    if mode == "async":
+        try:
+            job = await plan_job_queue.submit(user_id, request.context)
+        except JobQueueFull as e:
+            logger.warning(f"Rejecting async plan generation: {e}")
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to store generated workout plan."
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many plan generations queued. Please try again shortly.",
+                headers={"Retry-After": "5"}
             )
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"job_id": job["id"], "status": job["status"], "status_url": f"/api/v1/plans/jobs/{job['id']}"}
+        )
 
+    try:
+        workout_plan = await run_plan_generation(user_id, request.context, ai_orchestrator_service, plan_service)
         return PlanGenerationResponse(data=workout_plan)
+    except AIServiceTimeout as e:
+        logger.error(f"AI plan generation timed out: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Workout plan generation timed out. Please try again."
+        )
     except ValueError as e:
         logger.error(f"AI plan generation validation error: {e}")
         raise HTTPException(
@@ -64,4 +77,75 @@ async def generate_plan(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to generate or store workout plan"
-        )
\ No newline at end of file
+        )
+
+def _encode_event(event: str, data, ndjson: bool) -> str:
+    if ndjson:
+        return json.dumps({"event": event, "data": data}) + "\n"
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/generate/stream")
+async def generate_plan_stream(
+    request: PlanGenerationRequest,
+    http_request: Request,
+    user_id: str = Depends(get_current_user_id),
+    ai_orchestrator_service: AIOrchestratorService = Depends(get_ai_orchestrator_service),
+    plan_service: PlanService = Depends(get_plan_service)
+):
+    """
+    Streaming variant of /generate, with the same inputs, drafts and rule-based fallback. Emits
+    `exercise` and `day` events as soon as each part of the plan validates, then a final `plan`
+    event once the whole plan is stored (it replaces any parts sent before a fallback), or an
+    `error` event carrying the status /generate would have returned.
+    Server-sent events by default; NDJSON when the client sends `Accept: application/x-ndjson`.
+    """
+    ndjson = "application/x-ndjson" in http_request.headers.get("accept", "")
+
+    async def events():
+        try:
+            async for event, data in stream_plan_generation(user_id, request.context, ai_orchestrator_service, plan_service):
+                if event == "plan":
+                    data = data.model_dump(mode="json")
+                yield _encode_event(event, data, ndjson)
+        except AIServiceTimeout as e:
+            logger.error(f"AI plan generation timed out: {e}")
+            yield _encode_event("error", {"status": 504, "detail": "Workout plan generation timed out. Please try again."}, ndjson)
+        except ValueError as e:
+            logger.error(f"AI plan generation validation error: {e}")
+            yield _encode_event("error", {"status": 422, "detail": str(e)}, ndjson)
+        except Exception as e:
+            logger.error(f"Failed to generate or store workout plan: {e}")
+            yield _encode_event("error", {"status": 500, "detail": "Failed to generate or store workout plan"}, ndjson)
+
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson" if ndjson else "text/event-stream",
+        # Disable proxy buffering so each event reaches the client as soon as it is written.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/jobs/{job_id}")
+async def get_plan_job(
+    job_id: str,
+    request: Request,
+    response: Response,
+    wait: float = Query(0, ge=0, le=settings.PLAN_JOB_LONG_POLL_MAX_SECONDS, description="Long-poll up to this many seconds for the job to finish"),
+    user_id: str = Depends(get_current_user_id),
+    plan_job_queue: PlanJobQueue = Depends(get_plan_job_queue_service)
+):
+    """
+    Status of an async plan generation job. `result` holds the stored plan once `status` is
+    "succeeded"; `error` holds the status and detail /generate would have returned if "failed".
+    Polls may send If-None-Match: a job whose state has not moved since is answered with 304.
+    """
+    job = await (plan_job_queue.wait(job_id, user_id, wait) if wait else plan_job_queue.get(job_id, user_id))
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Plan job not found")
+    # A job only moves forward (queued -> running -> finished), so its timestamps version it.
+    etag = strong_etag("plan_job", job["id"], job["status"], job["started_at"], job["finished_at"])
+    unchanged = not_modified(request, "plan_job", etag)
+    if unchanged is not None:
+        return unchanged
+    set_validators(response, etag)
+    return {key: job[key] for key in ("id", "status", "created_at", "started_at", "finished_at", "result", "error")}
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Optional
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.supabase import get_user_supabase_client
+from app.dependencies.auth_middleware import get_current_user_id
+from app.models.sync import SyncPullResponse, SyncPushRequest, SyncPushResponse
+from app.services.sync_service import InvalidCursor, SyncService
+
+router = APIRouter()
+
+
+def get_sync_service(supabase=Depends(get_user_supabase_client)) -> SyncService:
+    # Scoped to the caller's JWT: pushes and pulls go through the RLS policies on both tables.
+    return SyncService(supabase)
+
+
+@router.post(
+    "/push",
+    response_model=SyncPushResponse,
+    summary="Upload workout sets logged offline",
+    description="Applies a device's queued workout log mutations. Safe to retry: sets are deduplicated on their client-generated ids.",
+)
+async def sync_push(
+    request: SyncPushRequest,
+    user_id: UUID = Depends(get_current_user_id),
+    sync_service: SyncService = Depends(get_sync_service),
+):
+    if len(request.mutations) > settings.LOG_BULK_MAX_ENTRIES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.LOG_BULK_MAX_ENTRIES} mutations per push."
+        )
+    return await sync_service.push(request, user_id)
+
+
+@router.get(
+    "/pull",
+    response_model=SyncPullResponse,
+    summary="Fetch workout logs and plans changed since a cursor",
+    description="Returns one page of changes after `cursor` (omit it for a full initial sync) and the cursor to continue from.",
+)
+async def sync_pull(
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(settings.SYNC_PAGE_SIZE, ge=1, le=settings.SYNC_MAX_PAGE_SIZE),
+    user_id: UUID = Depends(get_current_user_id),
+    sync_service: SyncService = Depends(get_sync_service),
+):
+    try:
+        return await sync_service.pull(user_id, cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
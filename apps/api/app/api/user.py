@@ -1,12 +1,11 @@
 # apps/api/app/api/user.py
 from typing import List
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from pydantic import EmailStr
 
-# Assuming app.core.auth will provide get_current_user_id
-# If this import fails, it needs to be adjusted based on the actual auth module location
-from app.core.auth import get_current_user_id
+from app.core.conditional import not_modified, set_validators, strong_etag
+from app.dependencies.auth_middleware import get_current_user_id
 from app.models.user import UserProfileData, UserProfileUpdate, GoalUpdate, EquipmentCreate
 from app.services.user_service import UserService # Will be created in Subtask 4.4
 
@@ -14,18 +13,34 @@ router = APIRouter()
 
 @router.get("/users/me", response_model=UserProfileData)
 async def get_current_user_profile(
+    request: Request,
+    response: Response,
     current_user_id: UUID = Depends(get_current_user_id),
     user_service: UserService = Depends(UserService)
 ):
     """
-    Retrieve the profile of the currently authenticated user.
+    Retrieve the profile of the currently authenticated user. Supports If-None-Match: the ETag is
+    the profile version, bumped by database triggers on every write to users, goals and
+    equipment, so a 304 costs one primary-key read and the profile is only built on a miss.
     """
-    user_profile = await user_service.get_user_profile(current_user_id)
+    version = await user_service.profile_version(current_user_id)
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User profile not found"
+        )
+    etag = strong_etag("profile", current_user_id, version)
+    unchanged = not_modified(request, "users_me", etag)
+    if unchanged is not None:
+        return unchanged
+    user_profile = await user_service.get_user_profile(current_user_id, min_version=version)
     if not user_profile:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User profile not found"
         )
+    # A write landing after the version read only makes this ETag older than the body.
+    set_validators(response, etag)
     return user_profile
 
 @router.put("/users/me", response_model=UserProfileData)
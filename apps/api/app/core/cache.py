@@ -0,0 +1,178 @@
+# apps/api/app/core/cache.py
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+
+class TTLLRUCache:
+    """
+    Thread-safe in-process cache bounded by size (LRU eviction) and age (per-entry TTL).
+
+    Expired entries are dropped lazily on access. Counters are kept so the cache can be sized
+    from production traffic: a high eviction count relative to misses means `maxsize` is too small,
+    a high expiration count means `ttl` is shorter than the typical re-read interval.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class CacheBackend(ABC):
+    """
+    Shared cache tier behind a `TieredCache` (e.g. Redis in a multi-worker deployment).
+    Values handed to a backend are JSON-compatible so any networked store can hold them.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """Local stand-in for a shared backend, for development and tests."""
+
+    def __init__(self, maxsize: int = 10_000):
+        self._store = TTLLRUCache(maxsize=maxsize, ttl=0)
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self._store.get(key)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._store.set(key, value, ttl=ttl)
+
+    async def delete(self, key: str) -> None:
+        self._store.delete(key)
+
+
+class TieredCache:
+    """
+    Read-through cache: an in-process `TTLLRUCache` in front of an optional shared `CacheBackend`.
+    A local miss falls through to the backend and repopulates the local tier on a hit.
+    Invalidation clears both tiers.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float, backend: Optional[CacheBackend] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.local = TTLLRUCache(maxsize=maxsize, ttl=ttl, clock=clock)
+        self.backend = backend
+        self.backend_hits = 0
+        self.backend_errors = 0
+
+    def _backend_key(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None or self.backend is None:
+            return value
+        try:
+            value = await self.backend.get(self._backend_key(key))
+        except Exception:
+            # A shared-tier outage degrades to local-only caching, never to a failed request.
+            self.backend_errors += 1
+            return None
+        if value is not None:
+            self.backend_hits += 1
+            self.local.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        self.local.set(key, value)
+        if self.backend is not None:
+            try:
+                await self.backend.set(self._backend_key(key), value, self.local.ttl)
+            except Exception:
+                self.backend_errors += 1
+
+    async def invalidate(self, key: str) -> None:
+        self.local.delete(key)
+        if self.backend is not None:
+            try:
+                await self.backend.delete(self._backend_key(key))
+            except Exception:
+                self.backend_errors += 1
+
+    def clear(self) -> None:
+        """Clears the local tier only."""
+        self.local.clear()
+
+    def stats(self) -> dict:
+        stats = self.local.stats()
+        stats.update({
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+            "backend_hits": self.backend_hits,
+            "backend_errors": self.backend_errors,
+        })
+        return stats
@@ -0,0 +1,72 @@
+# apps/api/app/core/conditional.py
+
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response, status
+
+from app.core.metrics import metrics_registry
+
+# Cache-Control policies. Personal data is never stored by shared caches; `no-cache` lets the
+# browser keep a copy but makes it revalidate (If-None-Match) before every reuse.
+PRIVATE_REVALIDATE = "private, no-cache"
+# URLs whose content never changes but that carry personal data (chart URLs hold a user's series):
+# the browser keeps them for good, CDNs and proxies never store them.
+PRIVATE_IMMUTABLE = "private, max-age=31536000, immutable"
+
+
+def strong_etag(*parts: Any) -> str:
+    """A strong validator over the values that determine a representation (row versions, inputs)."""
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+class ConditionalStats:
+    """Per route: conditional-capable GETs served and how many were answered with 304."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes: Dict[str, Dict[str, int]] = {}
+
+    def record(self, route: str, not_modified: bool) -> None:
+        with self._lock:
+            counts = self.routes.setdefault(route, {"requests": 0, "not_modified": 0})
+            counts["requests"] += 1
+            counts["not_modified"] += not_modified
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                route: {**counts, "not_modified_ratio": round(counts["not_modified"] / counts["requests"], 4)}
+                for route, counts in self.routes.items()
+            }
+
+
+conditional_stats = ConditionalStats()
+metrics_registry.register("conditional_get", conditional_stats.stats)
+
+
+def not_modified(request: Request, route: str, etag: str, cache_control: str = PRIVATE_REVALIDATE) -> Optional[Response]:
+    """
+    A 304 for `route` if the client already holds `etag`, else None. Call it as soon as the ETag
+    is known and before building the body; on None, pass the same values to `set_validators`.
+    """
+    matched = etag_matches(request.headers.get("if-none-match"), etag)
+    conditional_stats.record(route, matched)
+    if not matched:
+        return None
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def set_validators(response: Response, etag: str, cache_control: str = PRIVATE_REVALIDATE) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
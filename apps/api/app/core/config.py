@@ -12,6 +12,10 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "FastAPI AI Personal Trainer"
     API_V1_STR: str = "/api/v1"
 
+    # Environment; APP_ENV=development or TEST_ENV=local lets unauthenticated requests act as a fixed dev user
+    APP_ENV: str = os.getenv("APP_ENV", "production")
+    TEST_ENV: str = os.getenv("TEST_ENV", "")
+
     # Spotify API Credentials
     SPOTIPY_CLIENT_ID: str = os.getenv("SPOTIPY_CLIENT_ID", "dummy_spotify_client_id")
     SPOTIPY_CLIENT_SECRET: str = os.getenv("SPOTIPY_CLIENT_SECRET", "dummy_spotify_client_secret")
@@ -22,6 +26,120 @@ class Settings(BaseSettings):
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "http://localhost:54321")
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "dummy_supabase_key")
 
+    # GET /metrics exposes internal state (pools, caches, queues, file paths); off unless a token is set
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "") # scrapers send "Authorization: Bearer <token>"
+
+    # Shared Supabase HTTP connection pool (see app.core.supabase.SupabaseClientRegistry)
+    SUPABASE_POOL_MAX_CONNECTIONS: int = 50
+    SUPABASE_POOL_MAX_KEEPALIVE: int = 20
+    SUPABASE_POOL_KEEPALIVE_EXPIRY: float = 30.0 # seconds an idle connection is kept open
+    SUPABASE_HTTP_TIMEOUT: float = 10.0 # seconds
+    SUPABASE_SCOPED_CLIENT_CACHE_SIZE: int = 256 # per-user JWT clients kept warm
+
+    # Read-through cache for GET /users/me (see app.core.cache.TieredCache)
+    PROFILE_CACHE_TTL_SECONDS: float = 60.0
+    PROFILE_CACHE_MAX_ENTRIES: int = 2048
+    PROFILE_CACHE_SHARED_BACKEND: str = "" # "" = in-process only, "memory" = local stand-in for a shared store
+
+    # Supabase access-token verification (see app.core.token_verifier.TokenVerifier)
+    SUPABASE_JWT_SECRET: str = os.getenv("SUPABASE_JWT_SECRET", "") # HS256 projects
+    SUPABASE_JWKS_URL: str = os.getenv("SUPABASE_JWKS_URL", "") # asymmetric keys, e.g. {SUPABASE_URL}/auth/v1/.well-known/jwks.json
+    JWT_AUDIENCE: str = "authenticated"
+    JWT_LEEWAY_SECONDS: float = 0.0
+    JWKS_REFRESH_INTERVAL_SECONDS: float = 600.0
+    JWT_CLAIMS_CACHE_SIZE: int = 4096 # verified tokens kept until their exp
+
+    # OpenAI / AI orchestrator (see app.services.ai_orchestrator.AIOrchestratorService)
+    OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
+    OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "") # point at a local fake LLM server for load tests
+    OPENAI_MODEL: str = "gpt-4o"
+    OPENAI_ADAPT_MODEL: str = "gpt-4o-mini" # adapts precomputed draft plans to the daily context
+    AI_MAX_CONCURRENCY: int = 32 # in-flight LLM calls per process
+    AI_MAX_CONCURRENCY_PER_USER: int = 2
+    AI_REQUEST_DEADLINE_SECONDS: float = 10.0 # PRD NFR004: AI p95 <= 10s, including queueing and retries
+    AI_MAX_RETRIES: int = 2 # on 429 / 5xx / connection errors
+    AI_RETRY_BASE_DELAY_SECONDS: float = 0.25
+    AI_RETRY_MAX_DELAY_SECONDS: float = 2.0
+    AI_POOL_MAX_CONNECTIONS: int = 64
+
+    # Plan generation model routing (see app.services.model_router.ModelRouter)
+    AI_MODEL_TIERS: str = "" # comma-separated, preferred first; "" = OPENAI_MODEL, then OPENAI_ADAPT_MODEL
+    AI_HEDGE_DELAY_SECONDS: float = 6.0 # hedge to the next faster tier after this; 0 disables hedging
+    AI_ROUTER_P95_BUDGET_SECONDS: float = 8.0 # skip a tier whose rolling p95 latency exceeds this
+    AI_ROUTER_MAX_ERROR_RATE: float = 0.2 # ... or whose recent error rate exceeds this
+    AI_ROUTER_WINDOW: int = 200 # recent calls per model the rolling figures cover
+    AI_ROUTER_PROBE_INTERVAL_SECONDS: float = 30.0 # an unhealthy tier still gets one probe call this often
+    AI_LATENCY_SLO_SECONDS: float = 10.0 # PRD NFR004, reported per model as within_slo_rate
+
+    # Content-addressed cache of generated plans (see AIOrchestratorService.generate_workout_plan)
+    PLAN_CACHE_TTL_SECONDS: float = 900.0
+    PLAN_CACHE_MAX_ENTRIES: int = 1024
+    PLAN_CACHE_PERSISTENT: bool = False # also look up recent WorkoutPlans rows by prompt hash
+
+    # Plan prompt assembly (see app.services.prompt_builder.PromptBuilder)
+    PROMPT_TOKEN_BUDGET: int = 1500 # user prompt; the history summary gets what profile/goals/context leave
+    PROMPT_HISTORY_WINDOW_DAYS: int = 28
+    PROMPT_HISTORY_TOP_SETS: int = 3 # most recent top sets shown per exercise
+    PROMPT_HISTORY_CACHE_SIZE: int = 4096 # users whose history summary is memoized
+
+    # Async plan generation jobs (POST /plans/generate?mode=async, see app.services.plan_jobs)
+    PLAN_JOB_WORKERS: int = 4
+    PLAN_JOB_QUEUE_MAX_DEPTH: int = 200 # further submissions get 503 + Retry-After
+    PLAN_JOB_RESULT_TTL_SECONDS: float = 3600.0
+    PLAN_JOB_LONG_POLL_MAX_SECONDS: float = 25.0
+    PLAN_JOB_BROKER: str = "" # "" = in-process queue, "sqlite" = local SQLite broker shared by the workers on one host
+    PLAN_JOB_SQLITE_PATH: str = "plan_jobs.sqlite3"
+    PLAN_JOB_LEASE_SECONDS: float = 120.0 # sqlite broker: a job still running after this is presumed orphaned by a dead worker
+    PLAN_JOB_MAX_ATTEMPTS: int = 3 # claims per job before an orphaned job is failed instead of requeued
+
+    # Nightly draft pre-generation (python -m app.services.plan_batch)
+    PLAN_BATCH_CONCURRENCY: int = 8 # keep well under AI_MAX_CONCURRENCY
+    PLAN_BATCH_ACTIVE_DAYS: int = 14 # users with a plan in this window get a draft for tomorrow
+    PLAN_BATCH_CHECKPOINT_PATH: str = "plan_batch_checkpoint.json"
+
+    # Bulk workout log ingestion (POST /logs/bulk)
+    LOG_BULK_MAX_ENTRIES: int = 10_000 # per request; larger replays get 413
+    LOG_BULK_CHUNK_SIZE: int = 500 # rows per upsert request, well under PostgREST's body limit
+    LOG_BULK_CONCURRENCY: int = 4 # chunk upserts in flight per request
+
+    # Workout log reads (GET /logs)
+    LOG_PAGE_SIZE: int = 100
+    LOG_MAX_PAGE_SIZE: int = 1000
+
+    # Write-behind for POST /logs (see app.services.log_writer.BufferedLogWriter)
+    LOG_WRITE_BEHIND: bool = False # acknowledge sets once in the local WAL; insert them in batches
+    LOG_WAL_PATH: str = "workout_logs.wal" # one per worker process
+    LOG_WAL_FSYNC: bool = True # fsync every append; off trades crash durability for latency
+    LOG_FLUSH_INTERVAL_MS: int = 250
+    LOG_FLUSH_MAX_ROWS: int = 200 # flush early once this many sets are buffered
+    LOG_FLUSH_MAX_ATTEMPTS: int = 12 # failed inserts per set (about 15 minutes of backoff) before it is dead-lettered
+    LOG_FLUSH_RETRY_MAX_SECONDS: float = 300.0 # cap on the exponential backoff between retries of a set
+
+    # Offline sync (/sync/push, /sync/pull; see app.services.sync_service)
+    SYNC_PAGE_SIZE: int = 500 # rows per table per pull page
+    SYNC_MAX_PAGE_SIZE: int = 2000
+    SYNC_SETTLE_SECONDS: float = 2.0 # rows changed more recently wait for the next pull
+
+    # Dashboard (GET /dashboard, served from the per-user rollups in app.services.rollup_service)
+    DASHBOARD_WEEKS: int = 12 # weekly rollups read for volume / intensity trends and e1RMs
+    DASHBOARD_DAILY_DAYS: int = 28 # daily rollups read for the streak, consistency and recent workouts
+    DASHBOARD_TARGET_DAYS_PER_WEEK: int = 4 # consistency target
+
+    # Weekly review snapshots (python -m app.services.weekly_review_batch, Mondays)
+    WEEKLY_REVIEW_BATCH_CONCURRENCY: int = 16 # users in flight; each is three small PostgREST calls
+    WEEKLY_REVIEW_CHECKPOINT_PATH: str = "weekly_review_checkpoint.json"
+
+    # Weekly review sparklines (GET /dashboard/charts, see app.services.charts.SparklineRenderer)
+    CHART_PRECISION: int = 1 # decimals kept in path coordinates and chart URLs
+    CHART_MAX_POINTS: int = 104
+    CHART_CACHE_MAX_ENTRIES: int = 1024
+    CHART_CACHE_TTL_SECONDS: float = 86400.0
+
+    # Rule-based plans (see app.services.rule_engine)
+    PLAN_RULE_FALLBACK: bool = True # serve the rule-based plan when the LLM times out, fails or returns a broken plan
+    PLAN_RULE_FALLBACK_AFTER_SECONDS: float = 5.0 # LLM budget before the rule-based plan is served; 0 waits for the deadline
+    PLAN_RULE_DRAFTS: bool = False # have the LLM only patch the rule-based plan instead of writing a full one
+
     # JWT Settings (for internal FastAPI usage, not directly Supabase JWT)
     SECRET_KEY: str = os.getenv("SECRET_KEY", "super_secret_key_for_testing")
     ENCRYPTION_KEY: str = os.getenv("ENCRYPTION_KEY", "b'jWf2c_zV5_eS7vP_9dK1L_mN3oR6qX8yA0B4C5D6E7F='") # Replace with a strong, randomly generated key in production
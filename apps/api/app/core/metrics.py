@@ -0,0 +1,61 @@
+# apps/api/app/core/metrics.py
+
+import hmac
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+from fastapi import Header, HTTPException, status
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsRegistry:
+    """
+    Collects named stats providers (caches, pools, workers) so they can be read from one place.
+    Providers are zero-argument callables returning a JSON-serialisable dict; they are evaluated
+    lazily on `snapshot()` so registering costs nothing on the request path.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._providers: Dict[str, Callable[[], dict]] = {}
+
+    def register(self, name: str, provider: Callable[[], dict]) -> None:
+        with self._lock:
+            self._providers[name] = provider
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            self._providers.pop(name, None)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            providers = dict(self._providers)
+        snapshot = {}
+        for name, provider in providers.items():
+            try:
+                snapshot[name] = provider()
+            except Exception as e:
+                logger.error(f"Metrics provider '{name}' failed: {e}")
+                snapshot[name] = {"error": str(e)}
+        return snapshot
+
+
+metrics_registry = MetricsRegistry()
+
+
+def require_metrics_token(authorization: Optional[str] = Header(None)) -> None:
+    """
+    Guards GET /metrics: 404 while METRICS_TOKEN is unset (the default), 401 unless the request
+    carries it as a bearer token. User tokens never grant access.
+    """
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"},
+        )
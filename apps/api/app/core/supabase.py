@@ -1,59 +1,239 @@
 # apps/api/app/core/supabase.py
 
-import supabase
-from app.core.config import settings
-from fastapi import Header, HTTPException, status
-from typing import Optional
+import hashlib
+import logging
 import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import httpx
+from supabase import AsyncClient, AsyncClientOptions
+from supabase.lib.client_options import DEFAULT_HEADERS
+from app.core.config import settings
+from app.core.metrics import metrics_registry
+# Re-exported so modules importing the auth dependency from here share the single implementation.
+from app.dependencies.auth_middleware import get_current_user_id
+from fastapi import Header
+
+logger = logging.getLogger(__name__)
 
-def get_supabase_client():
+
+class SupabaseClientRegistry:
     """
-    Initializes and returns the Supabase client.
-    This is a placeholder and will be expanded.
+    Process-wide registry of Supabase clients.
+
+    Every client handed out by the registry (anon, service-role and per-user JWT scoped)
+    is an async Supabase client sharing a single keep-alive `httpx.AsyncClient` pool, so API
+    calls reuse open TLS connections instead of paying a new handshake per request, and
+    `await ... .execute()` never blocks the event loop. This is the data-access layer every
+    service goes through. Clients are created lazily on first use; the FastAPI lifespan
+    calls `startup()` / `close()` around the app.
     """
-    try:
-        client = supabase.create_client(
-            settings.SUPABASE_URL,
-            settings.SUPABASE_KEY
+
+    def __init__(
+        self,
+        max_connections: int = settings.SUPABASE_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections: int = settings.SUPABASE_POOL_MAX_KEEPALIVE,
+        keepalive_expiry: float = settings.SUPABASE_POOL_KEEPALIVE_EXPIRY,
+        timeout: float = settings.SUPABASE_HTTP_TIMEOUT,
+        scoped_cache_size: int = settings.SUPABASE_SCOPED_CLIENT_CACHE_SIZE,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        self.scoped_cache_size = scoped_cache_size
+
+        self._lock = threading.Lock()
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._anon_client: Optional[AsyncClient] = None
+        self._admin_client: Optional[AsyncClient] = None
+        self._scoped_clients: "OrderedDict[str, AsyncClient]" = OrderedDict()
+        self._scoped_hits = 0
+        self._scoped_misses = 0
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+        return self._http_client
+
+    def _credentials(self, key_env: str) -> tuple:
+        supabase_url = os.environ.get("SUPABASE_URL")
+        supabase_key = os.environ.get(key_env)
+        if not supabase_url or not supabase_key:
+            key_name = "Key" if key_env == "SUPABASE_KEY" else key_env.replace("SUPABASE_", "")
+            raise ValueError(f"Supabase URL and {key_name} must be set as environment variables.")
+        return supabase_url, supabase_key
+
+    def _create(self, supabase_url: str, supabase_key: str, headers: Optional[Dict[str, str]] = None) -> AsyncClient:
+        options = AsyncClientOptions(
+            headers={**DEFAULT_HEADERS, **(headers or {})},
+            httpx_client=self._http(),
+            postgrest_client_timeout=self.timeout,
+            # Server-side clients never hold a refreshable session of their own.
+            auto_refresh_token=False,
+            persist_session=False,
         )
-        return client
+        # The AsyncClient constructor is synchronous; only `acreate_client` probes for a stored session.
+        return AsyncClient(supabase_url, supabase_key, options=options)
+
+    def anon(self) -> AsyncClient:
+        """Client authenticated with the anon key (RLS applies as an anonymous user)."""
+        with self._lock:
+            if self._anon_client is None:
+                supabase_url, supabase_key = self._credentials("SUPABASE_KEY")
+                self._anon_client = self._create(supabase_url, supabase_key)
+            return self._anon_client
+
+    def admin(self) -> AsyncClient:
+        """Client authenticated with the service role key (bypasses RLS). Backend-only."""
+        with self._lock:
+            if self._admin_client is None:
+                supabase_url, supabase_key = self._credentials("SUPABASE_SERVICE_ROLE_KEY")
+                self._admin_client = self._create(supabase_url, supabase_key)
+            return self._admin_client
+
+    def for_user(self, access_token: str) -> AsyncClient:
+        """
+        Client that forwards the user's JWT so PostgREST evaluates RLS as that user.
+        Scoped clients are kept in a bounded LRU keyed by a hash of the token.
+        """
+        cache_key = hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+        with self._lock:
+            client = self._scoped_clients.get(cache_key)
+            if client is not None:
+                self._scoped_clients.move_to_end(cache_key)
+                self._scoped_hits += 1
+                return client
+
+            self._scoped_misses += 1
+            supabase_url, supabase_key = self._credentials("SUPABASE_KEY")
+            client = self._create(supabase_url, supabase_key, headers={"Authorization": f"Bearer {access_token}"})
+            self._scoped_clients[cache_key] = client
+            if len(self._scoped_clients) > self.scoped_cache_size:
+                self._scoped_clients.popitem(last=False)
+            return client
+
+    def for_auth_flow(self) -> AsyncClient:
+        """
+        Fresh, uncached anon client for sign-up / sign-in. supabase-py rewrites a client's
+        Authorization header when a session is established, so these calls must never run
+        on a shared client. It still rides the shared connection pool.
+        """
+        supabase_url, supabase_key = self._credentials("SUPABASE_KEY")
+        return self._create(supabase_url, supabase_key)
+
+    async def health_check(self) -> dict:
+        """Round-trips to the PostgREST root through the shared pool and reports latency."""
+        try:
+            supabase_url, supabase_key = self._credentials("SUPABASE_KEY")
+        except ValueError as e:
+            return {"status": "unconfigured", "detail": str(e)}
+
+        started = time.perf_counter()
+        try:
+            response = await self._http().get(
+                f"{supabase_url.rstrip('/')}/rest/v1/",
+                headers={"apikey": supabase_key, "Authorization": f"Bearer {supabase_key}"},
+            )
+            latency_ms = round((time.perf_counter() - started) * 1000, 2)
+            healthy = response.status_code < 500
+            return {
+                "status": "ok" if healthy else "error",
+                "status_code": response.status_code,
+                "latency_ms": latency_ms,
+            }
+        except httpx.HTTPError as e:
+            logger.error(f"Supabase health check failed: {e}")
+            return {"status": "error", "detail": str(e)}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_connections": self.limits.max_connections,
+                "max_keepalive_connections": self.limits.max_keepalive_connections,
+                "anon_client": self._anon_client is not None,
+                "admin_client": self._admin_client is not None,
+                "scoped_clients": len(self._scoped_clients),
+                "scoped_client_hits": self._scoped_hits,
+                "scoped_client_misses": self._scoped_misses,
+            }
+
+    def startup(self) -> None:
+        """Warms the anon client so the first request does not pay for client construction."""
+        try:
+            self.anon()
+        except ValueError as e:
+            logger.warning(f"Supabase client registry started without anon client: {e}")
+
+    async def close(self) -> None:
+        """Drops all clients and closes the shared connection pool."""
+        with self._lock:
+            self._anon_client = None
+            self._admin_client = None
+            self._scoped_clients.clear()
+            http_client, self._http_client = self._http_client, None
+        if http_client is not None:
+            await http_client.aclose()
+
+
+supabase_registry = SupabaseClientRegistry()
+metrics_registry.register("supabase_pool", supabase_registry.stats)
+
+
+def _bearer_token(authorization: Optional[str]) -> Optional[str]:
+    if authorization and authorization.startswith("Bearer "):
+        return authorization.split(" ", 1)[1]
+    return None
+
+
+def get_supabase_client() -> Optional[AsyncClient]:
+    """
+    Returns the pooled anon Supabase client, or None if Supabase is not configured.
+    """
+    try:
+        return supabase_registry.anon()
+    except Exception as e:
+        logger.error(f"Error initializing Supabase client: {e}")
+        return None
+
+
+def get_admin_supabase_client() -> Optional[AsyncClient]:
+    """
+    Returns the pooled service-role Supabase client, or None if it is not configured.
+    """
+    try:
+        return supabase_registry.admin()
     except Exception as e:
-        # In a real app, you'd have more robust logging and error handling
-        print(f"Error initializing Supabase client: {e}")
+        logger.error(f"Error initializing admin Supabase client: {e}")
         return None
 
-# Placeholder for the actual Supabase client instance
-supabase_client = get_supabase_client()
-
-async def get_current_user_id(authorization: Optional[str] = Header(None)) -> str:
-    """
-    Placeholder dependency to get the current user's ID.
-    In a real application, this would decode and validate a JWT from the Authorization header
-    and retrieve the user ID from the token.
-    For testing purposes, it returns a dummy UUID.
-    """
-    # For testing and development, return a fixed UUID or extract from a mock token
-    # In production, this would involve JWT validation with Supabase Auth
-    if os.getenv("APP_ENV") == "development" or os.getenv("TEST_ENV") == "local":
-        return "a0eebc99-9c0b-4ef8-bb6d-6bb9bd380a11" # Dummy UUID for local testing
-    
-    # Placeholder for actual JWT validation and user ID extraction
-    if authorization:
-        # Here you would typically decode and validate the JWT
-        # For now, if an Authorization header exists, assume authenticated
-        # In a real app, this would be:
-        # try:
-        #     # payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        #     # user_id: str = payload.get("sub")
-        #     # if user_id is None:
-        #     #     raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
-        #     # return user_id
-        # except (jwt.PyJWTError, HTTPException):
-        #     #     raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
-        return "a0eebc99-9c0b-4ef8-bb6d-6bb9bd380a11" # Dummy return if header is present
-    
-    raise HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Not authenticated",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
\ No newline at end of file
+
+def get_auth_flow_supabase_client() -> Optional[AsyncClient]:
+    """
+    Returns a fresh anon client for sign-up / sign-in flows (see `SupabaseClientRegistry.for_auth_flow`).
+    """
+    try:
+        return supabase_registry.for_auth_flow()
+    except Exception as e:
+        logger.error(f"Error initializing Supabase auth client: {e}")
+        return None
+
+
+def get_user_supabase_client(authorization: Optional[str] = Header(None)) -> Optional[AsyncClient]:
+    """
+    Returns a pooled client scoped to the caller's JWT so RLS policies apply to the user.
+    Falls back to the anon client when the request carries no bearer token.
+    """
+    token = _bearer_token(authorization)
+    if token is None:
+        return get_supabase_client()
+    try:
+        return supabase_registry.for_user(token)
+    except Exception as e:
+        logger.error(f"Error initializing user-scoped Supabase client: {e}")
+        return None
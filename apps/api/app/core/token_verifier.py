@@ -0,0 +1,228 @@
+# apps/api/app/core/token_verifier.py
+
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Callable, Dict, Optional
+
+import httpx
+import jwt
+
+from app.core.cache import TTLLRUCache
+from app.core.config import settings
+from app.core.metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = {"RS256", "RS384", "RS512", "ES256", "ES384", "ES512", "PS256", "PS384", "PS512", "EdDSA"}
+
+
+class TokenVerifierNotConfigured(Exception):
+    """Raised when a token needs a key type (HS256 secret or JWKS) the verifier was not given."""
+
+
+class TokenVerifier:
+    """
+    Verifies Supabase access tokens without touching the network on the request path.
+
+    Built once at startup from settings. HS256 tokens are checked against the project JWT secret;
+    asymmetric tokens (RS*/ES*/PS*/EdDSA) against keys from the project's JWKS document, looked up
+    by `kid`. The JWKS is fetched on `start()` and refreshed by a background task, and an unknown
+    `kid` schedules an early (rate-limited) refresh rather than blocking the request.
+
+    Verified claims are cached by SHA-256 of the token until the token's `exp`, so repeat calls
+    from the same client skip the signature check entirely.
+    """
+
+    def __init__(
+        self,
+        issuer: Optional[str],
+        audience: str = "authenticated",
+        hs256_secret: Optional[str] = None,
+        jwks_url: Optional[str] = None,
+        jwks_refresh_interval: float = 600.0,
+        jwks_min_refresh_interval: float = 30.0,
+        cache_size: int = 4096,
+        leeway: float = 0.0,
+        http_client: Optional[httpx.AsyncClient] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.issuer = issuer
+        self.audience = audience
+        self.hs256_secret = hs256_secret or None
+        self.jwks_url = jwks_url or None
+        self.jwks_refresh_interval = jwks_refresh_interval
+        self.jwks_min_refresh_interval = jwks_min_refresh_interval
+        self.leeway = leeway
+        self._clock = clock
+        self._http_client = http_client
+        self._owns_http_client = http_client is None
+
+        self._jwks_keys: Dict[str, jwt.PyJWK] = {}
+        self._jwks_fetched_at = 0.0
+        self._last_refresh_attempt = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._pending_refresh: Optional[asyncio.Task] = None
+
+        self.claims_cache = TTLLRUCache(maxsize=cache_size, ttl=0)
+        self.signature_checks = 0
+        self.jwks_refreshes = 0
+        self.jwks_refresh_errors = 0
+
+    @classmethod
+    def from_settings(cls) -> "TokenVerifier":
+        supabase_url = settings.SUPABASE_URL.rstrip("/")
+        return cls(
+            issuer=f"{supabase_url}/auth/v1",
+            audience=settings.JWT_AUDIENCE,
+            hs256_secret=settings.SUPABASE_JWT_SECRET,
+            jwks_url=settings.SUPABASE_JWKS_URL,
+            jwks_refresh_interval=settings.JWKS_REFRESH_INTERVAL_SECONDS,
+            cache_size=settings.JWT_CLAIMS_CACHE_SIZE,
+            leeway=settings.JWT_LEEWAY_SECONDS,
+        )
+
+    # --- verification -------------------------------------------------------------------------
+
+    def verify(self, token: str) -> dict:
+        """
+        Returns the verified claims of `token`.
+        Raises jwt.ExpiredSignatureError / jwt.InvalidTokenError for bad tokens and
+        TokenVerifierNotConfigured if the token's algorithm has no configured key.
+        """
+        cache_key = hashlib.sha256(token.encode("utf-8")).digest()
+        claims = self.claims_cache.get(cache_key)
+        if claims is not None:
+            return claims
+
+        header = jwt.get_unverified_header(token)
+        algorithm = header.get("alg")
+        key = self._key_for(algorithm, header.get("kid"))
+
+        self.signature_checks += 1
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=[algorithm],
+            audience=self.audience,
+            issuer=self.issuer,
+            leeway=self.leeway,
+            options={"require": ["exp", "sub"]},
+        )
+
+        remaining = claims["exp"] - self._clock()
+        if remaining > 0:
+            self.claims_cache.set(cache_key, claims, ttl=remaining)
+        return claims
+
+    def _key_for(self, algorithm: Optional[str], kid: Optional[str]):
+        if algorithm == "HS256":
+            if not self.hs256_secret:
+                raise TokenVerifierNotConfigured("SUPABASE_JWT_SECRET is not configured for backend JWT verification.")
+            return self.hs256_secret
+
+        if algorithm not in ASYMMETRIC_ALGORITHMS:
+            raise jwt.InvalidAlgorithmError(f"Unsupported signing algorithm: {algorithm}")
+        if not self.jwks_url:
+            raise TokenVerifierNotConfigured("SUPABASE_JWKS_URL is not configured for asymmetric JWT verification.")
+
+        jwk = self._jwks_keys.get(kid) if kid else None
+        if jwk is None:
+            # Likely a key rotation we have not seen yet; refresh in the background.
+            self._schedule_refresh()
+            raise jwt.InvalidTokenError(f"Unknown signing key id: {kid}")
+        return jwk.key
+
+    # --- JWKS -----------------------------------------------------------------------------------
+
+    def load_jwks(self, jwks: dict) -> None:
+        """Replaces the known signing keys with those in a JWKS document."""
+        keys = {}
+        for jwk in jwt.PyJWKSet.from_dict(jwks).keys:
+            if jwk.key_id:
+                keys[jwk.key_id] = jwk
+        self._jwks_keys = keys
+        self._jwks_fetched_at = self._clock()
+
+    async def refresh_jwks(self) -> None:
+        self._last_refresh_attempt = self._clock()
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(timeout=5.0)
+        try:
+            response = await self._http_client.get(self.jwks_url)
+            response.raise_for_status()
+            self.load_jwks(response.json())
+            self.jwks_refreshes += 1
+        except (httpx.HTTPError, ValueError, jwt.PyJWKSetError) as e:
+            self.jwks_refresh_errors += 1
+            logger.error(f"Failed to refresh JWKS from {self.jwks_url}: {e}")
+
+    def _schedule_refresh(self) -> None:
+        if self._clock() - self._last_refresh_attempt < self.jwks_min_refresh_interval:
+            return
+        if self._pending_refresh is not None and not self._pending_refresh.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._last_refresh_attempt = self._clock()
+        self._pending_refresh = loop.create_task(self.refresh_jwks())
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.jwks_refresh_interval)
+            await self.refresh_jwks()
+
+    async def start(self) -> None:
+        """Fetches the JWKS (if configured) and starts the background refresh task."""
+        if not self.jwks_url:
+            return
+        await self.refresh_jwks()
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        for task in (self._refresh_task, self._pending_refresh):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._refresh_task = None
+        self._pending_refresh = None
+        if self._owns_http_client and self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    def stats(self) -> dict:
+        return {
+            "hs256_configured": self.hs256_secret is not None,
+            "jwks_url": self.jwks_url,
+            "jwks_keys": len(self._jwks_keys),
+            "jwks_refreshes": self.jwks_refreshes,
+            "jwks_refresh_errors": self.jwks_refresh_errors,
+            "signature_checks": self.signature_checks,
+            "claims_cache": self.claims_cache.stats(),
+        }
+
+
+_token_verifier: Optional[TokenVerifier] = None
+
+
+def get_token_verifier() -> TokenVerifier:
+    """Returns the process-wide verifier, building it from settings on first use."""
+    global _token_verifier
+    if _token_verifier is None:
+        _token_verifier = TokenVerifier.from_settings()
+    return _token_verifier
+
+
+def set_token_verifier(verifier: Optional[TokenVerifier]) -> None:
+    """Replaces the process-wide verifier (tests, or reconfiguration at startup)."""
+    global _token_verifier
+    _token_verifier = verifier
+
+
+metrics_registry.register("jwt_verifier", lambda: get_token_verifier().stats())
@@ -1,74 +1,98 @@
 # apps/api/app/dependencies/auth_middleware.py
-from fastapi import Header, HTTPException, status
-from supabase import create_client, Client
-import os
+from dataclasses import dataclass, field
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException, Request, status
 import jwt
 
-async def get_current_user_id(authorization: str = Header(...)):
+from app.core.config import settings
+from app.core.token_verifier import TokenVerifierNotConfigured, get_token_verifier
+
+# Fixed user for local development without a Supabase session (APP_ENV=development / TEST_ENV=local)
+DEV_USER_ID = "a0eebc99-9c0b-4ef8-bb6d-6bb9bd380a11"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated caller of a request, resolved once and kept on `request.state.principal`."""
+    user_id: str
+    claims: dict = field(default_factory=dict)
+    token: Optional[str] = None
+
+    @property
+    def email(self) -> Optional[str]:
+        return self.claims.get("email")
+
+
+def _dev_bypass_enabled() -> bool:
+    return settings.APP_ENV == "development" or settings.TEST_ENV == "local"
+
+
+def authenticate(authorization: Optional[str]) -> Principal:
     """
-    FastAPI dependency to verify a Supabase JWT from the Authorization header.
+    Verifies a Supabase JWT from an Authorization header value and returns the principal.
+
+    Verification is done by the process-wide TokenVerifier (built once at startup): no environment
+    reads or network calls per request, and repeat tokens are answered from its claims cache.
     """
-    if not authorization or not authorization.startswith("Bearer "):
+    if not authorization:
+        if _dev_bypass_enabled():
+            return Principal(user_id=DEV_USER_ID)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Authorization header missing or malformed",
+            headers={"WWW-Authenticate": "Bearer"},
         )
-
-    token = authorization.split(" ")[1]
-
-    supabase_url = os.environ.get("SUPABASE_URL")
-    supabase_anon_key = os.environ.get("SUPABASE_ANON_KEY") # Typically, anon key is used for client-side, service role key for backend admin.
-                                                           # However, for JWT verification, we need the public key or the JWT secret.
-                                                           # Supabase-py's create_client method typically handles token verification when a session is set.
-                                                           # For standalone JWT verification, you might parse the public key.
-
-    # Option 1: Using the Supabase client (if it has a direct JWT verification method)
-    # The `supabase` client (create_client) does not expose a public JWT verification method directly
-    # that uses the JWT secret without a full session object.
-    # We will manually decode and verify using pyjwt and Supabase's public key or secret.
-
-    # Option 2: Manually decode and verify the JWT using pyjwt
-    # The JWT secret is usually derived from SUPABASE_SERVICE_ROLE_KEY or directly from the project settings.
-    # For a JWT issued by Supabase, the public key is also available.
-    # Let's assume the JWT secret is available as an environment variable (SUPABASE_JWT_SECRET)
-    # This might need to be retrieved dynamically or configured carefully.
-    jwt_secret = os.environ.get("SUPABASE_JWT_SECRET") # This often needs to be explicitly set or derived.
-
-    if not jwt_secret:
-        # Fallback/Error if JWT_SECRET is not explicitly provided.
-        # In a real Supabase setup, the public key for verifying JWTs is typically fetched or hardcoded.
-        # For this example, we'll try to derive a secret or expect it.
-        # This is a critical point: how to get the JWT secret for verification reliably.
+    if not authorization.startswith("Bearer "):
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="SUPABASE_JWT_SECRET is not configured for backend JWT verification.",
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authorization header missing or malformed",
+            headers={"WWW-Authenticate": "Bearer"},
         )
 
+    token = authorization.split(" ", 1)[1]
+
     try:
-        # Decode and verify the JWT
-        # audience (aud) and issuer (iss) claims should also be verified against Supabase's values.
-        decoded_payload = jwt.decode(
-            token,
-            jwt_secret,
-            algorithms=["HS256"], # Supabase typically uses HS256
-            audience="authenticated", # Default audience for Supabase JWTs
-            issuer=f"{supabase_url}/auth/v1" # Default issuer for Supabase JWTs
+        # Signature, audience ("authenticated") and issuer ({SUPABASE_URL}/auth/v1) are all checked.
+        claims = get_token_verifier().verify(token)
+        return Principal(user_id=claims["sub"], claims=claims, token=token)
+    except TokenVerifierNotConfigured as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e),
         )
-        # Here, you might fetch the user from your database based on decoded_payload['sub'] (user ID)
-        # For simplicity, we just return the user ID from the JWT
-        return {"user_id": decoded_payload["sub"]}
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="JWT has expired",
+            headers={"WWW-Authenticate": "Bearer"},
         )
     except jwt.InvalidTokenError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Invalid JWT: {e}",
+            headers={"WWW-Authenticate": "Bearer"},
         )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error verifying JWT: {e}",
         )
+
+
+async def get_current_principal(request: Request, authorization: Optional[str] = Header(None)) -> Principal:
+    """
+    The one auth dependency for every router. The principal is resolved at most once per request
+    and memoized on `request.state`, so other dependencies and services that need the caller
+    (including ones declared with `use_cache=False`) never verify the token a second time.
+    """
+    principal = getattr(request.state, "principal", None)
+    if principal is None:
+        principal = authenticate(authorization)
+        request.state.principal = principal
+    return principal
+
+
+async def get_current_user_id(principal: Principal = Depends(get_current_principal)) -> str:
+    """Authenticated user id (the JWT `sub`). Override this in tests to impersonate a user."""
+    return principal.user_id
@@ -1,4 +1,6 @@
-from fastapi import FastAPI, Request, status
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, Request, status
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware # New Import
@@ -10,9 +12,39 @@ from app.api.plans import router as plans_router
 from app.api.music import router as music_router
 from app.api.logs import logs_router # Import logs_router
 from app.api.export import router as export_router # Import export_router
+from app.api.sync import router as sync_router
+from app.api.dashboard import dashboard_router
+from app.core.supabase import supabase_registry
+from app.core.metrics import metrics_registry, require_metrics_token
+from app.core.token_verifier import get_token_verifier
+from app.services.ai_orchestrator import close_ai_orchestrator
+from app.services.log_writer import build_log_writer
+from app.services.plan_jobs import build_plan_job_queue
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared Supabase clients and their keep-alive connection pool live for the whole process.
+    supabase_registry.startup()
+    # JWT verifier is built once; JWKS (if configured) is fetched here and refreshed in the background.
+    token_verifier = get_token_verifier()
+    await token_verifier.start()
+    # Worker pool for POST /plans/generate?mode=async
+    app.state.plan_job_queue = build_plan_job_queue()
+    await app.state.plan_job_queue.start()
+    # Opt-in write-behind for POST /logs; replays sets a previous process left in its WAL.
+    app.state.log_writer = build_log_writer()
+    if app.state.log_writer is not None:
+        await app.state.log_writer.start()
+    yield
+    if app.state.log_writer is not None:
+        await app.state.log_writer.stop()
+    await app.state.plan_job_queue.stop()
+    await token_verifier.stop()
+    await close_ai_orchestrator()
+    await supabase_registry.close()
 
 def create_app() -> FastAPI:
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
 
     origins = [
         "http://localhost:3000", # Allow frontend origin
@@ -34,6 +66,8 @@ def create_app() -> FastAPI:
     app.include_router(music_router, prefix="/api/v1/music", tags=["music"])
     app.include_router(logs_router, prefix="/api/v1", tags=["logs"]) # Include logs_router
     app.include_router(export_router, prefix="/api/v1", tags=["export"]) # Include export_router
+    app.include_router(sync_router, prefix="/api/v1/sync", tags=["sync"])
+    app.include_router(dashboard_router, prefix="/api/v1", tags=["dashboard"])
 
     return app
 
@@ -48,4 +82,18 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 
 @app.get("/")
 async def root():
-    return {"message": "Hello FastAPI from apps/api!"}
\ No newline at end of file
+    return {"message": "Hello FastAPI from apps/api!"}
+
+@app.get("/health")
+async def health():
+    supabase_health = await supabase_registry.health_check()
+    return {
+        "status": "ok" if supabase_health["status"] != "error" else "degraded",
+        "supabase": supabase_health,
+        "supabase_pool": supabase_registry.stats(),
+    }
+
+@app.get("/metrics", dependencies=[Depends(require_metrics_token)], include_in_schema=False)
+async def metrics():
+    # In-process counters (cache hit/miss/eviction, pool usage) for sizing and dashboards.
+    return metrics_registry.snapshot()
@@ -1,4 +1,5 @@
 from pydantic import BaseModel, Field
+from datetime import date
 from typing import List, Optional
 
 # Re-using interfaces for consistency
@@ -27,13 +28,15 @@ class WeeklyReviewVolume(BaseModel):
     value: str
     trend: str # "up" or "down"
     percentage_change: str
-    chart_svg: str
+    chart_svg: str = "" # inline SVG; empty when the chart is served from chart_url
+    chart_url: Optional[str] = None # ETag-cached SVG (GET /dashboard/charts/...)
 
 class WeeklyReviewIntensity(BaseModel):
     value: str
     trend: str # "up" or "down"
     percentage_change: str
-    chart_svg: str
+    chart_svg: str = "" # inline SVG; empty when the chart is served from chart_url
+    chart_url: Optional[str] = None # ETag-cached SVG (GET /dashboard/charts/...)
 
 class ConsistencyChartData(BaseModel):
     day: str
@@ -51,6 +54,7 @@ class CoachCorner(BaseModel):
     suggestion: str
 
 class WeeklyReview(BaseModel):
+    week_start: Optional[date] = None # Monday of the reviewed (closed) week
     volume: WeeklyReviewVolume
     intensity: WeeklyReviewIntensity
     consistency: WeeklyReviewConsistency
@@ -0,0 +1,35 @@
+from uuid import UUID
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+from .workout_log import WorkoutLogCreate, WorkoutLogResponse
+
+class SyncPushRequest(BaseModel):
+    device_id: str = Field(..., min_length=1, max_length=128)
+    mutations: List[WorkoutLogCreate]
+
+class SyncMutationResult(BaseModel):
+    id: UUID
+    status: str # "created" | "duplicate" | "failed", as for /logs/bulk
+    error: Optional[str] = None
+
+class SyncPushResponse(BaseModel):
+    results: List[SyncMutationResult]
+    created: int = 0
+    duplicates: int = 0
+    failed: int = 0
+
+class SyncPlan(BaseModel):
+    id: UUID
+    plan_date: date
+    status: str
+    plan_details: Dict[str, Any]
+    ai_explanation: Optional[str] = None
+    updated_at: datetime
+
+class SyncPullResponse(BaseModel):
+    logs: List[WorkoutLogResponse]
+    plans: List[SyncPlan]
+    cursor: str # pass back as ?cursor= on the next pull
+    has_more: bool # another page is ready; pull again right away
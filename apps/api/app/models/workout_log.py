@@ -1,6 +1,6 @@
 from uuid import UUID
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 
 class WorkoutLogBase(BaseModel):
@@ -25,3 +25,13 @@ class WorkoutLogResponse(WorkoutLogBase):
 
     class Config:
         from_attributes = True
+
+class WorkoutLogBulkResult(WorkoutLogResponse):
+    # "created", "duplicate" (id already stored, or repeated in the same request) or "failed"
+    status: str = "created"
+    error: Optional[str] = None
+
+class WorkoutLogPage(BaseModel):
+    # Rows hold only the requested fields (always id and completed_at)
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None # pass back as `cursor` for the next page; None on the last page
@@ -22,6 +22,9 @@ class WorkoutPlanModel(BaseModel):
     plan_date: date
     workout_days: List[WorkoutDay]
     ai_explanation: Optional[str] = Field(None, description="AI's explanation for plan adaptations")
+    # Content hash of the prompt this plan was generated from; persisted alongside the plan so the
+    # plan cache can find it again, but never part of the plan's JSON or the API response.
+    prompt_hash: Optional[str] = Field(None, exclude=True)
 
 class PlanGenerationContext(BaseModel):
     mood: Optional[str] = None
@@ -1,14 +1,124 @@
-import os
-from openai import OpenAI
-from typing import Dict, Any, List, Optional
+import asyncio
+import hashlib
 import json
+import logging
+import random
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, List, Optional, Tuple
+
+import httpx
+import openai
+from openai import AsyncOpenAI
 from pydantic import ValidationError
 
+from app.core.cache import TieredCache
+from app.core.config import settings
+from app.core.metrics import metrics_registry
 from app.models.workout_plan import WorkoutPlanModel, PlanGenerationContext
+from app.services.model_router import ModelRouter
+from app.services.plan_repair import PlanRepairStats, TruncatedResponse, coerce_exercise, coerce_plan, invalid_exercises, loads_lenient
+from app.services.plan_service import WorkoutPlanCacheBackend
+from app.services.plan_stream import PlanStreamParser, plan_events
+from app.services.prompt_builder import PromptBuilder, count_tokens, prompt_builder as default_prompt_builder
+
+logger = logging.getLogger(__name__)
+
+
+class AIServiceTimeout(RuntimeError):
+    """The LLM call (including queueing and retries) did not finish within its deadline."""
+
 
 class AIOrchestratorService:
-    def __init__(self):
-        self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    """
+    Process-wide gateway to the LLM. Use `get_ai_orchestrator()` rather than constructing one per request.
+
+    - One `AsyncOpenAI` client over a shared keep-alive httpx pool. `transport` / `base_url` let the
+      pool be pointed at a local fake LLM server or an in-process transport for load tests.
+    - A global semaphore caps in-flight calls per process; a per-user semaphore stops one user's
+      burst from taking every slot. Callers queue for a slot rather than being rejected.
+    - Each call has a deadline (default: PRD NFR004's 10s AI budget) covering queueing, every attempt
+      and backoff; exceeding it raises AIServiceTimeout.
+    - 429, 5xx and connection errors are retried with full-jitter exponential backoff (honouring
+      Retry-After), but never past the deadline. The SDK's own retries are disabled.
+    - Generated plans are cached by a hash of the exact messages and the model that answered
+      (`plan_cache_key`), so a retry or double tap with unchanged inputs is answered without an
+      LLM call, and a plan from a fallback tier is never served as one from the preferred tier.
+    - Concurrent identical generations (same user, same cache key) are coalesced into a single
+      in-flight completion whose result every caller receives (`_single_flight`).
+    - `stream_workout_plan` streams the completion and emits each exercise / day as soon as it
+      validates, holding its concurrency slot until the stream is fully read.
+    - `adapt_workout_plan` is the cheap path for a precomputed draft: no LLM call for a neutral
+      context, otherwise a short adaptation prompt on the smaller `adapt_model`.
+    - `adjust_draft_plan` reviews a rule-based draft and only returns the changed exercises.
+    - Full generations are routed across model tiers by rolling latency and error rate, and hedged
+      with a faster tier when the first request is slow or fails (`ModelRouter`, `_generate_uncached`).
+    - Malformed responses are repaired in place, re-asking only for invalid exercises (`_parse_plan`).
+    """
+
+    def __init__(
+        self,
+        client: Optional[AsyncOpenAI] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        base_url: Optional[str] = None,
+        model: str = settings.OPENAI_MODEL,
+        adapt_model: str = settings.OPENAI_ADAPT_MODEL,
+        max_concurrency: int = settings.AI_MAX_CONCURRENCY,
+        max_concurrency_per_user: int = settings.AI_MAX_CONCURRENCY_PER_USER,
+        deadline: float = settings.AI_REQUEST_DEADLINE_SECONDS,
+        max_retries: int = settings.AI_MAX_RETRIES,
+        retry_base_delay: float = settings.AI_RETRY_BASE_DELAY_SECONDS,
+        retry_max_delay: float = settings.AI_RETRY_MAX_DELAY_SECONDS,
+        max_connections: int = settings.AI_POOL_MAX_CONNECTIONS,
+        plan_cache: Optional[TieredCache] = None,
+        prompt_builder: Optional[PromptBuilder] = None,
+        router: Optional[ModelRouter] = None,
+    ):
+        if client is None:
+            http_client = httpx.AsyncClient(
+                transport=transport,
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+                timeout=httpx.Timeout(deadline, connect=5.0),
+            )
+            client = AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY or None,
+                base_url=base_url or settings.OPENAI_BASE_URL or None,
+                max_retries=0, # retries are deadline-aware and handled here
+                timeout=deadline,
+                http_client=http_client,
+            )
+        self.openai_client = client
+        self.plan_cache = plan_cache or build_plan_cache()
+        self.prompt_builder = prompt_builder or default_prompt_builder
+        self._prompt_tokens_per_request = deque(maxlen=1000) # estimated, from construct_prompt
+        self.model = model
+        self.adapt_model = adapt_model
+        tiers = [tier.strip() for tier in settings.AI_MODEL_TIERS.split(",") if tier.strip()] or [model, adapt_model]
+        self.router = router or ModelRouter(tiers)
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.max_concurrency = max_concurrency
+        self.max_concurrency_per_user = max_concurrency_per_user
+
+        self._global_slots = asyncio.Semaphore(max_concurrency)
+        self._user_slots: Dict[str, list] = {} # user_id -> [Semaphore, holders + waiters]
+
+        self.calls = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+        self._plan_flights: Dict[str, list] = {} # user_id:cache_key -> [Task, waiters]
+        self.plan_calls_deduplicated = 0
+        self.plan_flights_cancelled = 0
+        self.plan_repair = PlanRepairStats()
+
         # For now, a placeholder system prompt. This will be refined.
         self.system_prompt = """
         You are an AI personal trainer. Your task is to generate a personalized daily workout plan in JSON format.
@@ -40,6 +150,30 @@ class AIOrchestratorService:
         }
         """
 
+        # Short prompt for adapting a precomputed draft: the schema is implied by the plan it is given.
+        self.adapt_system_prompt = (
+            "You are an AI personal trainer. Adapt the given workout plan to the user's current daily context "
+            "(mood, energy, soreness, recovery). Keep its structure and only change volume, intensity or exercise "
+            "choice where the context calls for it, and explain the changes in 'ai_explanation'. "
+            "Respond with the full plan as JSON with exactly the same fields."
+        )
+
+        # Re-ask prompt for exercises that failed validation: only the broken sub-trees are sent back.
+        self.repair_system_prompt = (
+            "Some exercises in a workout plan failed schema validation. Exercise schema: name (string), sets "
+            "(integer), reps (string), rpe (integer or null), weight, tempo, rest_interval, notes (string or null). "
+            "Correct each exercise using its errors and respond with JSON: {\"exercises\": [{\"day_index\": int, "
+            "\"exercise_index\": int, \"exercise\": {...}}]}, keeping the given indexes."
+        )
+
+        # Patch-only prompt for reviewing a rule-based draft: unchanged exercises are not repeated.
+        self.adjust_system_prompt = (
+            "You are an AI personal trainer. Review the draft workout plan against the user's goals, training "
+            "history and current daily context. Respond with JSON: {\"adjustments\": [{\"day_index\": int, "
+            "\"exercise_index\": int, and only the fields you change among name, sets, reps, rpe, weight, tempo, "
+            "rest_interval, notes}], \"ai_explanation\": string}. Use an empty list if the draft is already right."
+        )
+
     async def construct_prompt(
         self,
         user_id: str,
@@ -48,17 +182,12 @@ class AIOrchestratorService:
         workout_history: List[Dict[str, Any]],
         context: PlanGenerationContext
     ) -> str:
-        # Placeholder for complex prompt construction
-        # In a real scenario, this would dynamically build a detailed prompt
-        # based on all the provided user data.
-        prompt_parts = [
-            f"User ID: {user_id}",
-            f"User Profile: {json.dumps(user_profile)}",
-            f"User Goals: {json.dumps(user_goals)}",
-            f"Current Context: {json.dumps(context.model_dump())}",
-            "Generate a workout plan strictly following the JSON schema provided in the system prompt."
-        ]
-        return "\n".join(prompt_parts)
+        # Compact, canonical JSON (so the plan cache key is independent of dict ordering) plus a
+        # per-exercise history summary, all within PROMPT_TOKEN_BUDGET.
+        prompt = self.prompt_builder.build(user_id, user_profile, user_goals, workout_history, context)
+        self._prompt_tokens_per_request.append(prompt.tokens)
+        logger.info(f"Plan prompt for user {user_id}: ~{prompt.tokens} tokens ({prompt.history_tokens} history)")
+        return prompt.text
 
     async def generate_workout_plan(
         self,
@@ -68,31 +197,566 @@ class AIOrchestratorService:
         workout_history: List[Dict[str, Any]],
         context: PlanGenerationContext
     ) -> WorkoutPlanModel:
-        prompt = await self.construct_prompt(user_id, user_profile, user_goals, workout_history, context)
+        messages = await self._plan_messages(user_id, user_profile, user_goals, workout_history, context)
+
+        cached = await self._cached_routed_plan(messages)
+        if cached is not None:
+            return cached
+
+        plan = await self._single_flight(
+            f"{user_id}:{self.plan_cache_key(messages)}", lambda: self._generate_uncached(user_id, messages)
+        )
+        # Coalesced callers share one result; give each its own copy to mutate.
+        return plan.model_copy(deep=True)
+
+    async def adapt_workout_plan(self, user_id: str, draft: WorkoutPlanModel, context: PlanGenerationContext) -> WorkoutPlanModel:
+        """
+        Adapts a precomputed draft (see app.services.plan_batch) to today's context. A context with
+        no signals returns the draft as is; otherwise the adaptation model rewrites it, which costs a
+        fraction of a full generation (short prompt, smaller model). Cached like generated plans.
+        """
+        if not context.model_dump(exclude_none=True):
+            return draft.model_copy(deep=True)
+
+        messages = [
+            {"role": "system", "content": self.adapt_system_prompt},
+            {"role": "user", "content": "\n".join([
+                f"Current Context: {json.dumps(context.model_dump(), sort_keys=True)}",
+                f"Plan: {draft.model_dump_json(exclude={'plan_id'})}",
+            ])}
+        ]
+        cache_key = self.plan_cache_key(messages, model=self.adapt_model)
+
+        cached = await self._cached_plan(cache_key)
+        if cached is not None:
+            return cached
 
+        plan = await self._single_flight(
+            f"{user_id}:{cache_key}", lambda: self._generate_uncached(user_id, messages, model=self.adapt_model)
+        )
+        return plan.model_copy(deep=True)
+
+    async def adjust_draft_plan(
+        self,
+        user_id: str,
+        draft: WorkoutPlanModel,
+        user_profile: Dict[str, Any],
+        user_goals: Dict[str, Any],
+        workout_history: List[Dict[str, Any]],
+        context: PlanGenerationContext
+    ) -> WorkoutPlanModel:
+        """
+        Has the LLM review a rule-based draft (app.services.rule_engine) instead of writing a plan
+        from scratch. It answers with only the exercises it changes, so the completion is a few
+        dozen tokens rather than a whole plan; the patch is applied to the draft and validated.
+        """
+        prompt = self.prompt_builder.build(user_id, user_profile, user_goals, workout_history, context)
+        self._prompt_tokens_per_request.append(prompt.tokens)
+        messages = [
+            {"role": "system", "content": self.adjust_system_prompt},
+            {"role": "user", "content": "\n".join([
+                prompt.text.rsplit("\n", 1)[0], # everything but the "generate a full plan" instruction
+                f"Draft: {draft.model_dump_json(include={'workout_days'})}",
+            ])}
+        ]
+        cache_key = self.plan_cache_key(messages, model=self.adapt_model)
+
+        cached = await self._cached_plan(cache_key)
+        if cached is not None:
+            return cached
+
+        plan = await self._single_flight(
+            f"{user_id}:{cache_key}", lambda: self._adjust_uncached(user_id, messages, cache_key, draft)
+        )
+        return plan.model_copy(deep=True)
+
+    async def _adjust_uncached(self, user_id: str, messages: List[Dict[str, str]], cache_key: str,
+                               draft: WorkoutPlanModel) -> WorkoutPlanModel:
         try:
-            # Call OpenAI API
-            chat_completion = await self.openai_client.chat.completions.create(
-                model="gpt-4o",  # Or another suitable model
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={"type": "json_object"}
+            chat_completion = await self.complete(
+                user_id, messages=messages, model=self.adapt_model, response_format={"type": "json_object"}
             )
-            
-            # Extract JSON response
-            raw_response_content = chat_completion.choices[0].message.content
-            plan_data = json.loads(raw_response_content)
-
-            # Validate against Pydantic model
-            workout_plan = WorkoutPlanModel(**plan_data)
-            return workout_plan
+        except AIServiceTimeout:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Failed to generate plan from OpenAI: {e}")
 
-        except ValidationError as e:
-            raise ValueError(f"AI response validation failed: {e.errors()}")
+        try:
+            patch = json.loads(chat_completion.choices[0].message.content)
         except json.JSONDecodeError:
             raise ValueError("AI response was not valid JSON.")
+        plan_data = draft.model_dump(mode="json")
+        try:
+            for change in patch.get("adjustments") or []:
+                change = dict(change)
+                day, index = change.pop("day_index", 0), change.pop("exercise_index")
+                plan_data["workout_days"][day]["exercises"][index].update(change)
+        except (AttributeError, KeyError, IndexError, TypeError):
+            raise ValueError("AI response was not a valid plan adjustment.")
+        plan_data["ai_explanation"] = patch.get("ai_explanation") or draft.ai_explanation
+        return await self._accept_plan(user_id, json.dumps(plan_data), cache_key)
+
+    async def _generate_uncached(self, user_id: str, messages: List[Dict[str, str]],
+                                 model: Optional[str] = None) -> WorkoutPlanModel:
+        """
+        Runs one generation on the tier the router picks. If it has not produced a valid plan after
+        the router's hedge delay, or fails before then, the same request goes to the next faster
+        tier as well; the first valid plan wins and the other request is cancelled. The plan is
+        cached under the key of the tier that produced it. An explicit `model` is used as is.
+        """
+        primary = model or self.router.choose()
+        hedge = None if model else self.router.hedge_for(primary)
+        # A hedge delay past the deadline never fires; the hedge can still replace a failed primary.
+        hedge_delay = self.router.hedge_delay if self.router.hedge_delay < self.deadline else None
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        attempts = {asyncio.ensure_future(self._attempt_plan(user_id, messages, primary, self.deadline)): primary}
+        errors: Dict[str, Exception] = {}
+        try:
+            while pending := [attempt for attempt in attempts if not attempt.done()]:
+                hedge_in = max(started + hedge_delay - loop.time(), 0) if hedge and hedge_delay is not None else None
+                done, _ = await asyncio.wait(pending, timeout=hedge_in, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        if attempts[attempt] != primary:
+                            self.router.hedges_won += 1
+                        plan = attempt.result()
+                        await self.plan_cache.set(plan.prompt_hash, plan.model_dump(mode="json"))
+                        return plan
+                    errors[attempts[attempt]] = attempt.exception()
+                # The hedge delay elapsed with the first request still running, or it already failed
+                remaining = self.deadline - (loop.time() - started)
+                if hedge and remaining > 0 and (not done or errors):
+                    self.router.hedges += 1
+                    attempts[asyncio.ensure_future(self._attempt_plan(user_id, messages, hedge, remaining))] = hedge
+                    hedge = None
+            raise errors.get(primary) or next(iter(errors.values()))
+        finally:
+            for attempt in attempts:
+                attempt.cancel() # no-op for finished attempts
+
+    async def _attempt_plan(self, user_id: str, messages: List[Dict[str, str]], model: str,
+                            deadline: float) -> WorkoutPlanModel:
+        """
+        One completion on `model`, validated as a plan keyed on that model; its latency and outcome
+        feed the router.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        cache_key = self.plan_cache_key(messages, model=model)
+        try:
+            try:
+                # Call OpenAI API (bounded concurrency, deadline and retries; see `complete`)
+                chat_completion = await self.complete(
+                    user_id,
+                    messages=messages,
+                    deadline=deadline,
+                    model=model,
+                    response_format={"type": "json_object"}
+                )
+            except AIServiceTimeout:
+                raise
+            except Exception as e:
+                # Handle other potential OpenAI API errors
+                raise RuntimeError(f"Failed to generate plan from OpenAI: {e}")
+            if getattr(chat_completion.choices[0], "finish_reason", None) == "length":
+                # Cut off at the token limit: whatever parses is a shorter plan, not this one.
+                self.plan_repair.truncated += 1
+                raise TruncatedResponse("AI response was cut off before the plan was complete.")
+            # Extract the JSON response and validate it against the Pydantic model
+            plan = await self._parse_plan(
+                user_id, chat_completion.choices[0].message.content, cache_key, deadline - (loop.time() - started)
+            )
+        except asyncio.CancelledError:
+            self.router.record_cancelled(model)
+            raise
+        except Exception:
+            self.router.record(model, loop.time() - started, ok=False)
+            raise
+        self.router.record(model, loop.time() - started, ok=True)
+        return plan
+
+    async def stream_workout_plan(
+        self,
+        user_id: str,
+        user_profile: Dict[str, Any],
+        user_goals: Dict[str, Any],
+        workout_history: List[Dict[str, Any]],
+        context: PlanGenerationContext
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Streaming variant of `generate_workout_plan`. Yields ("exercise", dict) and ("day", dict)
+        events as each element of the streamed JSON validates (see PlanStreamParser), then
+        ("plan", WorkoutPlanModel) once the whole document validates. Cached plans, and identical
+        generations already in flight, are replayed as the same events.
+        """
+        messages = await self._plan_messages(user_id, user_profile, user_goals, workout_history, context)
+        cache_key = self.plan_cache_key(messages) # streams always run on `self.model`
+        flight_key = f"{user_id}:{cache_key}"
+
+        plan = await self._cached_routed_plan(messages)
+        if plan is None and flight_key in self._plan_flights:
+            self.plan_calls_deduplicated += 1
+            plan = (await asyncio.shield(self._plan_flights[flight_key][0])).model_copy(deep=True)
+        if plan is not None:
+            for event in plan_events(plan):
+                yield event
+            yield "plan", plan
+            return
+
+        parser = PlanStreamParser()
+        deltas: asyncio.Queue = asyncio.Queue()
+
+        finish_reasons: List[str] = []
+
+        async def pump(stream) -> None:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    deltas.put_nowait(chunk.choices[0].delta.content)
+                if chunk.choices and getattr(chunk.choices[0], "finish_reason", None) == "length":
+                    finish_reasons.append("length")
+
+        producer = asyncio.ensure_future(self.complete(
+            user_id, messages=messages, consume=pump, stream=True, response_format={"type": "json_object"}
+        ))
+        producer.add_done_callback(lambda _: deltas.put_nowait(None))
+        try:
+            while (delta := await deltas.get()) is not None:
+                for event in parser.feed(delta):
+                    yield event
+            await producer
+        except AIServiceTimeout:
+            raise
         except Exception as e:
-            # Handle other potential OpenAI API errors
             raise RuntimeError(f"Failed to generate plan from OpenAI: {e}")
+        finally:
+            # The client went away (or the stream failed): release the LLM call and its slot.
+            producer.cancel()
+            if producer.done() and not producer.cancelled():
+                producer.exception() # mark retrieved; already raised above or irrelevant after a disconnect
+
+        if finish_reasons:
+            self.plan_repair.truncated += 1
+            raise TruncatedResponse("AI response was cut off before the plan was complete.")
+        yield "plan", await self._accept_plan(user_id, parser.text, cache_key)
+
+    async def _plan_messages(self, user_id, user_profile, user_goals, workout_history, context) -> List[Dict[str, str]]:
+        prompt = await self.construct_prompt(user_id, user_profile, user_goals, workout_history, context)
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+
+    async def _cached_routed_plan(self, messages: List[Dict[str, str]]) -> Optional[WorkoutPlanModel]:
+        """A cached plan for `messages` from any tier the router would serve now, best tier first."""
+        for tier in self.router.servable_tiers():
+            plan = await self._cached_plan(self.plan_cache_key(messages, model=tier))
+            if plan is not None:
+                return plan
+        return None
+
+    async def _cached_plan(self, cache_key: str) -> Optional[WorkoutPlanModel]:
+        cached = await self.plan_cache.get(cache_key)
+        if cached is None:
+            return None
+        try:
+            return WorkoutPlanModel(**cached, prompt_hash=cache_key)
+        except (ValidationError, TypeError):
+            # Written under an older schema (or corrupted): drop it and regenerate.
+            logger.warning(f"Discarding invalid cached plan {cache_key}")
+            await self.plan_cache.invalidate(cache_key)
+            return None
+
+    async def _accept_plan(self, user_id: str, raw_response_content: str, cache_key: str) -> WorkoutPlanModel:
+        """Validates (repairing if needed) a complete LLM response as a WorkoutPlanModel and caches it."""
+        workout_plan = await self._parse_plan(user_id, raw_response_content, cache_key)
+        await self.plan_cache.set(cache_key, workout_plan.model_dump(mode="json"))
+        return workout_plan
+
+    async def _parse_plan(self, user_id: str, raw_response_content: str, cache_key: str,
+                          deadline: Optional[float] = None) -> WorkoutPlanModel:
+        """
+        Validates an LLM response as a WorkoutPlanModel. A response that fails validation is
+        repaired rather than regenerated: lenient JSON parsing and in-place coercion first (see
+        app.services.plan_repair), then a re-ask for only the exercises that are still invalid.
+        A response cut off mid-document is never repaired: it raises TruncatedResponse.
+        """
+        self.plan_repair.responses += 1
+        try:
+            return WorkoutPlanModel(**json.loads(raw_response_content), prompt_hash=cache_key)
+        except (json.JSONDecodeError, ValidationError, TypeError):
+            pass # slow path below
+
+        try:
+            plan_data = loads_lenient(raw_response_content)
+            if not isinstance(plan_data, dict):
+                raise ValueError("AI response was not a JSON object.")
+        except TruncatedResponse:
+            self.plan_repair.truncated += 1
+            raise
+        except ValueError:
+            self.plan_repair.failed += 1
+            raise
+        fixes = coerce_plan(plan_data, user_id)
+        invalid = invalid_exercises(plan_data)
+        reask_tokens = 0
+        if invalid:
+            reask_tokens = await self._reask_exercises(user_id, plan_data, invalid, deadline)
+        try:
+            workout_plan = WorkoutPlanModel(**plan_data, prompt_hash=cache_key)
+        except ValidationError as e:
+            self.plan_repair.failed += 1
+            raise ValueError(f"AI response validation failed: {e.errors()}")
+
+        if invalid:
+            self.plan_repair.repaired_by_reask += 1
+        else:
+            self.plan_repair.repaired_locally += 1
+        # Regenerating would have cost (at least) the whole completion again.
+        self.plan_repair.tokens_saved += max(count_tokens(raw_response_content) - reask_tokens, 0)
+        logger.info(f"Repaired plan for user {user_id}: {len(fixes)} fields coerced, {len(invalid)} exercises re-asked")
+        return workout_plan
+
+    async def _reask_exercises(self, user_id: str, plan_data: dict, invalid: List[Tuple[int, int, list]],
+                               deadline: Optional[float]) -> int:
+        """
+        Asks the adaptation model to correct only the invalid exercises and splices its answers into
+        `plan_data`. Returns the tokens the re-ask used; failures leave `plan_data` as it was.
+        """
+        if deadline is not None and deadline <= 0:
+            return 0 # no time left for a second call
+        broken = [
+            {"day_index": day, "exercise_index": index, "exercise": plan_data["workout_days"][day]["exercises"][index], "errors": errors}
+            for day, index, errors in invalid
+        ]
+        messages = [
+            {"role": "system", "content": self.repair_system_prompt},
+            {"role": "user", "content": json.dumps({"exercises": broken}, default=str, separators=(",", ":"))},
+        ]
+        try:
+            response = await self.complete(
+                user_id,
+                messages=messages,
+                deadline=deadline,
+                model=self.adapt_model,
+                response_format={"type": "json_object"},
+            )
+            content = response.choices[0].message.content
+            # Each answer replaces a whole exercise, so a cut-off re-ask still fixes the ones that arrived.
+            fixed = loads_lenient(content, allow_truncated=True).get("exercises")
+        except Exception as e:
+            logger.warning(f"Re-asking {len(invalid)} invalid exercises for user {user_id} failed: {e}")
+            return 0
+        usage = getattr(response, "usage", None)
+        tokens = getattr(usage, "total_tokens", None)
+        if not isinstance(tokens, int):
+            tokens = count_tokens(messages[1]["content"]) + count_tokens(content)
+
+        for item in fixed if isinstance(fixed, list) else []:
+            if not isinstance(item, dict) or not isinstance(item.get("exercise"), dict):
+                continue
+            key = (item.get("day_index"), item.get("exercise_index"))
+            if key in {(day, index) for day, index, _ in invalid}:
+                coerce_exercise(item["exercise"], [], "")
+                plan_data["workout_days"][key[0]]["exercises"][key[1]] = item["exercise"]
+        return tokens
+
+    async def _single_flight(self, key: str, factory: Callable[[], Awaitable[WorkoutPlanModel]]) -> WorkoutPlanModel:
+        """
+        Runs `factory()` once per key at a time; callers arriving while it is in flight await the
+        same task. A caller that is cancelled only stops waiting: the shared call keeps running for
+        the others, and is cancelled only when its last waiter has gone.
+        """
+        entry = self._plan_flights.get(key)
+        if entry is None:
+            entry = self._plan_flights[key] = [asyncio.ensure_future(factory()), 0]
+            entry[0].add_done_callback(lambda _: self._end_flight(key, entry))
+        else:
+            self.plan_calls_deduplicated += 1
+        entry[1] += 1
+        try:
+            return await asyncio.shield(entry[0])
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not entry[0].done():
+                self.plan_flights_cancelled += 1
+                entry[0].cancel()
+                # New callers start a fresh call rather than joining one that is being cancelled.
+                self._end_flight(key, entry)
+
+    def _end_flight(self, key: str, entry: list) -> None:
+        if self._plan_flights.get(key) is entry:
+            del self._plan_flights[key]
+
+    def plan_cache_key(self, messages: List[Dict[str, str]], model: Optional[str] = None) -> str:
+        """Canonical hash of the prompt messages and model: equal inputs always map to the same key."""
+        payload = json.dumps({"model": model or self.model, "messages": messages}, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # --- LLM call plumbing ----------------------------------------------------------------------
+
+    async def complete(
+        self,
+        user_id: str,
+        messages: List[Dict[str, str]],
+        deadline: Optional[float] = None,
+        consume: Optional[Callable[[Any], Awaitable[Any]]] = None,
+        **params,
+    ):
+        """
+        Runs one chat completion for `user_id` under the concurrency limits, deadline and retry policy.
+        Extra keyword arguments are passed to `chat.completions.create` (model defaults to `self.model`).
+
+        With `consume`, the response (e.g. a `stream=True` stream) is handed to `await consume(response)`
+        while the slot is still held and within the same deadline, and its result is returned.
+        Failures inside `consume` are not retried, since part of the output may already be used.
+        """
+        budget = self.deadline if deadline is None else deadline
+        expires_at = asyncio.get_running_loop().time() + budget
+        try:
+            return await asyncio.wait_for(self._complete_with_retries(user_id, messages, expires_at, params, consume), timeout=budget)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise AIServiceTimeout(f"AI call for user {user_id} exceeded its {budget:.1f}s deadline")
+
+    async def _complete_with_retries(self, user_id: str, messages: List[Dict[str, str]], expires_at: float, params: dict,
+                                     consume: Optional[Callable[[Any], Awaitable[Any]]] = None):
+        loop = asyncio.get_running_loop()
+        params.setdefault("model", self.model)
+        async with self._slot(user_id):
+            attempt = 0
+            while True:
+                self.calls += 1
+                try:
+                    response = await self.openai_client.chat.completions.create(
+                        messages=messages,
+                        timeout=max(expires_at - loop.time(), 0.001),
+                        **params,
+                    )
+                    self._count_tokens(response)
+                    break
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt)
+                    if delay is None or attempt >= self.max_retries or loop.time() + delay >= expires_at:
+                        self.failures += 1
+                        raise
+                    attempt += 1
+                    self.retries += 1
+                    logger.warning(f"LLM call failed ({e.__class__.__name__}); retry {attempt}/{self.max_retries} in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+            if consume is None:
+                return response
+            try:
+                return await consume(response)
+            except Exception:
+                self.failures += 1
+                raise
+
+    def _count_tokens(self, response) -> None:
+        usage = getattr(response, "usage", None)
+        if isinstance(getattr(usage, "prompt_tokens", None), int):
+            self.prompt_tokens += usage.prompt_tokens
+        if isinstance(getattr(usage, "completion_tokens", None), int):
+            self.completion_tokens += usage.completion_tokens
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Backoff before the next attempt, or None if `error` is not retryable."""
+        if isinstance(error, openai.APIStatusError):
+            if error.status_code != 429 and error.status_code < 500:
+                return None
+            retry_after = error.response.headers.get("retry-after") if error.response is not None else None
+            if retry_after:
+                try:
+                    return max(float(retry_after), 0.0)
+                except ValueError:
+                    pass
+        elif not isinstance(error, openai.APIConnectionError):
+            return None
+        # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * (2 ** attempt)))
+
+    @asynccontextmanager
+    async def _slot(self, user_id: str):
+        entry = self._user_slots.get(user_id)
+        if entry is None:
+            entry = self._user_slots[user_id] = [asyncio.Semaphore(self.max_concurrency_per_user), 0]
+        entry[1] += 1
+        self.waiting += 1
+        acquired = False
+        try:
+            # Per-user first, so a user's queued calls never hold global slots while they wait.
+            async with entry[0]:
+                async with self._global_slots:
+                    self.waiting -= 1
+                    acquired = True
+                    self.in_flight += 1
+                    try:
+                        yield
+                    finally:
+                        self.in_flight -= 1
+        finally:
+            if not acquired:
+                self.waiting -= 1
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._user_slots.pop(user_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "deadline_seconds": self.deadline,
+            "max_concurrency": self.max_concurrency,
+            "max_concurrency_per_user": self.max_concurrency_per_user,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "active_users": len(self._user_slots),
+            "calls": self.calls,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "prompt_tokens": self.prompt_tokens,
+            "prompt_tokens_per_request_p50": sorted(self._prompt_tokens_per_request)[len(self._prompt_tokens_per_request) // 2] if self._prompt_tokens_per_request else None,
+            "prompt_tokens_per_request_max": max(self._prompt_tokens_per_request) if self._prompt_tokens_per_request else None,
+            "completion_tokens": self.completion_tokens,
+            "plan_cache": self.plan_cache.stats(),
+            "plan_flights_in_flight": len(self._plan_flights),
+            "plan_calls_deduplicated": self.plan_calls_deduplicated,
+            "plan_flights_cancelled": self.plan_flights_cancelled,
+            "plan_repair": self.plan_repair.stats(),
+            "routing": self.router.stats(),
+        }
+
+    async def aclose(self) -> None:
+        await self.openai_client.close()
+
+
+def build_plan_cache() -> TieredCache:
+    backend = None
+    if settings.PLAN_CACHE_PERSISTENT:
+        backend = WorkoutPlanCacheBackend(max_age_seconds=settings.PLAN_CACHE_TTL_SECONDS)
+    return TieredCache(
+        "workout_plan",
+        maxsize=settings.PLAN_CACHE_MAX_ENTRIES,
+        ttl=settings.PLAN_CACHE_TTL_SECONDS,
+        backend=backend,
+    )
+
+
+_orchestrator: Optional[AIOrchestratorService] = None
+
+
+def get_ai_orchestrator() -> AIOrchestratorService:
+    """Returns the process-wide orchestrator, creating it on first use."""
+    global _orchestrator
+    if _orchestrator is None:
+        _orchestrator = AIOrchestratorService()
+        metrics_registry.register("ai_orchestrator", _orchestrator.stats)
+    return _orchestrator
+
+
+async def close_ai_orchestrator() -> None:
+    global _orchestrator
+    if _orchestrator is not None:
+        await _orchestrator.aclose()
+        metrics_registry.unregister("ai_orchestrator")
+        _orchestrator = None
@@ -0,0 +1,232 @@
+"""
+Columnar training analytics over a user's full WorkoutLogs history.
+
+Sets are loaded once into parallel NumPy arrays (exercise code, timestamp, reps, weight, RPE) and
+every figure is a vectorized group-by over them: np.bincount for sums and distinct days,
+np.maximum.at for maxima. That keeps years of history (10^5..10^6 sets) in the
+milliseconds the dashboard rollups are read in, where a per-set Python loop takes seconds.
+See benchmarks/bench_analytics.py.
+
+`rollup_trends` runs the same group-bys over weekly rollup rows: it computes the Weekly Review's
+volume and intensity series for GET /dashboard and the weekly review batch.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+from uuid import UUID
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.log_service import LogService
+
+ANALYTICS_FIELDS = ["exercise_name", "actual_reps", "actual_weight", "rpe"]
+_EPOCH = date(1970, 1, 1)
+_EPOCH_MONDAY_OFFSET = 3 # 1970-01-01 was a Thursday
+
+
+@dataclass
+class LogColumns:
+    exercise: np.ndarray # int32 code into `exercises`
+    timestamp: np.ndarray # int64 seconds since the epoch, UTC
+    reps: np.ndarray # int32
+    weight: np.ndarray # float64
+    rpe: np.ndarray # float64, NaN when not logged
+    exercises: List[str]
+
+    def __len__(self) -> int:
+        return len(self.reps)
+
+    @property
+    def day(self) -> np.ndarray:
+        """Days since the epoch (UTC) of each set."""
+        return self.timestamp // 86400
+
+    @property
+    def week(self) -> np.ndarray:
+        """Monday-based week number of each set; see `week_start_date`."""
+        return (self.day + _EPOCH_MONDAY_OFFSET) // 7
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict]) -> "LogColumns":
+        codes: Dict[str, int] = {}
+        exercise, stamps, reps, weight, rpe = [], [], [], [], []
+        for row in rows:
+            exercise.append(codes.setdefault(row["exercise_name"], len(codes)))
+            stamps.append(row["completed_at"])
+            reps.append(row["actual_reps"])
+            weight.append(row["actual_weight"])
+            rpe.append(row.get("rpe"))
+        return cls(
+            exercise=np.array(exercise, dtype=np.int32),
+            timestamp=_epoch_seconds(stamps),
+            reps=np.array(reps, dtype=np.int32),
+            weight=np.array(weight, dtype=np.float64),
+            rpe=np.array([np.nan if value is None else value for value in rpe], dtype=np.float64),
+            exercises=list(codes),
+        )
+
+
+def _epoch_seconds(stamps: List) -> np.ndarray:
+    # PostgREST returns timestamptz in UTC ("...+00:00"), which NumPy parses once the offset is cut.
+    if all(isinstance(stamp, str) and (stamp.endswith("+00:00") or stamp.endswith("Z")) for stamp in stamps):
+        return np.array([stamp[:19] for stamp in stamps], dtype="datetime64[s]").astype(np.int64)
+    seconds = []
+    for stamp in stamps:
+        moment = stamp if isinstance(stamp, datetime) else datetime.fromisoformat(str(stamp).replace("Z", "+00:00"))
+        seconds.append(int((moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)).timestamp()))
+    return np.array(seconds, dtype=np.int64)
+
+
+async def load_log_columns(user_id: UUID, log_service: Optional[LogService] = None) -> LogColumns:
+    """A user's whole history, paged through GET /logs' keyset query with only the needed columns."""
+    log_service = log_service or LogService()
+    rows: List[dict] = []
+    cursor = None
+    while True:
+        page = await log_service.list_logs(user_id, limit=settings.LOG_MAX_PAGE_SIZE, cursor=cursor, fields=ANALYTICS_FIELDS)
+        rows.extend(page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    rows.reverse() # pages come newest first
+    return LogColumns.from_rows(rows)
+
+
+def week_start_date(week: int) -> date:
+    return date.fromordinal(_EPOCH.toordinal() + int(week) * 7 - _EPOCH_MONDAY_OFFSET)
+
+
+def set_volume(logs: LogColumns) -> np.ndarray:
+    return logs.reps * logs.weight
+
+
+def e1rm(logs: LogColumns, method: str = "epley") -> np.ndarray:
+    """
+    Estimated 1RM per set. "epley": weight x (1 + reps / 30), a single is its own 1RM.
+    "rpe": the same with the reps in reserve (10 - RPE) added, as if taken to failure; sets
+    without an RPE fall back to plain Epley. Sets with no completed reps estimate 0.
+    """
+    reps = logs.reps.astype(np.float64)
+    if method == "rpe":
+        reps = reps + np.where(np.isnan(logs.rpe), 0.0, np.clip(10.0 - logs.rpe, 0.0, 10.0))
+    elif method != "epley":
+        raise ValueError(f"Unknown e1RM method: {method}")
+    estimate = np.where(reps <= 1, logs.weight, logs.weight * (1 + reps / 30))
+    return np.where(logs.reps > 0, estimate, 0.0)
+
+
+def group_sum(keys: np.ndarray, values: np.ndarray, size: int) -> np.ndarray:
+    return np.bincount(keys, weights=values, minlength=size)
+
+
+def group_max(keys: np.ndarray, values: np.ndarray, size: int) -> np.ndarray:
+    """Per-key maximum of non-negative values (0 for keys without any)."""
+    result = np.zeros(size)
+    np.maximum.at(result, keys, values)
+    return result
+
+
+def _trained_days(days: np.ndarray) -> np.ndarray:
+    """The distinct days, ascending; a bincount over the day range instead of a sort."""
+    if not len(days):
+        return days
+    first = days.min()
+    return np.flatnonzero(np.bincount(days - first)) + first
+
+
+def best_e1rm_by_exercise(logs: LogColumns, method: str = "epley") -> Dict[str, float]:
+    best = group_max(logs.exercise, e1rm(logs, method), len(logs.exercises))
+    return {name: float(best[code]) for code, name in enumerate(logs.exercises)}
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over up to `window` values (shorter at the start)."""
+    sums = np.cumsum(np.r_[0.0, values])
+    ends = np.arange(1, len(values) + 1)
+    starts = np.maximum(ends - window, 0)
+    return (sums[ends] - sums[starts]) / (ends - starts)
+
+
+def pct_change(values: np.ndarray) -> np.ndarray:
+    """Change against the previous value as a fraction; NaN for the first value and after a zero."""
+    previous = np.r_[np.nan, values[:-1]]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(previous > 0, (values - previous) / previous, np.nan)
+
+
+def streaks(days: np.ndarray, today: Optional[int] = None) -> Dict[str, int]:
+    """Longest run of consecutive trained days, and the run ending today (or yesterday)."""
+    trained = _trained_days(days)
+    if not len(trained):
+        return {"longest": 0, "current": 0}
+    breaks = np.flatnonzero(np.diff(trained) != 1)
+    starts = np.r_[0, breaks + 1]
+    ends = np.r_[breaks, len(trained) - 1]
+    lengths = ends - starts + 1
+    current = 0
+    if today is not None and trained[-1] >= today - 1:
+        current = int(lengths[-1])
+    return {"longest": int(lengths.max()), "current": current}
+
+
+def weekly_summary(logs: LogColumns, rolling_weeks: int = 4, method: str = "epley") -> Dict[str, np.ndarray]:
+    """
+    One entry per calendar week from the first to the last logged set, weeks without sets
+    included as zeros: `week_start` (datetime64[D] Mondays), volume, sets, trained days,
+    intensity (reps-weighted load as a fraction of each exercise's best e1RM over the whole
+    history), the volume's rolling mean and its week-over-week change.
+    """
+    if not len(logs):
+        empty = np.array([])
+        return {key: empty for key in ("week_start", "volume", "volume_rolling", "volume_pct_change", "sets", "trained_days", "intensity")}
+    weeks = logs.week
+    first = int(weeks.min())
+    index = weeks - first
+    size = int(index.max()) + 1
+    volume = group_sum(index, set_volume(logs), size)
+
+    best = group_max(logs.exercise, e1rm(logs, method), len(logs.exercises))[logs.exercise]
+    counted = (logs.reps > 0) & (best > 0)
+    relative = np.where(counted, logs.weight / np.where(best > 0, best, 1.0), 0.0) * logs.reps
+    reps = group_sum(index, np.where(counted, logs.reps, 0).astype(np.float64), size)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        intensity = np.where(reps > 0, group_sum(index, relative, size) / reps, np.nan)
+
+    trained = _trained_days(logs.day)
+    return {
+        "week_start": ((first + np.arange(size)) * 7 - _EPOCH_MONDAY_OFFSET).astype("datetime64[D]"),
+        "volume": volume,
+        "volume_rolling": rolling_mean(volume, rolling_weeks),
+        "volume_pct_change": pct_change(volume),
+        "sets": np.bincount(index, minlength=size),
+        "trained_days": np.bincount((trained + _EPOCH_MONDAY_OFFSET) // 7 - first, minlength=size),
+        "intensity": intensity,
+    }
+
+
+def rollup_trends(weekly_rows: Sequence[dict], weeks: Sequence[date]) -> Dict[str, np.ndarray]:
+    """
+    Volume and intensity for each of `weeks` (Mondays) from WorkoutWeeklyRollups rows, defined as
+    in `weekly_summary`: intensity is the reps-weighted load as a fraction of each exercise's best
+    e1RM over all of `weekly_rows` (each row's load is its volume / reps). Weeks without rows have
+    a volume of 0 and a NaN intensity; rows outside `weeks` only count towards the best e1RMs.
+    """
+    size = len(weeks)
+    if not weekly_rows:
+        return {"volume": np.zeros(size), "intensity": np.full(size, np.nan)}
+    positions = {week.isoformat(): index for index, week in enumerate(weeks)}
+    codes: Dict[str, int] = {}
+    exercise = np.array([codes.setdefault(row["exercise_name"], len(codes)) for row in weekly_rows], dtype=np.int32)
+    index = np.array([positions.get(str(row["week_start"])[:10], -1) for row in weekly_rows], dtype=np.int64)
+    volume = np.array([row["volume"] for row in weekly_rows], dtype=np.float64)
+    reps = np.array([row["reps"] for row in weekly_rows], dtype=np.float64)
+
+    best = group_max(exercise, np.array([row["best_e1rm"] for row in weekly_rows], dtype=np.float64), len(codes))[exercise]
+    counted = (reps > 0) & (best > 0)
+    shown = index >= 0
+    relative = np.where(counted, volume / np.where(best > 0, best, 1.0), 0.0) # reps x (mean load / e1RM)
+    counted_reps = group_sum(index[shown], np.where(counted, reps, 0.0)[shown], size)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        intensity = np.where(counted_reps > 0, group_sum(index[shown], relative[shown], size) / counted_reps, np.nan)
+    return {"volume": group_sum(index[shown], volume[shown], size), "intensity": intensity}
@@ -3,11 +3,11 @@ from typing import Optional
 from uuid import UUID
 from fastapi import HTTPException, status
 from fastapi import Depends
-from app.core.supabase import get_supabase_client
+from app.core.supabase import get_auth_flow_supabase_client
 from app.models.user import UserProfileData
 
 class AuthService:
-    def __init__(self, supabase_client = Depends(get_supabase_client)):
+    def __init__(self, supabase_client = Depends(get_auth_flow_supabase_client)):
         self.supabase = supabase_client
 
     async def register_user(self, email: str, password: str) -> Optional[UserProfileData]:
@@ -17,7 +17,7 @@ class AuthService:
         if not self.supabase:
             raise ValueError("Supabase client not initialized")
         try:
-            response = self.supabase.auth.sign_up({"email": email, "password": password})
+            response = await self.supabase.auth.sign_up({"email": email, "password": password})
 
             if response.user:
                 return UserProfileData(
@@ -37,7 +37,7 @@ class AuthService:
         if not self.supabase:
             raise ValueError("Supabase client not initialized")
         try:
-            response = self.supabase.auth.sign_in_with_password({"email": email, "password": password})
+            response = await self.supabase.auth.sign_in_with_password({"email": email, "password": password})
             if response.session:
                 return response.session.access_token
             if response.error:
@@ -0,0 +1,108 @@
+import hashlib
+import threading
+from typing import List, Sequence, Tuple
+
+from app.core.cache import TTLLRUCache
+from app.core.config import settings
+from app.core.metrics import metrics_registry
+
+# Drawing area of the weekly review charts (the web app stretches it with preserveAspectRatio="none")
+WIDTH, TOP, BOTTOM = 472, 1, 149
+CHART_KINDS = ("volume", "intensity")
+
+
+def _num(value: float, precision: int) -> str:
+    text = f"{value:.{precision}f}".rstrip("0").rstrip(".") if precision > 0 else f"{value:.0f}"
+    return "0" if text == "-0" else text
+
+
+def canonical_values(values: Sequence[float], precision: int = settings.CHART_PRECISION) -> str:
+    """The series as it appears in a chart URL; equal strings render equal charts."""
+    return ",".join(_num(float(value), precision) for value in values)
+
+
+def chart_etag(kind: str, values: str) -> str:
+    return '"' + hashlib.sha256(f"{kind}:{values}".encode()).hexdigest()[:20] + '"'
+
+
+def chart_path(kind: str, values: Sequence[float]) -> str:
+    """Where the dashboard links a chart; the URL carries the series, so any worker can serve it."""
+    return f"{settings.API_V1_STR}/dashboard/charts/{kind}.svg?values={canonical_values(values)}"
+
+
+def sparkline_path(values: Sequence[float], precision: int = settings.CHART_PRECISION) -> str:
+    """
+    Smoothed line through the series scaled into the drawing area: one cubic segment per step,
+    both control points at the horizontal midpoint, so the curve is flat at every data point
+    and never overshoots it.
+    """
+    if not values:
+        values = [0.0]
+    if len(values) == 1:
+        values = [values[0], values[0]]
+    low, high = min(values), max(values)
+    step = WIDTH / (len(values) - 1)
+    points: List[Tuple[float, float]] = []
+    for index, value in enumerate(values):
+        y = (TOP + BOTTOM) / 2 if high == low else BOTTOM - (value - low) / (high - low) * (BOTTOM - TOP)
+        points.append((index * step, y))
+
+    n = lambda value: _num(value, precision)
+    (x0, y0), *rest = points
+    path = [f"M{n(x0)} {n(y0)}"]
+    for (px, py), (x, y) in zip(points, rest):
+        mid = n((px + x) / 2)
+        path.append(f"C{mid} {n(py)} {mid} {n(y)} {n(x)} {n(y)}")
+    return "".join(path)
+
+
+def render_sparkline(kind: str, values: Sequence[float], precision: int = settings.CHART_PRECISION) -> str:
+    line = sparkline_path(values, precision)
+    gradient = f"{kind}Gradient"
+    return (
+        '<svg fill="none" height="148" preserveAspectRatio="none" viewBox="-3 0 478 150" width="100%" '
+        'xmlns="http://www.w3.org/2000/svg"><defs>'
+        f'<linearGradient gradientUnits="userSpaceOnUse" id="{gradient}" x1="236" x2="236" y1="{TOP}" y2="{BOTTOM}">'
+        '<stop stop-color="#13ec5b" stop-opacity="0.3"/><stop offset="1" stop-color="#13ec5b" stop-opacity="0"/>'
+        "</linearGradient></defs>"
+        f'<path d="{line}V{BOTTOM}H0Z" fill="url(#{gradient})"/>'
+        f'<path d="{line}" stroke="#13ec5b" stroke-linecap="round" stroke-width="3"/></svg>'
+    )
+
+
+class SparklineRenderer:
+    """
+    Weekly review charts, memoized by ETag (a hash of chart kind and canonical series). The
+    dashboard payload links each chart by a URL that carries its series instead of embedding the
+    SVG; GET /dashboard/charts answers a matching If-None-Match with 304 before rendering, and
+    renders each distinct series at most once per CHART_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self, maxsize: int = settings.CHART_CACHE_MAX_ENTRIES, ttl: float = settings.CHART_CACHE_TTL_SECONDS):
+        self.cache = TTLLRUCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.renders = 0
+        self.not_modified = 0
+
+    def render(self, kind: str, values: Sequence[float]) -> Tuple[str, str]:
+        """(ETag, SVG) for the series."""
+        canonical = canonical_values(values)
+        etag = chart_etag(kind, canonical)
+        svg = self.cache.get(etag)
+        if svg is None:
+            svg = render_sparkline(kind, [float(value) for value in canonical.split(",")] if canonical else [])
+            self.cache.set(etag, svg)
+            with self._lock:
+                self.renders += 1
+        return etag, svg
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self) -> dict:
+        return {"renders": self.renders, "not_modified": self.not_modified, "cache": self.cache.stats()}
+
+
+sparklines = SparklineRenderer()
+metrics_registry.register("charts", sparklines.stats)
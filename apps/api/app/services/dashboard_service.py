@@ -1,67 +1,231 @@
+import asyncio
+import math
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
 from uuid import UUID
-from datetime import datetime
-from apps.api.app.models.dashboard import DashboardMetrics, GoalProgress, WorkoutStreak, WeeklyVolume, TodaysContext, RecentWorkout, WeeklyReviewVolume, WeeklyReviewIntensity, ConsistencyChartData, WeeklyReviewConsistency, CoachCorner, WeeklyReview
+
+from app.core.conditional import strong_etag
+from app.core.config import settings
+from app.models.dashboard import DashboardMetrics, GoalProgress, WorkoutStreak, WeeklyVolume, TodaysContext, RecentWorkout, WeeklyReviewVolume, WeeklyReviewIntensity, ConsistencyChartData, WeeklyReviewConsistency, CoachCorner, WeeklyReview
+from app.services.analytics import rollup_trends
+from app.services.charts import chart_path
+from app.services.rollup_service import RollupService, week_start
+from app.services.weekly_review import WeeklyReviewSnapshots
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+def _by_period(rows: List[dict], key: str) -> Dict[date, List[dict]]:
+    periods: Dict[date, List[dict]] = defaultdict(list)
+    for row in rows:
+        periods[date.fromisoformat(str(row[key])[:10])].append(row)
+    return periods
+
+
+def _volume(rows: List[dict]) -> float:
+    return sum(row["volume"] for row in rows)
+
+
+def _trend(current: Optional[float], previous: Optional[float]) -> Tuple[str, str]:
+    """("up" | "down", relative change) of this week against the last."""
+    current, previous = current or 0.0, previous or 0.0
+    change = abs(current - previous) / previous if previous else 0.0
+    return ("up" if current >= previous else "down"), f"{change:.0%}"
+
+
+def _day_label(day: date, today: date) -> str:
+    if day == today:
+        return "Today"
+    if day == today - timedelta(days=1):
+        return "Yesterday"
+    return f"{day:%b} {day.day}"
+
 
 class DashboardService:
-    def __init__(self):
-        # In a real implementation, this would involve database queries
-        pass
+    """
+    GET /dashboard from the per-user rollups (see RollupService): DASHBOARD_WEEKS weekly rows for
+    trends and e1RMs and DASHBOARD_DAILY_DAYS daily rows for the streak, consistency and recent
+    workouts, so the cost grows with the weeks shown rather than with the sets ever logged.
+    Streaks longer than DASHBOARD_DAILY_DAYS are reported as that many days.
+
+    The Weekly Review covers the last closed week. It only changes once the week is over when
+    sets for it are synced late, so it is read from the snapshot the weekly review batch stores
+    (WeeklyReviewSnapshots) and only computed here, from the same rollup rows, while that snapshot
+    is missing. Late sets delete the snapshots they make stale.
+    """
+
+    def __init__(self, rollups: Optional[RollupService] = None, unit: str = "kg",
+                 snapshots: Optional[WeeklyReviewSnapshots] = None):
+        self.rollups = rollups or RollupService()
+        self.unit = unit
+        self.snapshots = snapshots or WeeklyReviewSnapshots()
+
+    async def etag(self, user_id: UUID, *context: str, today: Optional[date] = None) -> str:
+        """
+        Validator for the user's dashboard: the rollup version (bumped by every apply or rebuild),
+        the day (streaks and labels move at midnight UTC) and the settings that shape the payload.
+        Review snapshots are computed from the same rollups and deleted whenever those change
+        under them, so they need no version of their own.
+        """
+        today = today or datetime.now(timezone.utc).date()
+        version = await self.rollups.version(user_id)
+        return strong_etag(
+            "dashboard", user_id, version, today, self.unit, settings.DASHBOARD_WEEKS, settings.DASHBOARD_DAILY_DAYS,
+            settings.DASHBOARD_TARGET_DAYS_PER_WEEK, *context,
+        )
+
+    async def get_dashboard_metrics(self, user_id: UUID, today: Optional[date] = None) -> DashboardMetrics:
+        today = today or datetime.now(timezone.utc).date()
+        this_week = week_start(today)
+        review_week = this_week - timedelta(weeks=1)
+        first_week = this_week - timedelta(weeks=settings.DASHBOARD_WEEKS - 1)
+        daily_rows, weekly_rows, review = await asyncio.gather(
+            self.rollups.daily(user_id, min(today - timedelta(days=settings.DASHBOARD_DAILY_DAYS - 1), review_week - timedelta(weeks=1))),
+            # One week more than shown: the review's trends end a week earlier.
+            self.rollups.weekly(user_id, first_week - timedelta(weeks=1)),
+            self.snapshots.get(user_id, review_week),
+        )
+        days = _by_period(daily_rows, "day")
+        weeks = _by_period(weekly_rows, "week_start")
+        window = [first_week + timedelta(weeks=offset) for offset in range(settings.DASHBOARD_WEEKS)]
+        volume = _volume(weeks.get(this_week, []))
 
-    async def get_dashboard_metrics(self, user_id: UUID) -> DashboardMetrics:
-        # Mock data for demonstration
         return DashboardMetrics(
-            goal_progress=GoalProgress(
-                name="Bench Press",
-                current=85.0,
-                target=100.0,
-                unit="kg",
-            ),
-            workout_streak=WorkoutStreak(
-                days=5,
-            ),
+            goal_progress=self._goal_progress([row for row in weekly_rows if str(row["week_start"])[:10] >= first_week.isoformat()]),
+            workout_streak=WorkoutStreak(days=self._streak(days, today)),
             weekly_volume=WeeklyVolume(
-                total=5450.0,
-                unit="lbs",
-                chart_data_url="https://lh3.googleusercontent.com/aida-public/AB6AXuDzNjPnJ-GgHG7kXZRQt_FiXCIzXCAuALb6qz2uu10zi7JmVwF2xbv_2U-90Cg0JRY7geQY2-AeqdaDp7gszptq97bYvic8uVDvkqJff8k4hOUiDapwK1k9TCUv_9OqLwZGP4Mp1QpROmaP_HtWlV4jRnR4ksIi4RRKfWh0B5xymw2Uq26DbMqPdtAm-oer-zIzPpCjqFaWQnIcaOCKOl0xDbjJ_B3jtZk7oCBTV_cjdV9izKhC8kmdbAnO0lV_0e_amNrhR63b062F",
+                total=round(volume, 1), unit=self.unit,
+                chart_data_url=chart_path("volume", [_volume(weeks.get(week, [])) for week in window]),
+            ),
+            todays_context=TodaysContext(message=self._todays_context(days, today)),
+            recent_workouts=self._recent_workouts(days, today),
+            weekly_review=review or self._weekly_review(days, weekly_rows, review_week),
+        )
+
+    async def weekly_review(self, user_id: UUID, week: date) -> WeeklyReview:
+        """The review of the week starting on `week`, from the rollups (what the snapshots store)."""
+        daily_rows, weekly_rows = await asyncio.gather(
+            self.rollups.daily(user_id, week - timedelta(weeks=1)),
+            self.rollups.weekly(user_id, week - timedelta(weeks=settings.DASHBOARD_WEEKS - 1)),
+        )
+        return self._weekly_review(_by_period(daily_rows, "day"), weekly_rows, week)
+
+    def _weekly_review(self, days: Dict[date, List[dict]], weekly_rows: List[dict], week: date) -> WeeklyReview:
+        """
+        Trends of `week` against the week before over the DASHBOARD_WEEKS weeks ending with it.
+        Later rows are ignored, so the review reads the same whenever it is computed.
+        """
+        weekly_rows = [row for row in weekly_rows if str(row["week_start"])[:10] <= week.isoformat()]
+        previous_week = week - timedelta(weeks=1)
+        # One point per week of the window, oldest first; at least the four weeks the Coach Corner reads
+        window = [week - timedelta(weeks=ago) for ago in range(max(settings.DASHBOARD_WEEKS, 4) - 1, -1, -1)]
+        trends = rollup_trends(weekly_rows, window)
+        volumes = dict(zip(window, trends["volume"].tolist()))
+        intensities = {
+            period: None if math.isnan(value) else value for period, value in zip(window, trends["intensity"].tolist())
+        }
+        volume, previous_volume = volumes[week], volumes[previous_week]
+        trained = [day for day in days if week_start(day) == week]
+        trained_previous_week = sum(week_start(day) == previous_week for day in days)
+        target_days = settings.DASHBOARD_TARGET_DAYS_PER_WEEK
+
+        # Chart series over the DASHBOARD_WEEKS weeks ending with the reviewed one, empty weeks as 0
+        shown = window[-settings.DASHBOARD_WEEKS:]
+        volume_chart = chart_path("volume", [volumes[period] for period in shown])
+        intensity_chart = chart_path("intensity", [(intensities[period] or 0.0) * 100 for period in shown])
+
+        volume_trend, volume_change = _trend(volume, previous_volume)
+        intensity = intensities.get(week)
+        intensity_trend, intensity_change = _trend(intensity, intensities.get(previous_week))
+        consistency_trend, consistency_change = _trend(len(trained), trained_previous_week)
+
+        return WeeklyReview(
+            week_start=week,
+            volume=WeeklyReviewVolume(
+                value=f"{volume:,.0f} {self.unit}", trend=volume_trend, percentage_change=volume_change,
+                chart_url=volume_chart,
             ),
-            todays_context=TodaysContext(
-                message="You seem rested. Today's a good day for a high-intensity session. Let's aim for a new PR!",
+            intensity=WeeklyReviewIntensity(
+                value=f"{intensity:.0%} 1RM" if intensity is not None else "-",
+                trend=intensity_trend, percentage_change=intensity_change, chart_url=intensity_chart,
             ),
-            recent_workouts=[
-                RecentWorkout(name="Push Day - Upper Body", date="Yesterday"),
-                RecentWorkout(name="Leg Day - Hypertrophy", date="Mar 15"),
-                RecentWorkout(name="Pull Day - Back & Biceps", date="Mar 14"),
-            ],
-            weekly_review=WeeklyReview(
-                volume=WeeklyReviewVolume(
-                    value="5,450 lbs",
-                    trend="up",
-                    percentage_change="15%",
-                    chart_svg='<svg fill="none" height="148" preserveAspectRatio="none" viewBox="-3 0 478 150" width="100%" xmlns="http://www.w3.org/2000/svg"><defs><linearGradient gradientUnits="userSpaceOnUse" id="chartGradient" x1="236" x2="236" y1="1" y2="149"><stop stopColor="#13ec5b" stopOpacity="0.3"></stop><stop offset="1" stopColor="#13ec5b" stopOpacity="0"></stop></linearGradient></defs><path d="M0 109C18.1538 109 18.1538 21 36.3077 21C54.4615 21 54.4615 41 72.6154 41C90.7692 41 90.7692 93 108.923 93C127.077 93 127.077 33 145.231 33C163.385 33 163.385 101 181.538 101C199.692 101 199.692 61 217.846 61C236 61 236 45 254.154 45C272.308 45 272.308 121 290.462 121C308.615 121 308.615 149 326.769 149C344.923 149 344.923 1 363.077 1C381.231 1 381.231 81 399.385 81C417.538 81 417.538 129 435.692 129C453.846 129 453.846 25 472 25" fill="url(#chartGradient)"></path><path d="M0 109C18.1538 109 18.1538 21 36.3077 21C54.4615 21 54.4615 41 72.6154 41C90.7692 41 90.7692 93 108.923 93C127.077 93 127.077 33 145.231 33C163.385 33 163.385 101 181.538 101C199.692 101 199.692 61 217.846 61C236 61 236 45 254.154 45C272.308 45 272.308 121 290.462 121C308.615 121 308.615 149 326.769 149C344.923 149 344.923 1 363.077 1C381.231 1 381.231 81 399.385 81C417.538 81 417.538 129 435.692 129C453.846 129 453.846 25 472 25" stroke="#13ec5b" strokeLinecap="round" strokeWidth="3"></path></svg>',
-                ),
-                intensity=WeeklyReviewIntensity(
-                    value="85% 1RM",
-                    trend="down",
-                    percentage_change="2%",
-                    chart_svg='<svg fill="none" height="148" preserveAspectRatio="none" viewBox="-3 0 478 150" width="100%" xmlns="http://www.w3.org/2000/svg"><defs><linearGradient gradientUnits="userSpaceOnUse" id="chartGradient2" x1="236" x2="236" y1="1" y2="149"><stop stopColor="#13ec5b" stopOpacity="0.3"></stop><stop offset="1" stopColor="#13ec5b" stopOpacity="0"></stop></linearGradient></defs><path d="M0 25C18.1538 25 18.1538 129 36.3077 129C54.4615 129 54.4615 81 72.6154 81C90.7692 81 90.7692 1 108.923 1C127.077 1 127.077 149 145.231 149C163.385 149 163.385 121 181.538 121C199.692 121 199.692 45 217.846 45C236 45 236 61 254.154 61C272.308 61 272.308 101 290.462 101C308.615 101 308.615 33 326.769 33C344.923 33 344.923 93 363.077 93C381.231 93 381.231 41 399.385 41C417.538 41 417.538 21 435.692 21C453.846 21 453.846 109 472 109V149H0V25Z" fill="url(#chartGradient2)"></path><path d="M0 25C18.1538 25 18.1538 129 36.3077 129C54.4615 129 54.4615 81 72.6154 81C90.7692 81 90.7692 1 108.923 1C127.077 1 127.077 149 145.231 149C163.385 149 163.385 121 181.538 121C199.692 121 199.692 45 217.846 45C236 45 236 61 254.154 61C272.308 61 272.308 101 290.462 101C308.615 101 308.615 33 326.769 33C344.923 33 344.923 93 363.077 93C381.231 93 381.231 41 399.385 41C417.538 41 417.538 21 435.692 21C453.846 21 453.846 109 472 109" stroke="#13ec5b" strokeLinecap="round" strokeWidth="3"></path></svg>',
-                ),
-                consistency=WeeklyReviewConsistency(
-                    value="4/5 Days",
-                    trend="up",
-                    percentage_change="20%",
-                    chart_data=[
-                        ConsistencyChartData(day="Mon", height_percentage="75%", trained=True),
-                        ConsistencyChartData(day="Tue", height_percentage="100%", trained=False),
-                        ConsistencyChartData(day="Wed", height_percentage="80%", trained=True),
-                        ConsistencyChartData(day="Thu", height_percentage="90%", trained=True),
-                        ConsistencyChartData(day="Fri", height_percentage="100%", trained=False),
-                        ConsistencyChartData(day="Sat", height_percentage="60%", trained=True),
-                        ConsistencyChartData(day="Sun", height_percentage="100%", trained=False),
-                    ],
-                ),
-                coach_corner=CoachCorner(
-                    message="Your intensity has been trending down over the last 3 sessions. To prevent overtraining and promote recovery, consider a deload week.",
-                    suggestion="Implement Suggestion",
-                ),
+            consistency=WeeklyReviewConsistency(
+                value=f"{len(trained)}/{target_days} Days", trend=consistency_trend,
+                percentage_change=consistency_change, chart_data=self._consistency_chart(days, week),
             ),
-        )
\ No newline at end of file
+            coach_corner=self._coach_corner(intensities, week, len(trained), target_days), # the reviewed week is "last week"
+        )
+
+    def _goal_progress(self, weekly_rows: List[dict]) -> GoalProgress:
+        """The main lift (most volume in the window): latest e1RM against 5% over its best, in 2.5 steps."""
+        if not weekly_rows:
+            return GoalProgress(name="No lifts logged yet", current=0.0, target=0.0, unit=self.unit)
+        volume: Dict[str, float] = defaultdict(float)
+        for row in weekly_rows:
+            volume[row["exercise_name"]] += row["volume"]
+        lift = max(volume, key=volume.get)
+        rows = [row for row in weekly_rows if row["exercise_name"] == lift] # newest week first
+        best = max(row["best_e1rm"] for row in rows)
+        return GoalProgress(
+            name=lift, current=round(rows[0]["best_e1rm"], 1), target=math.ceil(best * 1.05 / 2.5) * 2.5, unit=self.unit,
+        )
+
+    @staticmethod
+    def _streak(days: Dict[date, List[dict]], today: date) -> int:
+        """Consecutive trained days up to today (or yesterday, if today is still open)."""
+        day = today if today in days else today - timedelta(days=1)
+        streak = 0
+        while day in days:
+            streak += 1
+            day -= timedelta(days=1)
+        return streak
+
+    @staticmethod
+    def _todays_context(days: Dict[date, List[dict]], today: date) -> str:
+        if not days:
+            return "Log your first session and your training trends will show up here."
+        rest = (today - max(days)).days
+        if rest == 0:
+            return "Session logged today. Prioritize food and sleep so it pays off."
+        if rest == 1:
+            return "You trained yesterday. A moderate session or active recovery fits today."
+        return f"{rest} days since your last session. You seem rested; today's a good day for a high-intensity session."
+
+    @staticmethod
+    def _recent_workouts(days: Dict[date, List[dict]], today: date, count: int = 3) -> List[RecentWorkout]:
+        workouts = []
+        for day in sorted(days, reverse=True)[:count]:
+            lifts = sorted(days[day], key=lambda row: row["volume"], reverse=True)
+            workouts.append(RecentWorkout(name=" & ".join(row["exercise_name"] for row in lifts[:2]), date=_day_label(day, today)))
+        return workouts
+
+    @staticmethod
+    def _consistency_chart(days: Dict[date, List[dict]], this_week: date) -> List[ConsistencyChartData]:
+        week = [this_week + timedelta(days=offset) for offset in range(7)]
+        volumes = [_volume(days.get(day, [])) for day in week]
+        peak = max(volumes) or 1.0
+        return [
+            # Untrained days render as a full-height empty bar.
+            ConsistencyChartData(day=label, height_percentage=f"{volume / peak:.0%}" if day in days else "100%", trained=day in days)
+            for label, day, volume in zip(WEEKDAYS, week, volumes)
+        ]
+
+    @staticmethod
+    def _coach_corner(intensities: Dict[date, Optional[float]], week: date, trained: int,
+                      target_days: int) -> CoachCorner:
+        recent = [intensities.get(week - timedelta(weeks=weeks)) for weeks in (3, 2, 1, 0)]
+        if None not in recent and all(later < earlier for earlier, later in zip(recent, recent[1:])):
+            return CoachCorner(
+                message="Your intensity has been trending down for three weeks. To prevent overtraining and promote recovery, consider a deload week.",
+                suggestion="Schedule a deload week",
+            )
+        if trained < target_days:
+            return CoachCorner(
+                message=f"You trained {trained} of your {target_days} target days last week. Shorter sessions are easier to fit in than skipped ones.",
+                suggestion="Plan shorter sessions",
+            )
+        return CoachCorner(
+            message="You hit your training days and your intensity is holding. Keep progressing the main lifts.",
+            suggestion="Keep the current plan",
+        )
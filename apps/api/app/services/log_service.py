@@ -1,24 +1,65 @@
-from uuid import UUID
+import asyncio
+import base64
+import binascii
+import json
+import logging
+from uuid import UUID, uuid4
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Optional, Sequence
 from postgrest import APIResponse
 from fastapi import HTTPException, status # Explicitly import HTTPException and status
+from supabase import AsyncClient
 
-from ..models.workout_log import WorkoutLogCreate, WorkoutLogResponse
+from ..models.workout_log import WorkoutLogBulkResult, WorkoutLogCreate, WorkoutLogPage, WorkoutLogResponse
+from ..core.config import settings
 from ..core.supabase import get_supabase_client
 
+logger = logging.getLogger(__name__)
+
+BULK_CREATED, BULK_DUPLICATE, BULK_FAILED = "created", "duplicate", "failed"
+
+# Columns GET /logs can return; id and completed_at are always included (they form the page cursor).
+LOG_FIELDS = (
+    "id", "user_id", "plan_id", "exercise_name", "set_number", "target_reps", "actual_reps",
+    "target_weight", "actual_weight", "rpe", "completed_at",
+)
+
+
+class InvalidCursor(ValueError):
+    """The client sent a cursor this server did not issue."""
+
+
+def encode_log_cursor(completed_at: str, log_id: str) -> str:
+    payload = json.dumps([completed_at, log_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_log_cursor(cursor: str):
+    try:
+        completed_at, log_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        # Both values end up in a PostgREST filter: only accept what they claim to be.
+        datetime.fromisoformat(completed_at)
+        return completed_at, str(UUID(log_id))
+    except (binascii.Error, ValueError, TypeError, AttributeError) as e:
+        raise InvalidCursor(f"Invalid log cursor: {e}")
+
+
 class LogService:
-    def __init__(self):
-        self.supabase = get_supabase_client()
+    def __init__(self, supabase: Optional[AsyncClient] = None):
+        self._supabase = supabase
+
+    @property
+    def supabase(self):
+        # Resolved per call so the module-level instance always uses the pooled registry client.
+        return self._supabase or get_supabase_client()
 
     async def create_log_entry(
         self,
         log_entry: WorkoutLogCreate,
         user_id: UUID
     ) -> WorkoutLogResponse:
-        data = log_entry.model_dump()
+        data = log_entry.model_dump(mode="json", exclude_none=True) # keeps the client's completed_at
         data["user_id"] = str(user_id) # Supabase expects string for UUID
-        data["completed_at"] = datetime.utcnow().isoformat() # Use UTC datetime
 
         response: APIResponse = await self.supabase.table("WorkoutLogs").insert(data).execute()
 
@@ -35,21 +76,125 @@ class LogService:
     async def create_bulk_log_entries(
         self,
         log_entries: List[WorkoutLogCreate],
-        user_id: UUID
-    ) -> List[WorkoutLogResponse]:
-        data_to_insert = []
+        user_id: UUID,
+        chunk_size: int = settings.LOG_BULK_CHUNK_SIZE,
+        concurrency: int = settings.LOG_BULK_CONCURRENCY,
+    ) -> List[WorkoutLogBulkResult]:
+        """
+        Idempotent bulk ingestion for offline replays. Rows keep the client's `id` (one is assigned
+        if missing) and `completed_at`, and are upserted on `id` in chunks with existing ids
+        ignored, so replaying a session never duplicates sets. Returns one result per entry, in
+        order, with its status: created, duplicate, or failed (its chunk could not be written).
+        """
+        rows = []
         for log_entry in log_entries:
-            data = log_entry.model_dump()
+            data = log_entry.model_dump(mode="json")
+            data["id"] = data["id"] or str(uuid4())
             data["user_id"] = str(user_id)
-            data["completed_at"] = datetime.utcnow().isoformat()
-            data_to_insert.append(data)
+            rows.append(data)
 
-        response: APIResponse = await self.supabase.table("WorkoutLogs").insert(data_to_insert).execute()
+        first_rows: Dict[str, dict] = {}
+        for row in rows:
+            first_rows.setdefault(row["id"], row)
+        unique = list(first_rows.values())
+        stored: Dict[str, dict] = {}
+        errors: Dict[str, str] = {}
+        slots = asyncio.Semaphore(max(1, concurrency))
 
-        if response.data:
-            return [WorkoutLogResponse(**item) for item in response.data]
-        else:
+        async def write(chunk: List[dict]) -> None:
+            async with slots:
+                try:
+                    response: APIResponse = await (
+                        self.supabase.table("WorkoutLogs")
+                        .upsert(chunk, on_conflict="id", ignore_duplicates=True)
+                        .execute()
+                    )
+                except Exception as e:
+                    logger.error(f"Bulk log chunk of {len(chunk)} rows for user {user_id} failed: {e}")
+                    errors.update((row["id"], str(e)) for row in chunk)
+                    return
+            # Only rows that were actually inserted come back; the rest already existed.
+            stored.update((str(item["id"]), item) for item in response.data or [])
+
+        await asyncio.gather(*(write(unique[i:i + chunk_size]) for i in range(0, len(unique), chunk_size)))
+
+        if unique and len(errors) == len(unique):
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to create bulk workout log entries."
-            )
\ No newline at end of file
+            )
+
+        results = []
+        for row in rows:
+            if row["id"] in errors:
+                results.append(WorkoutLogBulkResult(**row, status=BULK_FAILED, error=errors[row["id"]]))
+            elif row["id"] in stored:
+                # Later copies of the same id in this request are duplicates of the first.
+                results.append(WorkoutLogBulkResult(**stored.pop(row["id"]), status=BULK_CREATED))
+            else:
+                results.append(WorkoutLogBulkResult(**row, status=BULK_DUPLICATE))
+        return results
+
+    async def list_logs(
+        self,
+        user_id: UUID,
+        limit: int = settings.LOG_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        exercise_name: Optional[str] = None,
+        plan_id: Optional[UUID] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> WorkoutLogPage:
+        """
+        One page of a user's sets, newest first, in (completed_at, id) keyset order: the cursor is
+        the last row of the previous page, so every page is an index range scan on
+        (user_id[, exercise_name | plan_id], completed_at, id) however deep the client pages.
+        `fields` limits the returned columns (id and completed_at are always included); unknown
+        names raise ValueError.
+        """
+        requested = fields or LOG_FIELDS
+        unknown = [field for field in requested if field not in LOG_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown workout log fields: {', '.join(unknown)}")
+        columns = ", ".join(dict.fromkeys(("id", "completed_at", *requested)))
+
+        query = self.supabase.table("WorkoutLogs").select(columns).eq("user_id", str(user_id))
+        if exercise_name is not None:
+            query = query.eq("exercise_name", exercise_name)
+        if plan_id is not None:
+            query = query.eq("plan_id", str(plan_id))
+        if since is not None:
+            query = query.gte("completed_at", since.isoformat())
+        if until is not None:
+            query = query.lt("completed_at", until.isoformat())
+        if cursor:
+            completed_at, log_id = decode_log_cursor(cursor)
+            # Keyset: strictly before (completed_at, id); timestamps quoted for their ':' and '+'. The
+            # redundant `lte` bound is what lets Postgres start the index scan at the cursor rather
+            # than filter its way down from the newest row.
+            query = query.lte("completed_at", completed_at).or_(f'completed_at.lt."{completed_at}",and(completed_at.eq."{completed_at}",id.lt.{log_id})')
+        response: APIResponse = await (
+            query.order("completed_at", desc=True).order("id", desc=True).limit(limit).execute()
+        )
+        rows = response.data or []
+        next_cursor = None
+        if len(rows) == limit:
+            next_cursor = encode_log_cursor(rows[-1]["completed_at"], str(rows[-1]["id"]))
+        return WorkoutLogPage(items=rows, next_cursor=next_cursor)
+
+    async def list_logs_since(self, user_id: UUID, since: datetime, arrived_since: Optional[datetime] = None) -> List[dict]:
+        """
+        Raw WorkoutLogs rows completed after `since` and, if given, stored (`updated_at`) at or
+        after `arrived_since`, in arrival order (for incremental history summaries).
+        """
+        query = (
+            self.supabase.table("WorkoutLogs")
+            .select("id, exercise_name, set_number, actual_reps, actual_weight, rpe, completed_at, updated_at")
+            .eq("user_id", str(user_id))
+            .gt("completed_at", since.isoformat())
+        )
+        if arrived_since is not None:
+            query = query.gte("updated_at", arrived_since.isoformat())
+        response: APIResponse = await query.order("updated_at").order("id").execute()
+        return response.data or []
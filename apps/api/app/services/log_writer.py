@@ -0,0 +1,282 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+import statistics
+import time
+from collections import defaultdict, deque
+from typing import Dict, List, Optional
+from uuid import UUID, uuid4
+
+from app.core.config import settings
+from app.core.metrics import metrics_registry
+from app.core.supabase import supabase_registry
+from app.models.workout_log import WorkoutLogCreate, WorkoutLogResponse
+from app.services.log_service import BULK_FAILED, LogService
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedLogWriter:
+    """
+    Write-behind path for POST /logs (LOG_WRITE_BEHIND). A set is acknowledged as soon as it is
+    appended (and fsynced) to a local write-ahead file; a background task batch-inserts buffered
+    sets into WorkoutLogs every `flush_interval_ms` or as soon as `flush_max_rows` are waiting.
+
+    Each flush first rotates the WAL into a numbered segment, so sets logged during the insert go
+    to a fresh file. Once the insert returns, the sets that failed are rewritten into a retry
+    segment and the flushed segments are deleted. A failed set is retried on its own, with
+    exponential backoff, up to `max_attempts` times; after that it is appended to the dead-letter
+    file (`<wal>.dead`, one WAL row per line plus `_error`) so one poison row cannot hold the rest
+    back. Renaming the dead-letter file to `<wal>.0-0.segment` replays it on the next start.
+
+    On startup, whatever segments and WAL a crashed process left behind are replayed. Rows carry
+    their id from the moment they are appended and are written through the idempotent bulk
+    upsert, so replaying a segment that was in fact already stored creates no duplicates.
+
+    One WAL per process: with several workers, give each its own LOG_WAL_PATH.
+    """
+
+    def __init__(
+        self,
+        wal_path: str = settings.LOG_WAL_PATH,
+        flush_interval_ms: int = settings.LOG_FLUSH_INTERVAL_MS,
+        flush_max_rows: int = settings.LOG_FLUSH_MAX_ROWS,
+        fsync: bool = settings.LOG_WAL_FSYNC,
+        max_attempts: int = settings.LOG_FLUSH_MAX_ATTEMPTS,
+        retry_max_seconds: float = settings.LOG_FLUSH_RETRY_MAX_SECONDS,
+        log_service: Optional[LogService] = None,
+    ):
+        self.wal_path = wal_path
+        self.dead_letter_path = f"{wal_path}.dead"
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_max_rows = flush_max_rows
+        self.fsync = fsync
+        self.max_attempts = max(1, max_attempts)
+        self.retry_max_seconds = retry_max_seconds
+        self._log_service = log_service
+        self._file = None
+        self._pending: List[dict] = [] # appended, not yet stored; oldest first
+        self._segments: List[str] = [] # rotated WAL files holding a prefix of _pending
+        self._segment_seq = 0
+        self._attempts: Dict[str, int] = {} # row id -> failed inserts so far
+        self._retry_at: Dict[str, float] = {} # row id -> monotonic time of its next retry
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._append_seconds = deque(maxlen=1000)
+
+        self.appended = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.flush_failures = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self.recovered = 0
+        self.last_flush_seconds: Optional[float] = None
+
+    @property
+    def log_service(self) -> LogService:
+        if self._log_service is None:
+            # Flushes write many users' sets outside any request, so they use the service role.
+            self._log_service = LogService(supabase_registry.admin())
+        return self._log_service
+
+    async def start(self) -> None:
+        self._recover()
+        self._file = open(self.wal_path, "a", encoding="utf-8")
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        metrics_registry.register("log_writer", self.stats)
+        if self._pending:
+            self._wake.set()
+
+    async def stop(self) -> None:
+        metrics_registry.unregister("log_writer")
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush() # best effort; anything left is replayed on the next start
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def append(self, log_entry: WorkoutLogCreate, user_id: UUID) -> WorkoutLogResponse:
+        """Durably buffers one set and returns it as it will be stored."""
+        started = time.perf_counter()
+        row = log_entry.model_dump(mode="json")
+        row["id"] = row["id"] or str(uuid4())
+        row["user_id"] = str(user_id)
+        self._file.write(json.dumps(row, separators=(",", ":")) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._pending.append(row)
+        self.appended += 1
+        if len(self._pending) >= self.flush_max_rows:
+            self._wake.set()
+        self._append_seconds.append(time.perf_counter() - started)
+        return WorkoutLogResponse(**row)
+
+    async def flush(self) -> int:
+        """Stores everything buffered and due so far; returns the number of rows stored."""
+        if not self._pending:
+            return 0
+        self._rotate()
+        batch, segments = list(self._pending), list(self._segments)
+        now = time.monotonic()
+        due = [row for row in batch if self._retry_at.get(row["id"], 0.0) <= now]
+        if not due:
+            return 0
+        started = time.perf_counter()
+        # First attempts go in full chunks; retries one row per upsert, so a poison row only fails itself.
+        groups: Dict[tuple, List[dict]] = defaultdict(list)
+        for row in due:
+            groups[row["user_id"], row["id"] in self._attempts].append(row)
+        errors: Dict[str, str] = {}
+        for (user_id, retry), rows in groups.items():
+            options = {"chunk_size": 1} if retry else {}
+            try:
+                results = await self.log_service.create_bulk_log_entries(
+                    [WorkoutLogCreate(**row) for row in rows], UUID(user_id), **options
+                )
+                errors.update((row["id"], result.error or "not stored") for row, result in zip(rows, results) if result.status == BULK_FAILED)
+            except Exception as e:
+                errors.update((row["id"], str(e)) for row in rows)
+            if retry:
+                self.retried += len(rows)
+
+        due_ids = {row["id"] for row in due}
+        keep: List[dict] = []
+        dead: List[dict] = []
+        for row in batch:
+            row_id = row["id"]
+            if row_id not in due_ids:
+                keep.append(row) # still backing off
+            elif row_id in errors:
+                attempts = self._attempts.get(row_id, 0) + 1
+                if attempts >= self.max_attempts:
+                    self._attempts.pop(row_id, None)
+                    self._retry_at.pop(row_id, None)
+                    dead.append({**row, "_attempts": attempts, "_error": errors[row_id]})
+                else:
+                    self._attempts[row_id] = attempts
+                    self._retry_at[row_id] = now + min(self.flush_interval * 2 ** attempts, self.retry_max_seconds)
+                    keep.append(row)
+            else:
+                self._attempts.pop(row_id, None)
+                self._retry_at.pop(row_id, None)
+        stored = sum(row["id"] not in errors for row in due)
+
+        if errors:
+            self.flush_failures += 1
+            logger.error(f"{len(errors)} of {len(due)} buffered workout sets were not stored; {len(dead)} dead-lettered")
+        if dead:
+            self._write_lines(self.dead_letter_path, dead, mode="a")
+            self.dead_lettered += len(dead)
+        if len(keep) < len(batch):
+            # Replace the flushed segments with one holding only the rows still to retry.
+            remaining = []
+            if keep:
+                retry_segment = self._segment_path()
+                self._write_lines(retry_segment, [{**row, "_attempts": self._attempts.get(row["id"], 0)} for row in keep])
+                remaining.append(retry_segment)
+            for segment in segments:
+                os.remove(segment)
+            self._segments = remaining + self._segments[len(segments):]
+            self._pending = keep + self._pending[len(batch):]
+        self.flushes += 1
+        self.flushed += stored
+        self.last_flush_seconds = time.perf_counter() - started
+        return stored
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def _rotate(self) -> None:
+        """Moves the current WAL into a segment (if it holds anything) and starts a new one."""
+        if self._file is None or self._file.tell() == 0:
+            return
+        self._file.close()
+        segment = self._segment_path()
+        os.replace(self.wal_path, segment)
+        self._segments.append(segment)
+        self._file = open(self.wal_path, "a", encoding="utf-8")
+
+    def _segment_path(self) -> str:
+        self._segment_seq += 1
+        return f"{self.wal_path}.{time.time_ns()}-{self._segment_seq}.segment"
+
+    def _write_lines(self, path: str, rows: List[dict], mode: str = "w") -> None:
+        with open(path, mode, encoding="utf-8") as f:
+            f.writelines(json.dumps(row, separators=(",", ":")) + "\n" for row in rows)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+    def _recover(self) -> None:
+        """Loads rows left by a previous process: rotated segments (oldest first), then the WAL."""
+        leftovers = sorted(glob.glob(f"{glob.escape(self.wal_path)}.*.segment"), key=_segment_order)
+        if os.path.exists(self.wal_path) and os.path.getsize(self.wal_path) > 0:
+            segment = self._segment_path()
+            os.replace(self.wal_path, segment)
+            leftovers.append(segment)
+        for segment in leftovers:
+            with open(segment, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final line from a crash mid-append; that set was never acknowledged.
+                        logger.warning(f"Skipping unreadable line in {segment}")
+                        continue
+                    # Retry segments (and replayed dead letters) carry their failed attempts so far.
+                    attempts = row.pop("_attempts", 0)
+                    row.pop("_error", None)
+                    if attempts and attempts < self.max_attempts:
+                        self._attempts[row["id"]] = attempts
+                    self._pending.append(row)
+            self._segments.append(segment)
+        self.recovered = len(self._pending)
+        if self.recovered:
+            logger.info(f"Replaying {self.recovered} buffered workout sets from {len(leftovers)} WAL segments")
+
+    def stats(self) -> dict:
+        latencies = sorted(self._append_seconds)
+        return {
+            "wal_path": self.wal_path,
+            "pending": len(self._pending),
+            "segments": len(self._segments),
+            "appended": self.appended,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "flush_failures": self.flush_failures,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+            "recovered": self.recovered,
+            "last_flush_ms": self.last_flush_seconds * 1000 if self.last_flush_seconds is not None else None,
+            "append_p50_us": statistics.median(latencies) * 1e6 if latencies else None,
+            "append_p99_us": latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1e6 if latencies else None,
+        }
+
+
+def _segment_order(path: str):
+    # <wal>.<ns>-<seq>.segment
+    stamp = path.rsplit(".", 2)[-2]
+    ns, _, seq = stamp.partition("-")
+    return int(ns), int(seq or 0)
+
+
+def build_log_writer() -> Optional[BufferedLogWriter]:
+    """The app's write-behind log writer, or None when POST /logs writes through (the default)."""
+    return BufferedLogWriter() if settings.LOG_WRITE_BEHIND else None
@@ -0,0 +1,185 @@
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence
+
+from app.core.config import settings
+
+# Upper bounds (seconds) of the per-model latency histogram buckets; the last bucket is open-ended.
+LATENCY_BUCKETS = (0.5, 1.0, 2.0, 4.0, 6.0, 8.0, 10.0, 15.0, 30.0)
+
+
+def _percentile(ordered: List[float], fraction: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class ModelStats:
+    """Rolling latency and outcome window for one model, plus all-time counters and a histogram."""
+
+    def __init__(self, window: int):
+        self.latencies = deque(maxlen=window) # seconds, every finished call (valid or not)
+        self.outcomes = deque(maxlen=window) # True for a valid response
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.calls = 0
+        self.successes = 0
+        self.within_slo = 0
+        self.cancelled = 0
+
+    def record(self, latency: float, ok: bool, slo_seconds: float) -> None:
+        self.latencies.append(latency)
+        self.outcomes.append(ok)
+        self.calls += 1
+        self.successes += ok
+        self.within_slo += ok and latency <= slo_seconds
+        self.histogram[next((i for i, bound in enumerate(LATENCY_BUCKETS) if latency <= bound), len(LATENCY_BUCKETS))] += 1
+
+    def error_rate(self) -> float:
+        return 1 - sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def p95(self) -> Optional[float]:
+        return _percentile(sorted(self.latencies), 0.95)
+
+    def stats(self) -> dict:
+        ordered = sorted(self.latencies)
+        return {
+            "calls": self.calls,
+            "successes": self.successes,
+            "cancelled": self.cancelled,
+            "success_rate": self.successes / self.calls if self.calls else None,
+            "within_slo_rate": self.within_slo / self.calls if self.calls else None,
+            "recent_error_rate": self.error_rate(),
+            "latency_p50_seconds": _percentile(ordered, 0.5),
+            "latency_p95_seconds": _percentile(ordered, 0.95),
+            "latency_max_seconds": ordered[-1] if ordered else None,
+            "latency_histogram": {
+                **{f"le_{bound:g}": count for bound, count in zip(LATENCY_BUCKETS, self.histogram)},
+                "le_inf": self.histogram[-1],
+            },
+        }
+
+
+class ModelRouter:
+    """
+    Picks the model tier for a plan generation and the tier to hedge with.
+
+    `tiers` are ordered from preferred (best, slowest) to fastest. A request goes to the first tier
+    whose rolling p95 latency is within `p95_budget` and whose recent error rate is at most
+    `max_error_rate` (tiers with fewer than `min_samples` calls are assumed healthy); if none
+    qualifies, the fastest tier. The hedge is the next faster tier after the chosen one, issued
+    once the first request has been running for `hedge_delay` seconds, or as soon as it fails.
+
+    A skipped tier gets no traffic, so its window would never recover. Like a half-open circuit
+    breaker, it is still chosen for one probe call every `probe_interval` seconds; a probe that
+    succeeds within `p95_budget` clears its window, so it counts as healthy again.
+    """
+
+    def __init__(
+        self,
+        tiers: Sequence[str],
+        hedge_delay: float = settings.AI_HEDGE_DELAY_SECONDS,
+        p95_budget: float = settings.AI_ROUTER_P95_BUDGET_SECONDS,
+        max_error_rate: float = settings.AI_ROUTER_MAX_ERROR_RATE,
+        window: int = settings.AI_ROUTER_WINDOW,
+        min_samples: int = 20,
+        slo_seconds: float = settings.AI_LATENCY_SLO_SECONDS,
+        probe_interval: float = settings.AI_ROUTER_PROBE_INTERVAL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.tiers = list(dict.fromkeys(tiers)) # dedupe, keep order
+        self.hedge_delay = hedge_delay
+        self.p95_budget = p95_budget
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.slo_seconds = slo_seconds
+        self.window = window
+        self.models: Dict[str, ModelStats] = {model: ModelStats(window) for model in self.tiers}
+        self.routed: Dict[str, int] = {model: 0 for model in self.tiers}
+        self.hedges = 0
+        self.hedges_won = 0
+        self.probe_interval = probe_interval
+        self.clock = clock
+        self._next_probe: Dict[str, float] = {} # unhealthy tier -> when it may be probed
+        self._probing: Dict[str, int] = {} # tier -> probe calls in flight
+        self.probes = 0
+        self.recovered = 0
+
+    def _model(self, model: str) -> ModelStats:
+        if model not in self.models: # e.g. an explicitly requested model outside the tiers
+            self.models[model] = ModelStats(self.window)
+        return self.models[model]
+
+    def healthy(self, model: str) -> bool:
+        stats = self._model(model)
+        if len(stats.outcomes) < self.min_samples:
+            return True
+        p95 = stats.p95()
+        return stats.error_rate() <= self.max_error_rate and (p95 is None or p95 <= self.p95_budget)
+
+    def choose(self) -> str:
+        now = self.clock()
+        model = self.tiers[-1]
+        for tier in self.tiers:
+            if self.healthy(tier):
+                self._next_probe.pop(tier, None)
+                model = tier
+                break
+            due = self._next_probe.setdefault(tier, now + self.probe_interval)
+            if now >= due and tier != self.tiers[-1]:
+                self._next_probe[tier] = now + self.probe_interval
+                self._probing[tier] = self._probing.get(tier, 0) + 1
+                self.probes += 1
+                model = tier
+                break
+        self.routed[model] += 1
+        return model
+
+    def servable_tiers(self) -> List[str]:
+        """
+        Tiers whose cached plans may be served now: the preferred tiers down to the first healthy
+        one, i.e. the tier `choose` routes to and the better ones it would prefer. Unlike
+        `choose`, this counts nothing and starts no probe.
+        """
+        for index, tier in enumerate(self.tiers):
+            if self.healthy(tier):
+                return self.tiers[:index + 1]
+        return list(self.tiers)
+
+    def hedge_for(self, model: str) -> Optional[str]:
+        if self.hedge_delay <= 0 or model not in self.tiers:
+            return None
+        faster = self.tiers[self.tiers.index(model) + 1:]
+        return faster[0] if faster else None
+
+    def record(self, model: str, latency: float, ok: bool) -> None:
+        stats = self._model(model)
+        stats.record(latency, ok, self.slo_seconds)
+        if self._end_probe(model) and ok and latency <= self.p95_budget:
+            # Recovered: start a fresh window rather than waiting for old samples to roll out.
+            stats.latencies.clear()
+            stats.outcomes.clear()
+            self._next_probe.pop(model, None)
+            self.recovered += 1
+
+    def record_cancelled(self, model: str) -> None:
+        self._model(model).cancelled += 1
+        self._end_probe(model) # a hedged-out probe proves nothing; the next one is due after the interval
+
+    def _end_probe(self, model: str) -> bool:
+        if not self._probing.get(model):
+            return False
+        self._probing[model] -= 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "tiers": self.tiers,
+            "hedge_delay_seconds": self.hedge_delay,
+            "slo_seconds": self.slo_seconds,
+            "routed": dict(self.routed),
+            "hedges": self.hedges,
+            "hedges_won": self.hedges_won,
+            "probes": self.probes,
+            "recovered": self.recovered,
+            "models": {model: stats.stats() for model, stats in self.models.items()},
+        }
@@ -10,8 +10,8 @@ from urllib.parse import urlencode
 
 from app.core.config import settings
 from app.utils.encryption import encryption_util
-from app.core.supabase import get_supabase_client # Assuming Supabase client is used for DB interaction
-from supabase import Client, create_client
+from app.core.supabase import get_supabase_client
+from supabase import AsyncClient
 from app.models.music import MusicFeedbackRequest # Import MusicFeedbackRequest
 
 class MusicService:
@@ -23,7 +23,11 @@ class MusicService:
         self.spotify_auth_url = "https://accounts.spotify.com/authorize"
         self.spotify_token_url = "https://accounts.spotify.com/api/token"
         self.spotify_api_base_url = "https://api.spotify.com/v1"
-        self.supabase: Client = get_supabase_client()
+
+    @property
+    def supabase(self) -> AsyncClient:
+        # Resolved per call so the module-level instance always uses the pooled registry client.
+        return get_supabase_client()
 
     async def log_music_feedback(self, user_id: str, feedback: MusicFeedbackRequest):
         """
@@ -127,7 +131,7 @@ class MusicService:
                 }
 
                 # Assuming 'integrations' table exists and RLS is set up
-                response_db = self.supabase.table("integrations").insert(integration_data).execute()
+                response_db = await self.supabase.table("integrations").insert(integration_data).execute()
 
                 if response_db.data:
                     logger.info(f"Spotify tokens stored for user {user_id}")
@@ -157,7 +161,7 @@ class MusicService:
         Returns the new access token if successful, None otherwise.
         """
         # Retrieve encrypted refresh token from DB
-        response_db = self.supabase.table("integrations").select("refresh_token").eq("user_id", user_id).eq("provider", "spotify").single().execute()
+        response_db = await self.supabase.table("integrations").select("refresh_token").eq("user_id", user_id).eq("provider", "spotify").single().execute()
 
         if not response_db.data:
             logger.warning(f"No Spotify integration found for user {user_id}")
@@ -191,7 +195,7 @@ class MusicService:
                     "access_token": encryption_util.encrypt(new_access_token),
                     "expires_at": expires_at.isoformat(),
                 }
-                self.supabase.table("integrations").update(update_data).eq("user_id", user_id).eq("provider", "spotify").execute()
+                await self.supabase.table("integrations").update(update_data).eq("user_id", user_id).eq("provider", "spotify").execute()
 
                 logger.info(f"Spotify access token refreshed for user {user_id}")
                 return new_access_token
@@ -201,7 +205,7 @@ class MusicService:
                     f"Spotify token refresh failed: {e.response.status_code} - {e.response.text}"
                 )
                 # Potentially clear invalid integration if refresh token is revoked/invalid
-                self.supabase.table("integrations").delete().eq("user_id", user_id).eq("provider", "spotify").execute()
+                await self.supabase.table("integrations").delete().eq("user_id", user_id).eq("provider", "spotify").execute()
                 raise HTTPException(
                     status_code=e.response.status_code, detail="Spotify token refresh failed"
                 )
@@ -216,7 +220,7 @@ class MusicService:
         """
         Retrieves and refreshes if necessary, the Spotify access token for a user.
         """
-        response_db = self.supabase.table("integrations").select("*").eq("user_id", user_id).eq("provider", "spotify").single().execute()
+        response_db = await self.supabase.table("integrations").select("*").eq("user_id", user_id).eq("provider", "spotify").single().execute()
 
         if not response_db.data:
             return None
@@ -1,11 +1,12 @@
 # apps/api/app/services/onboarding_service.py
 from fastapi import Depends, HTTPException, status
-from app.core.supabase import get_supabase_client
+from app.core.supabase import get_user_supabase_client
+from app.services.user_service import invalidate_profile_cache
 from app.models.onboarding import OnboardingData
 from datetime import datetime
 
 class OnboardingService:
-    def __init__(self, supabase_client = Depends(get_supabase_client)):
+    def __init__(self, supabase_client = Depends(get_user_supabase_client)):
         self.supabase = supabase_client
 
     async def save_onboarding_data(self, user_id: str, data: OnboardingData):
@@ -15,7 +16,7 @@ class OnboardingService:
         try:
             # 1. Update the user's unit preference
             user_update_data = {'unit_preference': data.unitPreference}
-            self.supabase.from_('users').update(user_update_data).eq('id', user_id).execute()
+            await self.supabase.from_('users').update(user_update_data).eq('id', user_id).execute()
 
             # 2. Handle the primary goal
             primary_goal = data.customGoal if data.goal == "Custom" else data.goal
@@ -29,7 +30,7 @@ class OnboardingService:
                 'injuries_limitations': data.customInjuriesLimitations,
                 'created_at': datetime.now().isoformat()
             }
-            self.supabase.from_('goals').insert(goal_data).execute()
+            await self.supabase.from_('goals').insert(goal_data).execute()
 
             # 4. Handle equipment
             equipment_list = []
@@ -41,10 +42,13 @@ class OnboardingService:
 
             if equipment_list:
                 equipment_entries = [{'user_id': user_id, 'name': name} for name in equipment_list]
-                self.supabase.from_('equipment').insert(equipment_entries).execute()
+                await self.supabase.from_('equipment').insert(equipment_entries).execute()
 
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to save onboarding data: {str(e)}"
-            )
\ No newline at end of file
+            )
+        finally:
+            # Some writes may have landed even if a later one failed.
+            await invalidate_profile_cache(user_id)
\ No newline at end of file
@@ -0,0 +1,233 @@
+"""
+Nightly pre-generation of tomorrow's workout plans.
+
+Run off-peak from a scheduler (cron, Kubernetes CronJob, ...), from apps/api:
+
+    python -m app.services.plan_batch                    # tomorrow, all active users
+    python -m app.services.plan_batch --date 2025-12-14 --concurrency 16
+
+Every user with a confirmed plan in the last PLAN_BATCH_ACTIVE_DAYS gets a draft WorkoutPlans row
+for the target date; drafts left over from days that are over are deleted first. Drafts are generated with a neutral context; in the morning /plans/generate only
+adapts them to the user's actual context (AIOrchestratorService.adapt_workout_plan), so the
+morning peak costs short, cheap completions instead of full generations.
+
+Progress is checkpointed to PLAN_BATCH_CHECKPOINT_PATH (appended, fsynced every 100 users), so a
+crashed or interrupted run picks up where it stopped; users that already have a draft are skipped
+as well.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import List, Optional, Set
+
+from app.core.config import settings
+from app.core.supabase import supabase_registry
+from app.models.workout_plan import PlanGenerationContext
+from app.services.ai_orchestrator import AIOrchestratorService, get_ai_orchestrator
+from app.services.plan_jobs import load_plan_inputs
+from app.services.plan_service import PlanService
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchReport:
+    plan_date: date
+    users: int = 0
+    generated: int = 0
+    skipped: int = 0
+    failed: int = 0
+    tokens: int = 0
+    elapsed_seconds: float = 0.0
+    failures: dict = field(default_factory=dict) # user_id -> error
+
+    @property
+    def plans_per_minute(self) -> float:
+        return self.generated / self.elapsed_seconds * 60 if self.elapsed_seconds else 0.0
+
+    @property
+    def tokens_per_minute(self) -> float:
+        return self.tokens / self.elapsed_seconds * 60 if self.elapsed_seconds else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"drafts for {self.plan_date}: {self.generated} generated, {self.skipped} skipped, {self.failed} failed "
+            f"of {self.users} users in {self.elapsed_seconds:.0f}s "
+            f"({self.plans_per_minute:.1f} plans/min, {self.tokens_per_minute:,.0f} tokens/min)"
+        )
+
+
+class BatchCheckpoint:
+    """
+    User ids already handled for one target date: a JSON header line, then one id per line. Ids
+    are appended and fsynced every `flush_every` ids or `flush_seconds`, so a run writes each id
+    once; a crash loses at most the ids since the last flush, which the next run simply redoes.
+    """
+
+    def __init__(self, path: str, plan_date: date, flush_every: int = 100, flush_seconds: float = 5.0):
+        self.path = path
+        self.plan_date = plan_date
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self.done: Set[str] = set()
+        self._file = None
+        self._unflushed = 0
+        self._flushed_at = time.monotonic()
+        if os.path.exists(path):
+            with open(path) as f:
+                lines = f.read().split("\n")
+            try:
+                header = json.loads(lines[0])
+            except ValueError:
+                header = {}
+            if header.get("plan_date") == plan_date.isoformat(): # a checkpoint for another night is stale
+                # A crash can leave the last line cut short; it matches no id and is kept off the next append.
+                self.done = set(header.get("done", [])) | {line for line in lines[1:-1] if line}
+                if lines[-1]:
+                    with open(path, "a") as f:
+                        f.write("\n")
+                return
+        with open(path, "w") as f:
+            f.write(json.dumps({"plan_date": plan_date.isoformat()}) + "\n")
+
+    def mark_done(self, user_id: str) -> None:
+        self.done.add(user_id)
+        if self._file is None:
+            self._file = open(self.path, "a")
+        self._file.write(f"{user_id}\n")
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every or time.monotonic() - self._flushed_at >= self.flush_seconds:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._file is not None and self._unflushed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._unflushed = 0
+        self._flushed_at = time.monotonic()
+
+    def close(self) -> None:
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class NightlyPlanBatch:
+    def __init__(
+        self,
+        plan_service: PlanService,
+        orchestrator: AIOrchestratorService,
+        plan_date: date,
+        concurrency: int = settings.PLAN_BATCH_CONCURRENCY,
+        checkpoint_path: str = settings.PLAN_BATCH_CHECKPOINT_PATH,
+        active_days: int = settings.PLAN_BATCH_ACTIVE_DAYS,
+    ):
+        self.plan_service = plan_service
+        self.orchestrator = orchestrator
+        self.plan_date = plan_date
+        self.concurrency = concurrency
+        self.checkpoint = BatchCheckpoint(checkpoint_path, plan_date)
+        self.active_days = active_days
+
+    async def run(self, user_ids: Optional[List[str]] = None) -> BatchReport:
+        if user_ids is None:
+            # Drafts dated before today (the day before the target) can no longer be confirmed.
+            expired = await self.plan_service.delete_expired_drafts(self.plan_date - timedelta(days=1))
+            if expired:
+                logger.info(f"Deleted {expired} unconfirmed drafts dated before {self.plan_date - timedelta(days=1)}")
+            user_ids = await self.plan_service.list_active_user_ids(self.plan_date - timedelta(days=self.active_days))
+        report = BatchReport(plan_date=self.plan_date, users=len(user_ids))
+        tokens_before = self._tokens()
+        started = time.monotonic()
+
+        pending: asyncio.Queue = asyncio.Queue()
+        for user_id in user_ids:
+            if user_id in self.checkpoint.done:
+                report.skipped += 1
+            else:
+                pending.put_nowait(user_id)
+
+        async def worker() -> None:
+            while not pending.empty():
+                user_id = pending.get_nowait()
+                try:
+                    if await self._generate_draft(user_id):
+                        report.generated += 1
+                    else:
+                        report.skipped += 1
+                    self.checkpoint.mark_done(user_id)
+                except Exception as e:
+                    # Not checkpointed: the next run retries this user.
+                    logger.error(f"Draft generation failed for user {user_id}: {e}")
+                    report.failed += 1
+                    report.failures[user_id] = str(e)
+                handled = report.generated + report.skipped + report.failed
+                if handled % 100 == 0:
+                    report.elapsed_seconds = time.monotonic() - started
+                    report.tokens = self._tokens() - tokens_before
+                    logger.info(f"{handled}/{report.users} users: {report.summary()}")
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(max(1, self.concurrency))))
+        finally:
+            self.checkpoint.close()
+
+        report.elapsed_seconds = time.monotonic() - started
+        report.tokens = self._tokens() - tokens_before
+        logger.info(report.summary())
+        return report
+
+    async def _generate_draft(self, user_id: str) -> bool:
+        """Generates and stores one draft; False if the user already has one for the date."""
+        if await self.plan_service.get_draft_plan(user_id, self.plan_date) is not None:
+            return False
+        user_profile, user_goals, workout_history = await load_plan_inputs(user_id)
+        plan = await self.orchestrator.generate_workout_plan(
+            user_id=user_id,
+            user_profile=user_profile,
+            user_goals=user_goals,
+            workout_history=workout_history,
+            context=PlanGenerationContext(), # the daily context is only known in the morning
+        )
+        plan.user_id = user_id
+        plan.plan_date = self.plan_date
+        if not await self.plan_service.store_workout_plan(plan, draft=True):
+            raise RuntimeError("Failed to store draft workout plan.")
+        return True
+
+    def _tokens(self) -> int:
+        return self.orchestrator.prompt_tokens + self.orchestrator.completion_tokens
+
+
+async def main(args) -> None:
+    supabase_registry.startup()
+    orchestrator = get_ai_orchestrator()
+    try:
+        batch = NightlyPlanBatch(
+            # No user session at night: the batch writes drafts for many users with the service role.
+            plan_service=PlanService(supabase_registry.admin()),
+            orchestrator=orchestrator,
+            plan_date=date.fromisoformat(args.date) if args.date else date.today() + timedelta(days=1),
+            concurrency=args.concurrency,
+            checkpoint_path=args.checkpoint,
+        )
+        report = await batch.run()
+        print(report.summary())
+    finally:
+        await orchestrator.aclose()
+        await supabase_registry.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--date", help="target plan date (YYYY-MM-DD), default tomorrow")
+    parser.add_argument("--concurrency", type=int, default=settings.PLAN_BATCH_CONCURRENCY)
+    parser.add_argument("--checkpoint", default=settings.PLAN_BATCH_CHECKPOINT_PATH)
+    asyncio.run(main(parser.parse_args()))
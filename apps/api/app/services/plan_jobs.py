@@ -0,0 +1,577 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import statistics
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.cache import TTLLRUCache
+from app.core.config import settings
+from app.core.metrics import metrics_registry
+from app.models.workout_plan import PlanGenerationContext, WorkoutPlanModel
+from app.services.ai_orchestrator import AIOrchestratorService, AIServiceTimeout, get_ai_orchestrator
+from app.services.log_service import LogService
+from app.services.plan_service import PlanService
+from app.services.prompt_builder import prompt_builder
+from app.services.rule_engine import rule_engine
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+TERMINAL_STATES = (SUCCEEDED, FAILED)
+INTERRUPTED_ERROR = {"status": 503, "detail": "Plan generation was interrupted. Please try again."}
+
+
+class JobQueueFull(RuntimeError):
+    """The plan job queue is at PLAN_JOB_QUEUE_MAX_DEPTH; the caller should retry later."""
+
+
+# LLM plans still running after the user was served the rule-based plan (see run_plan_generation).
+_outrun_plans: set = set()
+
+
+def _finish_in_background(task: asyncio.Task) -> None:
+    _outrun_plans.add(task)
+
+    def done(task: asyncio.Task) -> None:
+        _outrun_plans.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.info(f"LLM plan finished after the rule-based fallback was served: {task.exception()}")
+    task.add_done_callback(done)
+
+
+async def load_plan_inputs(user_id: str) -> Tuple[Dict[str, Any], Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Profile, goals and workout history that a plan for `user_id` is generated from. Only logs stored
+    since the user's memoized history summary was last extended are fetched (see
+    PromptBuilder.history_watermark).
+    """
+    # Dummy profile data for now. In reality, this would come from the user's stored profile.
+    user_profile = {"fitness_level": "intermediate"}
+    user_goals = {"primary_goal": "build_muscle"}
+
+    since = datetime.now(timezone.utc) - timedelta(days=settings.PROMPT_HISTORY_WINDOW_DAYS)
+    try:
+        workout_history = await LogService().list_logs_since(user_id, since, prompt_builder.history_watermark(user_id))
+    except Exception as e:
+        # A plan without the latest history beats no plan.
+        logger.warning(f"Could not load workout history for user {user_id}: {e}")
+        workout_history = []
+    return user_profile, user_goals, workout_history
+
+
+async def run_plan_generation(
+    user_id: str,
+    context: PlanGenerationContext,
+    ai_orchestrator_service: AIOrchestratorService,
+    plan_service: PlanService,
+) -> WorkoutPlanModel:
+    """
+    Generates today's plan for `user_id` and stores it: the work behind POST /plans/generate in
+    either mode. If the nightly batch left a draft for today, only the cheap adaptation pass runs
+    and the draft is confirmed in place (unadapted if that pass fails). If the LLM misses its
+    deadline or fails without a draft, the user gets the rule-based plan (app.services.rule_engine)
+    instead of an error. So do users of a slow provider: once the LLM has used
+    PLAN_RULE_FALLBACK_AFTER_SECONDS of its deadline the rule-based plan is served, and the LLM
+    call finishes in the background, where its plan still lands in the plan cache.
+    """
+    draft = await plan_service.get_draft_plan(user_id, date.today())
+    if draft is not None:
+        return await _confirm_draft(user_id, draft, context, ai_orchestrator_service, plan_service)
+
+    user_profile, user_goals, workout_history = await load_plan_inputs(user_id)
+    rule_plan = _rule_plan(user_id, user_profile, user_goals, workout_history, context)
+    if settings.PLAN_RULE_DRAFTS:
+        ai_plan = asyncio.ensure_future(ai_orchestrator_service.adjust_draft_plan(
+            user_id, rule_plan, user_profile, user_goals, workout_history, context
+        ))
+    else:
+        ai_plan = asyncio.ensure_future(ai_orchestrator_service.generate_workout_plan(
+            user_id=user_id,
+            user_profile=user_profile,
+            user_goals=user_goals,
+            workout_history=workout_history,
+            context=context
+        ))
+    budget = _fallback_budget()
+    try:
+        # Shielded: a slow LLM call is left to finish (and fill the plan cache) rather than wasted.
+        workout_plan = await asyncio.wait_for(asyncio.shield(ai_plan), timeout=budget or None)
+    except asyncio.CancelledError:
+        ai_plan.cancel()
+        raise
+    except (asyncio.TimeoutError, RuntimeError, ValueError) as e:
+        if isinstance(e, asyncio.TimeoutError):
+            _finish_in_background(ai_plan)
+        workout_plan = _fall_back(user_id, rule_plan, e, budget)
+    return await _store_plan(user_id, workout_plan, plan_service)
+
+
+async def stream_plan_generation(
+    user_id: str,
+    context: PlanGenerationContext,
+    ai_orchestrator_service: AIOrchestratorService,
+    plan_service: PlanService,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    The streaming counterpart of run_plan_generation, behind POST /plans/generate/stream: the same
+    inputs (so the same prompt and plan cache key), draft handling and rule-based fallback. Yields
+    ("exercise" | "day", part) as the LLM's plan validates, then ("plan", stored plan). A draft, a
+    patched rule-based draft (PLAN_RULE_DRAFTS) or a fallback arrives as the "plan" event alone;
+    after a fallback that plan replaces any parts already sent. The budget applies to the first
+    part: a stream that has started is given the rest of its deadline.
+    """
+    draft = await plan_service.get_draft_plan(user_id, date.today())
+    if draft is not None:
+        yield "plan", await _confirm_draft(user_id, draft, context, ai_orchestrator_service, plan_service)
+        return
+    if settings.PLAN_RULE_DRAFTS:
+        # The LLM only returns a patch, so there are no parts to stream.
+        yield "plan", await run_plan_generation(user_id, context, ai_orchestrator_service, plan_service)
+        return
+
+    user_profile, user_goals, workout_history = await load_plan_inputs(user_id)
+    rule_plan = _rule_plan(user_id, user_profile, user_goals, workout_history, context)
+    budget = _fallback_budget()
+    parts = ai_orchestrator_service.stream_workout_plan(
+        user_id=user_id,
+        user_profile=user_profile,
+        user_goals=user_goals,
+        workout_history=workout_history,
+        context=context
+    )
+    workout_plan = None
+    try:
+        started = False
+        while workout_plan is None:
+            next_part = parts.__anext__()
+            try:
+                event, data = await (asyncio.wait_for(next_part, budget) if budget and not started else next_part)
+            except StopAsyncIteration:
+                raise RuntimeError("The plan stream ended without a plan.")
+            started = True
+            if event == "plan":
+                workout_plan = data
+            else:
+                yield event, data
+    except (asyncio.TimeoutError, RuntimeError, ValueError) as e:
+        workout_plan = _fall_back(user_id, rule_plan, e, budget)
+    finally:
+        await parts.aclose()
+    yield "plan", await _store_plan(user_id, workout_plan, plan_service)
+
+
+def _rule_plan(user_id, user_profile, user_goals, workout_history, context) -> WorkoutPlanModel:
+    # Microseconds to build, so always ready before the LLM is asked anything.
+    return rule_engine.generate(
+        user_id, user_profile, user_goals, prompt_builder.summarize_history(user_id, workout_history), context
+    )
+
+
+def _fallback_budget() -> float:
+    """Seconds the LLM gets before the rule-based plan is served; 0 for its whole deadline."""
+    return settings.PLAN_RULE_FALLBACK_AFTER_SECONDS if settings.PLAN_RULE_FALLBACK else 0
+
+
+def _fall_back(user_id: str, rule_plan: WorkoutPlanModel, error: Exception, budget: float) -> WorkoutPlanModel:
+    """
+    The rule-based plan in place of an LLM plan that was slower than the budget, hit
+    AIServiceTimeout, failed after the provider's retries, or could not be parsed or repaired
+    (including one cut off at the token limit). Re-raises `error` if PLAN_RULE_FALLBACK is off.
+    """
+    if not settings.PLAN_RULE_FALLBACK:
+        raise error
+    reason = f"no LLM plan within {budget:g}s" if isinstance(error, asyncio.TimeoutError) else error
+    logger.warning(f"Serving the rule-based plan to user {user_id}: {reason}")
+    rule_engine.fallbacks += 1
+    return rule_plan
+
+
+async def _confirm_draft(
+    user_id: str,
+    draft: WorkoutPlanModel,
+    context: PlanGenerationContext,
+    ai_orchestrator_service: AIOrchestratorService,
+    plan_service: PlanService,
+) -> WorkoutPlanModel:
+    try:
+        workout_plan = await ai_orchestrator_service.adapt_workout_plan(user_id, draft, context)
+    except RuntimeError as e: # AIServiceTimeout, or the provider failing after its retries
+        # The draft is a complete plan already; only today's adjustments are lost.
+        logger.warning(f"Serving the unadapted draft plan to user {user_id}: {e}")
+        workout_plan = draft.model_copy(deep=True)
+    workout_plan.user_id = user_id
+    workout_plan.plan_date = date.today()
+    workout_plan.plan_id = draft.plan_id
+    if not await plan_service.confirm_draft_plan(draft.plan_id, workout_plan):
+        raise RuntimeError("Failed to store generated workout plan.")
+    return workout_plan
+
+
+async def _store_plan(user_id: str, workout_plan: WorkoutPlanModel, plan_service: PlanService) -> WorkoutPlanModel:
+    # Ensure user_id and plan_date are set in the generated plan
+    workout_plan.user_id = user_id
+    workout_plan.plan_date = date.today()
+
+    stored_plan = await plan_service.store_workout_plan(workout_plan)
+    if not stored_plan:
+        raise RuntimeError("Failed to store generated workout plan.")
+    return workout_plan
+
+
+class PlanJobBroker(ABC):
+    """
+    Queue and job-record store behind a PlanJobQueue. Records are JSON-compatible dicts, so a
+    broker shared between worker processes can hold them.
+    """
+
+    @abstractmethod
+    async def enqueue(self, job: dict, max_depth: int) -> None:
+        """Adds a queued job, raising JobQueueFull if `max_depth` jobs are already waiting."""
+
+    @abstractmethod
+    async def dequeue(self) -> dict:
+        """Waits for the oldest queued job and claims it."""
+
+    @abstractmethod
+    async def save(self, job: dict) -> None:
+        ...
+
+    @abstractmethod
+    async def load(self, job_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def depth(self) -> int:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class InProcessJobBroker(PlanJobBroker):
+    """Default broker: an asyncio queue plus a TTL-bounded record store, local to this process."""
+
+    def __init__(self, result_ttl: float = settings.PLAN_JOB_RESULT_TTL_SECONDS, max_records: int = 10_000):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._records = TTLLRUCache(maxsize=max_records, ttl=result_ttl)
+
+    async def enqueue(self, job: dict, max_depth: int) -> None:
+        if self._queue.qsize() >= max_depth:
+            raise JobQueueFull(f"{self._queue.qsize()} plan jobs already queued")
+        self._records.set(job["id"], job)
+        self._queue.put_nowait(job["id"])
+
+    async def dequeue(self) -> dict:
+        while True:
+            job = self._records.get(await self._queue.get())
+            if job is not None: # None: the record expired while queued
+                return dict(job)
+
+    async def save(self, job: dict) -> None:
+        self._records.set(job["id"], dict(job))
+
+    async def load(self, job_id: str) -> Optional[dict]:
+        job = self._records.get(job_id)
+        return dict(job) if job is not None else None
+
+    async def depth(self) -> int:
+        return self._queue.qsize()
+
+
+class SQLiteJobBroker(PlanJobBroker):
+    """
+    Local broker for several API worker processes on one host: jobs live in a SQLite file, any
+    worker can claim them and any worker can answer GET /plans/jobs/{id}. Blocking SQLite calls
+    run in a thread; idle workers poll for new jobs every `poll_interval` seconds.
+
+    A claim is a lease: a job still running `lease` seconds after it was claimed belongs to a
+    worker that died, and the next claim requeues it, or fails it once it has been claimed
+    `max_attempts` times. The lease must outlast a healthy job (AI_REQUEST_DEADLINE_SECONDS plus
+    the store), or slow jobs run twice.
+    """
+
+    def __init__(self, path: str = settings.PLAN_JOB_SQLITE_PATH, result_ttl: float = settings.PLAN_JOB_RESULT_TTL_SECONDS,
+                 poll_interval: float = 0.2, lease: float = settings.PLAN_JOB_LEASE_SECONDS,
+                 max_attempts: int = settings.PLAN_JOB_MAX_ATTEMPTS):
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("pragma journal_mode=wal")
+        self._db.execute(
+            "create table if not exists plan_jobs ("
+            " id text primary key, status text not null, record text not null, updated_at real not null)"
+        )
+        self._db.execute("create index if not exists plan_jobs_status_idx on plan_jobs (status, updated_at)")
+
+    async def _run(self, fn, *args):
+        def locked():
+            with self._lock:
+                return fn(*args)
+        return await asyncio.to_thread(locked)
+
+    def _enqueue(self, job: dict, max_depth: int) -> None:
+        self._db.execute("begin immediate")
+        try:
+            (queued,) = self._db.execute("select count(*) from plan_jobs where status = ?", (QUEUED,)).fetchone()
+            if queued >= max_depth:
+                raise JobQueueFull(f"{queued} plan jobs already queued")
+            self._db.execute("insert into plan_jobs values (?, ?, ?, ?)", (job["id"], QUEUED, json.dumps(job), time.time()))
+            self._db.execute("commit")
+        except BaseException:
+            self._db.execute("rollback")
+            raise
+
+    def _claim(self) -> Optional[dict]:
+        now = time.time()
+        self._reclaim_expired(now)
+        row = self._db.execute(
+            "update plan_jobs set status = ?, updated_at = ?,"
+            " record = json_set(record, '$.attempts', coalesce(json_extract(record, '$.attempts'), 0) + 1)"
+            " where id = (select id from plan_jobs where status = ? order by updated_at limit 1)"
+            " returning record",
+            (RUNNING, now, QUEUED),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _reclaim_expired(self, now: float) -> None:
+        expired = now - self.lease
+        self._db.execute(
+            "update plan_jobs set status = ?, updated_at = ?,"
+            " record = json_set(record, '$.status', ?, '$.started_at', null)"
+            " where status = ? and updated_at < ? and coalesce(json_extract(record, '$.attempts'), 1) < ?",
+            (QUEUED, now, QUEUED, RUNNING, expired, self.max_attempts),
+        )
+        self._db.execute(
+            "update plan_jobs set status = ?, updated_at = ?,"
+            " record = json_set(record, '$.status', ?, '$.finished_at', ?, '$.error', json(?))"
+            " where status = ? and updated_at < ?",
+            (FAILED, now, FAILED, now, json.dumps(INTERRUPTED_ERROR), RUNNING, expired),
+        )
+
+    def _save(self, job: dict) -> None:
+        now = time.time()
+        self._db.execute(
+            "update plan_jobs set status = ?, record = ?, updated_at = ? where id = ?",
+            (job["status"], json.dumps(job), now, job["id"]),
+        )
+        if job["status"] in TERMINAL_STATES:
+            self._db.execute(
+                "delete from plan_jobs where status in (?, ?) and updated_at < ?",
+                (SUCCEEDED, FAILED, now - self.result_ttl),
+            )
+
+    def _load(self, job_id: str) -> Optional[dict]:
+        row = self._db.execute("select record from plan_jobs where id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def enqueue(self, job: dict, max_depth: int) -> None:
+        await self._run(self._enqueue, job, max_depth)
+
+    async def dequeue(self) -> dict:
+        while True:
+            job = await self._run(self._claim)
+            if job is not None:
+                return job
+            await asyncio.sleep(self.poll_interval)
+
+    async def save(self, job: dict) -> None:
+        await self._run(self._save, job)
+
+    async def load(self, job_id: str) -> Optional[dict]:
+        return await self._run(self._load, job_id)
+
+    async def depth(self) -> int:
+        (queued,) = await self._run(lambda: self._db.execute("select count(*) from plan_jobs where status = ?", (QUEUED,)).fetchone())
+        return queued
+
+    def close(self) -> None:
+        self._db.close()
+
+
+PlanJobHandler = Callable[[str, PlanGenerationContext], Awaitable[WorkoutPlanModel]]
+
+
+async def _default_handler(user_id: str, context: PlanGenerationContext) -> WorkoutPlanModel:
+    return await run_plan_generation(user_id, context, get_ai_orchestrator(), PlanService())
+
+
+class PlanJobQueue:
+    """
+    Async mode for plan generation: `submit` records a job and returns at once, a fixed pool of
+    worker tasks drains the broker through `handler` (AIOrchestratorService + PlanService), and
+    clients poll or long-poll `wait` for the result.
+
+    Backpressure: `submit` raises JobQueueFull once `max_depth` jobs are waiting, rather than
+    accepting work that could not start within the AI latency budget.
+    """
+
+    def __init__(
+        self,
+        broker: Optional[PlanJobBroker] = None,
+        workers: int = settings.PLAN_JOB_WORKERS,
+        max_depth: int = settings.PLAN_JOB_QUEUE_MAX_DEPTH,
+        handler: PlanJobHandler = _default_handler,
+        poll_interval: float = 1.0,
+    ):
+        self.broker = broker or InProcessJobBroker()
+        self.workers = workers
+        self.max_depth = max_depth
+        self.handler = handler
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._finished: Dict[str, list] = {} # job id -> [Event set when a local worker finishes it, long-pollers]
+
+        self.submitted = 0
+        self.rejected = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.busy = 0
+        self._depth = 0
+        self._wait_times = deque(maxlen=1000) # seconds from submit to a worker picking the job up
+
+    async def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker(), name=f"plan-job-worker-{i}") for i in range(self.workers)]
+            metrics_registry.register("plan_jobs", self.stats)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._tasks:
+            metrics_registry.unregister("plan_jobs")
+        self._tasks = []
+        self.broker.close()
+
+    async def submit(self, user_id: str, context: PlanGenerationContext) -> dict:
+        job = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "status": QUEUED,
+            "context": context.model_dump(mode="json"),
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        try:
+            await self.broker.enqueue(job, self.max_depth)
+        except JobQueueFull:
+            self.rejected += 1
+            raise
+        self.submitted += 1
+        self._depth = await self.broker.depth()
+        return job
+
+    async def get(self, job_id: str, user_id: str) -> Optional[dict]:
+        """The job record, or None if it does not exist (or has expired, or belongs to another user)."""
+        job = await self.broker.load(job_id)
+        if job is None or job["user_id"] != user_id:
+            return None
+        return job
+
+    async def wait(self, job_id: str, user_id: str, timeout: float) -> Optional[dict]:
+        """Long-poll: returns as soon as the job finishes, or its current record after `timeout` seconds."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        # Shared by every long-poller of the job; the last one to leave removes it.
+        entry = self._finished.setdefault(job_id, [asyncio.Event(), 0])
+        entry[1] += 1
+        try:
+            while True:
+                job = await self.get(job_id, user_id)
+                remaining = deadline - loop.time()
+                if job is None or job["status"] in TERMINAL_STATES or remaining <= 0:
+                    return job
+                try:
+                    # Local completions wake us at once; jobs run by another process are seen on the next poll.
+                    await asyncio.wait_for(entry[0].wait(), timeout=min(remaining, self.poll_interval))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._finished.pop(job_id, None)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self.broker.dequeue()
+            self._depth = await self.broker.depth()
+            self.busy += 1
+            try:
+                await self._run(job)
+            finally:
+                self.busy -= 1
+                waiting = self._finished.get(job["id"])
+                if waiting is not None:
+                    waiting[0].set()
+
+    async def _run(self, job: dict) -> None:
+        job["status"] = RUNNING
+        job["started_at"] = time.time()
+        self._wait_times.append(job["started_at"] - job["created_at"])
+        await self.broker.save(job)
+        try:
+            plan = await self.handler(job["user_id"], PlanGenerationContext(**job["context"]))
+            job["status"] = SUCCEEDED
+            job["result"] = plan.model_dump(mode="json")
+            self.succeeded += 1
+        except asyncio.CancelledError:
+            job["status"] = FAILED
+            job["error"] = INTERRUPTED_ERROR
+            self.failed += 1
+            raise
+        except Exception as e:
+            logger.error(f"Plan job {job['id']} failed: {e}")
+            job["status"] = FAILED
+            job["error"] = _job_error(e)
+            self.failed += 1
+        finally:
+            job["finished_at"] = time.time()
+            await self.broker.save(job)
+
+    def stats(self) -> dict:
+        waits = sorted(self._wait_times)
+        return {
+            "broker": type(self.broker).__name__,
+            "workers": self.workers,
+            "busy_workers": self.busy,
+            "queue_depth": self._depth,
+            "max_depth": self.max_depth,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "wait_seconds_p50": round(statistics.median(waits), 4) if waits else None,
+            "wait_seconds_p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 4) if waits else None,
+            "wait_seconds_max": round(waits[-1], 4) if waits else None,
+        }
+
+
+def _job_error(e: Exception) -> dict:
+    # Same statuses the synchronous /plans/generate returns for these failures.
+    if isinstance(e, AIServiceTimeout):
+        return {"status": 504, "detail": "Workout plan generation timed out. Please try again."}
+    if isinstance(e, ValueError):
+        return {"status": 422, "detail": str(e)}
+    return {"status": 500, "detail": "Failed to generate or store workout plan"}
+
+
+def build_plan_job_queue() -> PlanJobQueue:
+    """
+    The queue for one application instance. Its workers are tasks on the app's event loop, so the
+    lifespan owns it (`app.state.plan_job_queue`) rather than a module-level singleton.
+    """
+    broker = SQLiteJobBroker() if settings.PLAN_JOB_BROKER == "sqlite" else InProcessJobBroker()
+    return PlanJobQueue(broker=broker)
@@ -0,0 +1,203 @@
+import json
+import re
+from datetime import date
+from typing import Any, Dict, List, Tuple
+
+from pydantic import ValidationError
+
+from app.models.workout_plan import Exercise
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+_FENCE = re.compile(r"^```(?:json)?\s*(.*?)\s*(?:```)?$", re.S)
+
+# Alternative keys models use for the same field
+EXERCISE_ALIASES = {"exercise": "name", "exercise_name": "name", "rest": "rest_interval", "load": "weight"}
+DAY_ALIASES = {"name": "day_name", "day": "day_name"}
+
+
+class TruncatedResponse(ValueError):
+    """The LLM stopped before the document was complete (token limit); what arrived is a partial plan."""
+
+
+def loads_lenient(raw: str, allow_truncated: bool = False) -> Any:
+    """
+    json.loads that also accepts the usual near-misses from an LLM: markdown fences, prose around
+    the object and trailing commas. Output that never closes its root object was cut off, and
+    closing it would pass a shorter plan off as complete, so it raises TruncatedResponse unless
+    `allow_truncated` (then it is closed at the last complete element). Raises ValueError if
+    nothing parseable is left.
+    """
+    try:
+        return json.loads(raw)
+    except (json.JSONDecodeError, TypeError):
+        pass
+    text = (raw or "").strip()
+    fenced = _FENCE.match(text)
+    if fenced:
+        text = fenced.group(1)
+    start = text.find("{")
+    if start < 0:
+        raise ValueError("AI response was not valid JSON.")
+    complete, candidates = _closings(text[start:])
+    if not complete and not allow_truncated:
+        raise TruncatedResponse("AI response was cut off before the plan was complete.")
+    for candidate in candidates:
+        try:
+            return json.loads(_TRAILING_COMMA.sub(r"\1", candidate))
+        except json.JSONDecodeError:
+            continue
+    raise ValueError("AI response was not valid JSON.")
+
+
+def _closings(text: str, max_cuts: int = 3) -> Tuple[bool, List[str]]:
+    """
+    (True, [the document]) if its root object closes, else (False, the document closed at its
+    end and at its last few commas).
+    """
+    closers: List[str] = []
+    cuts: List[Tuple[int, str]] = [] # comma offset -> closers needed if cut there
+    in_string = escaped = False
+    for pos, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+        elif char in "}]":
+            if closers:
+                closers.pop()
+            if not closers:
+                return True, [text[:pos + 1]] # complete root object; ignore anything after it
+        elif char == ",":
+            cuts.append((pos, "".join(reversed(closers))))
+    end = text + ('"' if in_string else "") + "".join(reversed(closers))
+    return False, [end] + [text[:pos] + closing for pos, closing in reversed(cuts[-max_cuts:])]
+
+
+def _first_number(value: Any):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        match = _NUMBER.search(value)
+        return float(match.group()) if match else None
+    return None
+
+
+def _text(value: Any) -> Any:
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return f"{value:g}"
+    if isinstance(value, list) and value and all(isinstance(item, (int, float, str)) for item in value):
+        return "-".join(_text(item) for item in value) # [8, 12] reps -> "8-12"
+    return value
+
+
+def _rename(item: dict, aliases: Dict[str, str]) -> None:
+    for alias, key in aliases.items():
+        if alias in item and key not in item:
+            item[key] = item.pop(alias)
+
+
+def coerce_exercise(exercise: dict, fixes: List[str], path: str) -> None:
+    """Fixes field names and scalar types in place, recording each fix under `path`."""
+    _rename(exercise, EXERCISE_ALIASES)
+    for key in ("sets", "rpe"):
+        value = exercise.get(key)
+        if value is None or (isinstance(value, int) and not isinstance(value, bool)):
+            continue
+        number = _first_number(value)
+        if number is not None:
+            exercise[key] = int(round(number))
+            fixes.append(f"{path}.{key}")
+    for key in ("reps", "weight", "tempo", "rest_interval", "notes", "name"):
+        value = exercise.get(key)
+        if value is not None and not isinstance(value, str):
+            exercise[key] = _text(value)
+            fixes.append(f"{path}.{key}")
+
+
+def coerce_plan(data: dict, user_id: str) -> List[str]:
+    """
+    Repairs common schema violations of a plan dict in place against WorkoutDay / Exercise:
+    aliased keys, numbers as strings (and vice versa), a single day or exercise not wrapped in a
+    list, missing day names and missing top-level user_id / plan_date. Returns the fixed paths.
+    """
+    fixes: List[str] = []
+    if "workout_days" not in data and "exercises" in data:
+        data["workout_days"] = [{"day_name": "Today", "exercises": data.pop("exercises")}]
+        fixes.append("workout_days")
+    if isinstance(data.get("workout_days"), dict):
+        data["workout_days"] = [data["workout_days"]]
+        fixes.append("workout_days")
+    if not data.get("user_id"):
+        data["user_id"] = user_id
+        fixes.append("user_id")
+    if not data.get("plan_date"):
+        data["plan_date"] = date.today().isoformat()
+        fixes.append("plan_date")
+
+    for day_index, day in enumerate(data.get("workout_days") or []):
+        if not isinstance(day, dict):
+            continue
+        path = f"workout_days[{day_index}]"
+        _rename(day, DAY_ALIASES)
+        if not day.get("day_name"):
+            day["day_name"] = f"Day {day_index + 1}"
+            fixes.append(f"{path}.day_name")
+        if isinstance(day.get("exercises"), dict):
+            day["exercises"] = [day["exercises"]]
+            fixes.append(f"{path}.exercises")
+        for index, exercise in enumerate(day.get("exercises") or []):
+            if isinstance(exercise, dict):
+                coerce_exercise(exercise, fixes, f"{path}.exercises[{index}]")
+    return fixes
+
+
+def invalid_exercises(data: dict) -> List[Tuple[int, int, list]]:
+    """(day index, exercise index, validation errors) for every exercise that still fails validation."""
+    invalid = []
+    for day_index, day in enumerate(data.get("workout_days") or []):
+        if not isinstance(day, dict) or not isinstance(day.get("exercises"), list):
+            continue
+        for index, exercise in enumerate(day["exercises"]):
+            try:
+                Exercise.model_validate(exercise)
+            except ValidationError as e:
+                invalid.append((day_index, index, e.errors(include_url=False, include_context=False)))
+    return invalid
+
+
+class PlanRepairStats:
+    """How often LLM plans needed repairing and what that saved over regenerating them."""
+
+    def __init__(self):
+        self.responses = 0
+        self.repaired_locally = 0
+        self.repaired_by_reask = 0
+        self.failed = 0
+        self.truncated = 0 # cut off at the token limit; rejected, never repaired
+        self.tokens_saved = 0 # estimated: full regeneration tokens minus re-ask tokens
+
+    def stats(self) -> dict:
+        repaired = self.repaired_locally + self.repaired_by_reask
+        needed = repaired + self.failed
+        return {
+            "responses": self.responses,
+            "needed_repair": needed,
+            "repaired_locally": self.repaired_locally,
+            "repaired_by_reask": self.repaired_by_reask,
+            "failed": self.failed,
+            "truncated": self.truncated,
+            "repair_rate": repaired / needed if needed else None,
+            "tokens_saved": self.tokens_saved,
+        }
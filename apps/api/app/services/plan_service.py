@@ -1,21 +1,26 @@
-import os
-from supabase import create_client, Client
-from typing import Optional
+from supabase import AsyncClient
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, List, Optional
+import json
 import logging
 
+from app.core.cache import CacheBackend
+from app.core.supabase import supabase_registry
 from app.models.workout_plan import WorkoutPlanModel
 
 logger = logging.getLogger(__name__)
 
+# WorkoutPlans.status: drafts are precomputed by the nightly batch (app.services.plan_batch) and
+# become confirmed when /plans/generate adapts them to the user's context.
+PLAN_STATUS_DRAFT = "draft"
+PLAN_STATUS_CONFIRMED = "confirmed"
+
 class PlanService:
-    def __init__(self):
-        supabase_url = os.environ.get("SUPABASE_URL")
-        supabase_key = os.environ.get("SUPABASE_KEY")
-        if not supabase_url or not supabase_key:
-            raise ValueError("Supabase URL and Key must be set as environment variables.")
-        self.supabase: Client = create_client(supabase_url, supabase_key)
-
-    async def store_workout_plan(self, workout_plan: WorkoutPlanModel) -> Optional[WorkoutPlanModel]:
+    def __init__(self, supabase: Optional[AsyncClient] = None):
+        # Reuse the process-wide pooled client instead of building a new one per request.
+        self.supabase: AsyncClient = supabase or supabase_registry.anon()
+
+    async def store_workout_plan(self, workout_plan: WorkoutPlanModel, draft: bool = False) -> Optional[WorkoutPlanModel]:
         try:
             # Convert plan_date to string for Supabase insert
             plan_data = workout_plan.model_dump_json() # Use model_dump_json for Pydantic v2
@@ -23,12 +28,17 @@ class PlanService:
             # Supabase doesn't automatically handle UUID for PK, so let it generate
             # For now, plan_id from model is ignored, Supabase will generate.
             # In a real scenario, you might want to generate UUID client-side or handle response.
-            response = self.supabase.from_("WorkoutPlans").insert({
+            row = {
                 "user_id": str(workout_plan.user_id),
                 "plan_date": str(workout_plan.plan_date),
                 "plan_details": plan_data,
                 "ai_explanation": workout_plan.ai_explanation
-            }).execute()
+            }
+            if workout_plan.prompt_hash:
+                row["prompt_hash"] = workout_plan.prompt_hash
+            if draft:
+                row["status"] = PLAN_STATUS_DRAFT # the column defaults to confirmed
+            response = await self.supabase.from_("WorkoutPlans").insert(row).execute()
 
             # Assuming response.data contains the inserted row(s)
             if response.data:
@@ -42,3 +52,122 @@ class PlanService:
         except Exception as e:
             logger.error(f"Error storing workout plan in Supabase: {e}")
             raise
+
+    async def get_draft_plan(self, user_id: str, plan_date: date) -> Optional[WorkoutPlanModel]:
+        """The newest unconfirmed draft for `user_id` on `plan_date`, with `plan_id` set to its row id."""
+        response = await (
+            self.supabase.from_("WorkoutPlans")
+            .select("id, plan_details")
+            .eq("user_id", str(user_id))
+            .eq("plan_date", str(plan_date))
+            .eq("status", PLAN_STATUS_DRAFT)
+            .order("created_at", desc=True)
+            .limit(1)
+            .execute()
+        )
+        if not response.data:
+            return None
+        row = response.data[0]
+        plan_details = row["plan_details"]
+        plan_data = json.loads(plan_details) if isinstance(plan_details, str) else plan_details
+        return WorkoutPlanModel(**{**plan_data, "plan_id": str(row["id"])})
+
+    async def confirm_draft_plan(self, plan_id: str, workout_plan: WorkoutPlanModel) -> Optional[WorkoutPlanModel]:
+        """Replaces a draft's plan with its adapted version and marks it confirmed."""
+        row = {
+            "plan_details": workout_plan.model_dump_json(),
+            "ai_explanation": workout_plan.ai_explanation,
+            "status": PLAN_STATUS_CONFIRMED,
+        }
+        if workout_plan.prompt_hash:
+            row["prompt_hash"] = workout_plan.prompt_hash
+        response = await (
+            self.supabase.from_("WorkoutPlans")
+            .update(row)
+            .eq("id", plan_id)
+            .eq("status", PLAN_STATUS_DRAFT)
+            .execute()
+        )
+        if not response.data:
+            logger.error(f"Failed to confirm draft workout plan {plan_id}: no matching draft")
+            return None
+        return workout_plan
+
+    async def delete_expired_drafts(self, before: date) -> int:
+        """Deletes drafts dated before `before`: nobody confirms a plan for a day that is over."""
+        response = await (
+            self.supabase.from_("WorkoutPlans")
+            .delete()
+            .eq("status", PLAN_STATUS_DRAFT)
+            .lt("plan_date", str(before))
+            .execute()
+        )
+        return len(response.data or [])
+
+    async def list_active_user_ids(self, since: date, page_size: int = 1000) -> List[str]:
+        """
+        Users with a confirmed plan dated on or after `since`, in id order (the nightly batch's
+        population). Drafts do not count: they are the batch's own output, and a user who never
+        confirms one must drop out instead of getting a new draft every night.
+        """
+        user_ids: List[str] = []
+        seen = set()
+        offset = 0
+        while True:
+            response = await (
+                self.supabase.from_("WorkoutPlans")
+                .select("user_id")
+                .eq("status", PLAN_STATUS_CONFIRMED)
+                .gte("plan_date", str(since))
+                .order("user_id")
+                .range(offset, offset + page_size - 1)
+                .execute()
+            )
+            rows = response.data or []
+            for row in rows:
+                if row["user_id"] not in seen:
+                    seen.add(row["user_id"])
+                    user_ids.append(row["user_id"])
+            if len(rows) < page_size:
+                return user_ids
+            offset += page_size
+
+    async def find_plan_by_prompt_hash(self, prompt_hash: str, max_age_seconds: float) -> Optional[dict]:
+        """Returns the plan JSON of the newest WorkoutPlans row generated from `prompt_hash` within `max_age_seconds`."""
+        since = datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)
+        response = await (
+            self.supabase.from_("WorkoutPlans")
+            .select("plan_details")
+            .eq("prompt_hash", prompt_hash)
+            .gte("created_at", since.isoformat())
+            .order("created_at", desc=True)
+            .limit(1)
+            .execute()
+        )
+        if not response.data:
+            return None
+        plan_details = response.data[0]["plan_details"]
+        # plan_details is written as a JSON document string (see store_workout_plan)
+        return json.loads(plan_details) if isinstance(plan_details, str) else plan_details
+
+
+class WorkoutPlanCacheBackend(CacheBackend):
+    """
+    Persistent tier of the plan cache: every generated plan is already stored in WorkoutPlans with
+    its prompt hash, so lookups read those rows and writes are left to `store_workout_plan`.
+    """
+
+    def __init__(self, max_age_seconds: float, plan_service: Optional[PlanService] = None):
+        self.max_age_seconds = max_age_seconds
+        self._plan_service = plan_service
+
+    async def get(self, key: str) -> Optional[Any]:
+        plan_service = self._plan_service or PlanService()
+        # TieredCache namespaces keys as "<cache name>:<key>"; the key itself is the prompt hash.
+        return await plan_service.find_plan_by_prompt_hash(key.rsplit(":", 1)[-1], self.max_age_seconds)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        pass # rows are written, with their prompt hash, when the route stores the plan
+
+    async def delete(self, key: str) -> None:
+        pass # content-addressed entries are never invalidated, only aged out
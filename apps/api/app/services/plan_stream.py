@@ -0,0 +1,106 @@
+import json
+from typing import Any, Iterable, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.models.workout_plan import Exercise, WorkoutDay, WorkoutPlanModel
+
+# ("exercise" | "day", payload) as produced by PlanStreamParser / plan_events
+PlanEvent = Tuple[str, dict]
+
+
+class PlanStreamParser:
+    """
+    Incremental scanner for a workout plan JSON document arriving in chunks from the LLM.
+
+    `feed()` tracks string/escape state and container nesting, so as soon as an object inside
+    `workout_days[i].exercises` closes it is validated as an `Exercise` and emitted, and likewise
+    each `workout_days[i]` as a `WorkoutDay`. Elements that fail validation are not emitted; the
+    caller still validates the full document (`text`) as a `WorkoutPlanModel` at the end.
+    """
+
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._buffer = ""
+        self._pos = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._pending_key: Optional[str] = None
+        # Open containers: [opening char, key in the parent object or index in the parent array, start offset, child count]
+        self._stack: List[list] = []
+
+    @property
+    def text(self) -> str:
+        return self._buffer
+
+    def feed(self, chunk: str) -> List[PlanEvent]:
+        self._buffer += chunk
+        events: List[PlanEvent] = []
+        buffer = self._buffer
+        for pos in range(self._pos, len(buffer)):
+            char = buffer[pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = buffer[self._string_start:pos]
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = pos + 1
+            elif char == ":":
+                self._pending_key = self._last_string
+            elif char in "{[":
+                self._stack.append([char, self._slot_in_parent(), pos, 0])
+            elif char in "}]":
+                if not self._stack:
+                    continue
+                opener, slot, start, _ = self._stack.pop()
+                self._pending_key = None
+                if opener == "{":
+                    event = self._closed_object(slot, buffer[start:pos + 1])
+                    if event is not None:
+                        events.append(event)
+        self._pos = len(buffer)
+        return events
+
+    def _slot_in_parent(self) -> Any:
+        if not self._stack:
+            return None
+        parent = self._stack[-1]
+        if parent[0] == "[":
+            parent[3] += 1
+            return parent[3] - 1
+        key, self._pending_key = self._pending_key, None
+        return key
+
+    def _path(self) -> List[Any]:
+        return [frame[1] for frame in self._stack[1:]]
+
+    def _closed_object(self, slot: Any, raw: str) -> Optional[PlanEvent]:
+        # self._stack now holds the closed object's ancestors, root first.
+        path = self._path() + [slot]
+        try:
+            if len(path) == 4 and path[0] == "workout_days" and path[2] == "exercises":
+                exercise = Exercise(**json.loads(raw))
+                return "exercise", {"day_index": path[1], "index": path[3], "exercise": exercise.model_dump(mode="json")}
+            if len(path) == 2 and path[0] == "workout_days":
+                day = WorkoutDay(**json.loads(raw))
+                return "day", {"index": path[1], "day": day.model_dump(mode="json")}
+        except (ValueError, TypeError, ValidationError):
+            return None
+        return None
+
+
+def plan_events(plan: WorkoutPlanModel) -> Iterable[PlanEvent]:
+    """The events PlanStreamParser would have emitted for `plan` (used to replay cached plans)."""
+    for day_index, day in enumerate(plan.workout_days):
+        for index, exercise in enumerate(day.exercises):
+            yield "exercise", {"day_index": day_index, "index": index, "exercise": exercise.model_dump(mode="json")}
+        yield "day", {"index": day_index, "day": day.model_dump(mode="json")}
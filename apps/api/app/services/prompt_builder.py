@@ -0,0 +1,278 @@
+import json
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.cache import TTLLRUCache
+from app.core.config import settings
+from app.models.workout_plan import PlanGenerationContext
+
+try: # exact counts when tiktoken is installed; the estimate below is close enough for budgeting
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception: # pragma: no cover - depends on the environment
+    _encoding = None
+
+
+def count_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    # ~4 characters per token for English text and compact JSON
+    return (len(text) + 3) // 4
+
+
+def compact_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+
+# Keyword -> muscle group for volume totals; the first match wins, unknown exercises count as "other".
+MUSCLE_GROUPS = [
+    ("deadlift", "posterior"), ("rdl", "posterior"), ("hip thrust", "glutes"), ("squat", "legs"),
+    ("lunge", "legs"), ("leg press", "legs"), ("leg curl", "hamstrings"), ("leg extension", "quads"),
+    ("calf", "calves"), ("bench", "chest"), ("fly", "chest"), ("push-up", "chest"), ("pushup", "chest"),
+    ("dip", "triceps"), ("overhead press", "shoulders"), ("shoulder press", "shoulders"), ("ohp", "shoulders"),
+    ("lateral raise", "shoulders"), ("row", "back"), ("pull-up", "back"), ("pullup", "back"), ("chin", "back"),
+    ("pulldown", "back"), ("curl", "biceps"), ("tricep", "triceps"), ("extension", "triceps"),
+    ("plank", "core"), ("crunch", "core"), ("press", "shoulders"),
+]
+
+
+def muscle_group(exercise_name: str) -> str:
+    name = exercise_name.lower()
+    for keyword, group in MUSCLE_GROUPS:
+        if keyword in name:
+            return group
+    return "other"
+
+
+def estimated_1rm(weight: float, reps: int) -> float:
+    """Epley estimate; a single is its own 1RM."""
+    if reps <= 1:
+        return weight
+    return weight * (1 + reps / 30)
+
+
+def _parse_time(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        moment = value
+    else:
+        moment = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+@dataclass
+class _Session:
+    """One exercise on one day: its best set and the total volume, and the sets they came from."""
+    top_weight: float = 0.0
+    top_reps: int = 0
+    top_rpe: Optional[float] = None
+    best_e1rm: float = 0.0
+    volume: float = 0.0
+    sets: int = 0
+    rows: List[Tuple[Optional[str], float, int, Optional[float]]] = field(default_factory=list) # (log id, weight, reps, rpe)
+
+    def fold(self, log_id: Optional[str], weight: float, reps: int, rpe: Optional[float]) -> None:
+        self.rows.append((log_id, weight, reps, rpe))
+        self.sets += 1
+        self.volume += weight * reps
+        e1rm = estimated_1rm(weight, reps)
+        if e1rm > self.best_e1rm:
+            self.best_e1rm = e1rm
+            self.top_weight, self.top_reps, self.top_rpe = weight, reps, rpe
+
+
+@dataclass
+class HistorySummary:
+    """
+    Per-exercise aggregates of a user's WorkoutLogs, built incrementally: `add` folds in only logs
+    that arrived since `watermark`, so refreshing the summary costs O(new logs), not O(history).
+
+    The watermark follows arrival (`updated_at`, set when the row is stored or changed), not
+    `completed_at`: offline, replayed and WAL-buffered sets keep the client's completion time and
+    can land long after newer sets. Rows are tracked by id with the `updated_at` they were folded
+    in at: re-sent and re-read rows count once, and an edited row replaces its earlier version.
+    """
+    sessions: Dict[str, Dict[date, _Session]] = field(default_factory=lambda: defaultdict(dict))
+    watermark: Optional[datetime] = None
+    log_count: int = 0
+    # log id -> (updated_at, exercise, completion day) of the version folded in; pruned with the sessions
+    seen: Dict[str, Tuple[datetime, str, date]] = field(default_factory=dict)
+
+    def add(self, logs: List[Dict[str, Any]]) -> int:
+        added = 0
+        newest = self.watermark
+        for log in logs:
+            completed_at = _parse_time(log["completed_at"])
+            arrived_at = _parse_time(log.get("updated_at") or log["completed_at"])
+            log_id = str(log["id"]) if log.get("id") is not None else None
+            if log_id is not None:
+                # Rows stored in one transaction share updated_at, so the fetch includes the watermark
+                # itself: a row seen at the same updated_at is a re-read, a newer one an edit.
+                previous = self.seen.get(log_id)
+                if previous is not None:
+                    if arrived_at <= previous[0]:
+                        continue
+                    self._retract(log_id, previous)
+                elif self.watermark is not None and arrived_at < self.watermark:
+                    continue
+                else:
+                    added += 1
+                self.seen[log_id] = (arrived_at, log["exercise_name"], completed_at.date())
+            elif self.watermark is not None and arrived_at <= self.watermark:
+                continue
+            else:
+                added += 1
+            session = self.sessions[log["exercise_name"]].setdefault(completed_at.date(), _Session())
+            session.fold(log_id, float(log.get("actual_weight") or 0.0), int(log.get("actual_reps") or 0), log.get("rpe"))
+            newest = arrived_at if newest is None or arrived_at > newest else newest
+        self.watermark = newest
+        self.log_count += added
+        return added
+
+    def _retract(self, log_id: str, previous: Tuple[datetime, str, date]) -> None:
+        """Removes a folded-in log's set; it may have been the best one, so the session is refolded."""
+        _, name, day = previous
+        by_day = self.sessions.get(name, {})
+        if day not in by_day:
+            return # already pruned
+        session = _Session()
+        for row in by_day[day].rows:
+            if row[0] != log_id:
+                session.fold(*row)
+        if session.sets:
+            by_day[day] = session
+        else:
+            del by_day[day]
+            if not by_day:
+                del self.sessions[name]
+
+    def prune(self, since: date) -> None:
+        for log_id in [log_id for log_id, (_, _, day) in self.seen.items() if day < since]:
+            del self.seen[log_id]
+        for name in list(self.sessions):
+            by_day = self.sessions[name]
+            for day in [day for day in by_day if day < since]:
+                del by_day[day]
+            if not by_day:
+                del self.sessions[name]
+
+    def render(self, budget_tokens: int, today: date, window_days: int, top_sets: int) -> str:
+        """
+        Compact text summary within `budget_tokens`. Exercises trained most recently come first and
+        whole lines are dropped from the end (least recent) until the summary fits.
+        """
+        since = today - timedelta(days=window_days)
+        self.prune(since)
+        if not self.sessions or budget_tokens <= 0:
+            return ""
+
+        weeks = max(window_days / 7, 1)
+        volume_by_group: Dict[str, float] = defaultdict(float)
+        lines = []
+        for name, by_day in sorted(self.sessions.items(), key=lambda item: max(item[1]), reverse=True):
+            days = sorted(by_day)
+            for session in by_day.values():
+                volume_by_group[muscle_group(name)] += session.volume
+            recent = [
+                f"{_num(by_day[day].top_weight)}x{by_day[day].top_reps}"
+                + (f"@{_num(by_day[day].top_rpe)}" if by_day[day].top_rpe is not None else "")
+                + f" {day.strftime('%m-%d')}"
+                for day in reversed(days[-top_sets:])
+            ]
+            first, last = by_day[days[0]].best_e1rm, by_day[days[-1]].best_e1rm
+            trend = f"; e1RM {_num(first)}->{_num(last)}" + (f" ({(last - first) / first:+.0%})" if first else "") if len(days) > 1 else ""
+            lines.append(f"{name} [{muscle_group(name)}]: {', '.join(recent)}{trend}")
+
+        header = f"Training history, last {window_days}d (top set per session, weight x reps @RPE):"
+        volume = "Weekly volume (kg*reps): " + ", ".join(
+            f"{group} {round(total / weeks)}" for group, total in sorted(volume_by_group.items(), key=lambda item: -item[1])
+        )
+        kept = list(lines)
+        while kept and count_tokens("\n".join([header, *kept, volume])) > budget_tokens:
+            kept.pop()
+        if not kept:
+            return ""
+        if len(kept) < len(lines):
+            kept.append(f"(+{len(lines) - len(kept)} older exercises omitted)")
+        return "\n".join([header, *kept, volume])
+
+
+def _num(value: float) -> str:
+    return f"{value:.1f}".rstrip("0").rstrip(".")
+
+
+@dataclass
+class BuiltPrompt:
+    text: str
+    tokens: int
+    history_tokens: int
+
+
+class PromptBuilder:
+    """
+    Assembles the plan-generation user prompt under a token budget. Profile, goals and context go
+    in as compact JSON (None context fields dropped); the workout history is summarized per
+    exercise and gets whatever budget is left. Summaries are memoized per user and extended with
+    only the logs that arrived since they were built.
+    """
+
+    def __init__(
+        self,
+        budget_tokens: int = settings.PROMPT_TOKEN_BUDGET,
+        window_days: int = settings.PROMPT_HISTORY_WINDOW_DAYS,
+        top_sets: int = settings.PROMPT_HISTORY_TOP_SETS,
+        cache_size: int = settings.PROMPT_HISTORY_CACHE_SIZE,
+    ):
+        self.budget_tokens = budget_tokens
+        self.window_days = window_days
+        self.top_sets = top_sets
+        # Summaries are extended, never invalidated; the TTL only bounds memory for idle users.
+        self.summaries = TTLLRUCache(maxsize=cache_size, ttl=window_days * 86400)
+        self._lock = threading.Lock()
+
+    def history_watermark(self, user_id: str) -> Optional[datetime]:
+        """Arrival time (`updated_at`) of the newest log folded into the user's summary: fetch logs stored since."""
+        summary = self.summaries.get(user_id)
+        return summary.watermark if summary is not None else None
+
+    def summarize_history(self, user_id: str, logs: List[Dict[str, Any]]) -> HistorySummary:
+        with self._lock:
+            summary = self.summaries.get(user_id)
+            if summary is None:
+                summary = HistorySummary()
+                self.summaries.set(user_id, summary)
+            summary.add(logs)
+            return summary
+
+    def build(
+        self,
+        user_id: str,
+        user_profile: Dict[str, Any],
+        user_goals: Dict[str, Any],
+        workout_history: List[Dict[str, Any]],
+        context: PlanGenerationContext,
+        today: Optional[date] = None,
+    ) -> BuiltPrompt:
+        parts = [
+            f"User ID: {user_id}",
+            f"User Profile: {compact_json(user_profile)}",
+            f"User Goals: {compact_json(user_goals)}",
+            f"Current Context: {compact_json(context.model_dump(exclude_none=True))}",
+        ]
+        closing = "Generate a workout plan strictly following the JSON schema provided in the system prompt."
+        fixed_tokens = count_tokens("\n".join([*parts, closing]))
+
+        history = ""
+        if workout_history or self.summaries.get(user_id) is not None:
+            summary = self.summarize_history(user_id, workout_history)
+            with self._lock:
+                history = summary.render(
+                    self.budget_tokens - fixed_tokens, today or date.today(), self.window_days, self.top_sets
+                )
+        text = "\n".join([*parts, *([history] if history else []), closing])
+        return BuiltPrompt(text=text, tokens=count_tokens(text), history_tokens=count_tokens(history) if history else 0)
+
+
+prompt_builder = PromptBuilder()
@@ -0,0 +1,92 @@
+from datetime import date, timedelta
+from typing import List, Optional
+from uuid import UUID
+
+from postgrest import APIResponse
+from supabase import AsyncClient
+
+from app.core.supabase import get_supabase_client
+
+ROLLUP_COLUMNS = "exercise_name, sets, reps, volume, top_weight, best_e1rm"
+
+
+def week_start(day: date) -> date:
+    """Monday of the ISO week, matching date_trunc('week', ...) in the rollup functions."""
+    return day - timedelta(days=day.weekday())
+
+
+class RollupService:
+    """
+    Per-user training rollups that the dashboard reads instead of WorkoutLogs.
+
+    `WorkoutDailyRollups` and `WorkoutWeeklyRollups` hold, per day / ISO week and exercise, the
+    sets, reps, volume, top weight and best e1RM. A statement-level trigger on WorkoutLogs applies
+    every insert as deltas through the `apply_workout_log_rollups` database function, in the
+    inserting transaction: a set is never stored without being counted. The function increments
+    both tables in one statement each, so concurrent writers never lose an update, and only rows
+    the insert actually added are applied; replayed duplicates are not counted twice.
+
+    The API only inserts sets. Should sets ever be updated or deleted, `rebuild` recomputes the
+    user's rollups from WorkoutLogs. Both bump the user's row in `WorkoutRollupVersions`, which
+    versions the dashboard for conditional GETs.
+    """
+
+    def __init__(self, supabase: Optional[AsyncClient] = None):
+        self._supabase = supabase
+
+    @property
+    def supabase(self):
+        return self._supabase or get_supabase_client()
+
+    async def rebuild(self, user_id: UUID) -> None:
+        """Recomputes the user's rollups from WorkoutLogs."""
+        await self.supabase.rpc("rebuild_workout_log_rollups", {"p_user_id": str(user_id)}).execute()
+
+    async def version(self, user_id: UUID) -> int:
+        """Counter bumped by every apply and rebuild; 0 for a user without rollups."""
+        response = await (
+            self.supabase.table("WorkoutRollupVersions").select("version").eq("user_id", str(user_id)).maybe_single().execute()
+        )
+        return response.data["version"] if response and response.data else 0
+
+    async def list_active_user_ids(self, since: date, page_size: int = 1000) -> List[str]:
+        """Users with weekly rollups for weeks starting on or after `since`, in id order."""
+        user_ids: List[str] = []
+        seen = set()
+        offset = 0
+        while True:
+            response: APIResponse = await (
+                self.supabase.table("WorkoutWeeklyRollups")
+                .select("user_id")
+                .gte("week_start", since.isoformat())
+                .order("user_id").order("week_start").order("exercise_name") # the primary key: stable pages
+                .range(offset, offset + page_size - 1)
+                .execute()
+            )
+            rows = response.data or []
+            for row in rows:
+                if row["user_id"] not in seen:
+                    seen.add(row["user_id"])
+                    user_ids.append(row["user_id"])
+            if len(rows) < page_size:
+                return user_ids
+            offset += page_size
+
+    async def daily(self, user_id: UUID, since: date) -> List[dict]:
+        """Daily rollup rows from `since` on, newest first."""
+        return await self._read("WorkoutDailyRollups", "day", user_id, since)
+
+    async def weekly(self, user_id: UUID, since: date) -> List[dict]:
+        """Weekly rollup rows for the weeks starting on or after `since`, newest first."""
+        return await self._read("WorkoutWeeklyRollups", "week_start", user_id, since)
+
+    async def _read(self, table: str, period: str, user_id: UUID, since: date) -> List[dict]:
+        response: APIResponse = await (
+            self.supabase.table(table)
+            .select(f"{period}, {ROLLUP_COLUMNS}")
+            .eq("user_id", str(user_id))
+            .gte(period, since.isoformat())
+            .order(period, desc=True)
+            .execute()
+        )
+        return response.data or []
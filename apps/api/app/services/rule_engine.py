@@ -0,0 +1,152 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.metrics import metrics_registry
+from app.models.workout_plan import Exercise, PlanGenerationContext, WorkoutDay, WorkoutPlanModel
+from app.services.prompt_builder import HistorySummary
+
+
+@dataclass(frozen=True)
+class Template:
+    """Progression template for a goal: prescription per slot kind and the slots in a session."""
+    sets: int
+    reps: str
+    rpe: int
+    rest: str
+    slots: Tuple[str, ...]
+    increment: float # kg added to last session's top set when it was at or under the target RPE
+
+
+TEMPLATES: Dict[str, Template] = {
+    "build_muscle": Template(3, "8-12", 8, "90s", ("squat", "push", "pull", "hinge", "vertical_push", "core"), 2.5),
+    "strength": Template(5, "3-5", 8, "3min", ("squat", "push", "hinge", "pull", "core"), 2.5),
+    "lose_weight": Template(3, "12-15", 7, "45s", ("squat", "push", "pull", "hinge", "core"), 1.0),
+    "endurance": Template(3, "15-20", 7, "45s", ("squat", "push", "pull", "core"), 1.0),
+    "general_fitness": Template(3, "10", 7, "60s", ("squat", "push", "pull", "hinge", "core"), 1.0),
+}
+GOAL_ALIASES = {"hypertrophy": "build_muscle", "muscle": "build_muscle", "weight_loss": "lose_weight", "fat_loss": "lose_weight"}
+
+# Movement slot -> exercises in order of preference with the equipment each needs (None: bodyweight).
+EXERCISES: Dict[str, List[Tuple[str, Optional[str]]]] = {
+    "squat": [("Back Squat", "barbell"), ("Goblet Squat", "dumbbells"), ("Goblet Squat", "kettlebell"), ("Bodyweight Squat", None)],
+    "push": [("Bench Press", "barbell"), ("Dumbbell Bench Press", "dumbbells"), ("Push-up", None)],
+    "pull": [("Barbell Row", "barbell"), ("Pull-up", "pull-up bar"), ("Dumbbell Row", "dumbbells"), ("Band Pull-apart", "resistance bands"), ("Inverted Row", None)],
+    "hinge": [("Romanian Deadlift", "barbell"), ("Dumbbell Romanian Deadlift", "dumbbells"), ("Kettlebell Swing", "kettlebell"), ("Glute Bridge", None)],
+    "vertical_push": [("Overhead Press", "barbell"), ("Dumbbell Shoulder Press", "dumbbells"), ("Pike Push-up", None)],
+    "core": [("Plank", None)],
+}
+
+
+def _owned(equipment: List[str]) -> set:
+    owned = {item.strip().lower() for item in equipment}
+    # Common spellings from onboarding
+    if owned & {"dumbbell", "adjustable dumbbells"}:
+        owned.add("dumbbells")
+    if owned & {"bands", "resistance band"}:
+        owned.add("resistance bands")
+    return owned
+
+
+def readiness(context: PlanGenerationContext) -> Tuple[int, List[str]]:
+    """
+    -1 (back off), 0 (as planned) or +1 (push) from the daily context, with the reasons.
+    HRV is the simulated rMSSD in ms and sleep is hours.
+    """
+    down, up = [], []
+    if (context.energy or "").lower() in ("low", "tired", "exhausted"):
+        down.append("low energy")
+    if (context.soreness or "").lower() in ("high", "very sore", "sore"):
+        down.append("soreness")
+    if (context.recovery_bias or "").lower() in ("recovery", "rest", "deload"):
+        down.append("recovery requested")
+    if context.simulated_hrv is not None and context.simulated_hrv < 40:
+        down.append("low HRV")
+    if context.simulated_sleep is not None and context.simulated_sleep < 6:
+        down.append("short sleep")
+    if (context.energy or "").lower() in ("high", "great", "energized"):
+        up.append("high energy")
+    if down:
+        return -1, down
+    if up and (context.simulated_sleep is None or context.simulated_sleep >= 7):
+        return 1, up
+    return 0, []
+
+
+class RulePlanEngine:
+    """
+    Deterministic, local plan generator (well under a millisecond per plan): goal template ->
+    exercises available with the user's equipment -> load progressed from the last top set in
+    the user's history summary -> volume and intensity adjusted for today's readiness.
+
+    Used as the fallback when the LLM misses its deadline or fails, and as the draft the LLM only
+    adjusts (AIOrchestratorService.adjust_draft_plan).
+    """
+
+    def __init__(self):
+        self.plans = 0
+        self.fallbacks = 0
+
+    def generate(
+        self,
+        user_id: str,
+        user_profile: Dict[str, Any],
+        user_goals: Dict[str, Any],
+        history: Optional[HistorySummary],
+        context: PlanGenerationContext,
+        plan_date: Optional[date] = None,
+    ) -> WorkoutPlanModel:
+        goal = str(user_goals.get("primary_goal") or "general_fitness").lower()
+        template = TEMPLATES.get(GOAL_ALIASES.get(goal, goal), TEMPLATES["general_fitness"])
+        owned = _owned(user_profile.get("equipment") or user_goals.get("equipment") or [])
+        shift, reasons = readiness(context)
+
+        sets = max(2, template.sets + min(shift, 0)) # back off by a set; never add sets
+        rpe = max(5, min(9, template.rpe + shift))
+        exercises = []
+        for slot in template.slots:
+            name = next(name for name, needs in EXERCISES[slot] if needs is None or needs in owned)
+            if slot == "core":
+                exercises.append(Exercise(name=name, sets=sets, reps="30-45s", rpe=rpe, rest_interval="45s"))
+                continue
+            exercises.append(Exercise(
+                name=name,
+                sets=sets,
+                reps=template.reps,
+                rpe=rpe,
+                weight=self._progressed_weight(history, name, template, shift),
+                rest_interval=template.rest,
+            ))
+
+        explanation = f"Rule-based {GOAL_ALIASES.get(goal, goal).replace('_', ' ')} session"
+        if reasons:
+            explanation += f", adjusted for {', '.join(reasons)}"
+        self.plans += 1
+        return WorkoutPlanModel(
+            user_id=user_id,
+            plan_date=plan_date or date.today(),
+            workout_days=[WorkoutDay(day_name="Today", exercises=exercises)],
+            ai_explanation=explanation + ".",
+        )
+
+    def _progressed_weight(self, history: Optional[HistorySummary], name: str, template: Template, shift: int) -> Optional[str]:
+        sessions = history.sessions.get(name) if history is not None else None
+        if not sessions:
+            return None # no history: the lifter picks a load at the target RPE
+        last = sessions[max(sessions)]
+        if last.top_weight <= 0:
+            return None
+        weight = last.top_weight
+        if shift >= 0 and (last.top_rpe is None or last.top_rpe <= template.rpe):
+            weight += template.increment
+        elif shift < 0:
+            weight *= 0.9
+        weight = round(weight * 2) / 2 # nearest 0.5 kg
+        return f"{weight:g} kg"
+
+    def stats(self) -> dict:
+        return {"plans": self.plans, "fallbacks": self.fallbacks}
+
+
+rule_engine = RulePlanEngine()
+metrics_registry.register("rule_engine", rule_engine.stats)
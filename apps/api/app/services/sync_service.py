@@ -0,0 +1,133 @@
+import asyncio
+import base64
+import binascii
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from postgrest import APIResponse
+from supabase import AsyncClient
+
+from app.core.config import settings
+from app.core.supabase import get_supabase_client
+from app.models.sync import SyncMutationResult, SyncPlan, SyncPullResponse, SyncPushRequest, SyncPushResponse
+from app.models.workout_log import WorkoutLogResponse
+from app.services.log_service import BULK_CREATED, BULK_DUPLICATE, BULK_FAILED, InvalidCursor, LogService
+
+logger = logging.getLogger(__name__)
+
+LOG_COLUMNS = (
+    "id, user_id, plan_id, exercise_name, set_number, target_reps, actual_reps, "
+    "target_weight, actual_weight, rpe, completed_at, updated_at"
+)
+PLAN_COLUMNS = "id, plan_date, status, plan_details, ai_explanation, updated_at"
+
+# Cursor keys per synced table
+TABLES = {"logs": ("WorkoutLogs", LOG_COLUMNS), "plans": ("WorkoutPlans", PLAN_COLUMNS)}
+
+Position = Tuple[str, str] # (updated_at, id) of the last row a device has
+
+
+def encode_cursor(positions: Dict[str, Optional[Position]]) -> str:
+    payload = json.dumps({key: list(value) for key, value in positions.items() if value}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Dict[str, Optional[Position]]:
+    if not cursor:
+        return {key: None for key in TABLES}
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        positions = {}
+        for key in TABLES:
+            if payload.get(key) is None:
+                positions[key] = None
+                continue
+            updated_at, row_id = payload[key]
+            # Both values end up in a PostgREST filter: only accept what they claim to be.
+            datetime.fromisoformat(updated_at)
+            positions[key] = (updated_at, str(UUID(row_id)))
+        return positions
+    except (binascii.Error, ValueError, TypeError, AttributeError) as e:
+        raise InvalidCursor(f"Invalid sync cursor: {e}")
+
+
+class SyncService:
+    """
+    Offline sync for workout logs and plans.
+
+    Push applies a device's queued log mutations through the idempotent bulk upsert (client ids,
+    client timestamps), so a push interrupted by a dropped connection is simply sent again.
+
+    Pull returns what changed since the device's cursor, per table in (updated_at, id) keyset
+    order; `updated_at` is maintained by a trigger on both tables. The cursor is opaque to the
+    client and holds the last (updated_at, id) it has seen per table. Rows newer than
+    SYNC_SETTLE_SECONDS are held back until the next pull, so a transaction that commits after
+    a later-stamped one cannot be skipped by a cursor that already moved past its timestamp.
+    """
+
+    def __init__(self, supabase: Optional[AsyncClient] = None, log_service: Optional[LogService] = None):
+        self._supabase = supabase
+        self.log_service = log_service or LogService(supabase)
+
+    @property
+    def supabase(self):
+        return self._supabase or get_supabase_client()
+
+    async def push(self, request: SyncPushRequest, user_id: UUID) -> SyncPushResponse:
+        results = await self.log_service.create_bulk_log_entries(request.mutations, user_id) if request.mutations else []
+        response = SyncPushResponse(
+            results=[SyncMutationResult(id=result.id, status=result.status, error=result.error) for result in results]
+        )
+        for result in results:
+            if result.status == BULK_CREATED:
+                response.created += 1
+            elif result.status == BULK_DUPLICATE:
+                response.duplicates += 1
+            elif result.status == BULK_FAILED:
+                response.failed += 1
+        logger.info(
+            f"Sync push from device {request.device_id} of user {user_id}: {response.created} created, "
+            f"{response.duplicates} duplicate, {response.failed} failed"
+        )
+        return response
+
+    async def pull(self, user_id: UUID, cursor: Optional[str], limit: int = settings.SYNC_PAGE_SIZE) -> SyncPullResponse:
+        positions = decode_cursor(cursor)
+        settled = (datetime.now(timezone.utc) - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)).isoformat()
+        logs, plans = await asyncio.gather(*(
+            self._changed_rows(table, columns, user_id, positions[key], settled, limit)
+            for key, (table, columns) in TABLES.items()
+        ))
+        for key, rows in (("logs", logs), ("plans", plans)):
+            if rows:
+                positions[key] = (rows[-1]["updated_at"], str(rows[-1]["id"]))
+        return SyncPullResponse(
+            logs=[WorkoutLogResponse(**row) for row in logs],
+            plans=[SyncPlan(**{**row, "plan_details": _plan_details(row["plan_details"])}) for row in plans],
+            cursor=encode_cursor(positions),
+            has_more=len(logs) == limit or len(plans) == limit,
+        )
+
+    async def _changed_rows(self, table: str, columns: str, user_id: UUID, after: Optional[Position],
+                            settled: str, limit: int) -> List[dict]:
+        query = (
+            self.supabase.table(table)
+            .select(columns)
+            .eq("user_id", str(user_id))
+            .lte("updated_at", settled)
+        )
+        if after is not None:
+            updated_at, row_id = after
+            # Keyset: strictly after (updated_at, id); timestamps quoted for their ':' and '+'. The
+            # redundant `gte` bound lets Postgres start the index scan at the cursor.
+            query = query.gte("updated_at", updated_at).or_(f'updated_at.gt."{updated_at}",and(updated_at.eq."{updated_at}",id.gt.{row_id})')
+        response: APIResponse = await query.order("updated_at").order("id").limit(limit).execute()
+        return response.data or []
+
+
+def _plan_details(value):
+    # plan_details is written as a JSON document string (see PlanService.store_workout_plan)
+    return json.loads(value) if isinstance(value, str) else value
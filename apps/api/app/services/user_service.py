@@ -1,36 +1,67 @@
 # apps/api/app/services/user_service.py
-from typing import List, Optional
+from typing import Dict, List, Optional
 from uuid import UUID
-from datetime import datetime
 from fastapi import Depends
 
+from app.core.cache import CacheBackend, InMemoryCacheBackend, TieredCache
 from app.core.config import settings
-from app.core.supabase import get_supabase_client
-from app.models.user import UserProfileData, UserProfileUpdate, GoalUpdate, EquipmentCreate, GoalCreate
+from app.core.metrics import metrics_registry
+from app.core.supabase import get_user_supabase_client
+from app.models.user import UserProfileData, UserProfileUpdate
 
-class UserService:
-    def __init__(self, supabase=Depends(get_supabase_client)):
-        self.supabase = supabase
+# Users row with its latest goal and all equipment embedded, so PostgREST resolves the whole
+# profile in a single request. `goals` is ordered/limited inside the embed (see get_user_profile).
+PROFILE_SELECT = (
+    "id, email, unit_preference, updated_at, profile_version, "
+    "goals(primary_goal, training_frequency, training_duration, injuries_limitations, created_at), "
+    "equipment(name)"
+)
 
-    async def get_user_profile(self, user_id: UUID) -> Optional[UserProfileData]:
-        # Fetch user data from 'users' table (managed by Supabase Auth, extended by our schema)
-        user_response = self.supabase.from_('users').select('*').eq('id', str(user_id)).single().execute()
-        user_data = user_response.data
+def _shared_profile_backend() -> Optional[CacheBackend]:
+    if settings.PROFILE_CACHE_SHARED_BACKEND == "memory":
+        return InMemoryCacheBackend()
+    return None
+
+# Profiles are read on nearly every screen but change rarely. Entries hold the JSON form of
+# UserProfileData and the `users.profile_version` it was read at, keyed by user id; every write
+# path to users/goals/equipment must call `invalidate_profile_cache` (UserService,
+# OnboardingService, account deletion).
+profile_cache = TieredCache(
+    "user_profile_versioned",
+    maxsize=settings.PROFILE_CACHE_MAX_ENTRIES,
+    ttl=settings.PROFILE_CACHE_TTL_SECONDS,
+    backend=_shared_profile_backend(),
+)
+metrics_registry.register("profile_cache", profile_cache.stats)
+
+# Per-user invalidation count in this process. A read that started before an invalidation may
+# finish after it holding the old row; it compares generations and skips filling the cache.
+# (Writes in other workers are caught by the version check in `get_user_profile`.)
+_profile_generations: Dict[str, int] = {}
 
-        if not user_data:
-            return None
 
+async def invalidate_profile_cache(user_id) -> None:
+    key = str(user_id)
+    _profile_generations[key] = _profile_generations.get(key, 0) + 1
+    await profile_cache.invalidate(key)
+
+
+class UserService:
+    def __init__(self, supabase=Depends(get_user_supabase_client)):
+        self.supabase = supabase
+
+    @staticmethod
+    def _profile_from_row(row: dict) -> UserProfileData:
+        """Builds a UserProfileData from a users row carrying embedded `goals` and `equipment`."""
         profile_data = {
-            "id": user_data['id'],
-            "email": user_data['email'],
-            "unit_preference": user_data.get('unit_preference', 'kg'),
-            "updated_at": user_data.get('updated_at'),
+            "id": row['id'],
+            "email": row['email'],
+            "unit_preference": row.get('unit_preference') or 'kg',
+            "updated_at": row.get('updated_at'),
         }
 
-        # Fetch goals
-        goal_response = self.supabase.from_('goals').select('*').eq('user_id', str(user_id)).order('created_at', desc=True).limit(1).execute()
-        goal_data = goal_response.data[0] if goal_response.data else None
-
+        goals = row.get('goals') or []
+        goal_data = goals[0] if goals else None
         if goal_data:
             profile_data.update({
                 "primary_goal": goal_data.get('primary_goal'),
@@ -39,58 +70,77 @@ class UserService:
                 "injuries_limitations": goal_data.get('injuries_limitations'),
             })
 
-        # Fetch equipment
-        equipment_response = self.supabase.from_('equipment').select('name').eq('user_id', str(user_id)).execute()
-        equipment_names = [item['name'] for item in equipment_response.data] if equipment_response.data else []
-        profile_data['equipment'] = equipment_names
-        
+        profile_data['equipment'] = [item['name'] for item in row.get('equipment') or []]
         return UserProfileData(**profile_data)
 
+    async def profile_version(self, user_id: UUID) -> Optional[int]:
+        """
+        `users.profile_version`, bumped by triggers on every write to the user's profile (see
+        supabase/migrations); None for a user without a row. One primary-key read, so GET
+        /users/me can answer 304 without building the profile.
+        """
+        response = await (
+            self.supabase.from_('users').select('profile_version').eq('id', str(user_id)).maybe_single().execute()
+        )
+        return response.data['profile_version'] if response and response.data else None
+
+    async def get_user_profile(self, user_id: UUID, min_version: Optional[int] = None) -> Optional[UserProfileData]:
+        """
+        The user's profile, from the profile cache when it holds one read at `min_version` or
+        later. A write bumps the version before its cache invalidation lands, so a caller that
+        read the version first never gets a body older than that version.
+        """
+        generation = _profile_generations.get(str(user_id), 0)
+        cached = await profile_cache.get(str(user_id))
+        if cached is not None and (min_version is None or cached['version'] >= min_version):
+            return UserProfileData(**cached['profile'])
+
+        # One round trip: user row, latest goal and equipment via embedded resources
+        user_response = await (
+            self.supabase.from_('users')
+            .select(PROFILE_SELECT)
+            .eq('id', str(user_id))
+            .order('created_at', desc=True, foreign_table='goals')
+            .limit(1, foreign_table='goals')
+            .maybe_single()
+            .execute()
+        )
+        user_data = user_response.data if user_response else None
+
+        if not user_data:
+            return None
+
+        profile = self._profile_from_row(user_data)
+        if _profile_generations.get(str(user_id), 0) != generation:
+            # Invalidated while we read: this row may predate the write, so don't cache it.
+            return profile
+        await profile_cache.set(
+            str(user_id), {"version": user_data.get('profile_version', 0), "profile": profile.model_dump(mode="json")}
+        )
+        return profile
+
     async def update_user_profile(self, user_id: UUID, update_data: UserProfileUpdate) -> Optional[UserProfileData]:
-        # Start a transaction (Supabase client doesn't directly support transactions in this way)
-        # For multi-table updates, we'll perform operations sequentially and handle potential failures.
-        # A more robust solution might involve stored procedures or database functions in Supabase.
-
-        # 1. Update 'users' table
-        user_update_payload = {}
-        if update_data.unit_preference is not None:
-            user_update_payload['unit_preference'] = update_data.unit_preference
-        
-        if user_update_payload:
-            user_update_payload['updated_at'] = datetime.now().isoformat() # Update timestamp
-            self.supabase.from_('users').update(user_update_payload).eq('id', str(user_id)).execute()
-
-        # 2. Update 'goals' table
-        goal_update_payload = {}
-        if update_data.primary_goal is not None:
-            goal_update_payload['primary_goal'] = update_data.primary_goal
-        if update_data.training_frequency is not None:
-            goal_update_payload['training_frequency'] = update_data.training_frequency
-        if update_data.training_duration is not None:
-            goal_update_payload['training_duration'] = update_data.training_duration
-        if update_data.injuries_limitations is not None:
-            goal_update_payload['injuries_limitations'] = update_data.injuries_limitations
-        
-        if goal_update_payload:
-            # Check if a goal already exists for the user
-            existing_goal = self.supabase.from_('goals').select('id').eq('user_id', str(user_id)).order('created_at', desc=True).limit(1).execute()
-            if existing_goal.data:
-                # Update existing goal
-                self.supabase.from_('goals').update(goal_update_payload).eq('id', existing_goal.data[0]['id']).execute()
-            else:
-                # Create a new goal entry
-                goal_create_data = {**goal_update_payload, "user_id": str(user_id)}
-                self.supabase.from_('goals').insert(goal_create_data).execute()
-
-        # 3. Update 'equipment' table (replace all for simplicity)
-        if update_data.equipment is not None:
-            # Delete existing equipment for the user
-            self.supabase.from_('equipment').delete().eq('user_id', str(user_id)).execute()
-            
-            # Insert new equipment
-            if update_data.equipment:
-                new_equipment_entries = [{"user_id": str(user_id), "name": name} for name in update_data.equipment]
-                self.supabase.from_('equipment').insert(new_equipment_entries).execute()
-
-        # Fetch and return the updated profile
-        return await self.get_user_profile(user_id)
+        # The `update_user_profile` database function (supabase/migrations) applies the users,
+        # goals and equipment changes in a single transaction and returns the updated profile in
+        # the same shape as PROFILE_SELECT, so the write and the re-read share one round trip.
+        # Fields left as None are not touched; an empty equipment list clears all equipment.
+        goal_fields = update_data.model_dump(
+            include={'primary_goal', 'training_frequency', 'training_duration', 'injuries_limitations'},
+            exclude_none=True,
+        )
+        params = {
+            "p_user_id": str(user_id),
+            "p_unit_preference": update_data.unit_preference,
+            "p_goal": goal_fields or None,
+            "p_equipment": update_data.equipment,
+        }
+        try:
+            response = await self.supabase.rpc('update_user_profile', params).execute()
+        finally:
+            # Invalidate even on failure: the transaction may have committed before the error surfaced.
+            await invalidate_profile_cache(user_id)
+
+        if not response.data:
+            return None
+
+        return self._profile_from_row(response.data)
@@ -0,0 +1,72 @@
+import logging
+from datetime import date
+from typing import Optional
+from uuid import UUID
+
+from postgrest import APIResponse
+from supabase import AsyncClient
+
+from app.core.supabase import get_supabase_client
+from app.models.dashboard import WeeklyReview
+
+logger = logging.getLogger(__name__)
+
+
+class WeeklyReviewSnapshots:
+    """
+    The Weekly Review of each closed ISO week, as the dashboard shows it, one
+    `WeeklyReviewSnapshots` row per user and week. Written by the weekly review batch
+    (app.services.weekly_review_batch) once the week closes; GET /dashboard reads it with a
+    primary-key lookup instead of recomputing the review on every view.
+
+    Sets synced late for a closed week change its review: the rollup functions delete the
+    user's snapshots from that week on in the same transaction, and the dashboard computes the
+    review again until the next batch run.
+    """
+
+    def __init__(self, supabase: Optional[AsyncClient] = None):
+        self._supabase = supabase
+
+    @property
+    def supabase(self):
+        return self._supabase or get_supabase_client()
+
+    async def get(self, user_id: UUID, week: date) -> Optional[WeeklyReview]:
+        """The stored review of the week starting on `week`; None if not written (yet) or unreadable."""
+        try:
+            response = await (
+                self.supabase.table("WeeklyReviewSnapshots")
+                .select("review")
+                .eq("user_id", str(user_id))
+                .eq("week_start", week.isoformat())
+                .maybe_single()
+                .execute()
+            )
+        except Exception as e:
+            # The caller can still compute the review from the rollups.
+            logger.error(f"Reading the weekly review of {week} for user {user_id} failed: {e}")
+            return None
+        if not response or not response.data:
+            return None
+        return WeeklyReview.model_validate(response.data["review"])
+
+    async def put(self, user_id: UUID, week: date, review: WeeklyReview) -> None:
+        response: APIResponse = await (
+            self.supabase.table("WeeklyReviewSnapshots")
+            .upsert(
+                {"user_id": str(user_id), "week_start": week.isoformat(), "review": review.model_dump(mode="json")},
+                on_conflict="user_id,week_start",
+            )
+            .execute()
+        )
+        if not response.data:
+            raise RuntimeError(f"Storing the weekly review of {week} for user {user_id} returned no row.")
+
+    async def delete(self, user_id: UUID, week: date) -> None:
+        await (
+            self.supabase.table("WeeklyReviewSnapshots")
+            .delete()
+            .eq("user_id", str(user_id))
+            .eq("week_start", week.isoformat())
+            .execute()
+        )
@@ -0,0 +1,201 @@
+"""
+Weekly Review snapshots for the week that just closed.
+
+Run once the ISO week is over (Monday, early UTC) from a scheduler (cron, Kubernetes CronJob, ...),
+from apps/api:
+
+    python -m app.services.weekly_review_batch                    # last week, all active users
+    python -m app.services.weekly_review_batch --week 2025-12-08 --concurrency 32
+
+Every user with rollups in the reviewed week or the one before gets a WeeklyReviewSnapshots row
+holding the review as the dashboard shows it (trends, consistency, Coach Corner). GET /dashboard
+then reads the review with one lookup instead of recomputing it on every view for a week.
+
+Sets synced late for the week delete its snapshots (see WeeklyReviewSnapshots). A set landing
+while a user's review is being stored bumps the rollup version; the review is then computed
+again, so a snapshot never lags the rollups it was written after.
+
+At most --concurrency users are in flight. Progress is checkpointed to
+WEEKLY_REVIEW_CHECKPOINT_PATH (see plan_batch.BatchCheckpoint), so a crashed or interrupted run
+picks up where it stopped; snapshots are upserts, so redoing a user is harmless.
+"""
+import argparse
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics_registry
+from app.core.supabase import supabase_registry
+from app.services.dashboard_service import DashboardService
+from app.services.plan_batch import BatchCheckpoint
+from app.services.rollup_service import RollupService, week_start
+from app.services.weekly_review import WeeklyReviewSnapshots
+
+logger = logging.getLogger(__name__)
+
+STORE_ATTEMPTS = 3 # reviews computed per user while new sets keep moving the rollups
+
+
+@dataclass
+class ReviewBatchReport:
+    week: date
+    users: int = 0
+    stored: int = 0
+    skipped: int = 0 # already done by an earlier, interrupted run
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+    failures: dict = field(default_factory=dict) # user_id -> error
+
+    @property
+    def users_per_second(self) -> float:
+        return (self.stored + self.failed) / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"weekly reviews for {self.week}: {self.stored} stored, {self.skipped} skipped, {self.failed} failed "
+            f"of {self.users} users in {self.elapsed_seconds:.1f}s ({self.users_per_second:.1f} users/s)"
+        )
+
+
+class ReviewBatchStats:
+    """The running (else the last) batch in this process, with live throughput, for GET /metrics."""
+
+    def __init__(self):
+        self.runs = 0
+        self.running = False
+        self.report: Optional[ReviewBatchReport] = None
+        self._started = 0.0
+
+    def begin(self, report: ReviewBatchReport) -> None:
+        self.runs += 1
+        self.running = True
+        self.report = report
+        self._started = time.monotonic()
+
+    def end(self) -> None:
+        self.running = False
+
+    def stats(self) -> dict:
+        report = self.report
+        if report is None:
+            return {"runs": 0, "running": False}
+        elapsed = time.monotonic() - self._started if self.running else report.elapsed_seconds
+        handled = report.stored + report.failed
+        return {
+            "runs": self.runs,
+            "running": self.running,
+            "week": report.week.isoformat(),
+            "users": report.users,
+            "stored": report.stored,
+            "skipped": report.skipped,
+            "failed": report.failed,
+            "elapsed_seconds": round(elapsed, 3),
+            "users_per_second": round(handled / elapsed, 2) if elapsed else 0.0,
+        }
+
+
+review_batch_stats = ReviewBatchStats()
+metrics_registry.register("weekly_review_batch", review_batch_stats.stats)
+
+
+class WeeklyReviewBatch:
+    def __init__(
+        self,
+        dashboard_service: DashboardService,
+        snapshots: WeeklyReviewSnapshots,
+        week: date,
+        concurrency: int = settings.WEEKLY_REVIEW_BATCH_CONCURRENCY,
+        checkpoint_path: str = settings.WEEKLY_REVIEW_CHECKPOINT_PATH,
+    ):
+        self.dashboard_service = dashboard_service
+        self.snapshots = snapshots
+        self.week = week_start(week)
+        self.concurrency = concurrency
+        self.checkpoint = BatchCheckpoint(checkpoint_path, self.week)
+
+    async def run(self, user_ids: Optional[List[str]] = None) -> ReviewBatchReport:
+        if user_ids is None:
+            # Users who trained in the week before count too: their review is the one about a missed week.
+            user_ids = await self.dashboard_service.rollups.list_active_user_ids(self.week - timedelta(weeks=1))
+        report = ReviewBatchReport(week=self.week, users=len(user_ids))
+        started = time.monotonic()
+        review_batch_stats.begin(report)
+
+        pending: asyncio.Queue = asyncio.Queue()
+        for user_id in user_ids:
+            if user_id in self.checkpoint.done:
+                report.skipped += 1
+            else:
+                pending.put_nowait(user_id)
+
+        async def worker() -> None:
+            while not pending.empty():
+                user_id = pending.get_nowait()
+                try:
+                    await self._store(user_id)
+                    report.stored += 1
+                    self.checkpoint.mark_done(user_id)
+                except Exception as e:
+                    # Not checkpointed: the next run retries this user. Until then the dashboard computes the review.
+                    logger.error(f"Weekly review snapshot failed for user {user_id}: {e}")
+                    report.failed += 1
+                    report.failures[user_id] = str(e)
+                handled = report.stored + report.failed
+                if handled % 1000 == 0:
+                    report.elapsed_seconds = time.monotonic() - started
+                    logger.info(f"{handled + report.skipped}/{report.users} users: {report.summary()}")
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(max(1, self.concurrency))))
+        finally:
+            self.checkpoint.close()
+            report.elapsed_seconds = time.monotonic() - started
+            review_batch_stats.end()
+
+        logger.info(report.summary())
+        return report
+
+    async def _store(self, user_id: str) -> None:
+        rollups = self.dashboard_service.rollups
+        for _ in range(STORE_ATTEMPTS):
+            version = await rollups.version(user_id)
+            review = await self.dashboard_service.weekly_review(user_id, self.week)
+            await self.snapshots.put(user_id, self.week, review)
+            # A set stored after the read may have deleted the snapshot before this put wrote it back.
+            if await rollups.version(user_id) == version:
+                return
+        await self.snapshots.delete(user_id, self.week)
+        raise RuntimeError(f"rollups kept changing while storing the review ({STORE_ATTEMPTS} attempts)")
+
+
+async def main(args) -> None:
+    supabase_registry.startup()
+    try:
+        # No user session on a schedule: the batch reads rollups and writes snapshots with the service role.
+        admin = supabase_registry.admin()
+        snapshots = WeeklyReviewSnapshots(admin)
+        last_week = week_start(datetime.now(timezone.utc).date()) - timedelta(weeks=1)
+        batch = WeeklyReviewBatch(
+            dashboard_service=DashboardService(rollups=RollupService(admin), snapshots=snapshots),
+            snapshots=snapshots,
+            week=date.fromisoformat(args.week) if args.week else last_week,
+            concurrency=args.concurrency,
+            checkpoint_path=args.checkpoint,
+        )
+        report = await batch.run()
+        print(report.summary())
+    finally:
+        await supabase_registry.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--week", help="any day of the week to review (YYYY-MM-DD), default last week")
+    parser.add_argument("--concurrency", type=int, default=settings.WEEKLY_REVIEW_BATCH_CONCURRENCY)
+    parser.add_argument("--checkpoint", default=settings.WEEKLY_REVIEW_CHECKPOINT_PATH)
+    asyncio.run(main(parser.parse_args()))
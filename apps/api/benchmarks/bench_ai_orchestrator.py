@@ -0,0 +1,82 @@
+"""
+Load test for AIOrchestratorService against the in-process fake LLM (benchmarks/fake_llm.py).
+
+Fires `--requests` plan generations from `--users` distinct users with `--concurrency` callers and
+reports latency percentiles, timeouts, retries and the peak in-flight LLM calls, so the global /
+per-user limits and the deadline can be tuned against a known upstream latency and error rate.
+
+Usage (from apps/api):
+    python -m benchmarks.bench_ai_orchestrator --requests 200 --users 50 --concurrency 100 --latency-ms 800 --error-rate 0.05
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app.models.workout_plan import PlanGenerationContext
+from app.services.ai_orchestrator import AIOrchestratorService, AIServiceTimeout
+from benchmarks.fake_llm import make_app
+
+
+async def main(args) -> None:
+    fake = make_app(latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 2, rate_limit_rate=args.error_rate, server_error_rate=args.error_rate / 2)
+    service = AIOrchestratorService(
+        transport=httpx.ASGITransport(app=fake),
+        base_url="http://fake-llm.local/v1",
+        max_concurrency=args.max_concurrency,
+        max_concurrency_per_user=args.per_user,
+        deadline=args.deadline,
+    )
+
+    latencies, timeouts, failures = [], 0, 0
+    peak_in_flight = 0
+    gate = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int) -> None:
+        nonlocal timeouts, failures, peak_in_flight
+        async with gate:
+            started = time.perf_counter()
+            try:
+                await service.generate_workout_plan(f"user-{i % args.users}", {}, {}, [], PlanGenerationContext())
+                latencies.append(time.perf_counter() - started)
+            except AIServiceTimeout:
+                timeouts += 1
+            except Exception:
+                failures += 1
+            peak_in_flight = max(peak_in_flight, service.in_flight)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    await service.aclose()
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else float("nan")
+    stats = service.stats()
+    print(f"{args.requests} requests from {args.users} users in {elapsed:.1f}s ({args.requests / elapsed:.1f} req/s)")
+    print(f"ok: {len(latencies)}  timeouts: {timeouts}  failures: {failures}  retries: {stats['retries']}  llm calls: {stats['calls']}  deduplicated: {stats['plan_calls_deduplicated']}  plan cache hits: {stats['plan_cache']['hits']}")
+    if latencies:
+        print(f"latency p50: {statistics.median(latencies):.2f}s  p95: {pct(0.95):.2f}s  p99: {pct(0.99):.2f}s  max: {latencies[-1]:.2f}s")
+    print(f"peak in-flight LLM calls observed: {peak_in_flight} (limit {args.max_concurrency})")
+    routing = stats["routing"]
+    print(f"hedges: {routing['hedges']} (won {routing['hedges_won']})")
+    for model, model_stats in routing["models"].items():
+        if model_stats["calls"]:
+            print(f"  {model}: {model_stats['calls']} calls  success {model_stats['success_rate']:.1%}  "
+                  f"p50 {model_stats['latency_p50_seconds']:.2f}s  p95 {model_stats['latency_p95_seconds']:.2f}s  "
+                  f"within {routing['slo_seconds']:g}s SLO {model_stats['within_slo_rate']:.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=100, help="concurrent callers")
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="fake LLM mean latency")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="fraction of 429s (5xx is half of this)")
+    parser.add_argument("--max-concurrency", type=int, default=32)
+    parser.add_argument("--per-user", type=int, default=2)
+    parser.add_argument("--deadline", type=float, default=10.0)
+    asyncio.run(main(parser.parse_args()))
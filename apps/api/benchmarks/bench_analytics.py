@@ -0,0 +1,114 @@
+"""
+Benchmark for the columnar analytics kernel (app.services.analytics) against a per-set Python loop.
+
+Both compute the same weekly review figures over a synthetic multi-year history: weekly volume,
+sets and trained days, best Epley e1RM per exercise, reps-weighted intensity (%1RM) per week,
+the 4-week rolling volume, week-over-week change and the longest / current streak. Loading rows
+into arrays (LogColumns.from_rows) is timed separately, since it is paid once per history fetch.
+
+Usage (from apps/api):
+    python -m benchmarks.bench_analytics --sets 100000 1000000
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app.services import analytics
+from app.services.prompt_builder import estimated_1rm
+
+EXERCISES = [f"Exercise {i}" for i in range(20)]
+
+
+def make_rows(sets: int):
+    rng = random.Random(7)
+    moment = datetime(2015, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for i in range(sets):
+        if i % 20 == 0: # ~20 sets per session, a session every 1-3 days
+            moment += timedelta(days=rng.choice((1, 1, 2, 3)))
+        rows.append({
+            "exercise_name": rng.choice(EXERCISES), "actual_reps": rng.randint(0, 12),
+            "actual_weight": rng.uniform(20, 180), "rpe": rng.choice((None, 7.0, 8.0, 9.0)),
+            "completed_at": (moment + timedelta(seconds=90 * (i % 20))).isoformat(),
+        })
+    return rows
+
+
+def python_loop(rows):
+    """The per-set reference implementation."""
+    best = defaultdict(float)
+    parsed = []
+    for row in rows:
+        moment = datetime.fromisoformat(row["completed_at"])
+        day = moment.date()
+        week = day - timedelta(days=day.weekday())
+        reps, weight = row["actual_reps"], row["actual_weight"]
+        parsed.append((row["exercise_name"], day, week, reps, weight))
+        if reps > 0:
+            best[row["exercise_name"]] = max(best[row["exercise_name"]], estimated_1rm(weight, reps))
+    volume, sets, relative, counted_reps, days = defaultdict(float), defaultdict(int), defaultdict(float), defaultdict(int), defaultdict(set)
+    for exercise, day, week, reps, weight in parsed:
+        volume[week] += reps * weight
+        sets[week] += 1
+        days[week].add(day)
+        if reps > 0 and best[exercise] > 0:
+            relative[week] += reps * weight / best[exercise]
+            counted_reps[week] += reps
+    weeks = []
+    week = min(volume)
+    while week <= max(volume):
+        weeks.append(week)
+        week += timedelta(weeks=1)
+    series = [volume.get(week, 0.0) for week in weeks]
+    rolling = [sum(series[max(0, i - 3):i + 1]) / len(series[max(0, i - 3):i + 1]) for i in range(len(series))]
+    change = [None] + [(b - a) / a if a else None for a, b in zip(series, series[1:])]
+    intensity = [relative[week] / counted_reps[week] if counted_reps[week] else None for week in weeks]
+    trained = sorted({day for _, day, _, _, _ in parsed})
+    longest = run = 1
+    for previous, day in zip(trained, trained[1:]):
+        run = run + 1 if (day - previous).days == 1 else 1
+        longest = max(longest, run)
+    return {"volume": series, "rolling": rolling, "change": change, "intensity": intensity,
+            "trained_days": [len(days[week]) for week in weeks], "longest": longest}
+
+
+def kernel(logs):
+    summary = analytics.weekly_summary(logs)
+    return summary, analytics.best_e1rm_by_exercise(logs), analytics.streaks(logs.day)
+
+
+def timed(fn, repeat=3):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return min(samples), result
+
+
+def main(set_counts) -> None:
+    print(f"{'sets':>10} {'python loop':>12} {'load arrays':>12} {'kernel':>10} {'speedup':>8}  weeks")
+    for sets in set_counts:
+        rows = make_rows(sets)
+        loop_seconds, expected = timed(lambda: python_loop(rows), repeat=1 if sets >= 1_000_000 else 3)
+        load_seconds, logs = timed(lambda: analytics.LogColumns.from_rows(rows), repeat=1)
+        kernel_seconds, (summary, _, streak) = timed(lambda: kernel(logs))
+        assert np.allclose(summary["volume"], expected["volume"])
+        assert np.allclose(summary["volume_rolling"], expected["rolling"])
+        assert list(summary["trained_days"]) == expected["trained_days"] and streak["longest"] == expected["longest"]
+        assert np.allclose(summary["intensity"], [np.nan if value is None else value for value in expected["intensity"]], equal_nan=True)
+        print(
+            f"{sets:>10,} {loop_seconds * 1000:>9.0f} ms {load_seconds * 1000:>9.0f} ms {kernel_seconds * 1000:>7.1f} ms "
+            f"{loop_seconds / kernel_seconds:>7.0f}x  {len(summary['week_start'])}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sets", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+    main(args.sets)
@@ -0,0 +1,72 @@
+"""
+Micro-benchmark for Supabase JWT verification in get_current_user_id.
+
+  legacy     - the previous per-request path: read SUPABASE_URL / SUPABASE_JWT_SECRET from
+               os.environ and fully decode + verify the token every call.
+  cold       - TokenVerifier with every token distinct (signature check on each call).
+  warm       - TokenVerifier with the same token repeated (claims cache hit).
+  es256 cold - TokenVerifier verifying asymmetric tokens against a JWKS key by kid.
+
+Usage (from apps/api):
+    python -m benchmarks.bench_jwt_verify --iterations 20000
+"""
+import argparse
+import json
+import os
+import time
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from app.core.token_verifier import TokenVerifier
+
+SUPABASE_URL = "http://bench.supabase.local"
+ISSUER = f"{SUPABASE_URL}/auth/v1"
+SECRET = "bench-jwt-secret-with-at-least-32-bytes!"
+
+
+def make_token(key, algorithm="HS256", kid=None, sub="user-123"):
+    payload = {"sub": sub, "aud": "authenticated", "iss": ISSUER, "exp": int(time.time()) + 3600}
+    return jwt.encode(payload, key, algorithm=algorithm, headers={"kid": kid} if kid else None)
+
+
+def legacy_verify(token: str) -> dict:
+    supabase_url = os.environ.get("SUPABASE_URL")
+    jwt_secret = os.environ.get("SUPABASE_JWT_SECRET")
+    return jwt.decode(token, jwt_secret, algorithms=["HS256"], audience="authenticated", issuer=f"{supabase_url}/auth/v1")
+
+
+def run(label: str, verify, tokens) -> None:
+    started = time.perf_counter()
+    for token in tokens:
+        verify(token)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<12} {len(tokens) / elapsed:>12,.0f} verifications/s   {elapsed / len(tokens) * 1e6:>8.2f} us/op")
+
+
+def main(iterations: int) -> None:
+    os.environ["SUPABASE_URL"] = SUPABASE_URL
+    os.environ["SUPABASE_JWT_SECRET"] = SECRET
+
+    distinct = [make_token(SECRET, sub=f"user-{i}") for i in range(iterations)]
+    repeated = [distinct[0]] * iterations
+
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    public_jwk = json.loads(jwt.algorithms.ECAlgorithm.to_jwk(private_key.public_key()))
+    public_jwk.update({"kid": "bench", "alg": "ES256"})
+    es_tokens = [make_token(private_key, "ES256", kid="bench", sub=f"user-{i}") for i in range(max(1, iterations // 10))]
+
+    print(f"{iterations} HS256 tokens, {len(es_tokens)} ES256 tokens\n")
+    run("legacy", legacy_verify, repeated)
+    run("cold", TokenVerifier(issuer=ISSUER, hs256_secret=SECRET, cache_size=iterations).verify, distinct)
+    run("warm", TokenVerifier(issuer=ISSUER, hs256_secret=SECRET).verify, repeated)
+
+    es_verifier = TokenVerifier(issuer=ISSUER, jwks_url=f"{ISSUER}/.well-known/jwks.json", cache_size=len(es_tokens))
+    es_verifier.load_jwks({"keys": [public_jwk]})
+    run("es256 cold", es_verifier.verify, es_tokens)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    main(parser.parse_args().iterations)
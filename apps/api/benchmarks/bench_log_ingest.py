@@ -0,0 +1,122 @@
+"""
+Benchmark for POST /logs/bulk ingestion at 10k sets per call.
+
+Compares the previous single-request insert with LogService's chunked, idempotent upsert, then
+replays the same session to show that nothing is stored twice. Supabase is replaced by an
+in-process PostgREST stand-in that adds a fixed round trip plus a per-row cost and keeps the
+inserted ids, so duplicates are detected as they would be by the real `on_conflict=id` upsert.
+
+Usage (from apps/api):
+    python -m benchmarks.bench_log_ingest --sets 10000 --rtt-ms 25 --row-us 20
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import httpx
+from supabase import AsyncClient, AsyncClientOptions
+
+from app.models.workout_log import WorkoutLogCreate
+from app.services.log_service import LogService
+
+USER_ID = uuid4()
+
+
+class WorkoutLogsTransport(httpx.AsyncBaseTransport):
+    """WorkoutLogs over PostgREST: inserts rows, ignoring ids it already has when asked to."""
+
+    def __init__(self, rtt: float, row_cost: float):
+        self.rtt = rtt
+        self.row_cost = row_cost
+        self.ids = set()
+        self.rows_stored = 0
+        self.requests = 0
+        self.max_body_bytes = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        self.requests += 1
+        self.max_body_bytes = max(self.max_body_bytes, len(body))
+        rows = json.loads(body)
+        await asyncio.sleep(self.rtt + self.row_cost * len(rows))
+        if "ignore-duplicates" in request.headers.get("prefer", ""):
+            rows = [row for row in rows if row["id"] not in self.ids]
+        self.ids.update(row.get("id") for row in rows)
+        self.rows_stored += len(rows)
+        return httpx.Response(201, json=rows, request=request)
+
+
+def make_client(transport: WorkoutLogsTransport) -> AsyncClient:
+    return AsyncClient(
+        "http://bench.supabase.local",
+        "bench_key",
+        options=AsyncClientOptions(
+            httpx_client=httpx.AsyncClient(transport=transport),
+            auto_refresh_token=False,
+            persist_session=False,
+        ),
+    )
+
+
+def make_session(sets: int):
+    started = datetime(2025, 12, 10, 9, tzinfo=timezone.utc)
+    return [
+        WorkoutLogCreate(
+            id=uuid4(), exercise_name=f"Exercise {i % 12}", set_number=i % 5 + 1, actual_reps=8,
+            actual_weight=60.0, rpe=8.0, completed_at=started + timedelta(seconds=90 * i),
+        )
+        for i in range(sets)
+    ]
+
+
+async def legacy_bulk_insert(supabase: AsyncClient, entries) -> None:
+    """The previous path: every row in one insert, with completed_at overwritten."""
+    rows = []
+    for entry in entries:
+        row = entry.model_dump(mode="json")
+        row["user_id"] = str(USER_ID)
+        row["completed_at"] = datetime.utcnow().isoformat()
+        rows.append(row)
+    await supabase.table("WorkoutLogs").insert(rows).execute()
+
+
+async def measure(label: str, transport: WorkoutLogsTransport, operation, sets: int) -> None:
+    requests_before, stored_before = transport.requests, transport.rows_stored
+    started = time.perf_counter()
+    results = await operation()
+    elapsed = time.perf_counter() - started
+    statuses = {}
+    for result in results or []:
+        statuses[result.status] = statuses.get(result.status, 0) + 1
+    print(
+        f"{label:<30} {elapsed * 1000:>8.0f} ms  {sets / elapsed:>9,.0f} sets/s  "
+        f"requests: {transport.requests - requests_before:>3}  stored: {transport.rows_stored - stored_before:>6}  "
+        f"largest body: {transport.max_body_bytes / 1024:>7.0f} KiB  {statuses or ''}"
+    )
+
+
+async def main(sets: int, rtt_ms: float, row_us: float) -> None:
+    print(f"{sets} sets per call, simulated RTT {rtt_ms} ms + {row_us} us/row\n")
+    session = make_session(sets)
+
+    legacy = WorkoutLogsTransport(rtt_ms / 1000, row_us / 1e6)
+    legacy_client = make_client(legacy)
+    await measure("legacy single insert", legacy, lambda: legacy_bulk_insert(legacy_client, session), sets)
+    await measure("legacy replay", legacy, lambda: legacy_bulk_insert(legacy_client, session), sets)
+
+    chunked = WorkoutLogsTransport(rtt_ms / 1000, row_us / 1e6)
+    service = LogService(supabase=make_client(chunked))
+    await measure("chunked upsert", chunked, lambda: service.create_bulk_log_entries(session, USER_ID), sets)
+    await measure("chunked upsert replay", chunked, lambda: service.create_bulk_log_entries(session, USER_ID), sets)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sets", type=int, default=10_000)
+    parser.add_argument("--rtt-ms", type=float, default=25.0, help="Simulated Supabase round-trip latency")
+    parser.add_argument("--row-us", type=float, default=20.0, help="Simulated database cost per row")
+    args = parser.parse_args()
+    asyncio.run(main(args.sets, args.rtt_ms, args.row_us))
@@ -0,0 +1,103 @@
+"""
+Benchmark for GET /logs page latency at 1M sets per user.
+
+Compares OFFSET paging with the (completed_at, id) keyset paging LogService.list_logs uses, at
+increasing page depths, for all sets and for one exercise. Runs the SQL those PostgREST queries
+translate to against an in-process SQLite copy of WorkoutLogs carrying the indexes from
+supabase/migrations/20251214090000_workout_log_query_indexes.sql (SQLite has no INCLUDE, so the
+covering columns are appended to the exercise index key instead). Absolute numbers differ from
+Postgres; the shape (flat for keyset, linear in depth for OFFSET) is the point.
+
+Usage (from apps/api):
+    python -m benchmarks.bench_log_query --rows 1000000 --users 2 --page-size 100
+"""
+import argparse
+import random
+import sqlite3
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+EXERCISES = [f"Exercise {i}" for i in range(12)]
+COLUMNS = "id, completed_at, exercise_name, set_number, actual_reps, actual_weight, rpe"
+
+
+def build(rows: int, users: int) -> tuple:
+    db = sqlite3.connect(":memory:")
+    db.execute(
+        'create table "WorkoutLogs" (id text primary key, user_id text, plan_id text, exercise_name text, '
+        "set_number int, actual_reps int, actual_weight real, rpe real, completed_at text)"
+    )
+    db.execute('create index workout_logs_user_completed_idx on "WorkoutLogs" (user_id, completed_at, id)')
+    db.execute(
+        'create index workout_logs_user_exercise_completed_idx on "WorkoutLogs" '
+        "(user_id, exercise_name, completed_at, id, set_number, actual_reps, actual_weight, rpe)"
+    )
+    user_ids = [str(uuid.uuid4()) for _ in range(users)]
+    started = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    rng = random.Random(7)
+    for user_id in user_ids:
+        batch = []
+        for i in range(rows):
+            completed_at = (started + timedelta(seconds=60 * i)).isoformat()
+            batch.append((str(uuid.uuid4()), user_id, None, rng.choice(EXERCISES), i % 5 + 1, 8, 60.0, 8.0, completed_at))
+            if len(batch) == 50_000:
+                db.executemany('insert into "WorkoutLogs" values (?, ?, ?, ?, ?, ?, ?, ?, ?)', batch)
+                batch.clear()
+        db.executemany('insert into "WorkoutLogs" values (?, ?, ?, ?, ?, ?, ?, ?, ?)', batch)
+    db.execute("analyze")
+    return db, user_ids[0]
+
+
+def timed(db, sql: str, params: tuple, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        db.execute(sql, params).fetchall()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def run(db, user_id: str, exercise, depths, page_size: int, repeat: int) -> None:
+    where = "user_id = ?" + (" and exercise_name = ?" if exercise else "")
+    base = (user_id, exercise) if exercise else (user_id,)
+    order = "order by completed_at desc, id desc"
+    offset_sql = f'select {COLUMNS} from "WorkoutLogs" where {where} {order} limit ? offset ?'
+    keyset_sql = (
+        f'select {COLUMNS} from "WorkoutLogs" where {where} '
+        f"and completed_at <= ? and (completed_at < ? or (completed_at = ? and id < ?)) {order} limit ?"
+    )
+    total = db.execute(f'select count(*) from "WorkoutLogs" where {where}', base).fetchone()[0]
+    print(f"\n{exercise or 'all exercises'}: {total:,} sets")
+    print(f"{'depth':>10} {'OFFSET':>12} {'keyset':>12}")
+    for depth in sorted(set(depths)):
+        if depth >= total:
+            continue
+        offset_ms = timed(db, offset_sql, base + (page_size, depth), repeat) * 1000
+        if depth == 0:
+            keyset_ms = timed(db, f'select {COLUMNS} from "WorkoutLogs" where {where} {order} limit ?', base + (page_size,), repeat) * 1000
+        else:
+            completed_at, log_id = db.execute(f'select completed_at, id from "WorkoutLogs" where {where} {order} limit 1 offset ?',
+                                              base + (depth - 1,)).fetchone()
+            keyset_ms = timed(db, keyset_sql, base + (completed_at, completed_at, completed_at, log_id, page_size), repeat) * 1000
+        print(f"{depth:>10,} {offset_ms:>9.2f} ms {keyset_ms:>9.2f} ms")
+
+
+def main(rows: int, users: int, page_size: int, repeat: int) -> None:
+    started = time.perf_counter()
+    db, user_id = build(rows, users)
+    print(f"{users} users x {rows:,} sets loaded in {time.perf_counter() - started:.1f} s; page size {page_size}")
+    depths = [0, 1_000, 10_000, 100_000, rows // 2, rows - page_size]
+    run(db, user_id, None, depths, page_size, repeat)
+    run(db, user_id, EXERCISES[3], [depth // len(EXERCISES) for depth in depths], page_size, repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Sets per user")
+    parser.add_argument("--users", type=int, default=2)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.rows, args.users, args.page_size, args.repeat)
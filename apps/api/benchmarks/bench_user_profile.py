@@ -0,0 +1,118 @@
+"""
+Round-trip benchmark for GET/PUT /users/me.
+
+Compares the old sequential PostgREST access pattern (three reads per profile fetch, up to five
+writes plus a full re-read per update) with UserService's embedded-select read and single-RPC
+update. Supabase is replaced by an in-process transport that adds a fixed per-request latency,
+so the numbers isolate round trips rather than database work.
+
+Usage (from apps/api):
+    python -m benchmarks.bench_user_profile --rtt-ms 25 --iterations 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from uuid import uuid4
+
+import httpx
+from supabase import AsyncClient, AsyncClientOptions
+
+from app.models.user import UserProfileUpdate
+from app.services.user_service import UserService, profile_cache
+
+USER_ID = uuid4()
+PROFILE_ROW = {
+    "id": str(USER_ID),
+    "email": "bench@example.com",
+    "unit_preference": "kg",
+    "updated_at": None,
+    "goals": [{"primary_goal": "Build Muscle", "training_frequency": 4, "training_duration": 60, "injuries_limitations": None, "created_at": "2025-12-01T10:00:00"}],
+    "equipment": [{"name": "Dumbbells"}, {"name": "Bench"}],
+}
+PROFILE_UPDATE = UserProfileUpdate(unit_preference="lbs", training_frequency=5, equipment=["Dumbbells", "Barbell"])
+
+
+class LatencyTransport(httpx.AsyncBaseTransport):
+    """Answers every PostgREST request after `rtt` seconds and counts round trips."""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.requests = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        await asyncio.sleep(self.rtt)
+        if request.url.path.startswith("/rest/v1/rpc/"):
+            return httpx.Response(200, json=PROFILE_ROW, request=request)
+        if request.method == "GET":
+            return httpx.Response(200, json=[PROFILE_ROW], request=request)
+        return httpx.Response(201, json=[], request=request)
+
+
+def make_client(transport: LatencyTransport) -> AsyncClient:
+    return AsyncClient(
+        "http://bench.supabase.local",
+        "bench_key",
+        options=AsyncClientOptions(
+            httpx_client=httpx.AsyncClient(transport=transport),
+            auto_refresh_token=False,
+            persist_session=False,
+        ),
+    )
+
+
+async def legacy_get_profile(supabase: AsyncClient, user_id) -> None:
+    """The previous read path: users, latest goal and equipment as three sequential requests."""
+    await supabase.from_('users').select('*').eq('id', str(user_id)).limit(1).execute()
+    await supabase.from_('goals').select('*').eq('user_id', str(user_id)).order('created_at', desc=True).limit(1).execute()
+    await supabase.from_('equipment').select('name').eq('user_id', str(user_id)).execute()
+
+
+async def legacy_update_profile(supabase: AsyncClient, user_id, update: UserProfileUpdate) -> None:
+    """The previous write path: per-table writes followed by a full profile re-read."""
+    if update.unit_preference is not None:
+        await supabase.from_('users').update({'unit_preference': update.unit_preference}).eq('id', str(user_id)).execute()
+    goal_fields = update.model_dump(include={'primary_goal', 'training_frequency', 'training_duration', 'injuries_limitations'}, exclude_none=True)
+    if goal_fields:
+        await supabase.from_('goals').select('id').eq('user_id', str(user_id)).order('created_at', desc=True).limit(1).execute()
+        await supabase.from_('goals').update(goal_fields).eq('user_id', str(user_id)).execute()
+    if update.equipment is not None:
+        await supabase.from_('equipment').delete().eq('user_id', str(user_id)).execute()
+        await supabase.from_('equipment').insert([{"user_id": str(user_id), "name": name} for name in update.equipment]).execute()
+    await legacy_get_profile(supabase, user_id)
+
+
+async def measure(label: str, operation, rtt: float, iterations: int) -> None:
+    transport = LatencyTransport(rtt)
+    supabase = make_client(transport)
+    timings = []
+    for _ in range(iterations):
+        # Measure the database path, not the profile cache in front of it.
+        profile_cache.clear()
+        started = time.perf_counter()
+        await operation(supabase)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+    print(
+        f"{label:<28} round trips/op: {transport.requests / iterations:>4.1f}   "
+        f"p50: {statistics.median(timings):>7.1f} ms   p95: {p95:>7.1f} ms"
+    )
+
+
+async def main(rtt_ms: float, iterations: int) -> None:
+    rtt = rtt_ms / 1000
+    print(f"Simulated Supabase RTT: {rtt_ms} ms, {iterations} iterations per case\n")
+    await measure("GET  legacy (sequential)", lambda s: legacy_get_profile(s, USER_ID), rtt, iterations)
+    await measure("GET  embedded select", lambda s: UserService(supabase=s).get_user_profile(USER_ID), rtt, iterations)
+    await measure("PUT  legacy (sequential)", lambda s: legacy_update_profile(s, USER_ID, PROFILE_UPDATE), rtt, iterations)
+    await measure("PUT  update_user_profile RPC", lambda s: UserService(supabase=s).update_user_profile(USER_ID, PROFILE_UPDATE), rtt, iterations)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rtt-ms", type=float, default=25.0, help="Simulated Supabase round-trip latency")
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.rtt_ms, args.iterations))
@@ -0,0 +1,62 @@
+"""
+Fake OpenAI-compatible chat completions server for load-testing the AI orchestrator.
+
+Serves POST /v1/chat/completions with a valid workout-plan JSON after a configurable latency and
+fails a configurable fraction of calls with 429 or 503. Run it standalone and point the API at it:
+
+    uvicorn benchmarks.fake_llm:app --port 8089
+    OPENAI_BASE_URL=http://localhost:8089/v1 OPENAI_API_KEY=fake uvicorn app.main:app
+
+or use it in-process through `httpx.ASGITransport(app=...)` (see bench_ai_orchestrator.py).
+Tune with FAKE_LLM_LATENCY_MS, FAKE_LLM_JITTER_MS, FAKE_LLM_429_RATE and FAKE_LLM_5XX_RATE.
+"""
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import date
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+
+def make_app(latency_ms: float = 800.0, jitter_ms: float = 400.0, rate_limit_rate: float = 0.0, server_error_rate: float = 0.0) -> FastAPI:
+    fake = FastAPI()
+    fake.state.requests = 0
+
+    @fake.post("/v1/chat/completions")
+    async def chat_completions(body: dict):
+        fake.state.requests += 1
+        await asyncio.sleep(max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000)
+
+        roll = random.random()
+        if roll < rate_limit_rate:
+            return JSONResponse({"error": {"message": "Rate limit reached", "type": "rate_limit"}}, status_code=429, headers={"retry-after": "0.2"})
+        if roll < rate_limit_rate + server_error_rate:
+            return JSONResponse({"error": {"message": "Overloaded", "type": "server_error"}}, status_code=503)
+
+        plan = {
+            "user_id": "fake",
+            "plan_date": date.today().isoformat(),
+            "workout_days": [{"day_name": "Today", "exercises": [{"name": "Back Squat", "sets": 4, "reps": "6-8", "rpe": 8}]}],
+            "ai_explanation": None,
+        }
+        return {
+            "id": f"chatcmpl-fake-{fake.state.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": json.dumps(plan)}}],
+            "usage": {"prompt_tokens": 600, "completion_tokens": 250, "total_tokens": 850},
+        }
+
+    return fake
+
+
+app = make_app(
+    latency_ms=float(os.getenv("FAKE_LLM_LATENCY_MS", "800")),
+    jitter_ms=float(os.getenv("FAKE_LLM_JITTER_MS", "400")),
+    rate_limit_rate=float(os.getenv("FAKE_LLM_429_RATE", "0.05")),
+    server_error_rate=float(os.getenv("FAKE_LLM_5XX_RATE", "0.02")),
+)
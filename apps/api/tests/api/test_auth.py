@@ -40,6 +40,8 @@ async def test_delete_account_success(mock_admin_supabase_client):
     mock_admin_supabase_client.from_.assert_any_call("Goals")
     mock_admin_supabase_client.from_.assert_any_call("WorkoutLogs")
     mock_admin_supabase_client.from_.assert_any_call("Equipment")
+    for table in ("WorkoutDailyRollups", "WorkoutWeeklyRollups", "WorkoutRollupVersions", "WeeklyReviewSnapshots"):
+        mock_admin_supabase_client.from_.assert_any_call(table)
     # Verify call to delete user from Supabase Auth
     mock_admin_supabase_client.auth.admin.delete_user.assert_called_with("test_user_id_to_delete")
 
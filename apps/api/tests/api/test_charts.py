@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.dashboard import get_dashboard_service
+from app.dependencies.auth_middleware import get_current_user_id
+from app.main import create_app
+from app.services.charts import sparklines
+from app.services.dashboard_service import DashboardService
+from app.services.rollup_service import week_start
+
+USER_ID = uuid4()
+
+
+def no_snapshots():
+    snapshots = MagicMock()
+    snapshots.get = AsyncMock(return_value=None)
+    return snapshots
+
+
+@pytest.fixture(scope="module")
+def app():
+    app = create_app()
+    app.dependency_overrides[get_current_user_id] = lambda: USER_ID
+    yield app
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture(scope="module")
+def client(app):
+    with TestClient(app) as c:
+        yield c
+
+
+def test_chart_is_served_with_etag_and_revalidated(client):
+    response = client.get("/api/v1/dashboard/charts/volume.svg", params={"values": "100,250.5,180"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/svg+xml"
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "private, max-age=31536000, immutable" # never in a shared cache
+
+    renders = sparklines.renders
+    revalidated = client.get("/api/v1/dashboard/charts/volume.svg", params={"values": "100,250.5,180"},
+                             headers={"If-None-Match": f'W/"other", {etag}'})
+    assert revalidated.status_code == 304 and revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+    assert sparklines.renders == renders # not rendered again
+
+
+def test_chart_rejects_bad_requests(client):
+    assert client.get("/api/v1/dashboard/charts/volume.svg", params={"values": "1,x"}).status_code == 400
+    assert client.get("/api/v1/dashboard/charts/volume.svg", params={"values": "nan"}).status_code == 400
+    assert client.get("/api/v1/dashboard/charts/volume.svg", params={"values": ",".join(["1"] * 105)}).status_code == 400
+    assert client.get("/api/v1/dashboard/charts/pie.svg").status_code == 404
+
+
+def test_dashboard_links_charts_instead_of_embedding_them(app, client):
+    rollups = MagicMock()
+    rollups.version = AsyncMock(return_value=0)
+    rollups.daily = AsyncMock(return_value=[])
+    last_week = week_start(datetime.now(timezone.utc).date()) - timedelta(weeks=1) # the reviewed week
+    rollups.weekly = AsyncMock(return_value=[{"week_start": last_week.isoformat(), "exercise_name": "Squat", "sets": 5,
+                                              "reps": 25, "volume": 2500.0, "top_weight": 100.0, "best_e1rm": 120.0}])
+    app.dependency_overrides[get_dashboard_service] = lambda: DashboardService(rollups=rollups, snapshots=no_snapshots())
+    try:
+        response = client.get("/api/v1/dashboard/")
+    finally:
+        app.dependency_overrides.pop(get_dashboard_service, None)
+
+    assert response.status_code == 200
+    volume = response.json()["weekly_review"]["volume"]
+    assert volume["chart_svg"] == ""
+    assert volume["chart_url"].startswith("http://testserver/api/v1/dashboard/charts/volume.svg?values=")
+    assert volume["chart_url"].endswith(",2500")
+    assert client.get(volume["chart_url"]).status_code == 200
+
+
+def test_dashboard_is_revalidated_against_the_rollup_version(app, client):
+    rollups = MagicMock()
+    rollups.version = AsyncMock(return_value=7)
+    rollups.daily = AsyncMock(return_value=[])
+    rollups.weekly = AsyncMock(return_value=[])
+    app.dependency_overrides[get_dashboard_service] = lambda: DashboardService(rollups=rollups, snapshots=no_snapshots())
+    try:
+        first = client.get("/api/v1/dashboard/")
+        etag = first.headers["etag"]
+        unchanged = client.get("/api/v1/dashboard/", headers={"If-None-Match": etag})
+        rollups.version.return_value = 8 # a new set was logged
+        changed = client.get("/api/v1/dashboard/", headers={"If-None-Match": etag})
+    finally:
+        app.dependency_overrides.pop(get_dashboard_service, None)
+
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "private, no-cache"
+    assert unchanged.status_code == 304 and unchanged.content == b""
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert rollups.weekly.await_count == 2 # the 304 never read the rollups
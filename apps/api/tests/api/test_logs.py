@@ -0,0 +1,50 @@
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.dependencies.auth_middleware import get_current_user_id
+from app.main import create_app
+from app.models.workout_log import WorkoutLogPage
+from app.services.log_service import InvalidCursor
+
+USER_ID = uuid4()
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = create_app()
+    app.dependency_overrides[get_current_user_id] = lambda: USER_ID
+    with TestClient(app) as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def list_logs():
+    with patch("app.api.logs.log_service.list_logs", new_callable=AsyncMock) as mock:
+        yield mock
+
+
+def test_list_logs_passes_filters_and_fields(client, list_logs):
+    plan_id = uuid4()
+    list_logs.return_value = WorkoutLogPage(items=[{"id": str(uuid4()), "completed_at": "2025-12-10T09:00:00+00:00"}], next_cursor="next")
+
+    response = client.get("/api/v1/logs/", params={
+        "exercise": "Squat", "plan_id": str(plan_id), "since": "2025-12-01T00:00:00Z",
+        "fields": "actual_weight, rpe", "limit": 50, "cursor": "abc",
+    })
+
+    assert response.status_code == 200
+    assert response.json()["next_cursor"] == "next"
+    kwargs = list_logs.await_args.kwargs
+    assert list_logs.await_args.args == (USER_ID,)
+    assert (kwargs["exercise_name"], kwargs["plan_id"], kwargs["fields"]) == ("Squat", plan_id, ["actual_weight", "rpe"])
+    assert (kwargs["limit"], kwargs["cursor"], kwargs["until"]) == (50, "abc", None)
+
+
+def test_list_logs_rejects_bad_cursor_and_page_size(client, list_logs):
+    list_logs.side_effect = InvalidCursor("Invalid log cursor: bad")
+    assert client.get("/api/v1/logs/", params={"cursor": "bad"}).status_code == 400
+    assert client.get("/api/v1/logs/", params={"limit": 100_000}).status_code == 422
@@ -1,141 +1,427 @@
 import pytest
 from fastapi.testclient import TestClient as FastAPIClient
 from app.main import create_app
-from app.api.plans import get_ai_orchestrator_service, get_plan_service
-from unittest.mock import AsyncMock, patch
+from app.api.plans import get_ai_orchestrator_service, get_plan_job_queue_service, get_plan_service
+from app.services.plan_jobs import JobQueueFull
+from app.services.ai_orchestrator import AIServiceTimeout
+from app.services.plan_repair import TruncatedResponse
+from app.dependencies.auth_middleware import get_current_user_id
+from unittest.mock import AsyncMock, MagicMock, patch
 from app.models.workout_plan import PlanGenerationRequest, PlanGenerationResponse, WorkoutPlanModel, WorkoutDay, Exercise, PlanGenerationContext
 from datetime import date
+import asyncio
+import json
+import time
 
 # Fixture to create a TestClient for testing FastAPI endpoints
 @pytest.fixture(scope="module")
-def client():
+def app():
     app = create_app()
+    app.dependency_overrides[get_current_user_id] = lambda: "test_user_id"
+    yield app
+    app.dependency_overrides.clear()
+
+@pytest.fixture(scope="module")
+def client(app):
     with FastAPIClient(app) as c:
         yield c
-    app.dependency_overrides.clear()
+
+@pytest.fixture
+def mock_services(app):
+    # The orchestrator is a process-wide singleton, so swap the dependencies rather than the classes.
+    mock_ai_instance = MagicMock()
+    mock_plan_instance = MagicMock()
+    mock_plan_instance.get_draft_plan = AsyncMock(return_value=None) # no overnight draft: full generation
+    app.dependency_overrides[get_ai_orchestrator_service] = lambda: mock_ai_instance
+    app.dependency_overrides[get_plan_service] = lambda: mock_plan_instance
+    yield mock_ai_instance, mock_plan_instance
+    app.dependency_overrides.pop(get_ai_orchestrator_service, None)
+    app.dependency_overrides.pop(get_plan_service, None)
 
 
 
 
 
-def test_generate_plan_success(client: FastAPIClient):
-    with patch('app.api.plans.AIOrchestratorService') as MockAIOrchestratorService, \
-         patch('app.api.plans.PlanService') as MockPlanService:
-        mock_ai_instance = MockAIOrchestratorService.return_value
-        mock_plan_instance = MockPlanService.return_value
+def test_generate_plan_success(client: FastAPIClient, mock_services):
+    mock_ai_instance, mock_plan_instance = mock_services
 
-        mock_ai_instance.generate_workout_plan = AsyncMock()
-        mock_plan_instance.store_workout_plan = AsyncMock()
+    mock_ai_instance.generate_workout_plan = AsyncMock()
+    mock_plan_instance.store_workout_plan = AsyncMock()
 
-        # Mock AI Orchestrator to return a valid plan
-        mock_workout_plan = WorkoutPlanModel(
-            user_id="test_user_id",
-            plan_date=date.today(),
-            workout_days=[
-                WorkoutDay(day_name="Monday", exercises=[Exercise(name="Mock Squat", sets=3, reps="8-10")])
-            ],
-            ai_explanation="AI generated this plan."
-        )
-        mock_ai_instance.generate_workout_plan.return_value = mock_workout_plan
-        
-        # Mock PlanService to indicate successful storage
-        mock_plan_instance.store_workout_plan.return_value = mock_workout_plan
+    # Mock AI Orchestrator to return a valid plan
+    mock_workout_plan = WorkoutPlanModel(
+        user_id="test_user_id",
+        plan_date=date.today(),
+        workout_days=[
+            WorkoutDay(day_name="Monday", exercises=[Exercise(name="Mock Squat", sets=3, reps="8-10")])
+        ],
+        ai_explanation="AI generated this plan."
+    )
+    mock_ai_instance.generate_workout_plan.return_value = mock_workout_plan
+    
+    # Mock PlanService to indicate successful storage
+    mock_plan_instance.store_workout_plan.return_value = mock_workout_plan
 
-        request_data = {
-            "context": {
-                "mood": "motivated",
-                "energy": "high"
-            }
+    request_data = {
+        "context": {
+            "mood": "motivated",
+            "energy": "high"
         }
+    }
 
-        response = client.post("/api/v1/plans/generate", json=request_data)
-        
-        assert response.status_code == 200
-        response_json = response.json()
-        assert response_json["message"] == "Workout plan generated successfully"
-        assert response_json["data"]["user_id"] == "test_user_id"
-        assert response_json["data"]["ai_explanation"] == "AI generated this plan."
-        mock_ai_instance.generate_workout_plan.assert_awaited_once()
-        mock_plan_instance.store_workout_plan.assert_awaited_once()
-
-def test_generate_plan_ai_validation_error(client: FastAPIClient):
-    with patch('app.api.plans.AIOrchestratorService') as MockAIOrchestratorService, \
-         patch('app.api.plans.PlanService') as MockPlanService:
-        mock_ai_instance = MockAIOrchestratorService.return_value
-        mock_plan_instance = MockPlanService.return_value
-
-        mock_ai_instance.generate_workout_plan = AsyncMock(side_effect=ValueError("AI response validation failed"))
-        mock_plan_instance.store_workout_plan = AsyncMock() # Ensure this is an AsyncMock
-
-        request_data = {
-            "context": {
-                "mood": "bad"
-            }
+    response = client.post("/api/v1/plans/generate", json=request_data)
+    
+    assert response.status_code == 200
+    response_json = response.json()
+    assert response_json["message"] == "Workout plan generated successfully"
+    assert response_json["data"]["user_id"] == "test_user_id"
+    assert response_json["data"]["ai_explanation"] == "AI generated this plan."
+    mock_ai_instance.generate_workout_plan.assert_awaited_once()
+    mock_plan_instance.store_workout_plan.assert_awaited_once()
+
+def test_generate_plan_ai_validation_error(client: FastAPIClient, mock_services):
+    mock_ai_instance, mock_plan_instance = mock_services
+
+    mock_ai_instance.generate_workout_plan = AsyncMock(side_effect=ValueError("AI response validation failed"))
+    mock_plan_instance.store_workout_plan = AsyncMock() # Ensure this is an AsyncMock
+
+    request_data = {
+        "context": {
+            "mood": "bad"
         }
+    }
 
+    with patch("app.services.plan_jobs.settings.PLAN_RULE_FALLBACK", False):
         response = client.post("/api/v1/plans/generate", json=request_data)
-        
-        assert response.status_code == 422
-        assert "AI response validation failed" in response.json()["detail"]
-        mock_ai_instance.generate_workout_plan.assert_awaited_once()
-        mock_plan_instance.store_workout_plan.assert_not_awaited() # Should not call store if AI fails
-
-def test_generate_plan_storage_failure(client: FastAPIClient):
-    with patch('app.api.plans.AIOrchestratorService') as MockAIOrchestratorService, \
-         patch('app.api.plans.PlanService') as MockPlanService:
-        mock_ai_instance = MockAIOrchestratorService.return_value
-        mock_plan_instance = MockPlanService.return_value
-
-        mock_ai_instance.generate_workout_plan = AsyncMock()
-        mock_plan_instance.store_workout_plan = AsyncMock()
-
-        mock_workout_plan = WorkoutPlanModel(
-            user_id="test_user_id",
-            plan_date=date.today(),
-            workout_days=[
-                WorkoutDay(day_name="Monday", exercises=[Exercise(name="Mock Squat", sets=3, reps="8-10")])
-            ],
-            ai_explanation="AI generated this plan."
-        )
-        mock_ai_instance.generate_workout_plan.return_value = mock_workout_plan
-        mock_plan_instance.store_workout_plan.return_value = None # Simulate storage failure
-
-        request_data = {
-            "context": {
-                "mood": "motivated"
-            }
+    
+    assert response.status_code == 422
+    assert "AI response validation failed" in response.json()["detail"]
+    mock_ai_instance.generate_workout_plan.assert_awaited_once()
+    mock_plan_instance.store_workout_plan.assert_not_awaited() # Should not call store if AI fails
+
+def test_generate_plan_storage_failure(client: FastAPIClient, mock_services):
+    mock_ai_instance, mock_plan_instance = mock_services
+
+    mock_ai_instance.generate_workout_plan = AsyncMock()
+    mock_plan_instance.store_workout_plan = AsyncMock()
+
+    mock_workout_plan = WorkoutPlanModel(
+        user_id="test_user_id",
+        plan_date=date.today(),
+        workout_days=[
+            WorkoutDay(day_name="Monday", exercises=[Exercise(name="Mock Squat", sets=3, reps="8-10")])
+        ],
+        ai_explanation="AI generated this plan."
+    )
+    mock_ai_instance.generate_workout_plan.return_value = mock_workout_plan
+    mock_plan_instance.store_workout_plan.return_value = None # Simulate storage failure
+
+    request_data = {
+        "context": {
+            "mood": "motivated"
         }
+    }
 
-        response = client.post("/api/v1/plans/generate", json=request_data)
-        
-        assert response.status_code == 500
-        assert "Failed to generate or store workout plan" in response.json()["detail"]
-        mock_ai_instance.generate_workout_plan.assert_awaited_once()
-        mock_plan_instance.store_workout_plan.assert_awaited_once()
-
-def test_generate_plan_general_exception(client: FastAPIClient):
-    with patch('app.api.plans.AIOrchestratorService') as MockAIOrchestratorService, \
-         patch('app.api.plans.PlanService') as MockPlanService:
-        mock_ai_instance = MockAIOrchestratorService.return_value
-        mock_plan_instance = MockPlanService.return_value
-
-        mock_ai_instance.generate_workout_plan = AsyncMock(side_effect=Exception("Unknown AI error"))
-        mock_plan_instance.store_workout_plan = AsyncMock() # Ensure this is an AsyncMock
-
-        request_data = {
-            "context": {
-                "mood": "motivated"
-            }
+    response = client.post("/api/v1/plans/generate", json=request_data)
+    
+    assert response.status_code == 500
+    assert "Failed to generate or store workout plan" in response.json()["detail"]
+    mock_ai_instance.generate_workout_plan.assert_awaited_once()
+    mock_plan_instance.store_workout_plan.assert_awaited_once()
+
+def test_generate_plan_general_exception(client: FastAPIClient, mock_services):
+    mock_ai_instance, mock_plan_instance = mock_services
+
+    mock_ai_instance.generate_workout_plan = AsyncMock(side_effect=Exception("Unknown AI error"))
+    mock_plan_instance.store_workout_plan = AsyncMock() # Ensure this is an AsyncMock
+
+    request_data = {
+        "context": {
+            "mood": "motivated"
         }
+    }
 
-        response = client.post("/api/v1/plans/generate", json=request_data)
-        
-        assert response.status_code == 500
-        assert "Failed to generate or store workout plan" in response.json()["detail"]
-        mock_ai_instance.generate_workout_plan.assert_awaited_once()
-        mock_plan_instance.store_workout_plan.assert_not_awaited()
+    response = client.post("/api/v1/plans/generate", json=request_data)
+    
+    assert response.status_code == 500
+    assert "Failed to generate or store workout plan" in response.json()["detail"]
+    mock_ai_instance.generate_workout_plan.assert_awaited_once()
+    mock_plan_instance.store_workout_plan.assert_not_awaited()
+
+def test_generate_plan_ai_timeout_serves_rule_based_plan(client: FastAPIClient, mock_services):
+    mock_ai_instance, mock_plan_instance = mock_services
+    mock_ai_instance.generate_workout_plan = AsyncMock(side_effect=AIServiceTimeout("deadline exceeded"))
+    mock_plan_instance.store_workout_plan = AsyncMock(return_value=True)
+
+    response = client.post("/api/v1/plans/generate", json={"context": {"energy": "low"}})
+
+    assert response.status_code == 200
+    plan = response.json()["data"]
+    assert plan["user_id"] == "test_user_id"
+    assert plan["ai_explanation"].startswith("Rule-based") and "low energy" in plan["ai_explanation"]
+    assert plan["workout_days"][0]["exercises"]
+    mock_plan_instance.store_workout_plan.assert_awaited_once()
+
+def test_generate_plan_unparseable_ai_plan_serves_rule_based_plan(client: FastAPIClient, mock_services):
+    mock_ai_instance, mock_plan_instance = mock_services
+    mock_ai_instance.generate_workout_plan = AsyncMock(
+        side_effect=TruncatedResponse("AI response was cut off before the plan was complete.")
+    )
+    mock_plan_instance.store_workout_plan = AsyncMock(return_value=True)
+
+    response = client.post("/api/v1/plans/generate", json={"context": {}})
+
+    assert response.status_code == 200
+    assert response.json()["data"]["ai_explanation"].startswith("Rule-based")
+    mock_plan_instance.store_workout_plan.assert_awaited_once()
+
+def test_generate_plan_slow_ai_serves_rule_based_plan_within_budget(client: FastAPIClient, mock_services):
+    mock_ai_instance, mock_plan_instance = mock_services
+    finished = []
+
+    async def slow_generation(**kwargs):
+        await asyncio.sleep(0.3)
+        finished.append(True)
+        return WorkoutPlanModel(user_id="ai", plan_date=date.today(), workout_days=[])
+    mock_ai_instance.generate_workout_plan = AsyncMock(side_effect=slow_generation)
+    mock_plan_instance.store_workout_plan = AsyncMock(return_value=True)
+
+    started = time.monotonic()
+    with patch("app.services.plan_jobs.settings.PLAN_RULE_FALLBACK_AFTER_SECONDS", 0.05):
+        response = client.post("/api/v1/plans/generate", json={"context": {}})
+
+    assert response.status_code == 200 and time.monotonic() - started < 0.3
+    assert response.json()["data"]["ai_explanation"].startswith("Rule-based")
+    assert finished == [] # the LLM call was left running, not awaited
+    stored = mock_plan_instance.store_workout_plan.call_args.args[0]
+    assert stored.ai_explanation.startswith("Rule-based")
+
+def test_generate_plan_ai_timeout_without_fallback(client: FastAPIClient, mock_services):
+    mock_ai_instance, mock_plan_instance = mock_services
+    mock_ai_instance.generate_workout_plan = AsyncMock(side_effect=AIServiceTimeout("deadline exceeded"))
+    mock_plan_instance.store_workout_plan = AsyncMock()
+
+    with patch("app.services.plan_jobs.settings.PLAN_RULE_FALLBACK", False):
+        response = client.post("/api/v1/plans/generate", json={"context": {"mood": "motivated"}})
+
+    assert response.status_code == 504
+    mock_plan_instance.store_workout_plan.assert_not_awaited()
 
 def test_read_root(client: FastAPIClient):
     response = client.get("/api/v1/plans/")
     assert response.status_code == 200
-    assert response.json() == {"message": "Plans API is working!"}
\ No newline at end of file
+    assert response.json() == {"message": "Plans API is working!"}
+
+def test_generate_plan_stream_emits_parts_and_stored_plan(client: FastAPIClient, mock_services):
+    mock_ai_instance, mock_plan_instance = mock_services
+    exercise = Exercise(name="Mock Squat", sets=3, reps="8-10")
+    day = WorkoutDay(day_name="Monday", exercises=[exercise])
+    plan = WorkoutPlanModel(user_id="ai", plan_date=date(2025, 1, 1), workout_days=[day])
+
+    async def stream_workout_plan(**kwargs):
+        yield "exercise", {"day_index": 0, "index": 0, "exercise": exercise.model_dump(mode="json")}
+        yield "day", {"index": 0, "day": day.model_dump(mode="json")}
+        yield "plan", plan
+    mock_ai_instance.stream_workout_plan = stream_workout_plan
+    mock_plan_instance.store_workout_plan = AsyncMock(return_value=plan)
+
+    response = client.post("/api/v1/plans/generate/stream", json={"context": {}}, headers={"Accept": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event["event"] for event in events] == ["exercise", "day", "plan"]
+    assert events[-1]["data"]["user_id"] == "test_user_id"
+    assert events[-1]["data"]["plan_date"] == date.today().isoformat()
+    mock_plan_instance.store_workout_plan.assert_awaited_once()
+
+
+def test_generate_plan_stream_sse_reports_timeout(client: FastAPIClient, mock_services):
+    mock_ai_instance, mock_plan_instance = mock_services
+
+    async def stream_workout_plan(**kwargs):
+        raise AIServiceTimeout("deadline exceeded")
+        yield
+    mock_ai_instance.stream_workout_plan = stream_workout_plan
+    mock_plan_instance.store_workout_plan = AsyncMock()
+
+    with patch("app.services.plan_jobs.settings.PLAN_RULE_FALLBACK", False):
+        response = client.post("/api/v1/plans/generate/stream", json={"context": {}})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.startswith("event: error\ndata: ")
+    assert json.loads(response.text.split("data: ", 1)[1])["status"] == 504
+    mock_plan_instance.store_workout_plan.assert_not_awaited()
+
+
+def test_generate_plan_async_mode_returns_job_id(client: FastAPIClient, app, mock_services):
+    job_queue = MagicMock()
+    job_queue.submit = AsyncMock(return_value={"id": "job-1", "status": "queued"})
+    app.dependency_overrides[get_plan_job_queue_service] = lambda: job_queue
+    try:
+        response = client.post("/api/v1/plans/generate?mode=async", json={"context": {"mood": "good"}})
+    finally:
+        app.dependency_overrides.pop(get_plan_job_queue_service, None)
+
+    assert response.status_code == 202
+    assert response.json() == {"job_id": "job-1", "status": "queued", "status_url": "/api/v1/plans/jobs/job-1"}
+    assert job_queue.submit.call_args.args[0] == "test_user_id"
+
+
+def test_generate_plan_async_mode_queue_full(client: FastAPIClient, app, mock_services):
+    job_queue = MagicMock()
+    job_queue.submit = AsyncMock(side_effect=JobQueueFull("200 plan jobs already queued"))
+    app.dependency_overrides[get_plan_job_queue_service] = lambda: job_queue
+    try:
+        response = client.post("/api/v1/plans/generate?mode=async", json={"context": {}})
+    finally:
+        app.dependency_overrides.pop(get_plan_job_queue_service, None)
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+
+
+def test_get_plan_job(client: FastAPIClient, app):
+    job = {"id": "job-1", "user_id": "test_user_id", "status": "succeeded", "context": {}, "created_at": 1.0,
+           "started_at": 2.0, "finished_at": 3.0, "result": {"user_id": "test_user_id"}, "error": None}
+    job_queue = MagicMock()
+    job_queue.get = AsyncMock(side_effect=lambda job_id, user_id: job if job_id == "job-1" else None)
+    job_queue.wait = AsyncMock(return_value=job)
+    app.dependency_overrides[get_plan_job_queue_service] = lambda: job_queue
+    try:
+        found = client.get("/api/v1/plans/jobs/job-1")
+        long_polled = client.get("/api/v1/plans/jobs/job-1?wait=10")
+        missing = client.get("/api/v1/plans/jobs/other")
+    finally:
+        app.dependency_overrides.pop(get_plan_job_queue_service, None)
+
+    assert found.status_code == 200
+    assert found.json()["result"] == {"user_id": "test_user_id"}
+    assert "user_id" not in found.json() and "context" not in found.json()
+    job_queue.wait.assert_awaited_once_with("job-1", "test_user_id", 10)
+    assert long_polled.status_code == 200
+    assert missing.status_code == 404
+
+
+def test_get_plan_job_revalidates_with_etag(client: FastAPIClient, app):
+    job = {"id": "job-1", "user_id": "test_user_id", "status": "running", "context": {}, "created_at": 1.0,
+           "started_at": 2.0, "finished_at": None, "result": None, "error": None}
+    job_queue = MagicMock()
+    job_queue.get = AsyncMock(return_value=job)
+    app.dependency_overrides[get_plan_job_queue_service] = lambda: job_queue
+    try:
+        first = client.get("/api/v1/plans/jobs/job-1")
+        etag = first.headers["etag"]
+        unchanged = client.get("/api/v1/plans/jobs/job-1", headers={"If-None-Match": etag})
+        job.update(status="succeeded", finished_at=3.0, result={"user_id": "test_user_id"})
+        finished = client.get("/api/v1/plans/jobs/job-1", headers={"If-None-Match": etag})
+    finally:
+        app.dependency_overrides.pop(get_plan_job_queue_service, None)
+
+    assert first.headers["cache-control"] == "private, no-cache"
+    assert unchanged.status_code == 304 and unchanged.content == b""
+    assert finished.status_code == 200
+    assert finished.headers["etag"] != etag
+    assert finished.json()["status"] == "succeeded"
+
+def test_generate_plan_adapts_overnight_draft(client: FastAPIClient, mock_services):
+    mock_ai_instance, mock_plan_instance = mock_services
+    draft = WorkoutPlanModel(
+        plan_id="draft-row-id",
+        user_id="test_user_id",
+        plan_date=date.today(),
+        workout_days=[WorkoutDay(day_name="Today", exercises=[Exercise(name="Deadlift", sets=5, reps="3")])],
+    )
+    adapted = draft.model_copy(update={"ai_explanation": "Lighter volume: low energy."})
+    mock_plan_instance.get_draft_plan = AsyncMock(return_value=draft)
+    mock_plan_instance.confirm_draft_plan = AsyncMock(return_value=adapted)
+    mock_ai_instance.adapt_workout_plan = AsyncMock(return_value=adapted)
+    mock_ai_instance.generate_workout_plan = AsyncMock()
+
+    response = client.post("/api/v1/plans/generate", json={"context": {"energy": "low"}})
+
+    assert response.status_code == 200
+    assert response.json()["data"]["ai_explanation"] == "Lighter volume: low energy."
+    mock_ai_instance.generate_workout_plan.assert_not_awaited()
+    mock_plan_instance.confirm_draft_plan.assert_awaited_once()
+    assert mock_plan_instance.confirm_draft_plan.call_args.args[0] == "draft-row-id"
+
+
+def test_generate_plan_serves_the_draft_when_adaptation_times_out(client: FastAPIClient, mock_services):
+    mock_ai_instance, mock_plan_instance = mock_services
+    draft = WorkoutPlanModel(
+        plan_id="draft-row-id",
+        user_id="test_user_id",
+        plan_date=date.today(),
+        workout_days=[WorkoutDay(day_name="Today", exercises=[Exercise(name="Deadlift", sets=5, reps="3")])],
+    )
+    mock_plan_instance.get_draft_plan = AsyncMock(return_value=draft)
+    mock_plan_instance.confirm_draft_plan = AsyncMock(return_value=draft)
+    mock_ai_instance.adapt_workout_plan = AsyncMock(side_effect=AIServiceTimeout("deadline exceeded"))
+
+    response = client.post("/api/v1/plans/generate", json={"context": {"energy": "low"}})
+
+    assert response.status_code == 200
+    assert response.json()["data"]["workout_days"][0]["exercises"][0]["name"] == "Deadlift"
+    assert mock_plan_instance.confirm_draft_plan.call_args.args[0] == "draft-row-id"
+
+
+def test_generate_plan_stream_uses_the_generate_inputs(client: FastAPIClient, mock_services):
+    mock_ai_instance, mock_plan_instance = mock_services
+    plan = WorkoutPlanModel(user_id="ai", plan_date=date.today(), workout_days=[])
+    history = [{"exercise_name": "Squat", "set_number": 1, "actual_reps": 5, "actual_weight": 100.0,
+                "completed_at": "2025-12-10T09:00:00+00:00", "id": "log-1"}]
+    received = {}
+
+    async def stream_workout_plan(**kwargs):
+        received.update(kwargs)
+        yield "plan", plan
+    mock_ai_instance.stream_workout_plan = stream_workout_plan
+    mock_plan_instance.store_workout_plan = AsyncMock(return_value=plan)
+    inputs = ({"fitness_level": "advanced"}, {"primary_goal": "strength"}, history)
+
+    with patch("app.services.plan_jobs.load_plan_inputs", AsyncMock(return_value=inputs)) as load_plan_inputs:
+        response = client.post("/api/v1/plans/generate/stream", json={"context": {}}, headers={"Accept": "application/x-ndjson"})
+
+    load_plan_inputs.assert_awaited_once_with("test_user_id")
+    assert (received["user_profile"], received["user_goals"], received["workout_history"]) == inputs
+    assert [json.loads(line)["event"] for line in response.text.splitlines()] == ["plan"]
+
+
+def test_generate_plan_stream_falls_back_to_rule_based_plan(client: FastAPIClient, mock_services):
+    mock_ai_instance, mock_plan_instance = mock_services
+
+    async def stream_workout_plan(**kwargs):
+        yield "exercise", {"day_index": 0, "index": 0, "exercise": {"name": "Mock Squat", "sets": 3, "reps": "8"}}
+        raise TruncatedResponse("AI response was cut off before the plan was complete.")
+    mock_ai_instance.stream_workout_plan = stream_workout_plan
+    mock_plan_instance.store_workout_plan = AsyncMock(return_value=True)
+
+    response = client.post("/api/v1/plans/generate/stream", json={"context": {}}, headers={"Accept": "application/x-ndjson"})
+
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event["event"] for event in events] == ["exercise", "plan"] # the plan replaces the part sent
+    assert events[-1]["data"]["ai_explanation"].startswith("Rule-based")
+    mock_plan_instance.store_workout_plan.assert_awaited_once()
+
+
+def test_generate_plan_stream_confirms_overnight_draft(client: FastAPIClient, mock_services):
+    mock_ai_instance, mock_plan_instance = mock_services
+    draft = WorkoutPlanModel(
+        plan_id="draft-row-id",
+        user_id="test_user_id",
+        plan_date=date.today(),
+        workout_days=[WorkoutDay(day_name="Today", exercises=[Exercise(name="Deadlift", sets=5, reps="3")])],
+    )
+    mock_plan_instance.get_draft_plan = AsyncMock(return_value=draft)
+    mock_plan_instance.confirm_draft_plan = AsyncMock(return_value=draft)
+    mock_ai_instance.adapt_workout_plan = AsyncMock(return_value=draft.model_copy())
+    mock_ai_instance.stream_workout_plan = MagicMock()
+
+    response = client.post("/api/v1/plans/generate/stream", json={"context": {}}, headers={"Accept": "application/x-ndjson"})
+
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event["event"] for event in events] == ["plan"]
+    assert events[0]["data"]["plan_id"] == "draft-row-id"
+    mock_ai_instance.stream_workout_plan.assert_not_called()
+    assert mock_plan_instance.confirm_draft_plan.call_args.args[0] == "draft-row-id"
@@ -0,0 +1,79 @@
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.sync import get_sync_service
+from app.core.supabase import get_user_supabase_client
+from app.dependencies.auth_middleware import get_current_user_id
+from app.main import create_app
+from app.models.sync import SyncMutationResult, SyncPullResponse, SyncPushResponse
+from app.services.sync_service import InvalidCursor
+
+USER_ID = uuid4()
+
+
+@pytest.fixture(scope="module")
+def app():
+    app = create_app()
+    app.dependency_overrides[get_current_user_id] = lambda: USER_ID
+    yield app
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture(scope="module")
+def client(app):
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def sync_service(app):
+    service = MagicMock()
+    app.dependency_overrides[get_sync_service] = lambda: service
+    yield service
+    app.dependency_overrides.pop(get_sync_service, None)
+
+
+def test_push_returns_per_mutation_status(client, sync_service):
+    log_id = uuid4()
+    sync_service.push = AsyncMock(return_value=SyncPushResponse(results=[SyncMutationResult(id=log_id, status="duplicate")], duplicates=1))
+    mutation = {"id": str(log_id), "exercise_name": "Squat", "set_number": 1, "actual_reps": 5, "actual_weight": 100.0,
+                "rpe": 8.0, "completed_at": "2025-12-10T09:00:00Z"}
+
+    response = client.post("/api/v1/sync/push", json={"device_id": "phone-1", "mutations": [mutation]})
+
+    assert response.status_code == 200
+    assert response.json()["results"] == [{"id": str(log_id), "status": "duplicate", "error": None}]
+    request, user_id = sync_service.push.await_args.args
+    assert request.mutations[0].id == log_id and user_id == USER_ID
+
+
+def test_pull_passes_cursor_and_limit(client, sync_service):
+    sync_service.pull = AsyncMock(return_value=SyncPullResponse(logs=[], plans=[], cursor="next", has_more=False))
+
+    response = client.get("/api/v1/sync/pull", params={"cursor": "abc", "limit": 50})
+
+    assert response.status_code == 200
+    assert response.json() == {"logs": [], "plans": [], "cursor": "next", "has_more": False}
+    sync_service.pull.assert_awaited_once_with(USER_ID, "abc", 50)
+
+
+def test_pull_rejects_bad_cursor(client, sync_service):
+    sync_service.pull = AsyncMock(side_effect=InvalidCursor("Invalid sync cursor: bad"))
+
+    response = client.get("/api/v1/sync/pull", params={"cursor": "bad"})
+
+    assert response.status_code == 400
+
+
+def test_sync_service_uses_the_callers_client(mocker):
+    user_client = MagicMock()
+    for_user = mocker.patch("app.core.supabase.supabase_registry.for_user", return_value=user_client)
+
+    service = get_sync_service(get_user_supabase_client(authorization="Bearer user-jwt"))
+
+    for_user.assert_called_once_with("user-jwt")
+    assert service.supabase is user_client
+    assert service.log_service.supabase is user_client
@@ -0,0 +1,77 @@
+import pytest
+
+from app.core.cache import CacheBackend, InMemoryCacheBackend, TTLLRUCache, TieredCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_expiry_counts_as_miss():
+    clock = FakeClock()
+    cache = TTLLRUCache(maxsize=4, ttl=10, clock=clock)
+
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    clock.now += 11
+    assert cache.get("a") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["expirations"] == 1
+    assert stats["size"] == 0
+
+
+def test_lru_eviction_drops_least_recently_used():
+    cache = TTLLRUCache(maxsize=2, ttl=60)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a") # "b" is now least recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_falls_through_to_shared_backend():
+    backend = InMemoryCacheBackend()
+    writer = TieredCache("profile", maxsize=8, ttl=60, backend=backend)
+    reader = TieredCache("profile", maxsize=8, ttl=60, backend=backend) # e.g. another worker
+
+    await writer.set("user-1", {"email": "a@example.com"})
+    assert await reader.get("user-1") == {"email": "a@example.com"}
+    assert reader.stats()["backend_hits"] == 1
+
+    await writer.invalidate("user-1")
+    reader.clear()
+    assert await reader.get("user-1") is None
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_survives_backend_errors():
+    class BrokenBackend(CacheBackend):
+        async def get(self, key):
+            raise ConnectionError("down")
+
+        async def set(self, key, value, ttl):
+            raise ConnectionError("down")
+
+        async def delete(self, key):
+            raise ConnectionError("down")
+
+    cache = TieredCache("profile", maxsize=8, ttl=60, backend=BrokenBackend())
+
+    await cache.set("user-1", {"email": "a@example.com"})
+    assert await cache.get("user-1") == {"email": "a@example.com"} # served from the local tier
+    await cache.invalidate("user-1")
+    assert await cache.get("user-1") is None
+    assert cache.stats()["backend_errors"] == 3
@@ -0,0 +1,32 @@
+from app.core.conditional import ConditionalStats, etag_matches, strong_etag
+
+
+def test_strong_etag_is_quoted_and_changes_with_any_part():
+    etag = strong_etag("dashboard", "user-1", 3)
+
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == strong_etag("dashboard", "user-1", 3)
+    assert etag != strong_etag("dashboard", "user-1", 4)
+    assert strong_etag("a", "bc") != strong_etag("ab", "c")
+
+
+def test_etag_matches_uses_weak_comparison():
+    etag = strong_etag("profile", 1)
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_conditional_stats_ratio_per_route():
+    stats = ConditionalStats()
+    for matched in (True, True, False, True):
+        stats.record("dashboard", matched)
+    stats.record("users_me", False)
+
+    assert stats.stats() == {
+        "dashboard": {"requests": 4, "not_modified": 3, "not_modified_ratio": 0.75},
+        "users_me": {"requests": 1, "not_modified": 0, "not_modified_ratio": 0.0},
+    }
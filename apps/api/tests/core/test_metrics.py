@@ -0,0 +1,21 @@
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+
+
+def test_metrics_is_off_without_a_token(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "")
+
+    assert TestClient(app).get("/metrics").status_code == 404
+
+
+def test_metrics_requires_the_token(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+    client = TestClient(app)
+
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer user-jwt"}).status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
+    assert "profile_cache" in response.json()
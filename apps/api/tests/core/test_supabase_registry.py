@@ -0,0 +1,86 @@
+import os
+import httpx
+import pytest
+from unittest.mock import MagicMock, patch
+
+from app.core.supabase import SupabaseClientRegistry
+
+
+@pytest.fixture
+def registry():
+    with patch.dict(os.environ, {
+        "SUPABASE_URL": "http://mock.supabase.com",
+        "SUPABASE_KEY": "anon_key",
+        "SUPABASE_SERVICE_ROLE_KEY": "service_key",
+    }):
+        with patch("app.core.supabase.AsyncClient", side_effect=lambda *args, **kwargs: MagicMock()) as mock_create_client:
+            registry = SupabaseClientRegistry(scoped_cache_size=2)
+            yield registry, mock_create_client
+
+
+def test_anon_and_admin_clients_are_created_once(registry):
+    registry, mock_create_client = registry
+
+    assert registry.anon() is registry.anon()
+    assert registry.admin() is registry.admin()
+    assert registry.anon() is not registry.admin()
+    assert mock_create_client.call_count == 2
+    assert mock_create_client.call_args_list[1].args[1] == "service_key"
+
+
+def test_all_clients_share_one_http_pool(registry):
+    registry, mock_create_client = registry
+
+    registry.anon()
+    registry.admin()
+    registry.for_user("user_jwt")
+
+    http_clients = {id(call.kwargs["options"].httpx_client) for call in mock_create_client.call_args_list}
+    assert len(http_clients) == 1
+    assert isinstance(mock_create_client.call_args.kwargs["options"].httpx_client, httpx.AsyncClient)
+
+
+def test_user_scoped_clients_forward_jwt_and_are_lru_bounded(registry):
+    registry, mock_create_client = registry
+
+    first = registry.for_user("token_a")
+    assert registry.for_user("token_a") is first
+    headers = mock_create_client.call_args.kwargs["options"].headers
+    assert headers["Authorization"] == "Bearer token_a"
+
+    registry.for_user("token_b")
+    registry.for_user("token_c") # evicts token_a
+
+    assert registry.stats()["scoped_clients"] == 2
+    assert registry.for_user("token_a") is not first
+    assert registry.stats()["scoped_client_hits"] == 1
+
+
+def test_auth_flow_clients_are_never_shared(registry):
+    registry, _ = registry
+
+    assert registry.for_auth_flow() is not registry.for_auth_flow()
+    assert registry.for_auth_flow() is not registry.anon()
+
+
+@pytest.mark.asyncio
+async def test_missing_configuration_raises_value_error():
+    with patch.dict(os.environ, clear=True):
+        registry = SupabaseClientRegistry()
+        with pytest.raises(ValueError, match="Supabase URL and SERVICE_ROLE_KEY must be set"):
+            registry.admin()
+        assert (await registry.health_check())["status"] == "unconfigured"
+
+
+@pytest.mark.asyncio
+async def test_close_releases_clients(registry):
+    registry, mock_create_client = registry
+
+    anon = registry.anon()
+    http_client = mock_create_client.call_args.kwargs["options"].httpx_client
+    await registry.close()
+
+    assert http_client.is_closed
+
+    assert registry.anon() is not anon
+    assert mock_create_client.call_count == 2
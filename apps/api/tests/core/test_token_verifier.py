@@ -0,0 +1,107 @@
+import json
+import time
+
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from app.core.cache import TTLLRUCache
+from app.core.token_verifier import TokenVerifier, TokenVerifierNotConfigured
+
+ISSUER = "http://mock.supabase.com/auth/v1"
+SECRET = "test-jwt-secret-with-at-least-32-bytes"
+
+
+def make_token(key, algorithm="HS256", kid=None, expires_in=300, **claims):
+    payload = {"sub": "user-123", "aud": "authenticated", "iss": ISSUER, "exp": int(time.time()) + expires_in, **claims}
+    headers = {"kid": kid} if kid else None
+    return jwt.encode(payload, key, algorithm=algorithm, headers=headers)
+
+
+@pytest.fixture
+def ec_key():
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    public_jwk = json.loads(jwt.algorithms.ECAlgorithm.to_jwk(private_key.public_key()))
+    public_jwk.update({"kid": "key-1", "alg": "ES256", "use": "sig"})
+    return private_key, {"keys": [public_jwk]}
+
+
+def test_hs256_claims_are_cached_until_exp():
+    verifier = TokenVerifier(issuer=ISSUER, hs256_secret=SECRET)
+    token = make_token(SECRET)
+
+    assert verifier.verify(token)["sub"] == "user-123"
+    assert verifier.verify(token)["sub"] == "user-123"
+
+    assert verifier.signature_checks == 1
+    assert verifier.claims_cache.stats()["hits"] == 1
+
+
+def test_cached_claims_expire_with_the_token():
+    cache_now = [0.0]
+    verifier = TokenVerifier(issuer=ISSUER, hs256_secret=SECRET)
+    verifier.claims_cache = TTLLRUCache(maxsize=16, ttl=0, clock=lambda: cache_now[0])
+    token = make_token(SECRET, expires_in=60)
+
+    verifier.verify(token)
+    cache_now[0] = 30.0
+    verifier.verify(token)
+    assert verifier.signature_checks == 1
+
+    cache_now[0] = 61.0 # past the token's exp: the entry is gone and the signature is re-checked
+    verifier.verify(token)
+    assert verifier.signature_checks == 2
+
+
+def test_rejects_wrong_audience_and_issuer():
+    verifier = TokenVerifier(issuer=ISSUER, hs256_secret=SECRET)
+
+    with pytest.raises(jwt.InvalidAudienceError):
+        verifier.verify(make_token(SECRET, aud="anon"))
+    with pytest.raises(jwt.InvalidIssuerError):
+        verifier.verify(make_token(SECRET, iss="http://elsewhere/auth/v1"))
+    assert len(verifier.claims_cache) == 0
+
+
+def test_asymmetric_token_verified_by_kid(ec_key):
+    private_key, jwks = ec_key
+    verifier = TokenVerifier(issuer=ISSUER, jwks_url="http://mock.supabase.com/auth/v1/.well-known/jwks.json")
+    verifier.load_jwks(jwks)
+
+    claims = verifier.verify(make_token(private_key, algorithm="ES256", kid="key-1"))
+    assert claims["sub"] == "user-123"
+
+    with pytest.raises(jwt.InvalidTokenError, match="Unknown signing key id"):
+        verifier.verify(make_token(private_key, algorithm="ES256", kid="rotated-key"))
+
+
+def test_asymmetric_token_without_jwks_is_a_configuration_error(ec_key):
+    private_key, _ = ec_key
+    verifier = TokenVerifier(issuer=ISSUER, hs256_secret=SECRET)
+
+    with pytest.raises(TokenVerifierNotConfigured):
+        verifier.verify(make_token(private_key, algorithm="ES256", kid="key-1"))
+
+
+@pytest.mark.asyncio
+async def test_start_fetches_jwks_and_stop_cancels_refresh(ec_key):
+    private_key, jwks = ec_key
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json=jwks)
+
+    verifier = TokenVerifier(
+        issuer=ISSUER,
+        jwks_url="http://mock.supabase.com/auth/v1/.well-known/jwks.json",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    await verifier.start()
+    try:
+        assert len(requests) == 1
+        assert verifier.verify(make_token(private_key, algorithm="ES256", kid="key-1"))["sub"] == "user-123"
+    finally:
+        await verifier.stop()
+    assert verifier.stats()["jwks_keys"] == 1
@@ -6,16 +6,20 @@ from unittest.mock import patch, MagicMock
 import jwt
 import os
 from datetime import datetime, timedelta
+from typing import Optional
 
 # Assuming app.dependencies.auth_middleware is the module containing get_current_user_id
 # We need to import it here to test it
-from app.dependencies.auth_middleware import get_current_user_id
+from fastapi import FastAPI, Depends, Request
+from app.dependencies.auth_middleware import Principal, get_current_principal, get_current_user_id
+from app.core.token_verifier import TokenVerifier, set_token_verifier
 
-# Mock the os.environ.get for SUPABASE_JWT_SECRET
+# The verifier is built once at startup; install one configured like SUPABASE_JWT_SECRET / SUPABASE_URL would
 @pytest.fixture(autouse=True)
-def mock_env_vars():
-    with patch.dict(os.environ, {"SUPABASE_JWT_SECRET": "test_jwt_secret", "SUPABASE_URL": "http://localhost:8000"}):
-        yield
+def mock_token_verifier():
+    set_token_verifier(TokenVerifier(issuer="http://localhost:8000/auth/v1", hs256_secret="test_jwt_secret"))
+    yield
+    set_token_verifier(None)
 
 def create_test_jwt(user_id: str, secret: str, expires_delta: Optional[timedelta] = None):
     to_encode = {"sub": str(user_id), "aud": "authenticated", "iss": "http://localhost:8000/auth/v1"}
@@ -26,42 +30,85 @@ def create_test_jwt(user_id: str, secret: str, expires_delta: Optional[timedelta
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, secret, algorithm="HS256")
 
+def make_request() -> Request:
+    return Request({"type": "http", "headers": []})
+
+@pytest.mark.asyncio
 async def test_get_current_user_id_valid_jwt():
     user_id = "test_user_id_123"
     token = create_test_jwt(user_id, "test_jwt_secret")
-    result = await get_current_user_id(f"Bearer {token}")
-    assert result == {"user_id": user_id}
+    principal = await get_current_principal(make_request(), f"Bearer {token}")
+    assert principal.user_id == user_id
+    assert principal.token == token
 
+@pytest.mark.asyncio
 async def test_get_current_user_id_missing_authorization_header():
     with pytest.raises(HTTPException) as excinfo:
-        await get_current_user_id(None) # Simulate missing header
+        await get_current_principal(make_request(), None) # Simulate missing header
     assert excinfo.value.status_code == status.HTTP_401_UNAUTHORIZED
     assert "Authorization header missing or malformed" in excinfo.value.detail
 
+@pytest.mark.asyncio
 async def test_get_current_user_id_malformed_authorization_header():
     with pytest.raises(HTTPException) as excinfo:
-        await get_current_user_id("InvalidToken")
+        await get_current_principal(make_request(), "InvalidToken")
     assert excinfo.value.status_code == status.HTTP_401_UNAUTHORIZED
     assert "Authorization header missing or malformed" in excinfo.value.detail
 
+@pytest.mark.asyncio
 async def test_get_current_user_id_expired_jwt():
     user_id = "test_user_id_expired"
     expired_token = create_test_jwt(user_id, "test_jwt_secret", expires_delta=timedelta(minutes=-1))
     with pytest.raises(HTTPException) as excinfo:
-        await get_current_user_id(f"Bearer {expired_token}")
+        await get_current_principal(make_request(), f"Bearer {expired_token}")
     assert excinfo.value.status_code == status.HTTP_401_UNAUTHORIZED
     assert "JWT has expired" in excinfo.value.detail
 
+@pytest.mark.asyncio
 async def test_get_current_user_id_invalid_jwt():
     with pytest.raises(HTTPException) as excinfo:
-        await get_current_user_id("Bearer invalid.jwt.token")
+        await get_current_principal(make_request(), "Bearer invalid.jwt.token")
     assert excinfo.value.status_code == status.HTTP_401_UNAUTHORIZED
     assert "Invalid JWT" in excinfo.value.detail
 
-@patch.dict(os.environ, {"SUPABASE_JWT_SECRET": ""}) # Temporarily unset the secret
+@pytest.mark.asyncio
 async def test_get_current_user_id_missing_jwt_secret_env_var():
+    set_token_verifier(TokenVerifier(issuer="http://localhost:8000/auth/v1", hs256_secret="")) # Secret not configured
     token = create_test_jwt("any_user", "test_jwt_secret") # Token created with a dummy secret, but verification will fail
     with pytest.raises(HTTPException) as excinfo:
-        await get_current_user_id(f"Bearer {token}")
+        await get_current_principal(make_request(), f"Bearer {token}")
     assert excinfo.value.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
     assert "SUPABASE_JWT_SECRET is not configured" in excinfo.value.detail
+
+
+@pytest.mark.asyncio
+async def test_principal_is_memoized_on_request_state():
+    request = make_request()
+    token = create_test_jwt("memo_user", "test_jwt_secret")
+
+    first = await get_current_principal(request, f"Bearer {token}")
+    # A second resolution in the same request never looks at the header again
+    second = await get_current_principal(request, None)
+
+    assert second is first
+    assert request.state.principal is first
+
+
+def test_route_resolves_principal_once():
+    verifier = TokenVerifier(issuer="http://localhost:8000/auth/v1", hs256_secret="test_jwt_secret")
+    set_token_verifier(verifier)
+    app = FastAPI()
+
+    async def uncached_principal(principal: Principal = Depends(get_current_principal, use_cache=False)):
+        return principal
+
+    @app.get("/whoami", dependencies=[Depends(get_current_user_id)])
+    async def whoami(user_id: str = Depends(get_current_user_id), principal: Principal = Depends(uncached_principal)):
+        return {"user_id": user_id, "same": principal.user_id == user_id}
+
+    token = create_test_jwt("route_user", "test_jwt_secret")
+    response = TestClient(app).get("/whoami", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.json() == {"user_id": "route_user", "same": True}
+    assert verifier.claims_cache.stats()["misses"] == 1
+    assert verifier.claims_cache.stats()["hits"] == 0
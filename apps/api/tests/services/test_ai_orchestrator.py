@@ -1,11 +1,14 @@
 import pytest
-from unittest.mock import AsyncMock, patch
-from app.services.ai_orchestrator import AIOrchestratorService
+import asyncio
+import httpx
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.ai_orchestrator import AIOrchestratorService, AIServiceTimeout
+from app.services.plan_repair import TruncatedResponse
+from app.services.model_router import ModelRouter
 from app.models.workout_plan import WorkoutPlanModel, WorkoutDay, Exercise, PlanGenerationContext
 from datetime import date
 from pydantic import ValidationError
 import os
-import os # Add this import
 
 class MockCompletion:
     def __init__(self, content: str):
@@ -22,6 +25,7 @@ class MockMessage:
 # Mock OpenAI client response
 MOCK_OPENAI_SUCCESS_CONTENT = '{"user_id": "test_user", "plan_date": "2025-12-13", "workout_days": [{"day_name": "Monday", "exercises": [{"name": "Mock Squat", "sets": 3, "reps": "8-10"}]}], "ai_explanation": "Plan adapted due to high energy."}'
 MOCK_OPENAI_INVALID_JSON_CONTENT = '{"user_id": "test_user", "plan_date": "2025-12-13", "workout_days": [{"day_name": "Monday", "exercises": [{"name": "Mock Squat", "sets": 3, "reps": "8-10"}]}], "ai_explanation": "Plan adapted due to high energy."'
+MOCK_OPENAI_UNPARSEABLE_CONTENT = "Sorry, I can't produce a plan right now."
 MOCK_OPENAI_VALIDATION_ERROR_CONTENT = '{"user_id": "test_user", "plan_date": "2025-12-13", "workout_days": [{"day_name": "Monday", "exercises": [{"name": "Mock Squat", "sets": "invalid", "reps": "8-10"}]}], "ai_explanation": "Plan adapted due to high energy."}'
 
 # In the tests, set return_value to MockCompletion(content)
@@ -30,13 +34,32 @@ MOCK_OPENAI_VALIDATION_ERROR_CONTENT = '{"user_id": "test_user", "plan_date": "2
 
 @pytest.fixture
 def ai_orchestrator_service():
+    mock_client = MagicMock()
+    mock_create_method = AsyncMock()
+    mock_client.chat.completions.create = mock_create_method
+    service = AIOrchestratorService(client=mock_client)
+    yield service, mock_create_method
+
+
+@pytest.fixture
+def single_tier_service(ai_orchestrator_service):
+    """The same service routed to one tier: a failed generation starts no hedge."""
+    service, mock_create_method = ai_orchestrator_service
+    service.router = ModelRouter([service.model])
+    return service, mock_create_method
+
+
+def completion_json(content: str) -> dict:
+    return {
+        "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": "gpt-4o",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+    }
+
+
+def make_service(handler, **kwargs) -> AIOrchestratorService:
+    """Orchestrator wired to an in-process fake LLM via the pluggable transport."""
     with patch.dict(os.environ, {"OPENAI_API_KEY": "test_key"}):
-        with patch("app.services.ai_orchestrator.OpenAI") as MockOpenAI:
-            mock_instance = MockOpenAI.return_value
-            mock_create_method = AsyncMock()
-            mock_instance.chat.completions.create = mock_create_method
-            service = AIOrchestratorService()
-            yield service, mock_create_method
+        return AIOrchestratorService(transport=httpx.MockTransport(handler), base_url="http://fake-llm.local/v1", **kwargs)
 
 @pytest.mark.asyncio
 async def test_generate_workout_plan_success(ai_orchestrator_service):
@@ -59,9 +82,9 @@ async def test_generate_workout_plan_success(ai_orchestrator_service):
     mock_create_method.assert_awaited_once()
 
 @pytest.mark.asyncio
-async def test_generate_workout_plan_invalid_json(ai_orchestrator_service):
-    service, mock_create_method = ai_orchestrator_service
-    mock_create_method.return_value = MockCompletion(MOCK_OPENAI_INVALID_JSON_CONTENT)
+async def test_generate_workout_plan_invalid_json(single_tier_service):
+    service, mock_create_method = single_tier_service
+    mock_create_method.return_value = MockCompletion(MOCK_OPENAI_UNPARSEABLE_CONTENT)
 
     user_id = "test_user"
     user_profile = {"level": "beginner"}
@@ -73,8 +96,8 @@ async def test_generate_workout_plan_invalid_json(ai_orchestrator_service):
         await service.generate_workout_plan(user_id, user_profile, user_goals, workout_history, context)
     mock_create_method.assert_awaited_once()
 @pytest.mark.asyncio
-async def test_generate_workout_plan_validation_error(ai_orchestrator_service):
-    service, mock_create_method = ai_orchestrator_service
+async def test_generate_workout_plan_validation_error(single_tier_service):
+    service, mock_create_method = single_tier_service
     mock_create_method.return_value = MockCompletion(MOCK_OPENAI_VALIDATION_ERROR_CONTENT)
 
     user_id = "test_user"
@@ -85,10 +108,13 @@ async def test_generate_workout_plan_validation_error(ai_orchestrator_service):
 
     with pytest.raises(ValueError, match="AI response validation failed"):
         await service.generate_workout_plan(user_id, user_profile, user_goals, workout_history, context)
-    mock_create_method.assert_awaited_once()
+    # The plan itself plus one re-ask for the invalid exercise (answered with junk here)
+    assert mock_create_method.await_count == 2
+    assert mock_create_method.call_args.kwargs["model"] == service.adapt_model
+    assert service.stats()["plan_repair"]["failed"] == 1
 @pytest.mark.asyncio
-async def test_generate_workout_plan_openai_error(ai_orchestrator_service):
-    service, mock_create_method = ai_orchestrator_service
+async def test_generate_workout_plan_openai_error(single_tier_service):
+    service, mock_create_method = single_tier_service
     mock_create_method.side_effect = Exception("OpenAI API call failed")
 
     user_id = "test_user"
@@ -100,3 +126,419 @@ async def test_generate_workout_plan_openai_error(ai_orchestrator_service):
     with pytest.raises(RuntimeError, match="Failed to generate plan from OpenAI: OpenAI API call failed"):
         await service.generate_workout_plan(user_id, user_profile, user_goals, workout_history, context)
     mock_create_method.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_retries_429_and_5xx_then_succeeds():
+    statuses = iter([429, 503])
+
+    def handler(request):
+        status_code = next(statuses, 200)
+        if status_code != 200:
+            return httpx.Response(status_code, json={"error": {"message": "busy"}}, headers={"retry-after": "0"})
+        return httpx.Response(200, json=completion_json(MOCK_OPENAI_SUCCESS_CONTENT))
+
+    service = make_service(handler, max_retries=2, retry_base_delay=0.001)
+    plan = await service.generate_workout_plan("test_user", {}, {}, [], PlanGenerationContext())
+
+    assert plan.user_id == "test_user"
+    assert service.stats()["calls"] == 3
+    assert service.stats()["retries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried():
+    def handler(request):
+        return httpx.Response(400, json={"error": {"message": "bad request"}})
+
+    service = make_service(handler, max_retries=3, retry_base_delay=0.001, router=ModelRouter(["gpt-4o"]))
+    with pytest.raises(RuntimeError, match="Failed to generate plan from OpenAI"):
+        await service.generate_workout_plan("test_user", {}, {}, [], PlanGenerationContext())
+
+    assert service.stats()["calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_deadline_raises_ai_service_timeout():
+    async def slow_create(**kwargs):
+        await asyncio.sleep(1)
+
+    client = MagicMock()
+    client.chat.completions.create = slow_create
+    service = AIOrchestratorService(client=client, deadline=0.05)
+
+    with pytest.raises(AIServiceTimeout):
+        await service.generate_workout_plan("test_user", {}, {}, [], PlanGenerationContext())
+    assert service.stats()["timeouts"] == 1
+    assert service.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_per_user_and_global_concurrency_limits():
+    active = {"total": 0, "peak_total": 0, "user_a": 0, "peak_user_a": 0}
+
+    async def create(messages, **kwargs):
+        user = messages[0]["content"]
+        active["total"] += 1
+        active[user] = active.get(user, 0) + 1
+        active["peak_total"] = max(active["peak_total"], active["total"])
+        active["peak_user_a"] = max(active["peak_user_a"], active.get("user_a", 0))
+        await asyncio.sleep(0.01)
+        active["total"] -= 1
+        active[user] -= 1
+
+    client = MagicMock()
+    client.chat.completions.create = create
+    service = AIOrchestratorService(client=client, max_concurrency=3, max_concurrency_per_user=1)
+
+    users = ["user_a"] * 4 + ["user_b", "user_c", "user_d"]
+    await asyncio.gather(*(service.complete(user, [{"role": "user", "content": user}]) for user in users))
+
+    assert active["peak_user_a"] == 1
+    assert active["peak_total"] <= 3
+    assert service.stats()["active_users"] == 0
+
+
+@pytest.mark.asyncio
+async def test_identical_inputs_are_served_from_plan_cache(ai_orchestrator_service):
+    service, mock_create_method = ai_orchestrator_service
+    mock_create_method.return_value = MockCompletion(MOCK_OPENAI_SUCCESS_CONTENT)
+
+    # Same inputs (dict key order aside) -> one LLM call, a validated model each time
+    first = await service.generate_workout_plan("test_user", {"level": "beginner", "age": 30}, {}, [], PlanGenerationContext(mood="happy"))
+    second = await service.generate_workout_plan("test_user", {"age": 30, "level": "beginner"}, {}, [], PlanGenerationContext(mood="happy"))
+
+    assert mock_create_method.await_count == 1
+    assert isinstance(second, WorkoutPlanModel)
+    assert second is not first
+    assert second.model_dump() == first.model_dump()
+    assert second.prompt_hash == first.prompt_hash is not None
+    assert service.stats()["plan_cache"]["hits"] == 1
+
+    # A different context is a different prompt and a cache miss
+    await service.generate_workout_plan("test_user", {"level": "beginner", "age": 30}, {}, [], PlanGenerationContext(mood="tired"))
+    assert mock_create_method.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_invalid_cached_plan_is_discarded_and_regenerated(ai_orchestrator_service):
+    service, mock_create_method = ai_orchestrator_service
+    mock_create_method.return_value = MockCompletion(MOCK_OPENAI_SUCCESS_CONTENT)
+    context = PlanGenerationContext()
+    prompt = await service.construct_prompt("test_user", {}, {}, [], context)
+    key = service.plan_cache_key([{"role": "system", "content": service.system_prompt}, {"role": "user", "content": prompt}])
+    await service.plan_cache.set(key, {"user_id": "test_user", "workout_days": "not a list"})
+
+    plan = await service.generate_workout_plan("test_user", {}, {}, [], context)
+
+    assert plan.workout_days[0].exercises[0].name == "Mock Squat"
+    mock_create_method.assert_awaited_once()
+
+
+def test_plan_cache_key_depends_on_model():
+    messages = [{"role": "user", "content": "same prompt"}]
+    assert AIOrchestratorService(client=MagicMock(), model="gpt-4o").plan_cache_key(messages) != \
+        AIOrchestratorService(client=MagicMock(), model="gpt-4o-mini").plan_cache_key(messages)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_generations_share_one_completion(ai_orchestrator_service):
+    service, mock_create_method = ai_orchestrator_service
+
+    async def slow_completion(**kwargs):
+        await asyncio.sleep(0.05)
+        return MockCompletion(MOCK_OPENAI_SUCCESS_CONTENT)
+    mock_create_method.side_effect = slow_completion
+
+    plans = await asyncio.gather(*(
+        service.generate_workout_plan("test_user", {}, {}, [], PlanGenerationContext()) for _ in range(3)
+    ))
+
+    mock_create_method.assert_awaited_once()
+    assert len({id(plan) for plan in plans}) == 3 # each caller gets its own copy
+    assert all(plan.model_dump() == plans[0].model_dump() for plan in plans)
+    stats = service.stats()
+    assert stats["plan_calls_deduplicated"] == 2
+    assert stats["plan_flights_in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancellation_is_per_caller(ai_orchestrator_service):
+    service, mock_create_method = ai_orchestrator_service
+    release = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def blocked_completion(**kwargs):
+        try:
+            await release.wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return MockCompletion(MOCK_OPENAI_SUCCESS_CONTENT)
+    mock_create_method.side_effect = blocked_completion
+
+    generate = lambda: service.generate_workout_plan("test_user", {}, {}, [], PlanGenerationContext())
+    first, second = asyncio.create_task(generate()), asyncio.create_task(generate())
+    await asyncio.sleep(0.01)
+
+    # One caller giving up leaves the shared completion running for the other
+    first.cancel()
+    await asyncio.sleep(0.01)
+    assert not cancelled.is_set()
+    release.set()
+    assert (await second).workout_days[0].exercises[0].name == "Mock Squat"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+    # When every caller has gone, the completion itself is cancelled
+    release.clear()
+    lone = asyncio.create_task(service.generate_workout_plan("other_user", {}, {}, [], PlanGenerationContext()))
+    await asyncio.sleep(0.01)
+    lone.cancel()
+    await asyncio.sleep(0.01)
+    assert cancelled.is_set()
+    assert service.stats()["plan_flights_cancelled"] == 1
+    assert service.stats()["plan_flights_in_flight"] == 0
+
+
+class MockStreamChunk:
+    def __init__(self, content):
+        self.choices = [MagicMock(delta=MagicMock(content=content))]
+
+
+def mock_stream(content: str, size: int = 16, service=None, in_flight=None):
+    async def stream():
+        for i in range(0, len(content), size):
+            if in_flight is not None:
+                in_flight.append(service.in_flight)
+            yield MockStreamChunk(content[i:i + size])
+    return stream()
+
+
+@pytest.mark.asyncio
+async def test_stream_workout_plan_emits_parts_then_validated_plan(ai_orchestrator_service):
+    service, mock_create_method = ai_orchestrator_service
+    in_flight = []
+    mock_create_method.side_effect = lambda **kwargs: mock_stream(MOCK_OPENAI_SUCCESS_CONTENT, service=service, in_flight=in_flight)
+
+    events = [event async for event in service.stream_workout_plan("test_user", {}, {}, [], PlanGenerationContext())]
+
+    assert [name for name, _ in events] == ["exercise", "day", "plan"]
+    assert events[0][1]["exercise"]["name"] == "Mock Squat"
+    assert isinstance(events[-1][1], WorkoutPlanModel)
+    assert mock_create_method.call_args.kwargs["stream"] is True
+    assert set(in_flight) == {1} # the concurrency slot is held while the stream is read
+    assert service.in_flight == 0
+
+    # The streamed plan was cached: a repeat is replayed without another completion
+    replay = [name async for name, _ in service.stream_workout_plan("test_user", {}, {}, [], PlanGenerationContext())]
+    assert replay == ["exercise", "day", "plan"]
+    mock_create_method.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_stream_workout_plan_rejects_invalid_document(ai_orchestrator_service):
+    service, mock_create_method = ai_orchestrator_service
+    mock_create_method.side_effect = lambda **kwargs: mock_stream(MOCK_OPENAI_UNPARSEABLE_CONTENT)
+
+    with pytest.raises(ValueError, match="AI response was not valid JSON."):
+        async for _ in service.stream_workout_plan("test_user", {}, {}, [], PlanGenerationContext()):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_adapt_workout_plan_skips_llm_for_neutral_context(ai_orchestrator_service):
+    service, mock_create_method = ai_orchestrator_service
+    draft = WorkoutPlanModel.model_validate_json(MOCK_OPENAI_SUCCESS_CONTENT)
+
+    plan = await service.adapt_workout_plan("test_user", draft, PlanGenerationContext())
+
+    assert plan.model_dump() == draft.model_dump() and plan is not draft
+    mock_create_method.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_adapt_workout_plan_uses_adapt_model_and_counts_tokens(ai_orchestrator_service):
+    service, mock_create_method = ai_orchestrator_service
+    completion = MockCompletion(MOCK_OPENAI_SUCCESS_CONTENT)
+    completion.usage = MagicMock(prompt_tokens=120, completion_tokens=80)
+    mock_create_method.return_value = completion
+    draft = WorkoutPlanModel.model_validate_json(MOCK_OPENAI_SUCCESS_CONTENT)
+
+    plan = await service.adapt_workout_plan("test_user", draft, PlanGenerationContext(energy="low"))
+
+    assert plan.ai_explanation == "Plan adapted due to high energy."
+    assert mock_create_method.call_args.kwargs["model"] == service.adapt_model
+    assert "low" in mock_create_method.call_args.kwargs["messages"][1]["content"]
+    assert (service.prompt_tokens, service.completion_tokens) == (120, 80)
+
+
+@pytest.mark.asyncio
+async def test_adjust_draft_plan_applies_only_the_returned_changes(ai_orchestrator_service):
+    service, mock_create_method = ai_orchestrator_service
+    mock_create_method.return_value = MockCompletion(
+        '{"adjustments": [{"day_index": 0, "exercise_index": 0, "sets": 2, "rpe": 6}], "ai_explanation": "Lighter today."}'
+    )
+    draft = WorkoutPlanModel.model_validate_json(MOCK_OPENAI_SUCCESS_CONTENT)
+
+    plan = await service.adjust_draft_plan("test_user", draft, {}, {"primary_goal": "strength"}, [], PlanGenerationContext(soreness="high"))
+
+    exercise = plan.workout_days[0].exercises[0]
+    assert (exercise.name, exercise.sets, exercise.reps, exercise.rpe) == ("Mock Squat", 2, "8-10", 6)
+    assert plan.ai_explanation == "Lighter today."
+    assert mock_create_method.call_args.kwargs["model"] == service.adapt_model
+    assert "Draft: " in mock_create_method.call_args.kwargs["messages"][1]["content"]
+
+
+@pytest.mark.asyncio
+async def test_adjust_draft_plan_rejects_invalid_patch(ai_orchestrator_service):
+    service, mock_create_method = ai_orchestrator_service
+    mock_create_method.return_value = MockCompletion('{"adjustments": [{"exercise_index": 7, "sets": 2}]}')
+    draft = WorkoutPlanModel.model_validate_json(MOCK_OPENAI_SUCCESS_CONTENT)
+
+    with pytest.raises(ValueError, match="not a valid plan adjustment"):
+        await service.adjust_draft_plan("test_user", draft, {}, {}, [], PlanGenerationContext(energy="low"))
+
+
+@pytest.mark.asyncio
+async def test_slow_generation_is_hedged_to_faster_tier():
+    primary_cancelled = asyncio.Event()
+
+    async def create(model, **kwargs):
+        if model == "gpt-4o":
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                primary_cancelled.set()
+                raise
+        return MockCompletion(MOCK_OPENAI_SUCCESS_CONTENT)
+
+    client = MagicMock()
+    client.chat.completions.create = create
+    router = ModelRouter(["gpt-4o", "gpt-4o-mini"], hedge_delay=0.02)
+    service = AIOrchestratorService(client=client, model="gpt-4o", router=router, deadline=2.0)
+
+    plan = await service.generate_workout_plan("test_user", {}, {}, [], PlanGenerationContext())
+
+    assert plan.workout_days[0].exercises[0].name == "Mock Squat"
+    await asyncio.sleep(0.01) # let the losing request unwind
+    assert primary_cancelled.is_set()
+    routing = service.stats()["routing"]
+    assert (routing["hedges"], routing["hedges_won"]) == (1, 1)
+    assert routing["models"]["gpt-4o"]["cancelled"] == 1
+    assert routing["models"]["gpt-4o-mini"]["successes"] == 1
+    assert service.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_generation_is_hedged_without_waiting_for_the_delay():
+    async def create(model, **kwargs):
+        if model == "gpt-4o":
+            raise Exception("upstream 400")
+        return MockCompletion(MOCK_OPENAI_SUCCESS_CONTENT)
+
+    client = MagicMock()
+    client.chat.completions.create = create
+    router = ModelRouter(["gpt-4o", "gpt-4o-mini"], hedge_delay=5.0)
+    service = AIOrchestratorService(client=client, model="gpt-4o", router=router, deadline=10.0)
+
+    plan = await asyncio.wait_for(service.generate_workout_plan("test_user", {}, {}, [], PlanGenerationContext()), timeout=1.0)
+
+    assert plan.workout_days[0].exercises[0].name == "Mock Squat"
+    routing = service.stats()["routing"]
+    assert (routing["hedges"], routing["hedges_won"]) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_hedged_plan_is_cached_under_the_tier_that_answered():
+    async def create(model, **kwargs):
+        if model == "gpt-4o":
+            await asyncio.sleep(1)
+        return MockCompletion(MOCK_OPENAI_SUCCESS_CONTENT)
+
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock(side_effect=create)
+    router = ModelRouter(["gpt-4o", "gpt-4o-mini"], hedge_delay=0.02, min_samples=1, max_error_rate=0.0)
+    service = AIOrchestratorService(client=client, model="gpt-4o", router=router, deadline=2.0)
+    context = PlanGenerationContext()
+    messages = await service._plan_messages("test_user", {}, {}, [], context)
+
+    plan = await service.generate_workout_plan("test_user", {}, {}, [], context)
+
+    assert plan.prompt_hash == service.plan_cache_key(messages, model="gpt-4o-mini")
+    assert await service.plan_cache.get(service.plan_cache_key(messages, model="gpt-4o")) is None
+
+    # While gpt-4o is healthy, the gpt-4o-mini plan is not served in its place...
+    router.record("gpt-4o", 0.5, ok=True)
+    client.chat.completions.create.side_effect = None
+    client.chat.completions.create.return_value = MockCompletion(MOCK_OPENAI_SUCCESS_CONTENT)
+    await service.generate_workout_plan("test_user", {}, {}, [], context)
+    assert client.chat.completions.create.call_args.kwargs["model"] == "gpt-4o"
+    calls = client.chat.completions.create.await_count
+
+    # ...but once it is routed around, either tier's cached plan answers without a call.
+    router.record("gpt-4o", 0.5, ok=False)
+    await service.generate_workout_plan("test_user", {}, {}, [], context)
+    assert client.chat.completions.create.await_count == calls
+
+
+@pytest.mark.asyncio
+async def test_fast_generation_is_not_hedged(ai_orchestrator_service):
+    service, mock_create_method = ai_orchestrator_service
+    mock_create_method.return_value = MockCompletion(MOCK_OPENAI_SUCCESS_CONTENT)
+
+    await service.generate_workout_plan("test_user", {}, {}, [], PlanGenerationContext())
+
+    mock_create_method.assert_awaited_once()
+    assert mock_create_method.call_args.kwargs["model"] == service.model
+    assert service.stats()["routing"]["hedges"] == 0
+
+
+@pytest.mark.asyncio
+async def test_fenced_and_mistyped_plan_is_repaired_locally(ai_orchestrator_service):
+    service, mock_create_method = ai_orchestrator_service
+    mistyped = MOCK_OPENAI_INVALID_JSON_CONTENT.replace('"sets": 3, "reps": "8-10"', '"sets": "3 sets", "reps": 10, "rpe": "8"')
+    mock_create_method.return_value = MockCompletion("```json\n" + mistyped + ",}\n```")
+
+    plan = await service.generate_workout_plan("test_user", {}, {}, [], PlanGenerationContext())
+
+    exercise = plan.workout_days[0].exercises[0]
+    assert (exercise.sets, exercise.reps, exercise.rpe) == (3, "10", 8)
+    mock_create_method.assert_awaited_once()
+    repair = service.stats()["plan_repair"]
+    assert (repair["repaired_locally"], repair["repair_rate"]) == (1, 1.0)
+    assert repair["tokens_saved"] > 0
+
+
+@pytest.mark.asyncio
+async def test_truncated_plan_is_rejected_not_shortened(single_tier_service):
+    service, mock_create_method = single_tier_service
+    # Cut off mid-document, with or without the finish_reason saying so
+    cut_off = MockCompletion(MOCK_OPENAI_SUCCESS_CONTENT)
+    cut_off.choices[0].finish_reason = "length"
+    mock_create_method.side_effect = [MockCompletion(MOCK_OPENAI_INVALID_JSON_CONTENT), cut_off, MockCompletion(MOCK_OPENAI_SUCCESS_CONTENT)]
+
+    for _ in range(2):
+        with pytest.raises(TruncatedResponse):
+            await service.generate_workout_plan("test_user", {}, {}, [], PlanGenerationContext())
+
+    assert service.stats()["plan_repair"]["truncated"] == 2
+    # Nothing was cached: the next request generates again
+    plan = await service.generate_workout_plan("test_user", {}, {}, [], PlanGenerationContext())
+    assert plan.workout_days[0].exercises[0].name == "Mock Squat"
+    assert mock_create_method.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_only_invalid_exercise_is_reasked(ai_orchestrator_service):
+    service, mock_create_method = ai_orchestrator_service
+    reask = MockCompletion('{"exercises": [{"day_index": 0, "exercise_index": 0, "exercise": {"name": "Mock Squat", "sets": 3, "reps": "8-10"}}]}')
+    reask.usage = MagicMock(total_tokens=40)
+    mock_create_method.side_effect = [MockCompletion(MOCK_OPENAI_VALIDATION_ERROR_CONTENT), reask]
+
+    plan = await service.generate_workout_plan("test_user", {}, {}, [], PlanGenerationContext())
+
+    assert plan.workout_days[0].exercises[0].sets == 3
+    reask_prompt = mock_create_method.call_args.kwargs["messages"][1]["content"]
+    assert '"sets":"invalid"' in reask_prompt and "ai_explanation" not in reask_prompt # just the broken sub-tree
+    assert service.stats()["plan_repair"]["repaired_by_reask"] == 1
@@ -0,0 +1,91 @@
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from app.models.workout_log import WorkoutLogPage
+from app.services import analytics
+
+
+def row(exercise, reps, weight, completed_at, rpe=None):
+    return {"exercise_name": exercise, "actual_reps": reps, "actual_weight": weight, "rpe": rpe, "completed_at": completed_at}
+
+
+ROWS = [
+    row("Squat", 5, 100.0, "2025-12-01T09:00:00+00:00", rpe=8.0), # Monday, week 1
+    row("Squat", 0, 120.0, "2025-12-01T09:05:00+00:00"), # missed
+    row("Bench Press", 1, 90.0, "2025-12-02T09:00:00Z"),
+    row("Squat", 5, 110.0, "2025-12-03T09:00:00+00:00"),
+    row("Squat", 8, 90.0, "2025-12-17T09:00:00+00:00"), # week 3; week 2 is empty
+]
+
+
+def test_columns_and_e1rm():
+    logs = analytics.LogColumns.from_rows(ROWS)
+
+    assert logs.exercises == ["Squat", "Bench Press"]
+    assert list(logs.exercise) == [0, 0, 1, 0, 0]
+    assert analytics.week_start_date(logs.week[0]) == date(2025, 12, 1)
+    assert np.allclose(analytics.e1rm(logs), [100 * (1 + 5 / 30), 0.0, 90.0, 110 * (1 + 5 / 30), 90 * (1 + 8 / 30)])
+    assert analytics.e1rm(logs, "rpe")[0] == pytest.approx(100 * (1 + 7 / 30)) # 2 reps in reserve
+    assert analytics.best_e1rm_by_exercise(logs) == {"Squat": pytest.approx(110 * (1 + 5 / 30)), "Bench Press": 90.0}
+
+
+def test_weekly_summary_and_streaks():
+    logs = analytics.LogColumns.from_rows(ROWS)
+
+    summary = analytics.weekly_summary(logs, rolling_weeks=2)
+
+    assert list(summary["week_start"].astype(str)) == ["2025-12-01", "2025-12-08", "2025-12-15"]
+    assert list(summary["volume"]) == [500.0 + 90.0 + 550.0, 0.0, 720.0]
+    assert list(summary["volume_rolling"]) == [1140.0, 570.0, 360.0]
+    assert np.isnan(summary["volume_pct_change"][0]) and summary["volume_pct_change"][1] == -1.0
+    assert np.isnan(summary["volume_pct_change"][2]) # after an empty week
+    assert list(summary["sets"]) == [4, 0, 1] and list(summary["trained_days"]) == [3, 0, 1]
+    squat_best = 110 * (1 + 5 / 30)
+    expected = (5 * 100 / squat_best + 1 * 90 / 90 + 5 * 110 / squat_best) / 11
+    assert summary["intensity"][0] == pytest.approx(expected) and np.isnan(summary["intensity"][1])
+
+    today = int(logs.day[-1]) + 1
+    assert analytics.streaks(logs.day, today=today) == {"longest": 3, "current": 1}
+    assert analytics.streaks(logs.day, today=today + 1)["current"] == 0
+    assert analytics.weekly_summary(analytics.LogColumns.from_rows([]))["volume"].size == 0
+
+
+@pytest.mark.asyncio
+async def test_load_log_columns_pages_through_the_history():
+    log_service = MagicMock()
+    log_service.list_logs = AsyncMock(side_effect=[
+        WorkoutLogPage(items=ROWS[3:][::-1], next_cursor="older"),
+        WorkoutLogPage(items=ROWS[:3][::-1], next_cursor=None),
+    ])
+
+    logs = await analytics.load_log_columns(uuid4(), log_service)
+
+    assert len(logs) == 5 and logs.exercises == ["Squat", "Bench Press"]
+    assert log_service.list_logs.await_args_list[1].kwargs["cursor"] == "older"
+    assert log_service.list_logs.await_args.kwargs["fields"] == analytics.ANALYTICS_FIELDS
+
+
+def test_rollup_trends_match_the_per_set_summary():
+    # The weekly rollups of ROWS, as apply_workout_log_rollups stores them
+    rollups = [
+        {"week_start": "2025-12-01", "exercise_name": "Squat", "reps": 10, "volume": 1050.0, "best_e1rm": 110 * (1 + 5 / 30)},
+        {"week_start": "2025-12-01", "exercise_name": "Bench Press", "reps": 1, "volume": 90.0, "best_e1rm": 90.0},
+        {"week_start": "2025-12-15", "exercise_name": "Squat", "reps": 8, "volume": 720.0, "best_e1rm": 90 * (1 + 8 / 30)},
+    ]
+    weeks = [date(2025, 12, 1), date(2025, 12, 8), date(2025, 12, 15)]
+
+    trends = analytics.rollup_trends(rollups, weeks)
+    summary = analytics.weekly_summary(analytics.LogColumns.from_rows(ROWS))
+
+    assert trends["volume"].tolist() == summary["volume"].tolist()
+    np.testing.assert_allclose(trends["intensity"], summary["intensity"])
+    assert np.isnan(trends["intensity"][1]) # an empty week
+
+    # Rows outside the weeks asked for still set the best e1RM
+    later = analytics.rollup_trends(rollups, weeks[2:])
+    np.testing.assert_allclose(later["intensity"], summary["intensity"][2:])
+    assert analytics.rollup_trends([], weeks)["volume"].tolist() == [0.0, 0.0, 0.0]
@@ -0,0 +1,22 @@
+from app.services.charts import SparklineRenderer, canonical_values, chart_path, sparkline_path
+
+
+def test_sparkline_path_is_smoothed_and_compact():
+    assert sparkline_path([0, 10, 5]) == "M0 149C118 149 118 1 236 1C354 1 354 75 472 75"
+    assert sparkline_path([3, 3]) == "M0 75C236 75 236 75 472 75" # a flat series sits mid-height
+    assert sparkline_path([7]) == sparkline_path([7, 7])
+    assert canonical_values([1200.0, 66.6666, -0.01, 0]) == "1200,66.7,0,0"
+    assert chart_path("volume", [1, 2.25]) == "/api/v1/dashboard/charts/volume.svg?values=1,2.2"
+
+
+def test_renderer_memoizes_by_series_hash():
+    renderer = SparklineRenderer(maxsize=8, ttl=60)
+
+    etag, svg = renderer.render("volume", [1.0, 2.0, 3.0])
+    same_etag, same_svg = renderer.render("volume", [1, 2.0001, 3])
+    other_etag, _ = renderer.render("intensity", [1.0, 2.0, 3.0])
+
+    assert (same_etag, same_svg) == (etag, svg) # equal after canonical rounding
+    assert other_etag != etag
+    assert renderer.stats()["renders"] == 2
+    assert svg.startswith("<svg") and 'id="volumeGradient"' in svg and len(svg) < 1200
@@ -0,0 +1,90 @@
+from datetime import date, timedelta
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+
+from app.services.dashboard_service import DashboardService
+
+TODAY = date(2025, 12, 11) # a Thursday; the week started on the 8th
+
+
+def rollup(period_key, period, exercise, volume, reps, best_e1rm):
+    return {period_key: period.isoformat(), "exercise_name": exercise, "sets": 5, "reps": reps, "volume": volume,
+            "top_weight": best_e1rm * 0.85, "best_e1rm": best_e1rm}
+
+
+def service(daily, weekly, snapshot=None):
+    rollups = MagicMock()
+    rollups.daily = AsyncMock(return_value=daily)
+    rollups.weekly = AsyncMock(return_value=weekly)
+    snapshots = MagicMock()
+    snapshots.get = AsyncMock(return_value=snapshot)
+    return DashboardService(rollups=rollups, snapshots=snapshots)
+
+
+@pytest.mark.asyncio
+async def test_metrics_come_from_rollups():
+    daily = [
+        rollup("day", TODAY, "Squat", 2500.0, 25, 120.0),
+        rollup("day", TODAY, "Leg Curl", 600.0, 30, 50.0),
+        rollup("day", TODAY - timedelta(days=1), "Bench Press", 2000.0, 25, 95.0),
+        rollup("day", TODAY - timedelta(days=3), "Squat", 2400.0, 25, 118.0), # this week's Monday
+        rollup("day", date(2025, 12, 5), "Squat", 2000.0, 20, 118.0), # last week, the reviewed one
+        rollup("day", date(2025, 12, 2), "Squat", 2000.0, 20, 115.0),
+    ]
+    weekly = [
+        rollup("week_start", date(2025, 12, 8), "Squat", 2500.0, 25, 120.0),
+        rollup("week_start", date(2025, 12, 8), "Leg Curl", 600.0, 30, 50.0),
+        rollup("week_start", date(2025, 12, 8), "Bench Press", 2000.0, 25, 95.0),
+        rollup("week_start", date(2025, 12, 1), "Squat", 4000.0, 40, 118.0),
+    ]
+    dashboard_service = service(daily, weekly)
+
+    metrics = await dashboard_service.get_dashboard_metrics(uuid4(), today=TODAY)
+
+    since = dashboard_service.rollups.weekly.await_args.args[1]
+    assert since == date(2025, 12, 8) - timedelta(weeks=12) # one more week than shown, for the review's trends
+    dashboard_service.snapshots.get.assert_awaited_once()
+    assert dashboard_service.snapshots.get.await_args.args[1] == date(2025, 12, 1)
+    assert metrics.workout_streak.days == 2
+    assert metrics.weekly_volume.total == 5100.0
+    assert (metrics.goal_progress.name, metrics.goal_progress.current, metrics.goal_progress.target) == ("Squat", 120.0, 127.5)
+    assert [workout.name for workout in metrics.recent_workouts] == ["Squat & Leg Curl", "Bench Press", "Squat"]
+    assert [workout.date for workout in metrics.recent_workouts] == ["Today", "Yesterday", "Dec 8"]
+    # No snapshot yet: the review of the closed week is computed from the same rows
+    review = metrics.weekly_review
+    assert review.week_start == date(2025, 12, 1)
+    assert (review.volume.value, review.volume.trend, review.volume.percentage_change) == ("4,000 kg", "up", "0%")
+    assert review.consistency.value == "2/4 Days"
+    assert [bar.trained for bar in review.consistency.chart_data] == [False, True, False, False, True, False, False]
+    assert review.intensity.value.endswith("% 1RM")
+    assert review.volume.chart_url.endswith(",4000") # the chart window ends with the reviewed week
+    assert review.coach_corner.message.startswith("You trained 2 of your 4 target days last week")
+
+
+@pytest.mark.asyncio
+async def test_review_is_served_from_the_snapshot_and_matches_a_recompute():
+    daily = [rollup("day", date(2025, 12, 2), "Squat", 2000.0, 20, 115.0)]
+    weekly = [
+        rollup("week_start", date(2025, 12, 8), "Squat", 2500.0, 25, 130.0),
+        rollup("week_start", date(2025, 12, 1), "Squat", 2000.0, 20, 115.0),
+    ]
+    computed = await service(daily, weekly).weekly_review(uuid4(), date(2025, 12, 1))
+    snapshot = computed.model_copy(update={"coach_corner": computed.coach_corner.model_copy(update={"suggestion": "stored"})})
+
+    metrics = await service(daily, weekly, snapshot=snapshot).get_dashboard_metrics(uuid4(), today=TODAY)
+
+    assert metrics.weekly_review.coach_corner.suggestion == "stored"
+    # Later weeks do not leak into a closed week's review (this week's best e1RM is ignored)
+    live = await service(daily, weekly).get_dashboard_metrics(uuid4(), today=TODAY)
+    assert live.weekly_review == computed
+
+
+@pytest.mark.asyncio
+async def test_empty_history():
+    metrics = await service([], []).get_dashboard_metrics(uuid4(), today=TODAY)
+
+    assert metrics.workout_streak.days == 0 and metrics.recent_workouts == []
+    assert metrics.weekly_review.intensity.value == "-"
+    assert metrics.weekly_review.coach_corner.suggestion == "Plan shorter sessions"
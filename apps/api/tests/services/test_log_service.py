@@ -0,0 +1,161 @@
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.workout_log import WorkoutLogCreate
+from app.services.log_service import InvalidCursor, LogService, decode_log_cursor, encode_log_cursor
+
+USER_ID = uuid4()
+
+
+class FakeWorkoutLogs:
+    """WorkoutLogs behind `upsert(..., on_conflict="id", ignore_duplicates=True)`: returns only new rows."""
+
+    def __init__(self, existing=(), fail_chunks=()):
+        self.rows = {row_id: {} for row_id in existing}
+        self.chunks = []
+        self.fail_chunks = set(fail_chunks)
+
+    def table(self, name):
+        assert name == "WorkoutLogs"
+        table = MagicMock()
+        table.upsert.side_effect = self.upsert
+        return table
+
+    def upsert(self, rows, on_conflict, ignore_duplicates):
+        assert (on_conflict, ignore_duplicates) == ("id", True)
+        chunk_index = len(self.chunks)
+        self.chunks.append(rows)
+
+        async def execute():
+            if chunk_index in self.fail_chunks:
+                raise RuntimeError("request entity too large")
+            inserted = [row for row in rows if row["id"] not in self.rows]
+            self.rows.update((row["id"], row) for row in inserted)
+            return MagicMock(data=inserted)
+        return MagicMock(execute=execute)
+
+
+class RecordedQuery:
+    """Records a PostgREST query chain and answers it with `rows`."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def table(self, name):
+        assert name == "WorkoutLogs"
+        return self
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return call
+
+    async def execute(self):
+        return MagicMock(data=self.rows)
+
+
+def entry(set_number, log_id=None):
+    return WorkoutLogCreate(
+        id=log_id, exercise_name="Squat", set_number=set_number, actual_reps=5, actual_weight=100.0, rpe=8.0,
+        completed_at=datetime(2025, 12, 10, 9, set_number, tzinfo=timezone.utc),
+    )
+
+
+@pytest.mark.asyncio
+async def test_bulk_ingest_is_chunked_and_keeps_client_ids_and_timestamps():
+    fake = FakeWorkoutLogs()
+    entries = [entry(i, uuid4()) for i in range(1, 8)] + [entry(8)]
+
+    results = await LogService(supabase=fake).create_bulk_log_entries(entries, USER_ID, chunk_size=3)
+
+    assert [len(chunk) for chunk in fake.chunks] == [3, 3, 2]
+    assert [result.status for result in results] == ["created"] * 8
+    assert [result.id for result in results[:7]] == [e.id for e in entries[:7]]
+    assert results[7].id is not None # assigned when the client sent none
+    assert results[0].completed_at == datetime(2025, 12, 10, 9, 1, tzinfo=timezone.utc)
+    assert fake.chunks[0][0]["user_id"] == str(USER_ID)
+
+
+@pytest.mark.asyncio
+async def test_replayed_and_repeated_ids_are_duplicates():
+    replayed, repeated, fresh = uuid4(), uuid4(), uuid4()
+    fake = FakeWorkoutLogs(existing=[str(replayed)])
+    entries = [entry(1, replayed), entry(2, repeated), entry(3, repeated), entry(4, fresh)]
+
+    results = await LogService(supabase=fake).create_bulk_log_entries(entries, USER_ID)
+
+    assert [result.status for result in results] == ["duplicate", "created", "duplicate", "created"]
+    assert sum(len(chunk) for chunk in fake.chunks) == 3 # the repeated id is sent once
+
+
+@pytest.mark.asyncio
+async def test_failed_chunks_are_reported_per_row():
+    fake = FakeWorkoutLogs(fail_chunks=[1])
+    entries = [entry(i, uuid4()) for i in range(1, 5)]
+
+    results = await LogService(supabase=fake).create_bulk_log_entries(entries, USER_ID, chunk_size=2, concurrency=1)
+
+    assert [result.status for result in results] == ["created", "created", "failed", "failed"]
+    assert results[2].error == "request entity too large"
+
+    with pytest.raises(HTTPException) as error:
+        await LogService(supabase=FakeWorkoutLogs(fail_chunks=[0])).create_bulk_log_entries(entries[:1], USER_ID)
+    assert error.value.status_code == 500
+
+
+@pytest.mark.asyncio
+async def test_list_logs_pages_by_keyset_with_filters_and_sparse_fields():
+    rows = [{"id": str(uuid4()), "completed_at": f"2025-12-10T09:0{minute}:00+00:00", "actual_weight": 100.0} for minute in (2, 1)]
+    query = RecordedQuery(rows)
+    plan_id = uuid4()
+
+    page = await LogService(supabase=query).list_logs(
+        USER_ID, limit=2, exercise_name="Squat", plan_id=plan_id,
+        since=datetime(2025, 12, 1, tzinfo=timezone.utc), fields=["actual_weight"],
+    )
+
+    assert page.items == rows
+    assert decode_log_cursor(page.next_cursor) == (rows[-1]["completed_at"], rows[-1]["id"])
+    calls = [(name, args) for name, args, _ in query.calls]
+    assert calls[0] == ("select", ("id, completed_at, actual_weight",))
+    assert ("eq", ("exercise_name", "Squat")) in calls and ("eq", ("plan_id", str(plan_id))) in calls
+    assert ("gte", ("completed_at", "2025-12-01T00:00:00+00:00")) in calls
+    assert not any(name == "or_" for name, _ in calls) # first page
+    assert [kwargs for name, _, kwargs in query.calls if name == "order"] == [{"desc": True}, {"desc": True}]
+
+    query = RecordedQuery(rows[:1])
+    page = await LogService(supabase=query).list_logs(USER_ID, limit=2, cursor=encode_log_cursor(rows[0]["completed_at"], rows[0]["id"]))
+    assert page.next_cursor is None # short page: nothing older
+    calls = [(name, args) for name, args, _ in query.calls]
+    assert ("lte", ("completed_at", rows[0]["completed_at"])) in calls
+    keyset = [args[0] for name, args in calls if name == "or_"]
+    assert keyset == [f'completed_at.lt."{rows[0]["completed_at"]}",and(completed_at.eq."{rows[0]["completed_at"]}",id.lt.{rows[0]["id"]})']
+
+
+@pytest.mark.asyncio
+async def test_list_logs_rejects_unknown_fields_and_foreign_cursors():
+    service = LogService(supabase=RecordedQuery([]))
+    with pytest.raises(ValueError):
+        await service.list_logs(USER_ID, fields=["password"])
+    for bad in ("not-a-cursor!", encode_log_cursor('2025-12-10",id.gt.0', str(uuid4()))):
+        with pytest.raises(InvalidCursor):
+            await service.list_logs(USER_ID, cursor=bad)
+
+
+@pytest.mark.asyncio
+async def test_logs_since_filters_on_arrival_for_incremental_summaries():
+    query = RecordedQuery([])
+    window = datetime(2025, 11, 12, tzinfo=timezone.utc)
+    watermark = datetime(2025, 12, 10, 9, tzinfo=timezone.utc)
+
+    await LogService(supabase=query).list_logs_since(USER_ID, window, watermark)
+
+    assert ("gt", ("completed_at", window.isoformat()), {}) in query.calls
+    assert ("gte", ("updated_at", watermark.isoformat()), {}) in query.calls
+    assert [call[1][0] for call in query.calls if call[0] == "order"] == ["updated_at", "id"]
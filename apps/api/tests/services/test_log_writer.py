@@ -0,0 +1,109 @@
+import asyncio
+import glob
+import json
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+
+from app.models.workout_log import WorkoutLogBulkResult, WorkoutLogCreate
+from app.services.log_writer import BufferedLogWriter
+
+USER_ID = uuid4()
+
+
+def entry(set_number):
+    return WorkoutLogCreate(exercise_name="Squat", set_number=set_number, actual_reps=5, actual_weight=100.0, rpe=8.0,
+                            completed_at=datetime(2025, 12, 10, 9, set_number, tzinfo=timezone.utc))
+
+
+def fake_log_service(stored, fail=False, poison=()):
+    async def create_bulk_log_entries(entries, user_id, **options):
+        if fail:
+            raise RuntimeError("supabase unavailable")
+        stored.extend(e for e in entries if e.set_number not in poison)
+        return [
+            WorkoutLogBulkResult(**e.model_dump(), user_id=user_id, status="failed", error="violates check constraint")
+            if e.set_number in poison else WorkoutLogBulkResult(**e.model_dump(), user_id=user_id)
+            for e in entries
+        ]
+    service = MagicMock()
+    service.create_bulk_log_entries = AsyncMock(side_effect=create_bulk_log_entries)
+    return service
+
+
+@pytest.mark.asyncio
+async def test_append_acknowledges_from_wal_and_flushes_in_batches(tmp_path):
+    stored = []
+    wal = str(tmp_path / "logs.wal")
+    writer = BufferedLogWriter(wal, flush_interval_ms=60_000, flush_max_rows=3, log_service=fake_log_service(stored))
+    await writer.start()
+
+    acknowledged = [writer.append(entry(i), USER_ID) for i in (1, 2)]
+    assert acknowledged[0].completed_at == datetime(2025, 12, 10, 9, 1, tzinfo=timezone.utc)
+    with open(wal) as f:
+        assert [json.loads(line)["id"] for line in f] == [str(log.id) for log in acknowledged]
+    await asyncio.sleep(0.01)
+    assert stored == [] # below flush_max_rows and before the interval
+
+    writer.append(entry(3), USER_ID)
+    await asyncio.sleep(0.01)
+    assert [e.set_number for e in stored] == [1, 2, 3]
+    assert [e.id for e in stored[:2]] == [log.id for log in acknowledged]
+    assert writer.stats()["pending"] == 0 and glob.glob(f"{wal}.*.segment") == []
+    await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_rows_and_wal_is_replayed_after_crash(tmp_path):
+    wal = str(tmp_path / "logs.wal")
+    crashed = BufferedLogWriter(wal, flush_interval_ms=60_000, flush_max_rows=100, log_service=fake_log_service([], fail=True))
+    await crashed.start()
+    ids = [crashed.append(entry(i), USER_ID).id for i in (1, 2)]
+    assert await crashed.flush() == 0 # Supabase down: rotated into a segment, nothing lost
+    crashed.append(entry(3), USER_ID) # still only in the live WAL
+    crashed._task.cancel() # the process dies without a clean stop
+
+    stored = []
+    restarted = BufferedLogWriter(wal, flush_interval_ms=60_000, log_service=fake_log_service(stored))
+    await restarted.start()
+    await asyncio.sleep(0.01)
+
+    assert [e.id for e in stored[:2]] == ids and len(stored) == 3
+    assert restarted.stats()["recovered"] == 3
+    assert glob.glob(f"{wal}.*.segment") == []
+    await restarted.stop()
+
+
+@pytest.mark.asyncio
+async def test_poison_row_is_retried_alone_then_dead_lettered(tmp_path):
+    stored = []
+    wal = str(tmp_path / "logs.wal")
+    service = fake_log_service(stored, poison={2})
+    writer = BufferedLogWriter(wal, flush_interval_ms=60_000, flush_max_rows=100, max_attempts=2,
+                               retry_max_seconds=0, log_service=service)
+    await writer.start()
+    ids = [writer.append(entry(i), USER_ID).id for i in (1, 2, 3)]
+
+    assert await writer.flush() == 2
+    assert [e.set_number for e in stored] == [1, 3]
+    # Only the failed row is kept, in a retry segment that replaces the flushed one
+    segments = glob.glob(f"{wal}.*.segment")
+    assert len(segments) == 1
+    with open(segments[0]) as f:
+        assert [(row["id"], row["_attempts"]) for row in map(json.loads, f)] == [(str(ids[1]), 1)]
+
+    writer.append(entry(4), USER_ID)
+    assert await writer.flush() == 1
+    retry, fresh = service.create_bulk_log_entries.call_args_list[-2:]
+    assert [e.set_number for e in retry.args[0]] == [2] and retry.kwargs == {"chunk_size": 1} # on its own
+    assert [e.set_number for e in fresh.args[0]] == [4] and fresh.kwargs == {}
+    assert [e.set_number for e in stored] == [1, 3, 4]
+    stats = writer.stats()
+    assert (stats["pending"], stats["segments"], stats["dead_lettered"]) == (0, 0, 1)
+    assert glob.glob(f"{wal}.*.segment") == []
+    with open(f"{wal}.dead") as f:
+        dead = [json.loads(line) for line in f]
+    assert [(row["id"], row["_attempts"], row["_error"]) for row in dead] == [(str(ids[1]), 2, "violates check constraint")]
+    await writer.stop()
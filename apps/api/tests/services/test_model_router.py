@@ -0,0 +1,80 @@
+from app.services.model_router import ModelRouter
+
+
+def test_routes_to_first_healthy_tier():
+    router = ModelRouter(["gpt-4o", "gpt-4o-mini"], p95_budget=8.0, max_error_rate=0.2, window=20, min_samples=5)
+    assert router.choose() == "gpt-4o"
+
+    for _ in range(5):
+        router.record("gpt-4o", 9.5, ok=True) # too slow at p95
+    assert router.choose() == "gpt-4o-mini"
+
+    for _ in range(20):
+        router.record("gpt-4o", 2.0, ok=True) # recovered within the rolling window
+    assert router.choose() == "gpt-4o"
+    assert router.stats()["routed"] == {"gpt-4o": 2, "gpt-4o-mini": 1}
+
+
+def test_error_rate_demotes_and_fastest_tier_is_last_resort():
+    router = ModelRouter(["gpt-4o", "gpt-4o-mini"], max_error_rate=0.2, min_samples=4)
+    for model in ("gpt-4o", "gpt-4o-mini"):
+        for ok in (True, False, False, True):
+            router.record(model, 1.0, ok=ok)
+
+    assert not router.healthy("gpt-4o")
+    assert router.choose() == "gpt-4o-mini"
+
+
+def test_hedge_is_next_faster_tier():
+    router = ModelRouter(["gpt-4o", "gpt-4o-mini"], hedge_delay=4.0)
+    assert router.hedge_for("gpt-4o") == "gpt-4o-mini"
+    assert router.hedge_for("gpt-4o-mini") is None
+    assert ModelRouter(["gpt-4o", "gpt-4o-mini"], hedge_delay=0).hedge_for("gpt-4o") is None
+
+
+def test_servable_tiers_stop_at_the_first_healthy_tier():
+    router = ModelRouter(["gpt-4o", "gpt-4o-mini"], max_error_rate=0.2, min_samples=4)
+    assert router.servable_tiers() == ["gpt-4o"]
+
+    for ok in (True, False, False, True):
+        router.record("gpt-4o", 1.0, ok=ok)
+    assert router.servable_tiers() == ["gpt-4o", "gpt-4o-mini"]
+    assert router.stats()["routed"] == {"gpt-4o": 0, "gpt-4o-mini": 0} # nothing was routed
+
+
+def test_stats_report_histogram_and_slo():
+    router = ModelRouter(["gpt-4o"], slo_seconds=10.0)
+    for latency, ok in ((0.4, True), (3.0, True), (12.0, True), (5.0, False)):
+        router.record("gpt-4o", latency, ok=ok)
+    router.record_cancelled("gpt-4o")
+
+    stats = router.stats()["models"]["gpt-4o"]
+    assert stats["calls"] == 4 and stats["cancelled"] == 1
+    assert stats["success_rate"] == 0.75
+    assert stats["within_slo_rate"] == 0.5 # 12s was valid but late; the 5s call failed
+    assert stats["latency_histogram"]["le_0.5"] == 1
+    assert stats["latency_histogram"]["le_4"] == 1
+    assert stats["latency_histogram"]["le_15"] == 1
+    assert stats["latency_max_seconds"] == 12.0
+
+
+def test_unhealthy_tier_is_probed_and_recovers():
+    now = [0.0]
+    router = ModelRouter(["gpt-4o", "gpt-4o-mini"], p95_budget=8.0, window=20, min_samples=5, probe_interval=30.0,
+                         clock=lambda: now[0])
+    for _ in range(20):
+        router.record("gpt-4o", 12.0, ok=True)
+    assert router.choose() == "gpt-4o-mini" # demoted; first probe due in 30 s
+
+    now[0] = 31.0
+    assert router.choose() == "gpt-4o" # the probe
+    assert router.choose() == "gpt-4o-mini" # one probe per interval
+    router.record("gpt-4o", 12.0, ok=True) # still slow: stays demoted
+    now[0] = 45.0
+    assert router.choose() == "gpt-4o-mini"
+
+    now[0] = 62.0
+    assert router.choose() == "gpt-4o"
+    router.record("gpt-4o", 3.0, ok=True) # healthy probe clears the stale window
+    assert router.healthy("gpt-4o") and router.choose() == "gpt-4o"
+    assert (router.stats()["probes"], router.stats()["recovered"]) == (2, 1)
@@ -0,0 +1,104 @@
+import json
+from datetime import date, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.models.workout_plan import Exercise, WorkoutDay, WorkoutPlanModel
+from app.services.plan_batch import BatchCheckpoint, NightlyPlanBatch
+
+PLAN_DATE = date(2025, 12, 14)
+
+
+def make_plan() -> WorkoutPlanModel:
+    return WorkoutPlanModel(
+        user_id="ai",
+        plan_date=date(2025, 12, 13),
+        workout_days=[WorkoutDay(day_name="Today", exercises=[Exercise(name="Squat", sets=3, reps="5")])],
+    )
+
+
+@pytest.fixture
+def orchestrator():
+    orchestrator = MagicMock(prompt_tokens=0, completion_tokens=0)
+
+    async def generate_workout_plan(**kwargs):
+        orchestrator.prompt_tokens += 600
+        orchestrator.completion_tokens += 250
+        if kwargs["user_id"] == "user-bad":
+            raise RuntimeError("Failed to generate plan from OpenAI: 500")
+        return make_plan()
+    orchestrator.generate_workout_plan = AsyncMock(side_effect=generate_workout_plan)
+    return orchestrator
+
+
+@pytest.fixture
+def plan_service():
+    plan_service = MagicMock()
+    plan_service.get_draft_plan = AsyncMock(return_value=None)
+    plan_service.store_workout_plan = AsyncMock(side_effect=lambda plan, draft: plan)
+    plan_service.delete_expired_drafts = AsyncMock(return_value=0)
+    return plan_service
+
+
+@pytest.mark.asyncio
+async def test_batch_stores_drafts_and_reports_throughput(tmp_path, orchestrator, plan_service):
+    plan_service.list_active_user_ids = AsyncMock(return_value=["user-1", "user-2", "user-bad"])
+    batch = NightlyPlanBatch(plan_service, orchestrator, PLAN_DATE, concurrency=2, checkpoint_path=str(tmp_path / "ckpt.json"))
+
+    report = await batch.run()
+
+    assert (report.users, report.generated, report.failed) == (3, 2, 1)
+    plan_service.delete_expired_drafts.assert_awaited_once_with(PLAN_DATE - timedelta(days=1))
+    assert "user-bad" in report.failures
+    assert report.tokens == 3 * 850
+    assert report.plans_per_minute > 0 and report.tokens_per_minute > 0
+    stored = [call.args[0] for call in plan_service.store_workout_plan.call_args_list]
+    assert {plan.user_id for plan in stored} == {"user-1", "user-2"}
+    assert all(plan.plan_date == PLAN_DATE for plan in stored)
+    assert all(call.kwargs["draft"] is True for call in plan_service.store_workout_plan.call_args_list)
+    # Failed users are not checkpointed, so the next run retries them
+    header, *done = (tmp_path / "ckpt.json").read_text().splitlines()
+    assert json.loads(header) == {"plan_date": "2025-12-14"} and sorted(done) == ["user-1", "user-2"]
+
+
+@pytest.mark.asyncio
+async def test_batch_resumes_from_checkpoint_and_skips_existing_drafts(tmp_path, orchestrator, plan_service):
+    checkpoint = tmp_path / "ckpt.json"
+    checkpoint.write_text(json.dumps({"plan_date": "2025-12-14", "done": ["user-1"]}))
+    plan_service.get_draft_plan = AsyncMock(side_effect=lambda user_id, plan_date: make_plan() if user_id == "user-2" else None)
+
+    report = await NightlyPlanBatch(plan_service, orchestrator, PLAN_DATE, checkpoint_path=str(checkpoint)).run(
+        ["user-1", "user-2", "user-3"]
+    )
+
+    assert (report.generated, report.skipped, report.failed) == (1, 2, 0)
+    assert [call.kwargs["user_id"] for call in orchestrator.generate_workout_plan.call_args_list] == ["user-3"]
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_for_another_date_is_ignored(tmp_path, orchestrator, plan_service):
+    checkpoint = tmp_path / "ckpt.json"
+    checkpoint.write_text(json.dumps({"plan_date": "2025-12-13", "done": ["user-1"]}))
+
+    report = await NightlyPlanBatch(plan_service, orchestrator, PLAN_DATE, checkpoint_path=str(checkpoint)).run(["user-1"])
+
+    assert report.generated == 1
+
+
+def test_checkpoint_appends_ids_and_survives_a_torn_last_line(tmp_path):
+    path = tmp_path / "ckpt.json"
+    checkpoint = BatchCheckpoint(str(path), PLAN_DATE, flush_every=2)
+    for user_id in ("user-1", "user-2", "user-3"):
+        checkpoint.mark_done(user_id)
+    checkpoint.close()
+    with open(path, "a") as f:
+        f.write("user-") # crashed mid-write
+
+    resumed = BatchCheckpoint(str(path), PLAN_DATE)
+    resumed.mark_done("user-4")
+    resumed.close()
+
+    assert resumed.done == {"user-1", "user-2", "user-3", "user-4"}
+    # The torn id stays a line of its own, so it matches no user and "user-4" is read back intact
+    assert {"user-1", "user-2", "user-3", "user-4"} <= BatchCheckpoint(str(path), PLAN_DATE).done
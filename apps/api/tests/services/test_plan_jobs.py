@@ -0,0 +1,143 @@
+import asyncio
+from datetime import date
+
+import pytest
+
+from app.models.workout_plan import Exercise, PlanGenerationContext, WorkoutDay, WorkoutPlanModel
+from app.services.ai_orchestrator import AIServiceTimeout
+from app.services.plan_jobs import InProcessJobBroker, JobQueueFull, PlanJobQueue, SQLiteJobBroker
+
+
+def make_plan(user_id: str) -> WorkoutPlanModel:
+    return WorkoutPlanModel(
+        user_id=user_id,
+        plan_date=date.today(),
+        workout_days=[WorkoutDay(day_name="Monday", exercises=[Exercise(name="Squat", sets=3, reps="5")])],
+    )
+
+
+@pytest.mark.asyncio
+async def test_job_runs_in_background_and_long_poll_returns_result():
+    release = asyncio.Event()
+
+    async def handler(user_id, context):
+        await release.wait()
+        return make_plan(user_id)
+
+    queue = PlanJobQueue(workers=2, handler=handler)
+    await queue.start()
+    try:
+        job = await queue.submit("user-1", PlanGenerationContext(mood="good"))
+        assert job["status"] == "queued"
+
+        await asyncio.sleep(0.01)
+        assert (await queue.get(job["id"], "user-1"))["status"] == "running"
+        assert await queue.get(job["id"], "someone-else") is None
+
+        asyncio.get_running_loop().call_later(0.05, release.set)
+        finished = await queue.wait(job["id"], "user-1", timeout=5)
+    finally:
+        await queue.stop()
+
+    assert finished["status"] == "succeeded"
+    assert finished["result"]["workout_days"][0]["exercises"][0]["name"] == "Squat"
+    stats = queue.stats()
+    assert stats["succeeded"] == 1 and stats["queue_depth"] == 0
+    assert stats["wait_seconds_max"] is not None
+
+
+@pytest.mark.asyncio
+async def test_failed_job_records_the_sync_status_code():
+    async def handler(user_id, context):
+        raise AIServiceTimeout("deadline exceeded")
+
+    queue = PlanJobQueue(workers=1, handler=handler)
+    await queue.start()
+    try:
+        job = await queue.submit("user-1", PlanGenerationContext())
+        finished = await queue.wait(job["id"], "user-1", timeout=5)
+    finally:
+        await queue.stop()
+
+    assert finished["status"] == "failed"
+    assert finished["error"]["status"] == 504
+    assert queue.stats()["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_submit_applies_backpressure_when_queue_is_full():
+    queue = PlanJobQueue(workers=0, max_depth=2) # no workers: nothing drains the queue
+
+    await queue.submit("user-1", PlanGenerationContext())
+    await queue.submit("user-2", PlanGenerationContext())
+    with pytest.raises(JobQueueFull):
+        await queue.submit("user-3", PlanGenerationContext())
+
+    assert queue.stats()["rejected"] == 1
+    assert queue.stats()["queue_depth"] == 2
+
+
+@pytest.mark.asyncio
+async def test_sqlite_broker_round_trip(tmp_path):
+    broker = SQLiteJobBroker(path=str(tmp_path / "jobs.sqlite3"), poll_interval=0.01)
+    try:
+        await broker.enqueue({"id": "job-1", "user_id": "user-1", "status": "queued"}, max_depth=1)
+        with pytest.raises(JobQueueFull):
+            await broker.enqueue({"id": "job-2", "user_id": "user-1", "status": "queued"}, max_depth=1)
+        assert await broker.depth() == 1
+
+        job = await broker.dequeue()
+        assert job["id"] == "job-1" and await broker.depth() == 0
+
+        job["status"] = "succeeded"
+        await broker.save(job)
+        assert (await broker.load("job-1"))["status"] == "succeeded"
+        assert await broker.load("missing") is None
+    finally:
+        broker.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_broker_requeues_jobs_of_dead_workers(tmp_path):
+    broker = SQLiteJobBroker(path=str(tmp_path / "jobs.sqlite3"), poll_interval=0.01, lease=0.05, max_attempts=2)
+    try:
+        await broker.enqueue({"id": "job-1", "user_id": "user-1", "status": "queued"}, max_depth=5)
+        first = await broker.dequeue() # this worker dies without saving
+        assert first["attempts"] == 1
+
+        await asyncio.sleep(0.1)
+        second = await broker.dequeue()
+        assert (second["id"], second["attempts"]) == ("job-1", 2)
+
+        await asyncio.sleep(0.1)
+        assert await broker.depth() == 0
+        await broker.enqueue({"id": "job-2", "user_id": "user-1", "status": "queued"}, max_depth=5)
+        assert (await broker.dequeue())["id"] == "job-2" # claiming reaps job-1 for good
+        orphaned = await broker.load("job-1")
+        assert orphaned["status"] == "failed" and orphaned["error"]["status"] == 503
+    finally:
+        broker.close()
+
+
+@pytest.mark.asyncio
+async def test_long_pollers_share_the_completion_event():
+    release = asyncio.Event()
+
+    async def handler(user_id, context):
+        await release.wait()
+        return make_plan(user_id)
+
+    queue = PlanJobQueue(workers=1, handler=handler, poll_interval=5)
+    await queue.start()
+    try:
+        job = await queue.submit("user-1", PlanGenerationContext())
+        patient = asyncio.create_task(queue.wait(job["id"], "user-1", timeout=5))
+        assert (await queue.wait(job["id"], "user-1", timeout=0.05))["status"] == "running" # leaves first
+        release.set()
+        # Woken by the worker, not by its next 5 s poll
+        finished = await asyncio.wait_for(patient, timeout=1)
+    finally:
+        await queue.stop()
+
+    assert finished["status"] == "succeeded"
+    assert queue._finished == {}
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from app.services.plan_repair import TruncatedResponse, coerce_plan, invalid_exercises, loads_lenient
+
+PLAN = {"user_id": "u", "plan_date": "2025-12-13", "workout_days": [
+    {"day_name": "Monday", "exercises": [{"name": "Squat", "sets": 3, "reps": "5"}, {"name": "Row", "sets": 3, "reps": "8"}]}
+]}
+
+
+def test_loads_lenient_handles_fences_prose_and_trailing_commas():
+    text = json.dumps(PLAN)
+    assert loads_lenient(f"```json\n{text}\n```") == PLAN
+    assert loads_lenient(f"Here is your plan: {text} Enjoy!") == PLAN
+    assert loads_lenient(text.replace("}]}]}", "},]},]}")) == PLAN
+
+
+def test_loads_lenient_rejects_truncated_output_unless_salvage_is_allowed():
+    text = json.dumps(PLAN)
+    cut = text[:text.index('"Row"') + 8] # mid-way through the second exercise
+    # Closing it would silently drop the rest of the plan
+    with pytest.raises(TruncatedResponse):
+        loads_lenient(cut)
+    with pytest.raises(TruncatedResponse):
+        loads_lenient(f"```json\n{cut}")
+
+    repaired = loads_lenient(cut, allow_truncated=True)
+    assert repaired["workout_days"][0]["exercises"][0] == PLAN["workout_days"][0]["exercises"][0]
+
+    with pytest.raises(ValueError, match="not valid JSON"):
+        loads_lenient("no plan here")
+
+
+def test_coerce_plan_fixes_common_violations_in_place():
+    data = {"plan_date": "2025-12-13", "workout_days": {"name": "Legs", "exercises": {
+        "exercise": "Squat", "sets": "4 sets", "reps": [8, 10], "rpe": 7.6, "weight": 100, "rest": 90,
+    }}}
+
+    fixes = coerce_plan(data, "user-1")
+
+    assert data["user_id"] == "user-1"
+    day = data["workout_days"][0]
+    assert day["day_name"] == "Legs"
+    assert day["exercises"][0] == {"name": "Squat", "sets": 4, "reps": "8-10", "rpe": 8, "weight": "100", "rest_interval": "90"}
+    assert "workout_days[0].exercises[0].sets" in fixes and "user_id" in fixes
+    assert invalid_exercises(data) == []
+
+
+def test_invalid_exercises_reports_unfixable_subtrees():
+    data = json.loads(json.dumps(PLAN))
+    data["workout_days"][0]["exercises"][1]["sets"] = "several"
+    coerce_plan(data, "u")
+
+    invalid = invalid_exercises(data)
+    assert [(day, index) for day, index, _ in invalid] == [(0, 1)]
+    assert invalid[0][2][0]["loc"] == ("sets",)
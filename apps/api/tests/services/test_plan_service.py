@@ -1,6 +1,7 @@
 import pytest
-from unittest.mock import MagicMock, patch
-from app.services.plan_service import PlanService
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.plan_service import PlanService, WorkoutPlanCacheBackend
+from app.core.supabase import SupabaseClientRegistry
 from app.models.workout_plan import WorkoutPlanModel, WorkoutDay, Exercise
 from datetime import date
 import os
@@ -8,8 +9,10 @@ import os
 @pytest.fixture
 def mock_supabase_client():
     with patch.dict(os.environ, {"SUPABASE_URL": "http://mock.supabase.com", "SUPABASE_KEY": "mock_key"}):
-        with patch("app.services.plan_service.create_client") as mock_create_client:
+        with patch("app.core.supabase.AsyncClient") as mock_create_client, \
+             patch("app.services.plan_service.supabase_registry", SupabaseClientRegistry()):
             mock_client = MagicMock()
+            mock_client.from_.return_value.insert.return_value.execute = AsyncMock()
             mock_create_client.return_value = mock_client
             yield mock_client
 
@@ -39,7 +42,7 @@ async def test_store_workout_plan_success(plan_service, mock_supabase_client):
     assert stored_plan.user_id == "test_user"
     mock_supabase_client.from_.assert_called_with("WorkoutPlans")
     mock_supabase_client.from_.return_value.insert.assert_called_once()
-    mock_supabase_client.from_.return_value.insert.return_value.execute.assert_called_once()
+    mock_supabase_client.from_.return_value.insert.return_value.execute.assert_awaited_once()
 
 @pytest.mark.asyncio
 async def test_store_workout_plan_no_data_returned(plan_service, mock_supabase_client):
@@ -75,6 +78,109 @@ async def test_store_workout_plan_exception_during_insert(plan_service, mock_sup
         await plan_service.store_workout_plan(workout_plan)
 
 def test_plan_service_init_missing_env_vars():
-    with patch.dict(os.environ, clear=True): # Clear env vars
+    with patch.dict(os.environ, clear=True), \
+         patch("app.services.plan_service.supabase_registry", SupabaseClientRegistry()): # Clear env vars
         with pytest.raises(ValueError, match="Supabase URL and Key must be set as environment variables."):
             PlanService()
+
+def test_plan_services_share_pooled_client(mock_supabase_client):
+    # Each request builds a PlanService; they must all reuse the same registry client.
+    assert PlanService().supabase is PlanService().supabase
+
+@pytest.mark.asyncio
+async def test_store_workout_plan_records_prompt_hash(plan_service, mock_supabase_client):
+    mock_supabase_client.from_.return_value.insert.return_value.execute.return_value = MagicMock(data=[{"id": "some_uuid"}])
+    workout_plan = WorkoutPlanModel(
+        user_id="test_user",
+        plan_date=date.today(),
+        workout_days=[WorkoutDay(day_name="Monday", exercises=[Exercise(name="Test Exercise", sets=3, reps="10")])],
+        prompt_hash="abc123",
+    )
+
+    await plan_service.store_workout_plan(workout_plan)
+
+    row = mock_supabase_client.from_.return_value.insert.call_args.args[0]
+    assert row["prompt_hash"] == "abc123"
+    assert "prompt_hash" not in row["plan_details"] # never part of the plan JSON
+
+@pytest.mark.asyncio
+async def test_workout_plan_cache_backend_reads_latest_plan_by_hash(plan_service, mock_supabase_client):
+    query = mock_supabase_client.from_.return_value.select.return_value
+    query = query.eq.return_value.gte.return_value.order.return_value.limit.return_value
+    query.execute = AsyncMock(return_value=MagicMock(data=[{"plan_details": '{"user_id": "test_user"}'}]))
+    backend = WorkoutPlanCacheBackend(max_age_seconds=900, plan_service=plan_service)
+
+    assert await backend.get("workout_plan:abc123") == {"user_id": "test_user"}
+    mock_supabase_client.from_.return_value.select.return_value.eq.assert_called_with("prompt_hash", "abc123")
+
+    query.execute.return_value = MagicMock(data=[])
+    assert await backend.get("workout_plan:abc123") is None
+
+
+class FakeWorkoutPlans:
+    """WorkoutPlans rows behind the select/delete chains PlanService builds, honouring their filters."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def from_(self, name):
+        assert name == "WorkoutPlans"
+        return FakePlanQuery(self)
+
+
+class FakePlanQuery:
+    def __init__(self, table):
+        self.table = table
+        self.filters = []
+        self.deleting = False
+
+    def select(self, columns):
+        return self
+
+    def delete(self):
+        self.deleting = True
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: str(row[column]) == value)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: str(row[column]) >= value)
+        return self
+
+    def lt(self, column, value):
+        self.filters.append(lambda row: str(row[column]) < value)
+        return self
+
+    def order(self, column):
+        return self
+
+    def range(self, start, end):
+        return self
+
+    async def execute(self):
+        matched = [row for row in self.table.rows if all(f(row) for f in self.filters)]
+        if self.deleting:
+            self.table.rows = [row for row in self.table.rows if row not in matched]
+        return MagicMock(data=matched)
+
+
+@pytest.mark.asyncio
+async def test_users_with_only_drafts_are_not_active():
+    plans = FakeWorkoutPlans([
+        {"user_id": "confirmed-user", "plan_date": "2025-12-12", "status": "confirmed"},
+        {"user_id": "confirmed-user", "plan_date": "2025-12-14", "status": "draft"},
+        {"user_id": "draft-only-user", "plan_date": "2025-12-13", "status": "draft"},
+        {"user_id": "draft-only-user", "plan_date": "2025-12-14", "status": "draft"},
+    ])
+    service = PlanService(supabase=plans)
+
+    # The batch's own drafts never keep a user in its population
+    assert await service.list_active_user_ids(date(2025, 12, 1)) == ["confirmed-user"]
+
+    # Yesterday's unconfirmed draft expires; today's and tomorrow's stay usable
+    assert await service.delete_expired_drafts(date(2025, 12, 14)) == 1
+    assert [(row["user_id"], row["plan_date"]) for row in plans.rows if row["status"] == "draft"] == [
+        ("confirmed-user", "2025-12-14"), ("draft-only-user", "2025-12-14"),
+    ]
@@ -0,0 +1,61 @@
+import json
+
+from app.models.workout_plan import WorkoutPlanModel
+from app.services.plan_stream import PlanStreamParser, plan_events
+
+PLAN = {
+    "user_id": "test_user",
+    "plan_date": "2025-12-13",
+    "workout_days": [
+        {"day_name": "Monday {upper}", "exercises": [
+            {"name": "Bench \"Press\"", "sets": 3, "reps": "8-10", "notes": "keep [elbows] tucked"},
+            {"name": "Row", "sets": 3, "reps": "10"},
+        ]},
+        {"day_name": "Tuesday", "exercises": [{"name": "Squat", "sets": 5, "reps": "5"}]},
+    ],
+    "ai_explanation": None,
+}
+
+
+def feed_in_chunks(parser, text, size):
+    events = []
+    for i in range(0, len(text), size):
+        events.extend(parser.feed(text[i:i + size]))
+    return events
+
+
+def test_emits_exercises_and_days_as_they_close():
+    parser = PlanStreamParser()
+    text = json.dumps(PLAN, indent=2)
+
+    events = feed_in_chunks(parser, text, 7)
+
+    assert [(event, data.get("day_index"), data["index"]) for event, data in events] == [
+        ("exercise", 0, 0), ("exercise", 0, 1), ("day", None, 0), ("exercise", 1, 0), ("day", None, 1),
+    ]
+    assert events[0][1]["exercise"]["name"] == 'Bench "Press"'
+    assert events[2][1]["day"]["day_name"] == "Monday {upper}"
+    assert parser.text == text
+
+
+def test_first_exercise_is_emitted_before_the_document_ends():
+    parser = PlanStreamParser()
+    text = json.dumps(PLAN)
+    cut = text.index('tucked"}') + len('tucked"}') # just past the first exercise object
+
+    assert [event for event, _ in parser.feed(text[:cut])] == ["exercise"]
+    assert parser.feed(text[cut:cut + 1]) == []
+
+
+def test_invalid_elements_are_not_emitted():
+    plan = {"workout_days": [{"day_name": "Monday", "exercises": [{"name": "Squat", "sets": "many", "reps": "5"}]}]}
+
+    events = PlanStreamParser().feed(json.dumps(plan))
+
+    assert events == []
+
+
+def test_plan_events_match_streamed_events():
+    text = json.dumps(PLAN)
+
+    assert list(plan_events(WorkoutPlanModel(**PLAN))) == PlanStreamParser().feed(text)
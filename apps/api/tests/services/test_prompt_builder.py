@@ -0,0 +1,101 @@
+from datetime import date, datetime, timedelta, timezone
+
+from app.models.workout_plan import PlanGenerationContext
+from app.services.prompt_builder import PromptBuilder, count_tokens, estimated_1rm
+
+TODAY = date(2025, 12, 13)
+
+
+def log(exercise, day, weight, reps, rpe=8.0, hour=9):
+    completed_at = datetime.combine(TODAY - timedelta(days=day), datetime.min.time(), timezone.utc).replace(hour=hour)
+    return {"exercise_name": exercise, "actual_weight": weight, "actual_reps": reps, "rpe": rpe, "completed_at": completed_at.isoformat()}
+
+
+HISTORY = [
+    log("Back Squat", 10, 100, 5), log("Back Squat", 10, 90, 8, hour=10),
+    log("Back Squat", 3, 105, 5), log("Bench Press", 3, 80, 6, rpe=9),
+    log("Barbell Row", 40, 70, 8), # outside the 28 day window
+]
+
+
+def test_history_is_summarized_per_exercise():
+    prompt = PromptBuilder(budget_tokens=1000, window_days=28).build("user-1", {"level": "beginner"}, {}, HISTORY, PlanGenerationContext(energy="low"), today=TODAY)
+
+    assert "Back Squat [legs]: 105x5@8 12-10, 100x5@8 12-03" in prompt.text
+    assert f"e1RM {estimated_1rm(100, 5):.1f}->{estimated_1rm(105, 5):.1f} (+5%)" in prompt.text
+    assert "Bench Press [chest]: 80x6@9 12-10" in prompt.text
+    assert "Barbell Row" not in prompt.text
+    assert 'Current Context: {"energy":"low"}' in prompt.text # compact, None fields dropped
+    assert prompt.tokens == count_tokens(prompt.text) and prompt.history_tokens > 0
+
+
+def test_history_is_trimmed_to_the_token_budget():
+    many = [log(f"Exercise {i}", i % 20, 50, 10) for i in range(60)]
+    builder = PromptBuilder(budget_tokens=200, window_days=28)
+
+    prompt = builder.build("user-1", {}, {}, many, PlanGenerationContext(), today=TODAY)
+
+    assert prompt.tokens <= 200 + count_tokens("(+99 older exercises omitted)")
+    assert "older exercises omitted" in prompt.text
+    assert "Exercise 0 " in prompt.text or "Exercise 20 " in prompt.text # most recent kept
+
+
+def test_summary_is_memoized_and_extended_incrementally():
+    builder = PromptBuilder(budget_tokens=1000, window_days=28)
+    builder.build("user-1", {}, {}, HISTORY[:2], PlanGenerationContext(), today=TODAY)
+    watermark = builder.history_watermark("user-1")
+    assert watermark == datetime(2025, 12, 3, 10, tzinfo=timezone.utc)
+
+    # Re-sent old logs are ignored; only newer ones are folded in
+    prompt = builder.build("user-1", {}, {}, HISTORY[:4], PlanGenerationContext(), today=TODAY)
+    summary = builder.summaries.get("user-1")
+    assert summary.log_count == 4
+    assert "105x5@8 12-10" in prompt.text
+
+    # With no new logs the memoized summary is still used
+    assert "Back Squat" in builder.build("user-1", {}, {}, [], PlanGenerationContext(), today=TODAY).text
+    assert builder.history_watermark("user-2") is None
+
+
+def test_late_synced_sets_are_folded_in_by_arrival():
+    builder = PromptBuilder(budget_tokens=1000, window_days=28)
+    stored = lambda row, log_id, arrived: {**row, "id": log_id, "updated_at": arrived.isoformat()}
+    noon = datetime(2025, 12, 12, 12, tzinfo=timezone.utc)
+    builder.summarize_history("user-1", [stored(log("Back Squat", 3, 105, 5), "a", noon)])
+    assert builder.history_watermark("user-1") == noon
+
+    # Logged offline ten days ago, synced now: older completed_at, newer arrival
+    late = stored(log("Deadlift", 10, 140, 3), "b", noon + timedelta(hours=1))
+    # Re-read rows at the watermark (same transaction) are not counted twice
+    summary = builder.summarize_history("user-1", [stored(log("Back Squat", 3, 105, 5), "a", noon), late])
+
+    assert summary.log_count == 2
+    assert "Deadlift" in summary.sessions
+    assert builder.history_watermark("user-1") == noon + timedelta(hours=1)
+
+
+def test_edited_set_replaces_its_earlier_version():
+    builder = PromptBuilder(budget_tokens=1000, window_days=28)
+    stored = lambda row, log_id, arrived: {**row, "id": log_id, "updated_at": arrived.isoformat()}
+    noon = datetime(2025, 12, 12, 12, tzinfo=timezone.utc)
+    builder.summarize_history("user-1", [
+        stored(log("Back Squat", 3, 150, 5), "a", noon), # typo: meant 105
+        stored(log("Back Squat", 3, 100, 5, hour=10), "b", noon),
+    ])
+
+    # Corrected later: the row keeps its id and completion time, updated_at moves on
+    summary = builder.summarize_history("user-1", [stored(log("Back Squat", 3, 105, 5), "a", noon + timedelta(hours=1))])
+
+    session = summary.sessions["Back Squat"][TODAY - timedelta(days=3)]
+    assert (session.sets, session.volume, session.top_weight) == (2, 105 * 5 + 100 * 5, 105)
+    assert session.best_e1rm == estimated_1rm(105, 5)
+    assert summary.log_count == 2
+    assert builder.history_watermark("user-1") == noon + timedelta(hours=1)
+
+    # Moved to another exercise: it leaves the old one entirely
+    summary = builder.summarize_history("user-1", [
+        stored(log("Front Squat", 3, 105, 5), "a", noon + timedelta(hours=2)),
+        stored(log("Front Squat", 3, 100, 5, hour=10), "b", noon + timedelta(hours=2)),
+    ])
+    assert "Back Squat" not in summary.sessions
+    assert summary.sessions["Front Squat"][TODAY - timedelta(days=3)].sets == 2
@@ -0,0 +1,40 @@
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+
+from app.services.rollup_service import RollupService, week_start
+
+
+def test_week_start_is_the_iso_monday():
+    assert week_start(date(2025, 12, 14)) == date(2025, 12, 8) # Sunday -> Monday
+    assert week_start(date(2025, 12, 8)) == date(2025, 12, 8)
+
+
+@pytest.mark.asyncio
+async def test_rebuild_recomputes_from_workout_logs():
+    supabase = MagicMock()
+    supabase.rpc.return_value.execute = AsyncMock()
+    user_id = uuid4()
+
+    await RollupService(supabase).rebuild(user_id)
+
+    supabase.rpc.assert_called_once_with("rebuild_workout_log_rollups", {"p_user_id": str(user_id)})
+
+
+@pytest.mark.asyncio
+async def test_list_active_user_ids_pages_and_dedupes():
+    pages = [[{"user_id": "a"}, {"user_id": "a"}], [{"user_id": "b"}, {"user_id": "c"}], [{"user_id": "c"}]]
+    query = MagicMock()
+    for method in ("select", "gte", "order", "range"):
+        getattr(query, method).return_value = query
+    query.execute = AsyncMock(side_effect=[MagicMock(data=page) for page in pages])
+    supabase = MagicMock()
+    supabase.table.return_value = query
+
+    user_ids = await RollupService(supabase).list_active_user_ids(date(2025, 12, 1), page_size=2)
+
+    assert user_ids == ["a", "b", "c"]
+    assert [call.args for call in query.range.call_args_list] == [(0, 1), (2, 3), (4, 5)]
+    query.gte.assert_called_with("week_start", "2025-12-01")
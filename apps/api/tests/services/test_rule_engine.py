@@ -0,0 +1,80 @@
+import time
+from datetime import date, datetime, timezone
+
+from app.models.workout_plan import PlanGenerationContext, WorkoutPlanModel
+from app.services.prompt_builder import HistorySummary
+from app.services.rule_engine import RulePlanEngine, readiness
+
+TODAY = date(2025, 12, 13)
+
+
+def history(*logs):
+    summary = HistorySummary()
+    summary.add([
+        {"exercise_name": name, "actual_weight": weight, "actual_reps": reps, "rpe": rpe,
+         "completed_at": datetime(2025, 12, day, 9, tzinfo=timezone.utc).isoformat()}
+        for name, weight, reps, rpe, day in logs
+    ])
+    return summary
+
+
+def names(plan: WorkoutPlanModel):
+    return [exercise.name for exercise in plan.workout_days[0].exercises]
+
+
+def test_plan_is_valid_and_fast():
+    engine = RulePlanEngine()
+    context = PlanGenerationContext(energy="low", simulated_hrv=35, simulated_sleep=5.5)
+    summary = history(("Back Squat", 100, 5, 8, 10))
+
+    started = time.perf_counter()
+    plan = engine.generate("user-1", {"equipment": ["barbell"]}, {"primary_goal": "strength"}, summary, context, TODAY)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.05
+    assert WorkoutPlanModel.model_validate(plan.model_dump()) == plan
+    assert plan.plan_date == TODAY and plan.user_id == "user-1"
+    assert engine.stats() == {"plans": 1, "fallbacks": 0}
+
+
+def test_exercises_follow_goal_and_equipment():
+    engine = RulePlanEngine()
+    neutral = PlanGenerationContext()
+
+    barbell = engine.generate("u", {"equipment": ["barbell", "pull-up bar"]}, {"primary_goal": "build_muscle"}, None, neutral)
+    bodyweight = engine.generate("u", {}, {"primary_goal": "build_muscle"}, None, neutral)
+    dumbbells = engine.generate("u", {"equipment": ["Dumbbell"]}, {"primary_goal": "lose_weight"}, None, neutral)
+
+    assert names(barbell)[:3] == ["Back Squat", "Bench Press", "Barbell Row"]
+    assert names(bodyweight)[:3] == ["Bodyweight Squat", "Push-up", "Inverted Row"]
+    assert names(dumbbells)[:2] == ["Goblet Squat", "Dumbbell Bench Press"]
+    assert dumbbells.workout_days[0].exercises[0].reps == "12-15"
+
+
+def test_readiness_scales_volume_and_intensity():
+    assert readiness(PlanGenerationContext()) == (0, [])
+    assert readiness(PlanGenerationContext(energy="high", simulated_sleep=8)) == (1, ["high energy"])
+    assert readiness(PlanGenerationContext(energy="high", soreness="high")) == (-1, ["soreness"])
+
+    engine = RulePlanEngine()
+    normal = engine.generate("u", {}, {"primary_goal": "strength"}, None, PlanGenerationContext())
+    tired = engine.generate("u", {}, {"primary_goal": "strength"}, None, PlanGenerationContext(simulated_sleep=4))
+
+    assert tired.workout_days[0].exercises[0].sets == normal.workout_days[0].exercises[0].sets - 1
+    assert tired.workout_days[0].exercises[0].rpe == normal.workout_days[0].exercises[0].rpe - 1
+    assert "short sleep" in tired.ai_explanation
+
+
+def test_load_progresses_from_last_top_set():
+    engine = RulePlanEngine()
+    summary = history(("Back Squat", 100, 5, 8, 3), ("Back Squat", 102.5, 5, 7, 10), ("Bench Press", 80, 5, 10, 10))
+    profile, goals = {"equipment": ["barbell"]}, {"primary_goal": "strength"}
+
+    plan = engine.generate("u", profile, goals, summary, PlanGenerationContext())
+    weights = {exercise.name: exercise.weight for exercise in plan.workout_days[0].exercises}
+    assert weights["Back Squat"] == "105 kg" # last session at RPE 7: add the increment
+    assert weights["Bench Press"] == "80 kg" # last session at RPE 10: repeat
+    assert weights["Romanian Deadlift"] is None # never trained: no prescribed load
+
+    backed_off = engine.generate("u", profile, goals, summary, PlanGenerationContext(soreness="high"))
+    assert backed_off.workout_days[0].exercises[0].weight == "92 kg" # 90% of 102.5, to the nearest 0.5
@@ -0,0 +1,106 @@
+import json
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+
+from app.models.sync import SyncPushRequest
+from app.models.workout_log import WorkoutLogBulkResult, WorkoutLogCreate
+from app.services.sync_service import InvalidCursor, SyncService, decode_cursor, encode_cursor
+
+USER_ID = uuid4()
+
+
+class FakeQuery:
+    """Records a PostgREST query chain and answers it with `rows`."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            self.calls.append((name, args))
+            return self
+        return call
+
+    async def execute(self):
+        return MagicMock(data=self.rows)
+
+
+class FakeSupabase:
+    def __init__(self, tables):
+        self.queries = {name: FakeQuery(rows) for name, rows in tables.items()}
+
+    def table(self, name):
+        return self.queries[name]
+
+
+def log_row(minute):
+    return {
+        "id": str(uuid4()), "user_id": str(USER_ID), "plan_id": None, "exercise_name": "Squat", "set_number": 1,
+        "target_reps": None, "actual_reps": 5, "target_weight": None, "actual_weight": 100.0, "rpe": 8.0,
+        "completed_at": f"2025-12-10T09:{minute:02d}:00+00:00", "updated_at": f"2025-12-10T09:{minute:02d}:05+00:00",
+    }
+
+
+def plan_row():
+    plan = {"user_id": str(USER_ID), "plan_date": "2025-12-10", "workout_days": []}
+    return {"id": str(uuid4()), "plan_date": "2025-12-10", "status": "confirmed", "plan_details": json.dumps(plan),
+            "ai_explanation": None, "updated_at": "2025-12-10T08:00:00+00:00"}
+
+
+def test_cursor_round_trip_and_validation():
+    position = ("2025-12-10T09:00:05+00:00", str(uuid4()))
+    assert decode_cursor(encode_cursor({"logs": position, "plans": None})) == {"logs": position, "plans": None}
+    assert decode_cursor(None) == {"logs": None, "plans": None}
+
+    for bad in ("not-a-cursor!", encode_cursor({"logs": ('2025-12-10",id.gt.0', str(uuid4()))})):
+        with pytest.raises(InvalidCursor):
+            decode_cursor(bad)
+
+
+@pytest.mark.asyncio
+async def test_pull_pages_by_keyset_and_advances_cursor():
+    logs = [log_row(1), log_row(2)]
+    fake = FakeSupabase({"WorkoutLogs": logs, "WorkoutPlans": [plan_row()]})
+    service = SyncService(supabase=fake)
+
+    first = await service.pull(USER_ID, None, limit=2)
+
+    assert [str(log.id) for log in first.logs] == [row["id"] for row in logs]
+    assert first.plans[0].plan_details["plan_date"] == "2025-12-10"
+    assert first.has_more # a full page of logs
+    assert decode_cursor(first.cursor)["logs"] == (logs[-1]["updated_at"], logs[-1]["id"])
+    assert ("eq", ("user_id", str(USER_ID))) in fake.queries["WorkoutLogs"].calls
+    assert not any(name == "or_" for name, _ in fake.queries["WorkoutLogs"].calls) # initial sync
+
+    fake = FakeSupabase({"WorkoutLogs": [], "WorkoutPlans": []})
+    second = await SyncService(supabase=fake).pull(USER_ID, first.cursor, limit=2)
+
+    keyset = [args[0] for name, args in fake.queries["WorkoutLogs"].calls if name == "or_"]
+    assert keyset == [f'updated_at.gt."{logs[-1]["updated_at"]}",and(updated_at.eq."{logs[-1]["updated_at"]}",id.gt.{logs[-1]["id"]})']
+    assert not second.has_more and second.logs == []
+    assert second.cursor == first.cursor # nothing new: the device keeps its position
+
+
+@pytest.mark.asyncio
+async def test_push_reports_per_mutation_status():
+    log_service = MagicMock()
+    mutations = [
+        WorkoutLogCreate(id=uuid4(), exercise_name="Squat", set_number=i, actual_reps=5, actual_weight=100.0, rpe=8.0,
+                         completed_at=datetime(2025, 12, 10, 9, i, tzinfo=timezone.utc))
+        for i in (1, 2)
+    ]
+    log_service.create_bulk_log_entries = AsyncMock(return_value=[
+        WorkoutLogBulkResult(**mutations[0].model_dump(), user_id=USER_ID, status="created"),
+        WorkoutLogBulkResult(**mutations[1].model_dump(), user_id=USER_ID, status="duplicate"),
+    ])
+
+    response = await SyncService(supabase=MagicMock(), log_service=log_service).push(
+        SyncPushRequest(device_id="phone-1", mutations=mutations), USER_ID
+    )
+
+    assert [(result.id, result.status) for result in response.results] == [(mutations[0].id, "created"), (mutations[1].id, "duplicate")]
+    assert (response.created, response.duplicates, response.failed) == (1, 1, 0)
@@ -0,0 +1,156 @@
+import asyncio
+import json
+from uuid import uuid4
+
+import httpx
+import pytest
+from supabase import AsyncClient, AsyncClientOptions
+
+from app.models.user import UserProfileUpdate
+from app.services.user_service import UserService, invalidate_profile_cache, profile_cache
+
+USER_ID = uuid4()
+PROFILE_ROW = {
+    "id": str(USER_ID),
+    "email": "test@example.com",
+    "unit_preference": "lbs",
+    "updated_at": None,
+    "profile_version": 2,
+    "goals": [{"primary_goal": "Build Muscle", "training_frequency": 4, "training_duration": 60, "injuries_limitations": None, "created_at": "2025-12-01T10:00:00"}],
+    "equipment": [{"name": "Dumbbells"}, {"name": "Bench"}],
+}
+
+
+@pytest.fixture(autouse=True)
+def empty_profile_cache():
+    profile_cache.clear()
+    yield
+    profile_cache.clear()
+
+
+@pytest.fixture
+def recorded_requests():
+    return []
+
+
+@pytest.fixture
+def user_service(recorded_requests):
+    def handler(request: httpx.Request) -> httpx.Response:
+        recorded_requests.append(request)
+        # Table reads return rows; the RPC returns the profile object directly.
+        return httpx.Response(200, json=[PROFILE_ROW] if request.method == "GET" else PROFILE_ROW)
+
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    supabase = AsyncClient(
+        "http://mock.supabase.com",
+        "mock_key",
+        options=AsyncClientOptions(httpx_client=http_client, auto_refresh_token=False, persist_session=False),
+    )
+    return UserService(supabase=supabase)
+
+
+@pytest.mark.asyncio
+async def test_get_user_profile_uses_single_embedded_request(user_service, recorded_requests):
+    profile = await user_service.get_user_profile(USER_ID)
+
+    assert len(recorded_requests) == 1
+    request = recorded_requests[0]
+    assert request.url.path == "/rest/v1/users"
+    assert "goals(" in request.url.params["select"]
+    assert "equipment(" in request.url.params["select"]
+    assert request.url.params["goals.order"] == "created_at.desc"
+    assert request.url.params["goals.limit"] == "1"
+
+    assert profile.unit_preference == "lbs"
+    assert profile.primary_goal == "Build Muscle"
+    assert profile.equipment == ["Dumbbells", "Bench"]
+
+
+@pytest.mark.asyncio
+async def test_update_user_profile_is_one_rpc_returning_the_profile(user_service, recorded_requests):
+    update = UserProfileUpdate(unit_preference="lbs", training_frequency=4, equipment=["Dumbbells", "Bench"])
+
+    profile = await user_service.update_user_profile(USER_ID, update)
+
+    assert len(recorded_requests) == 1
+    request = recorded_requests[0]
+    assert request.method == "POST"
+    assert request.url.path == "/rest/v1/rpc/update_user_profile"
+    assert json.loads(request.content) == {
+        "p_user_id": str(USER_ID),
+        "p_unit_preference": "lbs",
+        "p_goal": {"training_frequency": 4},
+        "p_equipment": ["Dumbbells", "Bench"],
+    }
+    assert profile.training_frequency == 4
+
+
+@pytest.mark.asyncio
+async def test_update_user_profile_leaves_untouched_sections_null(user_service, recorded_requests):
+    await user_service.update_user_profile(USER_ID, UserProfileUpdate(unit_preference="kg"))
+
+    body = json.loads(recorded_requests[0].content)
+    assert body["p_goal"] is None
+    assert body["p_equipment"] is None
+
+
+@pytest.mark.asyncio
+async def test_get_user_profile_is_served_from_cache(user_service, recorded_requests):
+    first = await user_service.get_user_profile(USER_ID)
+    second = await user_service.get_user_profile(USER_ID)
+
+    assert len(recorded_requests) == 1
+    assert second == first
+
+
+@pytest.mark.asyncio
+async def test_update_user_profile_invalidates_cache(user_service, recorded_requests):
+    await user_service.get_user_profile(USER_ID)
+    await user_service.update_user_profile(USER_ID, UserProfileUpdate(unit_preference="lbs"))
+    await user_service.get_user_profile(USER_ID)
+
+    assert [request.method for request in recorded_requests] == ["GET", "POST", "GET"]
+
+
+@pytest.mark.asyncio
+async def test_profile_version_is_a_single_column_read(user_service, recorded_requests):
+    assert await user_service.profile_version(USER_ID) == 2
+
+    assert len(recorded_requests) == 1
+    assert recorded_requests[0].url.params["select"] == "profile_version"
+
+
+@pytest.mark.asyncio
+async def test_get_user_profile_refetches_a_cached_profile_older_than_min_version(user_service, recorded_requests):
+    await user_service.get_user_profile(USER_ID)
+    await user_service.get_user_profile(USER_ID, min_version=2)
+    assert len(recorded_requests) == 1
+
+    # A write bumped the version before its invalidation reached this cache.
+    await user_service.get_user_profile(USER_ID, min_version=3)
+    assert len(recorded_requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_read_overlapping_an_invalidation_does_not_cache_the_old_row():
+    read_started, release_read = asyncio.Event(), asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        read_started.set()
+        await release_read.wait()
+        return httpx.Response(200, json=[PROFILE_ROW])
+
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    supabase = AsyncClient(
+        "http://mock.supabase.com",
+        "mock_key",
+        options=AsyncClientOptions(httpx_client=http_client, auto_refresh_token=False, persist_session=False),
+    )
+    read = asyncio.create_task(UserService(supabase=supabase).get_user_profile(USER_ID))
+    await read_started.wait()
+    # A write commits and invalidates while the read still holds the row from before it.
+    await invalidate_profile_cache(USER_ID)
+    release_read.set()
+
+    assert (await read).unit_preference == "lbs"
+    assert await profile_cache.get(str(USER_ID)) is None
@@ -0,0 +1,113 @@
+import json
+from datetime import date, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.core.metrics import metrics_registry
+from app.services.dashboard_service import DashboardService
+from app.services.weekly_review_batch import WeeklyReviewBatch, review_batch_stats
+
+WEEK = date(2025, 12, 8)
+
+
+@pytest.fixture
+def rollups():
+    rollups = MagicMock()
+    rollups.list_active_user_ids = AsyncMock(return_value=["user-1", "user-2", "user-bad"])
+    rollups.version = AsyncMock(return_value=7)
+
+    async def weekly(user_id, since):
+        if user_id == "user-bad":
+            raise RuntimeError("PostgREST 500")
+        return [{"week_start": WEEK.isoformat(), "exercise_name": "Squat", "sets": 5, "reps": 25, "volume": 2500.0,
+                 "top_weight": 100.0, "best_e1rm": 120.0}]
+    rollups.weekly = AsyncMock(side_effect=weekly)
+    rollups.daily = AsyncMock(return_value=[{"day": WEEK.isoformat(), "exercise_name": "Squat", "sets": 5, "reps": 25,
+                                             "volume": 2500.0, "top_weight": 100.0, "best_e1rm": 120.0}])
+    return rollups
+
+
+@pytest.fixture
+def snapshots():
+    snapshots = MagicMock()
+    snapshots.put = AsyncMock()
+    snapshots.delete = AsyncMock()
+    return snapshots
+
+
+@pytest.mark.asyncio
+async def test_batch_stores_snapshots_and_reports_throughput(tmp_path, rollups, snapshots):
+    batch = WeeklyReviewBatch(DashboardService(rollups=rollups, snapshots=snapshots), snapshots, WEEK + timedelta(days=3),
+                              concurrency=2, checkpoint_path=str(tmp_path / "ckpt.json"))
+
+    report = await batch.run()
+
+    rollups.list_active_user_ids.assert_awaited_once_with(WEEK - timedelta(weeks=1))
+    assert (report.week, report.users, report.stored, report.failed) == (WEEK, 3, 2, 1)
+    assert "user-bad" in report.failures
+    assert report.users_per_second > 0 and "users/s" in report.summary()
+    stored = {call.args[0]: call.args for call in snapshots.put.call_args_list}
+    assert set(stored) == {"user-1", "user-2"}
+    _, week, review = stored["user-1"]
+    assert week == WEEK and review.week_start == WEEK
+    assert review.volume.value == "2,500 kg" and review.consistency.value == "1/4 Days"
+    # Failed users are not checkpointed, so the next run retries them
+    header, *done = (tmp_path / "ckpt.json").read_text().splitlines()
+    assert json.loads(header) == {"plan_date": "2025-12-08"} and sorted(done) == ["user-1", "user-2"]
+
+
+@pytest.mark.asyncio
+async def test_batch_progress_is_published_to_metrics(tmp_path, rollups, snapshots):
+    live = []
+    snapshots.put = AsyncMock(side_effect=lambda *args: live.append(metrics_registry.snapshot()["weekly_review_batch"]))
+    batch = WeeklyReviewBatch(DashboardService(rollups=rollups, snapshots=snapshots), snapshots, WEEK,
+                              concurrency=1, checkpoint_path=str(tmp_path / "ckpt.json"))
+
+    report = await batch.run()
+
+    assert live[0]["running"] and live[0]["week"] == WEEK.isoformat() and live[0]["users"] == 3
+    final = metrics_registry.snapshot()["weekly_review_batch"]
+    assert not final["running"] and final["runs"] == review_batch_stats.runs
+    assert (final["stored"], final["skipped"], final["failed"]) == (2, 0, 1)
+    assert final["users_per_second"] == round(report.users_per_second, 2) > 0
+
+
+@pytest.mark.asyncio
+async def test_batch_resumes_from_checkpoint(tmp_path, rollups, snapshots):
+    checkpoint = tmp_path / "ckpt.json"
+    checkpoint.write_text(json.dumps({"plan_date": WEEK.isoformat(), "done": ["user-1"]}))
+    batch = WeeklyReviewBatch(DashboardService(rollups=rollups, snapshots=snapshots), snapshots, WEEK,
+                              checkpoint_path=str(checkpoint))
+
+    report = await batch.run(["user-1", "user-2"])
+
+    assert (report.skipped, report.stored) == (1, 1)
+    assert [call.args[0] for call in snapshots.put.call_args_list] == ["user-2"]
+
+
+@pytest.mark.asyncio
+async def test_review_is_recomputed_when_a_late_set_lands_while_storing(tmp_path, rollups, snapshots):
+    rollups.version.side_effect = [7, 8, 8, 8] # a set is stored between the first read and the put
+    batch = WeeklyReviewBatch(DashboardService(rollups=rollups, snapshots=snapshots), snapshots, WEEK,
+                              checkpoint_path=str(tmp_path / "ckpt.json"))
+
+    report = await batch.run(["user-1"])
+
+    assert report.stored == 1
+    assert snapshots.put.await_count == 2 and rollups.weekly.await_count == 2
+    snapshots.delete.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_review_is_dropped_while_the_rollups_keep_changing(tmp_path, rollups, snapshots):
+    rollups.version.side_effect = range(100)
+    batch = WeeklyReviewBatch(DashboardService(rollups=rollups, snapshots=snapshots), snapshots, WEEK,
+                              checkpoint_path=str(tmp_path / "ckpt.json"))
+
+    report = await batch.run(["user-1"])
+
+    # No snapshot is left behind, so the dashboard computes the review; the next run retries the user
+    assert (report.stored, report.failed) == (0, 1)
+    snapshots.delete.assert_awaited_once_with("user-1", WEEK)
+    assert "user-1" not in (tmp_path / "ckpt.json").read_text().splitlines()[1:]
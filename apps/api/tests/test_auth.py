@@ -1,16 +1,25 @@
 # apps/api/tests/test_auth.py
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 import uuid
 from app.main import app
+from app.api.auth import get_auth_supabase_client
 
 client = TestClient(app)
 
-@patch('app.api.auth.create_client')
+@pytest.fixture
+def mock_create_client():
+    # Register/login get their Supabase client from the shared registry dependency.
+    mock_factory = MagicMock()
+    app.dependency_overrides[get_auth_supabase_client] = lambda: mock_factory.return_value
+    yield mock_factory
+    app.dependency_overrides.pop(get_auth_supabase_client, None)
+
 def test_register_user_success(mock_create_client):
     # Configure the mock to simulate a successful registration
     mock_supabase_client = MagicMock()
+    mock_supabase_client.auth.sign_up = AsyncMock()
     mock_supabase_client.auth.sign_up.return_value = MagicMock(
         user=MagicMock(id=str(uuid.uuid4()), email="test@example.com"),
         session=MagicMock(),
@@ -22,16 +31,16 @@ def test_register_user_success(mock_create_client):
 
     assert response.status_code == 201
     assert response.json()["user"]["email"] == "test@example.com"
-    mock_supabase_client.auth.sign_up.assert_called_once()
+    mock_supabase_client.auth.sign_up.assert_awaited_once()
 
-def test_register_user_failure_invalid_input():
+def test_register_user_failure_invalid_input(mock_create_client):
     response = client.post("/api/v1/register", json={"email": "invalid-email", "password": "123"})
     assert response.status_code == 422
 
-@patch('app.api.auth.create_client')
 def test_register_user_failure_service_error(mock_create_client):
     # Configure the mock to simulate a registration error
     mock_supabase_client = MagicMock()
+    mock_supabase_client.auth.sign_up = AsyncMock()
     mock_supabase_client.auth.sign_up.return_value = MagicMock(
         user=None,
         session=None,
@@ -43,12 +52,12 @@ def test_register_user_failure_service_error(mock_create_client):
 
     assert response.status_code == 400
     assert "User already registered" in response.json()["detail"]
-    mock_supabase_client.auth.sign_up.assert_called_once()
+    mock_supabase_client.auth.sign_up.assert_awaited_once()
 
-@patch('app.api.auth.create_client')
 def test_login_user_success(mock_create_client):
     # Configure the mock to simulate a successful login
     mock_supabase_client = MagicMock()
+    mock_supabase_client.auth.sign_in_with_password = AsyncMock()
     mock_supabase_client.auth.sign_in_with_password.return_value = MagicMock(
         session=MagicMock(access_token="mock_access_token"),
         error=None
@@ -59,12 +68,12 @@ def test_login_user_success(mock_create_client):
 
     assert response.status_code == 200
     assert response.json()["access_token"] == "mock_access_token"
-    mock_supabase_client.auth.sign_in_with_password.assert_called_once()
+    mock_supabase_client.auth.sign_in_with_password.assert_awaited_once()
 
-@patch('app.api.auth.create_client')
 def test_login_user_failure_invalid_credentials(mock_create_client):
     # Configure the mock to simulate a login error
     mock_supabase_client = MagicMock()
+    mock_supabase_client.auth.sign_in_with_password = AsyncMock()
     mock_supabase_client.auth.sign_in_with_password.return_value = MagicMock(
         session=None,
         error=MagicMock(message="Invalid login credentials")
@@ -75,4 +84,4 @@ def test_login_user_failure_invalid_credentials(mock_create_client):
 
     assert response.status_code == 401
     assert "Invalid login credentials" in response.json()["detail"]
-    mock_supabase_client.auth.sign_in_with_password.assert_called_once()
\ No newline at end of file
+    mock_supabase_client.auth.sign_in_with_password.assert_awaited_once()
\ No newline at end of file
@@ -7,7 +7,7 @@ from datetime import datetime
 import json # Import json
 
 from app.main import app
-from app.models.workout_log import WorkoutLogCreate, WorkoutLogResponse
+from app.models.workout_log import WorkoutLogBulkResult, WorkoutLogCreate, WorkoutLogResponse
 from app.services.log_service import LogService
 from app.core.supabase import get_current_user_id
 
@@ -32,7 +32,7 @@ def mock_log_service():
 async def test_bulk_log_workout_sets_success(mock_log_service):
     user_id = override_get_current_user_id()
     mock_log_service.create_bulk_log_entries.return_value = [
-        WorkoutLogResponse(
+        WorkoutLogBulkResult(
             id=uuid4(),
             user_id=user_id,
             plan_id=None,
@@ -62,6 +62,16 @@ async def test_bulk_log_workout_sets_success(mock_log_service):
     assert response.status_code == 201
     assert mock_log_service.create_bulk_log_entries.called
     assert response.json()[0]["exercise_name"] == "Squat"
+    assert response.json()[0]["status"] == "created"
+
+def test_bulk_log_workout_sets_rejects_oversized_batch(mock_log_service):
+    entry = {"exercise_name": "Squat", "set_number": 1, "actual_reps": 10, "actual_weight": 100.0, "rpe": 8.0}
+
+    with patch("app.api.logs.settings.LOG_BULK_MAX_ENTRIES", 2):
+        response = client.post("/api/v1/logs/bulk", json=[entry] * 3)
+
+    assert response.status_code == 413
+    assert not mock_log_service.create_bulk_log_entries.called
 
 @pytest.mark.asyncio
 async def test_bulk_log_workout_sets_service_failure(mock_log_service):
@@ -42,6 +42,7 @@ def mock_user_service(mocker):
     Fixture to mock the UserService dependency.
     """
     mock_service_instance = mocker.Mock(spec=UserService)
+    mock_service_instance.profile_version = AsyncMock(return_value=1)
     mock_service_instance.get_user_profile = AsyncMock(return_value=MOCK_USER_PROFILE)
     mock_service_instance.update_user_profile = AsyncMock(return_value=MOCK_USER_PROFILE)
 
@@ -60,7 +61,7 @@ def test_get_user_profile_success(mock_get_current_user_id, mock_user_service):
     # The HTTP response JSON will always have a string. We need to compare JSON-like dicts.
     # A simple way is to load the dumped json string back into a dict.
     assert response.json() == json.loads(MOCK_USER_PROFILE.model_dump_json())
-    mock_user_service.get_user_profile.assert_called_once_with(MOCK_USER_ID)
+    mock_user_service.get_user_profile.assert_called_once_with(MOCK_USER_ID, min_version=1)
 
 def test_get_user_profile_not_found(mock_get_current_user_id, mock_user_service):
     """
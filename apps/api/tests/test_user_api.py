@@ -37,6 +37,7 @@ mock_user_profile_model = UserProfileData(
 
 def test_read_current_user(client: TestClient, mocker):
     # We also need to mock the service layer that the endpoint calls
+    mocker.patch("app.api.user.UserService.profile_version", return_value=1)
     mocker.patch(
         "app.api.user.UserService.get_user_profile",
         return_value=mock_user_profile_model
@@ -44,6 +45,32 @@ def test_read_current_user(client: TestClient, mocker):
     response = client.get("/api/v1/users/me")
     assert response.status_code == 200
     assert response.json()["id"] == str(MOCK_USER_ID)
+def test_read_current_user_revalidates_with_etag(client: TestClient, mocker):
+    mocker.patch("app.api.user.UserService.profile_version", return_value=3)
+    get_profile = mocker.patch(
+        "app.api.user.UserService.get_user_profile",
+        return_value=mock_user_profile_model
+    )
+    etag = client.get("/api/v1/users/me").headers["etag"]
+    get_profile.assert_called_once_with(MOCK_USER_ID, min_version=3)
+
+    unchanged = client.get("/api/v1/users/me", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    # The 304 is decided from the version alone: the profile is not built again.
+    assert get_profile.call_count == 1
+
+    mocker.patch("app.api.user.UserService.profile_version", return_value=4)
+    changed = client.get("/api/v1/users/me", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+def test_read_current_user_without_a_row_is_404(client: TestClient, mocker):
+    mocker.patch("app.api.user.UserService.profile_version", return_value=None)
+    get_profile = mocker.patch("app.api.user.UserService.get_user_profile")
+
+    response = client.get("/api/v1/users/me")
+    assert response.status_code == 404
+    get_profile.assert_not_called()
 
 def test_update_current_user(client: TestClient, mocker):
     update_data = {
@@ -12,6 +12,8 @@ export default function WeeklyReview() {
   }
 
   const { weekly_review } = dashboardData;
+  // The API reviews the last closed week (week_start); older payloads covered the current one.
+  const periodLabel = weekly_review.week_start ? 'Last Week' : 'This Week';
 
   const getTrendIcon = (trend: 'up' | 'down') => {
     return trend === 'up' ? 'arrow_drop_up' : 'arrow_drop_down';
@@ -29,12 +31,16 @@ export default function WeeklyReview() {
         <p className="text-white text-base font-medium leading-normal">Volume</p>
         <p className="text-white tracking-light text-[32px] font-bold leading-tight truncate">{weekly_review.volume.value}</p>
         <div className="flex gap-1 items-center">
-          <p className="text-[#92c9a4] text-base font-normal leading-normal">This Week</p>
+          <p className="text-[#92c9a4] text-base font-normal leading-normal">{periodLabel}</p>
           <span className={`material-symbols-outlined ${getTrendColor(weekly_review.volume.trend)} text-lg`}>{getTrendIcon(weekly_review.volume.trend)}</span>
           <p className={`text-base font-medium leading-normal ${getTrendColor(weekly_review.volume.trend)}`}>{weekly_review.volume.percentage_change}</p>
         </div>
-        <div className="flex min-h-[180px] flex-1 flex-col gap-8 py-4" dangerouslySetInnerHTML={{ __html: weekly_review.volume.chart_svg }}>
-        </div>
+        {weekly_review.volume.chart_url ? (
+          <img className="flex min-h-[180px] w-full flex-1 py-4" src={weekly_review.volume.chart_url} alt="Volume trend" />
+        ) : (
+          <div className="flex min-h-[180px] flex-1 flex-col gap-8 py-4" dangerouslySetInnerHTML={{ __html: weekly_review.volume.chart_svg }}>
+          </div>
+        )}
         <div className="flex justify-around">
           <p className="text-[#92c9a4] text-[13px] font-bold leading-normal tracking-[0.015em]">Mon</p>
           <p className="text-[#92c9a4] text-[13px] font-bold leading-normal tracking-[0.015em]">Tue</p>
@@ -50,12 +56,16 @@ export default function WeeklyReview() {
         <p className="text-white text-base font-medium leading-normal">Intensity</p>
         <p className="text-white tracking-light text-[32px] font-bold leading-tight truncate">{weekly_review.intensity.value}</p>
         <div className="flex gap-1 items-center">
-          <p className="text-[#92c9a4] text-base font-normal leading-normal">This Week</p>
+          <p className="text-[#92c9a4] text-base font-normal leading-normal">{periodLabel}</p>
           <span className={`material-symbols-outlined ${getTrendColor(weekly_review.intensity.trend)} text-lg`}>{getTrendIcon(weekly_review.intensity.trend)}</span>
           <p className={`text-base font-medium leading-normal ${getTrendColor(weekly_review.intensity.trend)}`}>{weekly_review.intensity.percentage_change}</p>
         </div>
-        <div className="flex min-h-[180px] flex-1 flex-col gap-8 py-4" dangerouslySetInnerHTML={{ __html: weekly_review.intensity.chart_svg }}>
-        </div>
+        {weekly_review.intensity.chart_url ? (
+          <img className="flex min-h-[180px] w-full flex-1 py-4" src={weekly_review.intensity.chart_url} alt="Intensity trend" />
+        ) : (
+          <div className="flex min-h-[180px] flex-1 flex-col gap-8 py-4" dangerouslySetInnerHTML={{ __html: weekly_review.intensity.chart_svg }}>
+          </div>
+        )}
         <div className="flex justify-around">
           <p className="text-[#92c9a4] text-[13px] font-bold leading-normal tracking-[0.015em]">Mon</p>
           <p className="text-[#92c9a4] text-[13px] font-bold leading-normal tracking-[0.015em]">Tue</p>
@@ -71,7 +81,7 @@ export default function WeeklyReview() {
         <p className="text-white text-base font-medium leading-normal">Consistency</p>
         <p className="text-white tracking-light text-[32px] font-bold leading-tight truncate">{weekly_review.consistency.value}</p>
         <div className="flex gap-1 items-center">
-          <p className="text-[#92c9a4] text-base font-normal leading-normal">This Week</p>
+          <p className="text-[#92c9a4] text-base font-normal leading-normal">{periodLabel}</p>
           <span className={`material-symbols-outlined ${getTrendColor(weekly_review.consistency.trend)} text-lg`}>{getTrendIcon(weekly_review.consistency.trend)}</span>
           <p className={`text-base font-medium leading-normal ${getTrendColor(weekly_review.consistency.trend)}`}>{weekly_review.consistency.percentage_change}</p>
         </div>
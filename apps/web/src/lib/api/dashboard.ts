@@ -23,17 +23,20 @@ export interface DashboardMetrics {
     date: string;
   }>;
   weekly_review: {
+    week_start?: string | null; // Monday of the reviewed (closed) week, YYYY-MM-DD
     volume: {
       value: string;
       trend: "up" | "down";
       percentage_change: string;
-      chart_svg: string; // Placeholder for actual SVG or data to render chart
+      chart_svg: string; // inline SVG; empty when chart_url is set
+      chart_url?: string | null; // ETag-cached SVG served by the API
     };
     intensity: {
       value: string;
       trend: "up" | "down";
       percentage_change: string;
-      chart_svg: string; // Placeholder for actual SVG or data to render chart
+      chart_svg: string; // inline SVG; empty when chart_url is set
+      chart_url?: string | null; // ETag-cached SVG served by the API
     };
     consistency: {
       value: string;
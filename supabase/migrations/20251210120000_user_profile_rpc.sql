@@ -0,0 +1,107 @@
+-- Single-round-trip profile reads and atomic profile updates for GET/PUT /users/me.
+
+-- Embedded selects order the latest goal per user; keep that lookup index-only.
+create index if not exists goals_user_id_created_at_idx on public.goals (user_id, created_at desc);
+create index if not exists equipment_user_id_idx on public.equipment (user_id);
+
+-- Profile payload in the same shape as UserService.PROFILE_SELECT:
+-- users row + `goals` (latest only) + `equipment` (names).
+create or replace function public.user_profile_json(p_user_id uuid)
+returns jsonb
+language sql
+stable
+security invoker
+set search_path = public
+as $$
+    select jsonb_build_object(
+        'id', u.id,
+        'email', u.email,
+        'unit_preference', u.unit_preference,
+        'updated_at', u.updated_at,
+        'goals', coalesce((
+            select jsonb_agg(to_jsonb(g))
+            from (
+                select primary_goal, training_frequency, training_duration, injuries_limitations, created_at
+                from public.goals
+                where user_id = u.id
+                order by created_at desc
+                limit 1
+            ) g
+        ), '[]'::jsonb),
+        'equipment', coalesce((
+            select jsonb_agg(jsonb_build_object('name', e.name))
+            from public.equipment e
+            where e.user_id = u.id
+        ), '[]'::jsonb)
+    )
+    from public.users u
+    where u.id = p_user_id;
+$$;
+
+-- Applies user / goal / equipment changes in one transaction and returns the new profile.
+-- NULL arguments leave that part of the profile untouched; an empty p_equipment array clears it.
+-- Runs as the caller, so the existing RLS policies on users/goals/equipment still apply.
+create or replace function public.update_user_profile(
+    p_user_id uuid,
+    p_unit_preference text default null,
+    p_goal jsonb default null,
+    p_equipment text[] default null
+)
+returns jsonb
+language plpgsql
+security invoker
+set search_path = public
+as $$
+declare
+    v_goal_id uuid;
+begin
+    if not exists (select 1 from public.users where id = p_user_id) then
+        return null;
+    end if;
+
+    if p_unit_preference is not null then
+        update public.users
+        set unit_preference = p_unit_preference,
+            updated_at = now()
+        where id = p_user_id;
+    end if;
+
+    if p_goal is not null and p_goal <> '{}'::jsonb then
+        select id into v_goal_id
+        from public.goals
+        where user_id = p_user_id
+        order by created_at desc
+        limit 1
+        for update;
+
+        if v_goal_id is not null then
+            update public.goals
+            set primary_goal = coalesce(p_goal->>'primary_goal', primary_goal),
+                training_frequency = coalesce((p_goal->>'training_frequency')::int, training_frequency),
+                training_duration = coalesce((p_goal->>'training_duration')::int, training_duration),
+                injuries_limitations = coalesce(p_goal->>'injuries_limitations', injuries_limitations)
+            where id = v_goal_id;
+        else
+            insert into public.goals (user_id, primary_goal, training_frequency, training_duration, injuries_limitations)
+            values (
+                p_user_id,
+                p_goal->>'primary_goal',
+                (p_goal->>'training_frequency')::int,
+                (p_goal->>'training_duration')::int,
+                p_goal->>'injuries_limitations'
+            );
+        end if;
+    end if;
+
+    if p_equipment is not null then
+        delete from public.equipment where user_id = p_user_id;
+        insert into public.equipment (user_id, name)
+        select p_user_id, name from unnest(p_equipment) as name;
+    end if;
+
+    return public.user_profile_json(p_user_id);
+end;
+$$;
+
+grant execute on function public.user_profile_json(uuid) to authenticated;
+grant execute on function public.update_user_profile(uuid, text, jsonb, text[]) to authenticated;
@@ -0,0 +1,10 @@
+-- Persistent tier of the plan generation cache (AIOrchestratorService / WorkoutPlanCacheBackend).
+-- Each stored plan records the content hash of the prompt it was generated from, so an identical
+-- request within PLAN_CACHE_TTL_SECONDS can reuse it instead of calling the LLM again.
+
+alter table public."WorkoutPlans" add column if not exists prompt_hash text;
+
+-- Lookups are "newest row for this hash since <ttl ago>".
+create index if not exists workout_plans_prompt_hash_created_at_idx
+    on public."WorkoutPlans" (prompt_hash, created_at desc)
+    where prompt_hash is not null;
@@ -0,0 +1,15 @@
+-- Draft plans pre-generated overnight (app.services.plan_batch). A draft is confirmed in place
+-- when /plans/generate adapts it to the user's context in the morning.
+
+alter table public."WorkoutPlans"
+    add column if not exists status text not null default 'confirmed'
+    check (status in ('draft', 'confirmed'));
+
+-- /plans/generate looks up "today's draft for this user" on every call.
+create index if not exists workout_plans_drafts_idx
+    on public."WorkoutPlans" (user_id, plan_date, created_at desc)
+    where status = 'draft';
+
+-- The batch's active-user scan: distinct users with a recent plan.
+create index if not exists workout_plans_plan_date_user_id_idx
+    on public."WorkoutPlans" (plan_date, user_id);
@@ -0,0 +1,33 @@
+-- Offline sync (GET /sync/pull) pages through rows changed since a device's cursor in
+-- (updated_at, id) order, so both synced tables need a change timestamp kept current on update.
+
+create or replace function public.set_updated_at() returns trigger
+    language plpgsql as $$
+begin
+    new.updated_at = now();
+    return new;
+end;
+$$;
+
+alter table public."WorkoutLogs"
+    add column if not exists updated_at timestamptz not null default now();
+
+alter table public."WorkoutPlans"
+    add column if not exists updated_at timestamptz not null default now();
+
+drop trigger if exists workout_logs_set_updated_at on public."WorkoutLogs";
+create trigger workout_logs_set_updated_at
+    before update on public."WorkoutLogs"
+    for each row execute function public.set_updated_at();
+
+drop trigger if exists workout_plans_set_updated_at on public."WorkoutPlans";
+create trigger workout_plans_set_updated_at
+    before update on public."WorkoutPlans"
+    for each row execute function public.set_updated_at();
+
+-- Keyset scans: user_id = ? and (updated_at, id) > (?, ?) order by updated_at, id
+create index if not exists workout_logs_sync_idx
+    on public."WorkoutLogs" (user_id, updated_at, id);
+
+create index if not exists workout_plans_sync_idx
+    on public."WorkoutPlans" (user_id, updated_at, id);
@@ -0,0 +1,21 @@
+-- GET /logs pages through a user's sets newest first in (completed_at, id) keyset order,
+-- optionally narrowed to one exercise or one plan:
+--   user_id = ? [and exercise_name = ? | and plan_id = ?]
+--     and (completed_at, id) < (?, ?) order by completed_at desc, id desc limit ?
+-- Each index below serves one of those shapes as a single range scan (b-trees are read
+-- backwards for the descending order), so page latency stays flat however deep a client pages.
+
+create index if not exists workout_logs_user_completed_idx
+    on public."WorkoutLogs" (user_id, completed_at, id);
+
+-- Per-exercise history is what the dashboard and progression charts read most. The columns
+-- they select are included so those pages can be answered by an index-only scan; widen the
+-- include list if those readers start selecting more fields.
+create index if not exists workout_logs_user_exercise_completed_idx
+    on public."WorkoutLogs" (user_id, exercise_name, completed_at, id)
+    include (set_number, actual_reps, actual_weight, rpe);
+
+-- Most sets logged offline or ad hoc have no plan, so only index the ones that do.
+create index if not exists workout_logs_user_plan_completed_idx
+    on public."WorkoutLogs" (user_id, plan_id, completed_at, id)
+    where plan_id is not null;
@@ -0,0 +1,115 @@
+-- Per-user training rollups for GET /dashboard (see app.services.rollup_service.RollupService).
+-- The dashboard reads a few weeks of these rows instead of scanning every WorkoutLogs set.
+
+create table if not exists public."WorkoutDailyRollups" (
+    user_id uuid not null,
+    day date not null, -- completed_at, UTC
+    exercise_name text not null,
+    sets integer not null default 0,
+    reps integer not null default 0,
+    volume double precision not null default 0, -- sum of actual_reps * actual_weight
+    top_weight double precision not null default 0,
+    best_e1rm double precision not null default 0, -- Epley, sets with at least one rep
+    updated_at timestamptz not null default now(),
+    primary key (user_id, day, exercise_name)
+);
+
+create table if not exists public."WorkoutWeeklyRollups" (
+    user_id uuid not null,
+    week_start date not null, -- Monday, date_trunc('week', day)
+    exercise_name text not null,
+    sets integer not null default 0,
+    reps integer not null default 0,
+    volume double precision not null default 0,
+    top_weight double precision not null default 0,
+    best_e1rm double precision not null default 0,
+    updated_at timestamptz not null default now(),
+    primary key (user_id, week_start, exercise_name)
+);
+
+alter table public."WorkoutDailyRollups" enable row level security;
+alter table public."WorkoutWeeklyRollups" enable row level security;
+
+drop policy if exists "Users manage their daily rollups" on public."WorkoutDailyRollups";
+create policy "Users manage their daily rollups" on public."WorkoutDailyRollups"
+    for all using (auth.uid() = user_id) with check (auth.uid() = user_id);
+
+drop policy if exists "Users manage their weekly rollups" on public."WorkoutWeeklyRollups";
+create policy "Users manage their weekly rollups" on public."WorkoutWeeklyRollups"
+    for all using (auth.uid() = user_id) with check (auth.uid() = user_id);
+
+-- Adds newly stored sets, pre-aggregated per (day, exercise) by the API, to both rollups.
+-- p_deltas: [{"day", "exercise_name", "sets", "reps", "volume", "top_weight", "best_e1rm"}, ...]
+-- Each upsert increments in place, so concurrent writers for the same user never lose an update.
+-- Runs as the caller, so the RLS policies above apply as they do to WorkoutLogs writes.
+create or replace function public.apply_workout_log_rollups(p_user_id uuid, p_deltas jsonb)
+returns void
+language sql
+security invoker
+set search_path = public
+as $$
+    insert into public."WorkoutDailyRollups" as r (user_id, day, exercise_name, sets, reps, volume, top_weight, best_e1rm)
+    select p_user_id, (d->>'day')::date, d->>'exercise_name', (d->>'sets')::int, (d->>'reps')::int,
+           (d->>'volume')::double precision, (d->>'top_weight')::double precision, (d->>'best_e1rm')::double precision
+    from jsonb_array_elements(p_deltas) d
+    on conflict (user_id, day, exercise_name) do update set
+        sets = r.sets + excluded.sets,
+        reps = r.reps + excluded.reps,
+        volume = r.volume + excluded.volume,
+        top_weight = greatest(r.top_weight, excluded.top_weight),
+        best_e1rm = greatest(r.best_e1rm, excluded.best_e1rm),
+        updated_at = now();
+
+    insert into public."WorkoutWeeklyRollups" as r (user_id, week_start, exercise_name, sets, reps, volume, top_weight, best_e1rm)
+    select p_user_id, date_trunc('week', (d->>'day')::date)::date, d->>'exercise_name',
+           sum((d->>'sets')::int), sum((d->>'reps')::int), sum((d->>'volume')::double precision),
+           max((d->>'top_weight')::double precision), max((d->>'best_e1rm')::double precision)
+    from jsonb_array_elements(p_deltas) d
+    group by 2, 3
+    on conflict (user_id, week_start, exercise_name) do update set
+        sets = r.sets + excluded.sets,
+        reps = r.reps + excluded.reps,
+        volume = r.volume + excluded.volume,
+        top_weight = greatest(r.top_weight, excluded.top_weight),
+        best_e1rm = greatest(r.best_e1rm, excluded.best_e1rm),
+        updated_at = now();
+$$;
+
+-- Recomputes a user's rollups from WorkoutLogs: the backfill below, and the repair for a
+-- failed apply or for sets changed outside LogService.
+create or replace function public.rebuild_workout_log_rollups(p_user_id uuid)
+returns void
+language plpgsql
+security invoker
+set search_path = public
+as $$
+begin
+    delete from public."WorkoutDailyRollups" where user_id = p_user_id;
+    delete from public."WorkoutWeeklyRollups" where user_id = p_user_id;
+
+    insert into public."WorkoutDailyRollups" (user_id, day, exercise_name, sets, reps, volume, top_weight, best_e1rm)
+    select user_id, (completed_at at time zone 'utc')::date, exercise_name, count(*), sum(actual_reps),
+           sum(actual_reps * actual_weight), max(actual_weight),
+           coalesce(max(case
+               when actual_reps = 1 then actual_weight
+               when actual_reps > 1 then actual_weight * (1 + actual_reps / 30.0)
+           end), 0)
+    from public."WorkoutLogs"
+    where user_id = p_user_id
+    group by 1, 2, 3;
+
+    insert into public."WorkoutWeeklyRollups" (user_id, week_start, exercise_name, sets, reps, volume, top_weight, best_e1rm)
+    select user_id, date_trunc('week', day)::date, exercise_name, sum(sets), sum(reps), sum(volume),
+           max(top_weight), max(best_e1rm)
+    from public."WorkoutDailyRollups"
+    where user_id = p_user_id
+    group by 1, 2, 3;
+end;
+$$;
+
+grant execute on function public.apply_workout_log_rollups(uuid, jsonb) to authenticated, service_role;
+grant execute on function public.rebuild_workout_log_rollups(uuid) to authenticated, service_role;
+
+-- Backfill everyone who already has sets.
+select public.rebuild_workout_log_rollups(user_id)
+from (select distinct user_id from public."WorkoutLogs") users;
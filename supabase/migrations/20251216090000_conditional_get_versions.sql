@@ -0,0 +1,86 @@
+-- Versions for conditional GETs (ETag / If-None-Match, see app.core.conditional).
+
+-- GET /dashboard: one counter per user, bumped whenever the user's rollups change, so a 304 can
+-- be decided with a primary-key read instead of reading the rollups.
+create table if not exists public."WorkoutRollupVersions" (
+    user_id uuid primary key,
+    version bigint not null default 0,
+    updated_at timestamptz not null default now()
+);
+
+alter table public."WorkoutRollupVersions" enable row level security;
+
+drop policy if exists "Users manage their rollup version" on public."WorkoutRollupVersions";
+create policy "Users manage their rollup version" on public."WorkoutRollupVersions"
+    for all using (auth.uid() = user_id) with check (auth.uid() = user_id);
+
+create or replace function public.apply_workout_log_rollups(p_user_id uuid, p_deltas jsonb)
+returns void
+language sql
+security invoker
+set search_path = public
+as $$
+    insert into public."WorkoutDailyRollups" as r (user_id, day, exercise_name, sets, reps, volume, top_weight, best_e1rm)
+    select p_user_id, (d->>'day')::date, d->>'exercise_name', (d->>'sets')::int, (d->>'reps')::int,
+           (d->>'volume')::double precision, (d->>'top_weight')::double precision, (d->>'best_e1rm')::double precision
+    from jsonb_array_elements(p_deltas) d
+    on conflict (user_id, day, exercise_name) do update set
+        sets = r.sets + excluded.sets,
+        reps = r.reps + excluded.reps,
+        volume = r.volume + excluded.volume,
+        top_weight = greatest(r.top_weight, excluded.top_weight),
+        best_e1rm = greatest(r.best_e1rm, excluded.best_e1rm),
+        updated_at = now();
+
+    insert into public."WorkoutWeeklyRollups" as r (user_id, week_start, exercise_name, sets, reps, volume, top_weight, best_e1rm)
+    select p_user_id, date_trunc('week', (d->>'day')::date)::date, d->>'exercise_name',
+           sum((d->>'sets')::int), sum((d->>'reps')::int), sum((d->>'volume')::double precision),
+           max((d->>'top_weight')::double precision), max((d->>'best_e1rm')::double precision)
+    from jsonb_array_elements(p_deltas) d
+    group by 2, 3
+    on conflict (user_id, week_start, exercise_name) do update set
+        sets = r.sets + excluded.sets,
+        reps = r.reps + excluded.reps,
+        volume = r.volume + excluded.volume,
+        top_weight = greatest(r.top_weight, excluded.top_weight),
+        best_e1rm = greatest(r.best_e1rm, excluded.best_e1rm),
+        updated_at = now();
+
+    insert into public."WorkoutRollupVersions" as v (user_id, version)
+    values (p_user_id, 1)
+    on conflict (user_id) do update set version = v.version + 1, updated_at = now();
+$$;
+
+create or replace function public.rebuild_workout_log_rollups(p_user_id uuid)
+returns void
+language plpgsql
+security invoker
+set search_path = public
+as $$
+begin
+    delete from public."WorkoutDailyRollups" where user_id = p_user_id;
+    delete from public."WorkoutWeeklyRollups" where user_id = p_user_id;
+
+    insert into public."WorkoutDailyRollups" (user_id, day, exercise_name, sets, reps, volume, top_weight, best_e1rm)
+    select user_id, (completed_at at time zone 'utc')::date, exercise_name, count(*), sum(actual_reps),
+           sum(actual_reps * actual_weight), max(actual_weight),
+           coalesce(max(case
+               when actual_reps = 1 then actual_weight
+               when actual_reps > 1 then actual_weight * (1 + actual_reps / 30.0)
+           end), 0)
+    from public."WorkoutLogs"
+    where user_id = p_user_id
+    group by 1, 2, 3;
+
+    insert into public."WorkoutWeeklyRollups" (user_id, week_start, exercise_name, sets, reps, volume, top_weight, best_e1rm)
+    select user_id, date_trunc('week', day)::date, exercise_name, sum(sets), sum(reps), sum(volume),
+           max(top_weight), max(best_e1rm)
+    from public."WorkoutDailyRollups"
+    where user_id = p_user_id
+    group by 1, 2, 3;
+
+    insert into public."WorkoutRollupVersions" as v (user_id, version)
+    values (p_user_id, 1)
+    on conflict (user_id) do update set version = v.version + 1, updated_at = now();
+end;
+$$;
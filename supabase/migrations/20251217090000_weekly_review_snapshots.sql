@@ -0,0 +1,16 @@
+-- Weekly Review snapshots (see app.services.weekly_review). One row per user and closed ISO week,
+-- written by `python -m app.services.weekly_review_batch`; GET /dashboard reads it by primary key.
+
+create table if not exists public."WeeklyReviewSnapshots" (
+    user_id uuid not null,
+    week_start date not null, -- Monday of the reviewed week
+    review jsonb not null, -- app.models.dashboard.WeeklyReview
+    created_at timestamptz not null default now(),
+    primary key (user_id, week_start)
+);
+
+alter table public."WeeklyReviewSnapshots" enable row level security;
+
+drop policy if exists "Users manage their weekly review snapshots" on public."WeeklyReviewSnapshots";
+create policy "Users manage their weekly review snapshots" on public."WeeklyReviewSnapshots"
+    for all using (auth.uid() = user_id) with check (auth.uid() = user_id);
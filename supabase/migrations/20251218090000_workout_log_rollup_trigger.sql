@@ -0,0 +1,49 @@
+-- Apply new WorkoutLogs sets to the rollups in the inserting transaction (see
+-- app.services.rollup_service.RollupService). Until now the API applied them with a second
+-- round trip after the insert; when that call failed the sets were stored but never counted.
+
+-- Statement-level, so a bulk upsert is one apply per user. `new_rows` holds only the rows the
+-- statement actually inserted: duplicates skipped by `on conflict do nothing` are not counted.
+-- The e1RM is Epley over sets with at least one rep, as in app.services.prompt_builder.estimated_1rm.
+create or replace function public.apply_inserted_workout_log_rollups()
+returns trigger
+language plpgsql
+security invoker
+set search_path = public
+as $$
+declare
+    batch record;
+begin
+    for batch in
+        select user_id, jsonb_agg(jsonb_build_object(
+                   'day', day, 'exercise_name', exercise_name, 'sets', sets, 'reps', reps,
+                   'volume', volume, 'top_weight', top_weight, 'best_e1rm', best_e1rm
+               )) as deltas
+        from (
+            select user_id, (completed_at at time zone 'utc')::date as day, exercise_name, count(*) as sets,
+                   sum(actual_reps) as reps, sum(actual_reps * actual_weight) as volume,
+                   max(actual_weight) as top_weight,
+                   coalesce(max(case
+                       when actual_reps = 1 then actual_weight
+                       when actual_reps > 1 then actual_weight * (1 + actual_reps / 30.0)
+                   end), 0) as best_e1rm
+            from new_rows
+            group by 1, 2, 3
+        ) d
+        group by user_id
+    loop
+        perform public.apply_workout_log_rollups(batch.user_id, batch.deltas);
+    end loop;
+    return null;
+end;
+$$;
+
+drop trigger if exists workout_logs_apply_rollups on public."WorkoutLogs";
+create trigger workout_logs_apply_rollups
+    after insert on public."WorkoutLogs"
+    referencing new table as new_rows
+    for each statement execute function public.apply_inserted_workout_log_rollups();
+
+-- Repair whatever the API-side apply lost before this trigger existed.
+select public.rebuild_workout_log_rollups(user_id)
+from (select distinct user_id from public."WorkoutLogs") users;
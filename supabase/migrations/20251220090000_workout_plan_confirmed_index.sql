@@ -0,0 +1,6 @@
+-- The nightly batch's active-user scan only counts confirmed plans (its own drafts are not
+-- activity), so index just those rows.
+drop index if exists public.workout_plans_plan_date_user_id_idx;
+create index if not exists workout_plans_confirmed_plan_date_user_id_idx
+    on public."WorkoutPlans" (plan_date, user_id)
+    where status = 'confirmed';
@@ -0,0 +1,8 @@
+-- The rollup trigger ran as the inserting role, so its rollup writes were checked against the
+-- rollup tables' RLS policies (auth.uid() = user_id). An insert made without a user JWT (the
+-- anon or a pooled client) then had its rollup write rejected, which aborted the set's insert
+-- with it. The trigger now runs as its owner, with search_path pinned; it only ever writes the
+-- rollups of rows the insert itself was allowed to add to WorkoutLogs.
+alter function public.apply_inserted_workout_log_rollups() security definer;
+alter function public.apply_inserted_workout_log_rollups() set search_path = public, pg_temp;
+revoke all on function public.apply_inserted_workout_log_rollups() from public;
@@ -0,0 +1,47 @@
+-- Profile version for conditional GETs on /users/me (see app.core.conditional). GET /users/me
+-- decides 304 from a primary-key read of `users.profile_version` before it builds the profile, so
+-- every write to the profile bumps it: users columns the profile shows, and any goal or equipment
+-- row. Onboarding and account deletion write those tables directly, so the bump lives in triggers.
+
+alter table public.users
+    add column if not exists profile_version bigint not null default 0;
+
+create or replace function public.bump_user_profile_version() returns trigger
+    language plpgsql as $$
+begin
+    new.profile_version = old.profile_version + 1;
+    return new;
+end;
+$$;
+
+drop trigger if exists users_bump_profile_version on public.users;
+create trigger users_bump_profile_version
+    before update of email, unit_preference on public.users
+    for each row execute function public.bump_user_profile_version();
+
+-- Definer, like the rollup trigger: the bump must land whoever writes goals or equipment (the
+-- user's own client, or the service role during onboarding repair and deletion).
+create or replace function public.bump_user_profile_version_from_child() returns trigger
+    language plpgsql
+    security definer
+    set search_path = public, pg_temp
+as $$
+begin
+    update public.users
+    set profile_version = profile_version + 1
+    where id = case when tg_op = 'DELETE' then old.user_id else new.user_id end;
+    return null;
+end;
+$$;
+
+revoke all on function public.bump_user_profile_version_from_child() from public;
+
+drop trigger if exists goals_bump_profile_version on public.goals;
+create trigger goals_bump_profile_version
+    after insert or update or delete on public.goals
+    for each row execute function public.bump_user_profile_version_from_child();
+
+drop trigger if exists equipment_bump_profile_version on public.equipment;
+create trigger equipment_bump_profile_version
+    after insert or update or delete on public.equipment
+    for each row execute function public.bump_user_profile_version_from_child();